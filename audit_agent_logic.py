@@ -1,12 +1,12 @@
 # audit_agent_logic.py
 import os
 import glob
-from google import genai
 from google.genai import types
 
-client = genai.Client(http_options={'api_version': 'v1alpha'})
+from llm_cache import cache_parser, generate_content
+from stage_context import StageContext
 
-def audit_persona(filename):
+def audit_persona(client, filename, cache=None):
     with open(filename, "r") as f:
         content = f.read()
 
@@ -33,19 +33,29 @@ def audit_persona(filename):
 
     print(f"--- 🕵️‍♀️ Auditing {os.path.basename(filename)} ---")
     
-    response = client.models.generate_content(
+    response = generate_content(
+        client,
         model='gemini-2.0-flash',
         contents=prompt,
         config=types.GenerateContentConfig(
             temperature=0.0
-        )
+        ),
+        cache=cache,
     )
     
     print(response.text)
     print("-" * 30)
 
-# Run on key agents first
-files = sorted(glob.glob("extracted_personas/agent_*.md")) + sorted(glob.glob("extracted_personas/persona_765.md"))
+def run(context):
+    args = context.parse_args(cache_parser("Static audit of extracted agent prompts"))
+    cache = context.cache(args.cache_mode)
 
-for file in files:
-    audit_persona(file)
+    # Run on key agents first
+    files = sorted(glob.glob("extracted_personas/agent_*.md")) + sorted(glob.glob("extracted_personas/persona_765.md"))
+
+    for file in files:
+        audit_persona(context.client, file, cache)
+    cache.report()
+
+if __name__ == "__main__":
+    run(StageContext())
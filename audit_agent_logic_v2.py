@@ -3,6 +3,11 @@ import glob
 from google import genai
 from google.genai import types
 
+from llm_cache import generate_content, open_cache, parse_cache_args
+
+args = parse_cache_args("Executability audit of hydrated agent prompts")
+cache = open_cache(args.cache_mode)
+
 # Initialize
 client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
 
@@ -31,9 +36,11 @@ def audit_file(filepath):
     ISSUES: [List of specific extracted variables or logic gaps]
     """
 
-    response = client.models.generate_content(
+    response = generate_content(
+        client,
         model="gemini-2.0-flash",
-        contents=prompt
+        contents=prompt,
+        cache=cache,
     )
     
     print(f"\n--- 🕵️‍♀️ Auditing {filepath} ---")
@@ -50,3 +57,4 @@ targets = [
 for t in targets:
     if os.path.exists(t):
         audit_file(t)
+cache.report()
@@ -3,6 +3,8 @@ import json
 from google import genai
 from google.genai import types
 
+from llm_cache import generate_content, open_cache, parse_cache_args
+
 # --- CONFIG ---
 API_KEY = os.environ.get("GOOGLE_API_KEY") # Ensure this is set
 PERSONAS_DIR = "hydrated_personas"
@@ -16,7 +18,7 @@ def load_tools():
             return json.load(f)
     return []
 
-def audit_persona(filename, content, tools_json):
+def audit_persona(filename, content, tools_json, cache=None):
     print(f"\n--- 🕵️‍♀️ Auditing {filename} with Gemini ---")
     
     prompt = f"""
@@ -51,19 +53,22 @@ def audit_persona(filename, content, tools_json):
     """
     
     try:
-        response = client.models.generate_content(
+        response = generate_content(
+            client,
             model="gemini-2.0-flash",
             contents=prompt,
             config=types.GenerateContentConfig(
                 response_mime_type="application/json"
-            )
+            ),
+            cache=cache,
         )
         return json.loads(response.text)
     except Exception as e:
         print(f"❌ Error auditing {filename}: {e}")
         return None
 
-def main():
+def main(cache_mode=None):
+    cache = open_cache(cache_mode)
     tools = load_tools()
     results = []
     
@@ -77,14 +82,17 @@ def main():
             with open(os.path.join(PERSONAS_DIR, fname), 'r') as f:
                 content = f.read()
             
-            audit = audit_persona(fname, content, tools)
+            audit = audit_persona(fname, content, tools, cache)
             if audit:
                 results.append(audit)
                 print(json.dumps(audit, indent=2))
 
+    cache.report()
+
     # Save Report
     with open('final_audit_report.json', 'w') as f:
         json.dump(results, f, indent=2)
 
 if __name__ == "__main__":
-    main()
+    args = parse_cache_args("Coherence and phantom-tool audit of hydrated personas")
+    main(args.cache_mode)
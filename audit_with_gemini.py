@@ -3,6 +3,11 @@ import glob
 from google import genai
 from google.genai import types
 
+from llm_cache import generate_content, open_cache, parse_cache_args
+
+args = parse_cache_args("Coherence audit of hydrated personas")
+cache = open_cache(args.cache_mode)
+
 # Initialize Client
 client = genai.Client(http_options={'api_version': 'v1alpha'})
 
@@ -25,9 +30,11 @@ def audit_persona(filename):
     {content[:10000]} # Limit to first 10k chars to fit context if needed
     """
 
-    response = client.models.generate_content(
+    response = generate_content(
+        client,
         model="gemini-2.0-flash",
-        contents=prompt
+        contents=prompt,
+        cache=cache,
     )
     
     print(response.text)
@@ -39,3 +46,4 @@ target_files = ["hydrated_personas/persona_765.md", "hydrated_personas/agent_eng
 for text_file in target_files:
     if os.path.exists(text_file):
         audit_persona(text_file)
+cache.report()
@@ -2,10 +2,14 @@ import os
 import sys
 import subprocess
 import argparse
-import time
+from typing import Optional
 from google import genai
 from google.genai import types
 
+from file_edit import edit_file, summary as edit_summary
+from port_inspector import parse_ports, report as port_report
+from process_killer import parse_pids, report as kill_report, terminate
+
 # --- Configuration ---
 DEFAULT_PERSONA = "hydrated_personas/agent_engineer.md"
 DEFAULT_MODEL = "gemini-2.0-flash"
@@ -38,69 +42,41 @@ def Bash(command: str):
     except Exception as e:
         return f"EXECUTION_ERROR: {str(e)}"
 
-def InspectPort(port: int):
-    """Returns detailed info (PID, User, Command) for the process on a port."""
-    print(f"\n[S] 🔍 Inspecting Port: {port}")
+def InspectPort(port: int = 0, ports: str = "", command: str = ""):
+    """Returns detailed info (PID, User, Command) for the process on a port.
+    Several at once: ports="8080,8081,8888". With no port, command="gemini_server_*" lists every port such processes listen on."""
+    wanted = parse_ports(port, ports)
+    print(f"\n[S] 🔍 Inspecting Port: {', '.join(map(str, wanted)) or command}")
     try:
-        # Try lsof first
-        cmd = f"lsof -i :{port} -t"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        pid = result.stdout.strip()
-        
-        if not pid:
-            # Try ss as fallback
-            cmd_ss = f"ss -lptn 'sport = :{port}' | grep -o 'pid=[0-9]*' | cut -d= -f2"
-            result_ss = subprocess.run(cmd_ss, shell=True, capture_output=True, text=True)
-            pid = result_ss.stdout.strip()
-
-        if not pid:
-            print("[S] 🚫 Port is free (no PID found).")
-            return "PORT_STATUS: FREE"
-        
-        # Get process details
-        print(f"[S] 🕵️ Found PID {pid}. Fetching details...")
-        ps_cmd = f"ps -fp {pid}"
-        ps_result = subprocess.run(ps_cmd, shell=True, capture_output=True, text=True)
-        
-        return f"PORT_STATUS: OCCUPIED\nPID: {pid}\nDETAILS:\n{ps_result.stdout}"
+        # One pass over /proc (see port_inspector.py) instead of lsof / ss / ps per port
+        return port_report(wanted, command or None)
     except Exception as e:
         return f"INSPECTION_ERROR: {str(e)}"
 
-def KillProcess(pid: int):
-    """Smart kill. Tries SIGTERM, waits, checks, then tries Sudo if needed."""
-    print(f"\n[S] 💀 Attempting to kill PID: {pid}")
-    
-    # 1. Try standard kill
-    subprocess.run(f"kill {pid}", shell=True)
-    time.sleep(1) 
-    
-    # 2. Check if still alive
-    check = subprocess.run(f"ps -p {pid}", shell=True, capture_output=True)
-    if check.returncode != 0:
-        print("[S] ☠️ Process successfully killed.")
-        return "STATUS: KILLED (Standard)"
-    
-    # 3. Try Sudo Kill
-    print("[S] 🛡️ Standard kill failed. Trying sudo -n kill -9...")
-    sudo_res = subprocess.run(f"sudo -n kill -9 {pid}", shell=True, capture_output=True, text=True)
-    
-    if sudo_res.returncode == 0:
-        print("[S] ☠️ Process killed with SUDO.")
-        return "STATUS: KILLED (Sudo Force)"
-    else:
-        print(f"[S] ❌ Sudo failed. Output: {sudo_res.stderr}")
-        return f"STATUS: FAILED_TO_KILL. Stderr: {sudo_res.stderr}"
-
-def Edit(path: str, content: str):
-    """Writes content to a file (overwrites)."""
+def KillProcess(pid: int = 0, pids: str = "", grace: float = 5):
+    """Smart kill. SIGTERMs the process with its process group and children, returns as soon as it exits,
+    SIGKILLs whatever is left after `grace` seconds, then tries Sudo if needed. Several at once: pids="123,456"."""
+    wanted = parse_pids(pid, pids)
+    print(f"\n[S] 💀 Attempting to kill PID: {', '.join(map(str, wanted))}")
+    try:
+        # Waits on pidfds (see process_killer.py) instead of `kill`, a fixed sleep and `ps -p`
+        return kill_report(terminate(wanted, grace=grace, sudo=True))
+    except Exception as e:
+        return f"STATUS: FAILED_TO_KILL. {str(e)}"
+
+def Edit(path: str, content: Optional[str] = None, old_string: str = "", new_string: str = "", diff: str = "",
+         expected_sha: str = "", replace_all: bool = False):
+    """Edits a file. To change part of it, give old_string and new_string (old_string must match the file
+    exactly, once, unless replace_all) or a unified diff; content overwrites (or creates) the whole file,
+    "" empties it.
+    expected_sha: the sha256 (8+ hex digits) an earlier Edit returned; refuses if the file changed since."""
     expanded_path = os.path.expanduser(path)
     print(f"\n[S] ✏️ Editing file: {expanded_path}")
     try:
-        os.makedirs(os.path.dirname(os.path.abspath(expanded_path)), exist_ok=True)
-        with open(expanded_path, "w") as f:
-            f.write(content)
-        print(f"[S] ✅ File written ({len(content)} chars).")
-        return f"Successfully wrote to {expanded_path}"
+        # Temp file + rename, answered with a compact diff (see file_edit.py)
+        result = edit_file(expanded_path, content, old_string, new_string, diff, expected_sha, replace_all)
+        print(f"[S] ✅ {result.mode}: +{result.added} -{result.removed} lines.")
+        return edit_summary(result)
     except Exception as e:
         return f"Error writing file: {str(e)}"
 
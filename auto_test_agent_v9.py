@@ -5,6 +5,8 @@ import subprocess
 import sys
 from datetime import datetime
 
+from file_index import FileIndex
+
 
 class StateManifest:
     """Manages persistent context and environmental facts."""
@@ -57,6 +59,7 @@ class AutoTestAgentV9:
         self.max_iterations = 10
         self.model_id = "gemini-3-pro"
         self.api_key = os.environ.get("GEMINI_API_KEY")
+        self.files = FileIndex(".").start()  # discovery lookups, instead of a `find` per filename
 
     def discovery_mode(self, command):
         """Parses command for filenames and updates manifest with found paths."""
@@ -64,10 +67,9 @@ class AutoTestAgentV9:
         filenames = re.findall(r"([a-zA-Z0-9_\-]+\.[a-zA-Z0-9]+)", command)
         for filename in filenames:
             print(f"🕵️ Discovery Mode: Searching for {filename}...")
-            find_cmd = f"find . -name '{filename}'"
-            res = subprocess.run(find_cmd, shell=True, capture_output=True, text=True)
-            if res.returncode == 0 and res.stdout.strip():
-                corrected_path = res.stdout.strip().split('\n')[0]
+            found = self.files.find(filename)
+            if found:
+                corrected_path = found[0]
                 print(f"✅ Found corrected path: {corrected_path}")
                 self.state.update_fact(filename, corrected_path)
 
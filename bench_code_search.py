@@ -0,0 +1,67 @@
+"""
+bench_code_search.py
+The Grep tool's old `grep -r` vs code_search.search() on real trees.
+
+For each pattern, over each --path (this repository, and node_modules when there is one):
+  grep -rn           what the consoles ran: everything, .git and node_modules included
+  grep --exclude-dir the same with code_search.IGNORED_DIRS excluded, for a fair comparison
+  search() full      every match (max_results unbounded)
+  search() budget    the tool's default budget of --max-results matches
+
+Usage:
+    python3 bench_code_search.py [--path . --path ../node_modules] [--pattern 'def \\w+'] [--repeat 5]
+"""
+import argparse
+import os
+import subprocess
+import time
+
+import code_search
+
+DEFAULT_PATTERNS = [r"import os", r"def \w+\(", r"TODO|FIXME", r"no_such_string_anywhere"]
+
+
+def best(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def grep(pattern, path, exclude):
+    command = ["grep", "-rnE", pattern, path] + [f"--exclude-dir={name}" for name in exclude]
+    return subprocess.run(command, capture_output=True).stdout.count(b"\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="grep -r vs in-process code search")
+    parser.add_argument("--path", action="append", dest="paths")
+    parser.add_argument("--pattern", action="append", dest="patterns")
+    parser.add_argument("--max-results", type=int, default=code_search.DEFAULT_MAX_RESULTS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = args.paths or ["."] + (["node_modules"] if os.path.isdir("node_modules") else [])
+    for path in paths:
+        files = sum(1 for _ in code_search.walk(path))
+        print(f"--- 🔍 {os.path.abspath(path)} ({files:,} searchable files) ---")
+        for pattern in args.patterns or DEFAULT_PATTERNS:
+            print(f"   /{pattern}/")
+            rows = [
+                ("grep -rn", lambda: grep(pattern, path, ())),
+                ("grep --exclude-dir", lambda: grep(pattern, path, sorted(code_search.IGNORED_DIRS))),
+                ("search() full", lambda: len(code_search.search(pattern, path, max_results=10**9).matches)),
+                (f"search() budget {args.max_results}",
+                 lambda: len(code_search.search(pattern, path, max_results=args.max_results).matches)),
+            ]
+            baseline = None
+            for name, func in rows:
+                seconds, count = best(func, args.repeat)
+                baseline = baseline or seconds
+                print(f"      {name:<22} {seconds * 1e3:9.1f} ms {count:8,} lines  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
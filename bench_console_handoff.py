@@ -0,0 +1,128 @@
+"""
+bench_console_handoff.py
+Failed requests and downtime during a rolling upgrade under load.
+
+Starts a console (ConsoleServer, GET / sleeping --latency to stand in for a model call),
+puts --clients concurrent clients on it (a fresh connection per request), then starts a
+replacement on the same port, either
+  handoff   taking the listening socket over (console_handoff.py); the old one drains
+  sigterm   the old --force path: SIGTERM the old PID, sleep 1s, bind
+and reports failed requests and the longest stretch without a successful request.
+
+Usage:
+    python3 bench_console_handoff.py [--clients 16] [--latency 0.5] [--modes handoff sigterm]
+"""
+import argparse
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from console_handoff import handoff_path, request_handoff
+from console_server import ConsoleServer, Response
+
+
+def serve(mode, port, latency, kill_pid):
+    server = ConsoleServer(max_connections=10_000, log_requests=False, drain_timeout=30)
+
+    @server.route("GET", "/")
+    def index(request):
+        time.sleep(latency)
+        return Response(f"ok {os.getpid()}")
+
+    listener = None
+    handoff = handoff_path(port) if mode == "handoff" else None
+    if mode == "handoff":
+        taken = request_handoff(handoff)
+        listener = taken[0] if taken else None
+    elif kill_pid:
+        os.kill(kill_pid, signal.SIGTERM)
+        time.sleep(1)  # what gemini_server_v4/v8 --force did
+    print("ready", flush=True)
+    server.run("127.0.0.1", port, sock=listener, handoff=handoff)
+
+
+def start_server(mode, port, latency, kill_pid=0):
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", mode, "--port", str(port),
+                              "--latency", str(latency), "--kill", str(kill_pid)], stdout=subprocess.PIPE, text=True)
+    child.stdout.readline()
+    return child
+
+
+def client(port, stop, results, delay):
+    time.sleep(delay)  # spread the clients out so responses don't arrive in lockstep
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            conn.request("GET", "/")
+            response = conn.getresponse()
+            outcome = "ok" if response.status == 200 and response.read().startswith(b"ok") else "dropped"
+            conn.close()
+        except ConnectionRefusedError:
+            outcome = "refused"
+            time.sleep(0.01)  # don't spin on a closed port
+        except OSError:
+            outcome = "dropped"
+        results.append((start, time.perf_counter(), outcome))
+
+
+def longest_gap(ends, since, until):
+    ends = [e for e in ends if since <= e <= until]
+    return max((b - a for a, b in zip(ends, ends[1:])), default=0)
+
+
+def bench(mode, port, clients, latency, warmup, settle):
+    old = start_server(mode, port, latency)
+    time.sleep(0.3)
+    stop = threading.Event()
+    results = []
+    threads = [threading.Thread(target=client, args=(port, stop, results, i * latency / clients))
+               for i in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(warmup)
+    upgrade_at = time.perf_counter()
+    new = start_server(mode, port, latency, kill_pid=old.pid)
+    time.sleep(settle)
+    stop.set()
+    for t in threads:
+        t.join()
+    for child in (old, new):
+        child.terminate()
+        child.wait()
+
+    refused = sum(1 for _, _, outcome in results if outcome == "refused")
+    dropped = sum(1 for _, _, outcome in results if outcome == "dropped")
+    ok_ends = sorted(end for _, end, outcome in results if outcome == "ok")
+    baseline = longest_gap(ok_ends, upgrade_at - warmup + latency, upgrade_at)
+    gap = longest_gap(ok_ends, upgrade_at, upgrade_at + settle)
+    print(f"   {mode:8} {len(results):5} requests | {dropped:4} dropped in flight | {refused:5} refused | "
+          f"longest gap between successes: {gap * 1000:6.1f} ms (steady state {baseline * 1000:.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling upgrade under load: socket handoff vs SIGTERM takeover")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds each request spends in the 'model call'")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--settle", type=float, default=3.0, help="Seconds of load after the upgrade starts")
+    parser.add_argument("--port", type=int, default=8931)
+    parser.add_argument("--modes", nargs="+", default=["handoff", "sigterm"], choices=["handoff", "sigterm"])
+    parser.add_argument("--serve", choices=["handoff", "sigterm"], help=argparse.SUPPRESS)
+    parser.add_argument("--kill", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.latency, args.kill)
+        return
+    print(f"--- 🔄 Rolling upgrade: {args.clients} clients, {args.latency}s per request ---")
+    for mode in args.modes:
+        bench(mode, args.port, args.clients, args.latency, args.warmup, args.settle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+bench_console_history.py
+GET / and /history latency with a long console history.
+
+Fills a history with --entries entries shaped like a v9 session (prompt, tool output,
+answer) and times, over real HTTP on the shared ConsoleServer core:
+  before   the old GET /: walk the list, re-escape every entry, `history_html +=`
+  after    the new GET /: join the newest pre-rendered fragments (console_history)
+  /history an incremental poll for the entries after the page's cursor
+
+Usage:
+    python3 bench_console_history.py [--entries 10000] [--tool-bytes 2000] [--repeat 20]
+"""
+import argparse
+import asyncio
+import http.client
+import statistics
+import threading
+import time
+
+from console_history import HistoryLog, render_history
+from console_server import ConsoleServer, Response
+
+PAGE = '<html><body><div id="chat-history" data-cursor="{{CURSOR}}">{{CHAT_HISTORY}}</div></body></html>'
+
+
+def fill(n, tool_bytes):
+    old_log = []
+    new_log = HistoryLog(css_classes={"USER": "user-msg", "GEMINI": "agent-msg"}, default_css="tool-msg")
+    roles = ("USER", "TOOL", "GEMINI")
+    for i in range(n):
+        role = roles[i % 3]
+        text = f"CMD: ls <dir {i}>\n" + "x" * tool_bytes if role == "TOOL" else f"message {i} with <tags> & text"
+        old_log.append((role, text))
+        new_log.append((role, text))
+    return old_log, new_log
+
+
+def make_server(old_log, new_log):
+    server = ConsoleServer(log_requests=False)
+
+    @server.route("GET", "/before")
+    def before(request):
+        history_html = ""
+        for role, text in old_log:
+            if role == "USER": css = "user-msg"
+            elif role == "GEMINI": css = "agent-msg"
+            else: css = "tool-msg"
+            safe_text = (text or "").replace("<", "&lt;").replace(">", "&gt;")
+            history_html += f'<div class="msg {css}">{safe_text}</div>'
+        return Response(PAGE.replace("{{CHAT_HISTORY}}", history_html))
+
+    @server.route("GET", "/after")
+    def after(request):
+        history_html, cursor = render_history(new_log)
+        return Response(PAGE.replace("{{CURSOR}}", str(cursor)).replace("{{CHAT_HISTORY}}", history_html))
+
+    @server.route("GET", "/history")
+    def history(request):
+        return Response.json(new_log.page_json(request.get("after"), None, request.get("limit") or 100))
+    return server
+
+
+def time_get(port, path, repeat):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    times, size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.request("GET", path)
+        size = len(conn.getresponse().read())
+        times.append(time.perf_counter() - start)
+    conn.close()
+    return statistics.median(times), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Console GET latency with a long history")
+    parser.add_argument("--entries", type=int, default=10_000)
+    parser.add_argument("--tool-bytes", type=int, default=2000, help="Size of each TOOL entry's output")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    old_log, new_log = fill(args.entries, args.tool_bytes)
+    server = make_server(old_log, new_log)
+    ready = threading.Event()
+    threading.Thread(target=lambda: asyncio.run(server.serve("127.0.0.1", 0, ready=lambda s: ready.set())),
+                     daemon=True).start()
+    ready.wait()
+
+    print(f"--- 📜 Console history: {args.entries} entries ({args.tool_bytes} B tool outputs) ---")
+    poll_from = new_log.last_id - 3  # a page that is one prompt/tool/answer behind
+    for label, path in (("GET / (before)", "/before"), ("GET / (after)", "/after"),
+                        ("GET /history poll", f"/history?after={poll_from}")):
+        latency, size = time_get(server.port, path, args.repeat)
+        print(f"   {label:18} {latency * 1000:8.2f} ms | {size / 1024:9.1f} KiB")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+bench_console_load.py
+Load test: connections/sec and server memory with N concurrent idle keep-alive clients.
+
+Starts a console server in a child process, either the shared asyncio core
+(console_server.py) or the ThreadingTCPServer + BaseHTTPRequestHandler setup the
+versioned consoles used, then opens --clients connections that each make one GET and
+then sit idle. Reports how fast the connections were served and the server's RSS and
+thread count while they idle.
+
+Usage:
+    python3 bench_console_load.py [--clients 500] [--servers asyncio threading]
+"""
+import argparse
+import asyncio
+import http.server
+import os
+import socketserver
+import subprocess
+import sys
+import time
+
+PAGE = b"<html><body>" + b"x" * 2048 + b"</body></html>"
+
+
+def serve_asyncio():
+    from console_server import ConsoleServer, Response
+    server = ConsoleServer(max_connections=100_000, log_requests=False)
+
+    @server.route("GET", "/")
+    def index(request):
+        return Response(PAGE)
+
+    asyncio.run(server.serve("127.0.0.1", 0, ready=lambda s: print(s.port, flush=True)))
+
+
+def serve_threading():
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so idle clients keep their thread
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-type", "text/html")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+    socketserver.ThreadingTCPServer.daemon_threads = True
+    socketserver.ThreadingTCPServer.request_queue_size = 1024
+    with socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler) as httpd:
+        print(httpd.server_address[1], flush=True)
+        httpd.serve_forever()
+
+
+def proc_status(pid):
+    fields = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            fields[key] = value.strip()
+    return int(fields["VmRSS"].split()[0]) / 1024, int(fields["Threads"])
+
+
+async def open_idle_client(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await writer.drain()
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    await reader.readexactly(length)
+    return writer
+
+
+async def load(port, clients):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(open_idle_client(port) for _ in range(clients)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    writers = [r for r in results if not isinstance(r, BaseException)]
+    return writers, len(results) - len(writers), elapsed
+
+
+def bench(kind, clients, hold):
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", kind],
+                             stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(child.stdout.readline())
+        rss_before, threads_before = proc_status(child.pid)
+
+        async def run():
+            writers, failed, elapsed = await load(port, clients)
+            await asyncio.sleep(hold)
+            rss, threads = proc_status(child.pid)
+            for w in writers:
+                w.close()
+            return len(writers), failed, elapsed, rss, threads
+
+        ok, failed, elapsed, rss, threads = asyncio.run(run())
+    finally:
+        child.terminate()
+        child.wait()
+    print(f"   {kind:10} {ok:5} ok / {failed} failed | {ok / elapsed:8.0f} conn/s | "
+          f"RSS {rss_before:6.1f} -> {rss:6.1f} MiB | threads {threads_before} -> {threads}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Idle-client load test for the console server core")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--hold", type=float, default=1.0, help="Seconds to hold the idle connections")
+    parser.add_argument("--servers", nargs="+", default=["asyncio", "threading"], choices=["asyncio", "threading"])
+    parser.add_argument("--serve", choices=["asyncio", "threading"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve_asyncio() if args.serve == "asyncio" else serve_threading()
+        return
+    print(f"--- 🏋️  {args.clients} concurrent idle keep-alive clients ---")
+    for kind in args.servers:
+        bench(kind, args.clients, args.hold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+bench_console_metrics.py
+Cost per instrumented call of console_metrics (budget: 5 µs).
+
+Times each hot-path hook against an uninstrumented baseline, on one thread and with
+--threads threads hammering the same series at once (the per-thread shards mean they
+never share a cell), and checks the totals add up afterwards.
+
+Usage:
+    python3 bench_console_metrics.py [--calls 200000] [--threads 4]
+"""
+import argparse
+import threading
+import time
+
+from console_metrics import ConsoleMetrics
+
+BUDGET_US = 5.0
+
+
+def per_call(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call overhead of the console metrics")
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    metrics = ConsoleMetrics()
+
+    def tool(path: str):
+        return path
+
+    instrumented = metrics.tool(tool)
+
+    def model_call():
+        with metrics.model_call("gemini-2.0-flash"):
+            pass
+
+    hooks = {
+        "counter inc": (lambda: metrics.tool_calls.inc("Bash", "ok"), lambda: None),
+        "histogram observe": (lambda: metrics.tool_latency.observe(0.003, "Bash"), lambda: None),
+        "request (per response)": (lambda: metrics.request("GET", "/", 200, 0.002), lambda: None),
+        "@metrics.tool call": (lambda: instrumented("a.py"), lambda: tool("a.py")),
+        "model_call context": (model_call, lambda: None),
+    }
+    print(f"--- 📈 Metrics overhead: {args.calls:,} calls per hook ---")
+    worst = 0
+    for name, (hook, baseline) in hooks.items():
+        cost = per_call(hook, args.calls) - per_call(baseline, args.calls)
+        worst = max(worst, cost)
+        print(f"   {name:24} {cost * 1e6:6.2f} µs/call")
+
+    costs = []
+
+    def worker():
+        costs.append(per_call(lambda: instrumented("a.py"), args.calls))
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = metrics.tool_calls.values()[("tool", "ok")]
+    assert total == args.calls * (args.threads + 1), total  # nothing lost without locks
+    assert metrics.tool_latency.values()[("tool",)][-1] == total
+    threaded = max(costs)
+    worst = max(worst, threaded / args.threads)  # threads share one GIL: wall time per call, per thread
+    print(f"   @metrics.tool x{args.threads} threads {threaded * 1e6 / args.threads:6.2f} µs/call "
+          f"(no lost updates across {total:,} calls)")
+    print(f"   {'✅' if worst * 1e6 < BUDGET_US else '❌'} worst {worst * 1e6:.2f} µs (budget {BUDGET_US} µs)")
+
+
+if __name__ == "__main__":
+    main()
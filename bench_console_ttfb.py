@@ -0,0 +1,128 @@
+"""
+bench_console_ttfb.py
+Time-to-first-byte of the console's blocking POST / versus the SSE /stream endpoint.
+
+Runs a local console (the same ConsoleServer / stream_reply / traced-tool code the v8
+and v9 servers use) over a stubbed chat that mimics automatic function calling:
+`--rounds` model turns that each call a tool, then `--chunks` streamed text chunks.
+The blocking path answers only after everything is done; /stream answers as each event
+is produced.
+
+Usage:
+    python3 bench_console_ttfb.py [--rounds 3] [--round-latency 0.4] [--chunks 8] [--chunk-latency 0.05]
+"""
+import argparse
+import asyncio
+import http.client
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+
+from console_server import ConsoleServer, EventStream, Response
+from console_stream import stream_reply, tool_events
+
+
+@tool_events.traced
+def Bash(command: str):
+    """Stub tool."""
+    time.sleep(0.05)
+    return f"ran {command}"
+
+
+class StubChat:
+    """Chat stand-in: tool rounds first (like AFC), then the answer in chunks."""
+
+    def __init__(self, rounds, round_latency, chunks, chunk_latency):
+        self.rounds = rounds
+        self.round_latency = round_latency
+        self.chunks = chunks
+        self.chunk_latency = chunk_latency
+
+    def send_message_stream(self, prompt):
+        for i in range(self.rounds):
+            time.sleep(self.round_latency)
+            Bash(f"step {i}")
+        for i in range(self.chunks):
+            time.sleep(self.chunk_latency)
+            yield SimpleNamespace(text=f"chunk {i} ")
+
+    def send_message(self, prompt):
+        return SimpleNamespace(text="".join(c.text for c in self.send_message_stream(prompt)))
+
+
+def make_server(chat):
+    server = ConsoleServer(log_requests=False)
+
+    @server.route("POST", "/")
+    def submit(request):
+        chat.send_message(request.get("prompt"))
+        return Response.redirect("/")
+
+    @server.route("GET", "/stream")
+    def stream(request):
+        prompt = request.get("prompt")
+        return EventStream(lambda emit: emit("done", {"text": stream_reply(chat, prompt, emit)}))
+    return server
+
+
+def time_blocking(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    start = time.perf_counter()
+    conn.request("POST", "/", body="prompt=ls", headers={"Content-Type": "application/x-www-form-urlencoded"})
+    response = conn.getresponse()
+    first_byte = time.perf_counter() - start
+    response.read()
+    conn.close()
+    return {"first_event": first_byte, "first_text": first_byte, "total": time.perf_counter() - start}
+
+
+def time_stream(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    start = time.perf_counter()
+    conn.request("GET", "/stream?prompt=ls")
+    response = conn.getresponse()
+    marks = {}
+    for line in response:
+        if line.startswith(b"event: "):
+            event = line[7:].strip().decode()
+            now = time.perf_counter() - start
+            marks.setdefault("first_event", now)
+            if event == "text":
+                marks.setdefault("first_text", now)
+            if event == "done":
+                marks["total"] = now
+                break
+    conn.close()
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTFB: blocking console POST vs SSE /stream")
+    parser.add_argument("--rounds", type=int, default=3, help="Tool-calling rounds before the answer")
+    parser.add_argument("--round-latency", type=float, default=0.4, help="Model seconds per round")
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--chunk-latency", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chat = StubChat(args.rounds, args.round_latency, args.chunks, args.chunk_latency)
+    server = make_server(chat)
+    ready = threading.Event()
+    threading.Thread(target=lambda: asyncio.run(server.serve("127.0.0.1", 0, ready=lambda s: ready.set())),
+                     daemon=True).start()
+    ready.wait()
+    port = server.port
+
+    print(f"--- ⏱️  Console TTFB: {args.rounds} tool rounds x {args.round_latency}s, "
+          f"{args.chunks} chunks x {args.chunk_latency}s ---")
+    for label, fn in (("POST / (blocking)", time_blocking), ("GET /stream (SSE)", time_stream)):
+        runs = [fn(port) for _ in range(args.repeat)]
+        med = {k: statistics.median(r[k] for r in runs) for k in ("first_event", "first_text", "total")}
+        print(f"   {label:20} first byte/event: {med['first_event'] * 1000:7.1f} ms | "
+              f"first text: {med['first_text'] * 1000:7.1f} ms | done: {med['total'] * 1000:7.1f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+bench_console_workers.py
+Console throughput with 1/2/4/8 pre-forked workers (--workers) and a stubbed model.
+
+Each request looks like a v8 turn: acquire the session's chat from a SessionPool backed
+by the shared SessionStore, "call the model" (sleep --latency, then --cpu-ms of Python
+work standing in for response parsing, tool calls and rendering), commit the history
+and append both sides to the shared on-disk HistoryLog. --clients keep-alive clients
+spread over --sessions browser sessions, so consecutive turns of a session usually land
+on different workers and have to continue the chat from the store.
+
+Usage:
+    python3 bench_console_workers.py [--workers 1 2 4 8] [--clients 32] [--seconds 5]
+"""
+import argparse
+import http.client
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from chat_sessions import SessionPool, SessionStore, session_id_from_headers
+from console_history import HistoryLog
+from console_server import ConsoleServer, Response
+from history_store import HistoryStore
+
+
+class StubChat:
+    def __init__(self, history=None):
+        self.history = list(history or [])
+
+    def get_history(self):
+        return self.history
+
+    def send_message(self, prompt, latency, cpu_ms):
+        time.sleep(latency)
+        deadline = time.thread_time() + cpu_ms / 1000
+        while time.thread_time() < deadline:
+            pass
+        self.history += [{"role": "user", "parts": [{"text": prompt}]},
+                         {"role": "model", "parts": [{"text": f"turn {len(self.history) // 2 + 1}"}]}]
+        return self.history[-1]["parts"][0]["text"]
+
+
+def serve(workers, sock, directory, latency, cpu_ms):
+    server = ConsoleServer(max_connections=10_000, log_requests=False, workers=workers)
+    pool = SessionPool(lambda model, history=None: StubChat(history),
+                       store=SessionStore(os.path.join(directory, "sessions.sqlite")))
+    history_log = HistoryLog(store=HistoryStore(os.path.join(directory, "history.log"), fsync="never"))
+
+    @server.route("POST", "/")
+    def submit(request):
+        prompt = request.get("prompt")
+        history_log.append(("USER", prompt))
+        pooled = pool.acquire(session_id_from_headers(request.headers), "stub")
+        with pooled.lock:
+            text = pooled.chat.send_message(prompt, latency, cpu_ms)
+            pool.commit(pooled)
+        history_log.append(("GEMINI", text))
+        return Response(text)
+
+    print("ready", flush=True)
+    server.run(sock=sock)
+
+
+def client(port, session, stop, counts):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/x-www-form-urlencoded", "Cookie": f"gemini_session={session}"}
+    ok = 0
+    while not stop.is_set():
+        conn.request("POST", "/", "prompt=run+the+tests", headers)
+        response = conn.getresponse()
+        ok += response.status == 200 and response.read().startswith(b"turn")
+    conn.close()
+    counts.append(ok)
+
+
+def bench(workers, args):
+    directory = tempfile.mkdtemp(prefix="bench_workers_")
+    sock = socket.create_server(("127.0.0.1", 0), backlog=1024)
+    port = sock.getsockname()[1]
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(workers),
+                              "--fd", str(sock.fileno()), "--dir", directory, "--latency", str(args.latency),
+                              "--cpu-ms", str(args.cpu_ms)], pass_fds=[sock.fileno()], stdout=subprocess.PIPE,
+                             text=True)
+    sock.close()
+    child.stdout.readline()
+    stop = threading.Event()
+    counts = []
+    threads = [threading.Thread(target=client, args=(port, f"s{i % args.sessions}", stop, counts))
+               for i in range(args.clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    child.terminate()
+    child.wait()
+    shutil.rmtree(directory)
+    return sum(counts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Console throughput vs --workers with a stubbed model")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--sessions", type=int, default=32, help="Distinct browser sessions among the clients")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds of (sleeping) model latency per turn")
+    parser.add_argument("--cpu-ms", type=float, default=5.0, help="Milliseconds of Python work per turn")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--fd", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, socket.socket(fileno=args.fd), args.dir, args.latency, args.cpu_ms)
+        return
+    print(f"--- 👷 Console workers: {args.clients} clients, {args.latency * 1000:.0f} ms model latency + "
+          f"{args.cpu_ms:.0f} ms CPU per turn, {os.cpu_count()} CPU(s) ---")
+    baseline = None
+    for workers in args.workers:
+        rate = bench(workers, args)
+        baseline = baseline or rate
+        print(f"   {workers} worker(s) | {rate:8.1f} req/s | {rate / baseline:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+bench_file_edit.py
+A one-line change to a big file: full-content Edit vs file_edit's replacement and diff modes.
+
+Copies --file (gemini_server_v8.py by default) to a temp dir and changes one line of it
+each way, reporting:
+  payload   what the model has to generate for the call, in characters and ~tokens
+  generate  that payload at --tokens-per-second of model output (what dominates an edit)
+  apply     the tool's own time: open("w") vs verify + temp file + fsync + rename
+
+Usage:
+    python3 bench_file_edit.py [--file gemini_server_v8.py] [--tokens-per-second 100] [--repeat 50]
+"""
+import argparse
+import difflib
+import os
+import shutil
+import tempfile
+import time
+
+import file_edit
+
+
+def old_edit(path, content):
+    """Edit as it was in gemini_server_v8.py."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return f"Successfully wrote to {path}"
+
+
+def per_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-content vs patch edits")
+    parser.add_argument("--file", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "gemini_server_v8.py"))
+    parser.add_argument("--tokens-per-second", type=float, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with open(args.file) as f:
+        original = f.read()
+    lines = original.splitlines(True)
+    target = next(i for i in range(len(lines) // 2, len(lines))  # a unique line halfway down
+                  if lines[i].strip() and original.count(lines[i]) == 1)
+    old_line = lines[target]
+    new_line = old_line.rstrip("\n") + "  # edited\n"
+    changed = original.replace(old_line, new_line, 1)
+    diff = "".join(difflib.unified_diff(lines, changed.splitlines(True), n=1))
+
+    directory = tempfile.mkdtemp(prefix="bench_file_edit_")
+    path = os.path.join(directory, os.path.basename(args.file))
+    try:
+        payloads = {"content": len(changed), "old/new": len(old_line) + len(new_line), "diff": len(diff)}
+        times = {}
+        shutil.copy(args.file, path)
+        times["content"], _ = per_call(lambda: old_edit(path, changed), args.repeat)
+
+        def replace_and_undo():
+            result = file_edit.edit_file(path, old=old_line, new=new_line)
+            file_edit.edit_file(path, old=new_line, new=old_line)
+            return result
+
+        def diff_and_undo():
+            result = file_edit.edit_file(path, diff=diff)
+            file_edit.atomic_write(path, original)
+            return result
+
+        shutil.copy(args.file, path)
+        replace_time, replaced = per_call(replace_and_undo, args.repeat)
+        times["old/new"] = replace_time / 2
+        diff_time, diffed = per_call(diff_and_undo, args.repeat)
+        times["diff"] = diff_time / 2
+        assert replaced.added == diffed.added == 1 and file_edit.edit_file(path, diff=diff).sha == file_edit.sha256(changed)
+
+        print(f"--- ✏️  one line of {os.path.basename(args.file)} ({len(original) / 1024:.0f} KiB, {len(lines)} lines) ---")
+        full = payloads["content"] / file_edit.CHARS_PER_TOKEN / args.tokens_per_second
+        for mode in ("old/new", "diff"):
+            tokens = payloads[mode] / file_edit.CHARS_PER_TOKEN
+            print(f"   payload {mode:8} {payloads['content']:7} -> {payloads[mode]:5} chars  "
+                  f"{payloads['content'] / payloads[mode]:6.1f}x  (~{(payloads['content'] - payloads[mode]) // file_edit.CHARS_PER_TOKEN} tokens saved)")
+            print(f"   generate {mode:7} {full * 1e3:7.0f} -> {tokens / args.tokens_per_second * 1e3:5.0f} ms  "
+                  f"at {args.tokens_per_second:.0f} tokens/s")
+            print(f"   apply {mode:10} {times['content'] * 1e3:7.2f} -> {times[mode] * 1e3:5.2f} ms  "
+                  f"(adds verification + fsync + rename)")
+        print(f"   reply: {file_edit.summary(replaced).splitlines()[0]}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
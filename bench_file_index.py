@@ -0,0 +1,72 @@
+"""
+bench_file_index.py
+Per-call file discovery (glob.glob, `find -name`, code_search.walk) vs a live FileIndex.
+
+On --root (this repository by default), times:
+  glob        glob.glob(pattern, recursive=True) vs FileIndex.glob() for a few patterns
+  find        `find . -name <file>` in a subprocess (discovery_mode) vs FileIndex.find()
+  grep files  code_search.walk() vs FileIndex.files(), the files a Grep searches
+  changed     FileIndex.changed_since() (there is nothing to compare it with)
+plus the one-off build of the index.
+
+Usage:
+    python3 bench_file_index.py [--root .] [--repeat 200]
+"""
+import argparse
+import glob
+import os
+import subprocess
+import time
+
+from code_search import walk
+from file_index import FileIndex
+
+PATTERNS = ["*.py", "**/*.py", "**/tools.py", "gemini_swarm/*.py"]
+
+
+def per_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def row(name, old, new):
+    print(f"   {name:<24} {old * 1e6:10.1f} µs -> {new * 1e6:8.1f} µs  {old / new:7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call file discovery vs a live file index")
+    parser.add_argument("--root", default=".")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    os.chdir(args.root)
+
+    start = time.perf_counter()
+    index = FileIndex(".").start()
+    stats = index.stats()
+    print(f"--- 🗂️  {os.getcwd()}: {stats['files']:,} files, {stats['directories']:,} directories ---")
+    print(f"   index build {(time.perf_counter() - start) * 1e3:.1f} ms once ({stats['mode']})")
+    print("--- 🔎 glob ---")
+    for pattern in PATTERNS:
+        old, _ = per_call(lambda: glob.glob(pattern, recursive=True), args.repeat)
+        new, _ = per_call(lambda: index.glob(pattern), args.repeat)
+        row(pattern, old, new)
+    print("--- 🕵️ discovery ---")
+    name = "tools.py"
+    old, _ = per_call(lambda: subprocess.run(["find", ".", "-name", name], capture_output=True), args.repeat // 10)
+    new, _ = per_call(lambda: index.find(name), args.repeat)
+    row(f"find -name {name}", old, new)
+    print("--- 📄 grep files ---")
+    old, walked = per_call(lambda: list(walk(".")), args.repeat)
+    new, indexed = per_call(lambda: index.files("."), args.repeat)
+    assert walked == indexed
+    row("walk vs files()", old, new)
+    since = time.time() - 3600
+    new, changed = per_call(lambda: index.changed_since(since), args.repeat)
+    print(f"   changed_since(1h ago)   {new * 1e6:10.1f} µs ({len(changed)} files)")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
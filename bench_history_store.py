@@ -0,0 +1,97 @@
+"""
+bench_history_store.py
+Append throughput and cold-start reload time of the on-disk console history.
+
+Appends --entries entries (a v9-like mix of prompts, tool output and answers) through
+HistoryLog + HistoryStore, once per fsync policy ('always' is run on a smaller slice,
+since it is bound by the disk), then starts a fresh interpreter that reopens the
+largest log and times how long it takes to have the page tail ready and to serve a page
+from deep in the log.
+
+Usage:
+    python3 bench_history_store.py [--entries 1000000] [--always-entries 2000] [--dir /tmp]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from console_history import HistoryLog
+from history_store import HistoryStore
+
+ROLES = ("USER", "TOOL", "GEMINI")
+
+
+def text_for(i):
+    if i % 3 == 1:
+        return f"CMD: ls -la src/{i}\n" + "drwxr-xr-x  2 agent agent 4096 file.py\n" * 4
+    return f"message {i}: refactor the <parser> & rerun the tests"
+
+
+def bench_append(path, entries, fsync):
+    log = HistoryLog(store=HistoryStore(path, fsync=fsync, max_entries=None))
+    start = time.perf_counter()
+    for i in range(entries):
+        log.append((ROLES[i % 3], text_for(i)))
+    elapsed = time.perf_counter() - start
+    log.close()
+    return elapsed
+
+
+def rss_mib():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+
+
+def reload(path):
+    """Runs in a fresh interpreter: reopen the log and serve the page tail plus a deep page."""
+    start = time.perf_counter()
+    log = HistoryLog(store=HistoryStore(path))
+    tail_html = log.render_tail()[0]
+    ready = time.perf_counter() - start
+    rss = rss_mib()
+    middle = log.last_id // 2
+    start = time.perf_counter()
+    entries, _ = log.page(after=middle, limit=100)
+    deep = time.perf_counter() - start
+    assert tail_html and entries[0].id == middle + 1
+    print(json.dumps({"entries": len(log), "ready": ready, "deep_page": deep, "rss": rss}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Console history store: append throughput and reload time")
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--always-entries", type=int, default=2000, help="Entries for the fsync=always run")
+    parser.add_argument("--dir", default=tempfile.gettempdir())
+    parser.add_argument("--reload", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.reload:
+        reload(args.reload)
+        return
+
+    print(f"--- 💾 Console history store: {args.entries:,} entries ---")
+    paths = []
+    for fsync, entries in (("never", args.entries), ("interval", args.entries), ("always", args.always_entries)):
+        path = os.path.join(args.dir, f"bench_history_{fsync}.log")
+        if os.path.exists(path):
+            os.remove(path)
+        elapsed = bench_append(path, entries, fsync)
+        paths.append(path)
+        print(f"   append fsync={fsync:9} {entries:>9,} entries | {entries / elapsed:>10,.0f} entries/s | "
+              f"{os.path.getsize(path) / 2**20:7.1f} MiB")
+
+    child = subprocess.run([sys.executable, os.path.abspath(__file__), "--reload", paths[1]],
+                           capture_output=True, text=True, check=True)
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    print(f"   cold reload        {result['entries']:>9,} entries | tail ready in {result['ready'] * 1000:.1f} ms | "
+          f"RSS {result['rss']:.1f} MiB | first page from the middle {result['deep_page'] * 1000:.1f} ms")
+    for path in paths:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+bench_line_index.py
+SmartRead on a big log: the old readlines()-and-slice vs line_index.
+
+Writes a --mb log file of ~100-byte lines (kept between runs), then times:
+  tail        the last --lines lines: readlines()[-n:] vs read_tail() seeking backwards
+  ranges      --ranges random line ranges: islice over the file vs read_lines() through
+              the cached line index (its one-off build is reported separately)
+  grow        appending 1 MiB and reading the new last lines through the index again
+
+Usage:
+    python3 bench_line_index.py [--mb 1024] [--lines 50] [--ranges 100] [--dir /tmp]
+"""
+import argparse
+import itertools
+import os
+import random
+import resource
+import tempfile
+import time
+
+import line_index
+
+
+def make_log(path, size):
+    if os.path.exists(path) and os.path.getsize(path) >= size:
+        return
+    line = 0
+    with open(path, "w") as f:
+        while f.tell() < size:
+            f.write("".join(f"2026-10-18T12:00:00Z INFO [worker-{n % 8}] request {n} served in {n % 977}ms "
+                            f"status=200 path=/api/items/{n % 10007}\n" for n in range(line, line + 10000)))
+            line += 10000
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail and line-range reads of a large log")
+    parser.add_argument("--mb", type=int, default=1024)
+    parser.add_argument("--lines", type=int, default=50)
+    parser.add_argument("--ranges", type=int, default=100)
+    parser.add_argument("--dir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    path = os.path.join(args.dir, f"bench_line_index_{args.mb}mb.log")
+    make_log(path, args.mb * 1024 * 1024)
+    print(f"--- 📜 {os.path.getsize(path) / 2**20:,.0f} MiB log, tail of {args.lines} lines ---")
+
+    def old_tail():
+        with open(path, "r") as f:
+            return "".join(f.readlines()[-args.lines:])
+
+    new_time, new = timed(lambda: line_index.read_tail(path, args.lines).data.decode())
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    old_time, old = timed(old_tail)
+    assert old == new
+    print(f"   read_tail      {new_time * 1e3:10.2f} ms (peak RSS {rss:,.0f} MiB)")
+    print(f"   readlines()    {old_time * 1e3:10.2f} ms (peak RSS "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MiB)")
+
+    build, (_, total) = timed(lambda: line_index.read_lines(path, 0, 1))
+    index = line_index.line_index(path)
+    print(f"--- 🔎 {args.ranges} random {args.lines}-line ranges of {total:,} lines ---")
+    print(f"   index build    {build * 1e3:10.2f} ms once ({len(index.checkpoints):,} checkpoints, "
+          f"{index.checkpoints.itemsize * len(index.checkpoints) / 1024:,.0f} KiB)")
+    rng = random.Random(0)
+    starts = [rng.randrange(total) for _ in range(args.ranges)]
+    new_time, new = timed(lambda: [line_index.read_lines(path, s, args.lines)[0].data.decode() for s in starts])
+    print(f"   read_lines     {new_time / args.ranges * 1e3:10.3f} ms/range")
+    sample = starts[:max(1, args.ranges // 10)]  # the old way is slow: time a tenth of them
+
+    def old_range(start):
+        with open(path, "r") as f:
+            return "".join(itertools.islice(f, start, start + args.lines))
+    old_time, old = timed(lambda: [old_range(s) for s in sample])
+    assert old == new[:len(sample)]
+    print(f"   islice         {old_time / len(sample) * 1e3:10.3f} ms/range ({len(sample)} sampled)")
+
+    with open(path, "a") as f:
+        f.write("".join(f"appended line {n}\n" for n in range(60000)))
+    grow, (chunk, total) = timed(lambda: line_index.read_lines(path, total + 60000 - args.lines, args.lines))
+    assert chunk.data.decode().endswith("appended line 59999\n")
+    print(f"   after +{60000:,} lines: extend + read {grow * 1e3:.2f} ms")
+    os.truncate(path, os.path.getsize(path) - len(b"".join(f"appended line {n}\n".encode() for n in range(60000))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+bench_pipeline_startup.py
+Per-step startup cost: a cold interpreter per stage vs. every stage in one interpreter.
+
+For each stage script in the pipelines, "cold" launches a fresh `python3` that imports
+the stage and builds its StageContext (optionally creating the Gemini client), which is
+what the subprocess-per-step orchestrators paid before any real work started. "in-process"
+does the same for all stages inside a single interpreter with one shared context, which is
+what pipeline_engine does by default now. Only startup is measured; the stages don't run.
+
+Usage:
+    python3 bench_pipeline_startup.py [--repeat 3] [--client]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# Imports the given stage modules with one shared StageContext; prints failures, never raises.
+STARTUP = """
+import importlib, sys
+from stage_context import StageContext
+context = StageContext(argv=[])
+for name in sys.argv[2:]:
+    try:
+        importlib.import_module(name)
+    except Exception as e:
+        print(f"{name}: {type(e).__name__}: {e}", file=sys.stderr)
+if sys.argv[1] == "client":
+    try:
+        context.client
+    except Exception as e:
+        print(f"client: {type(e).__name__}: {e}", file=sys.stderr)
+"""
+
+
+def pipeline_steps():
+    """Every distinct stage step across the three orchestrators, in first-seen order."""
+    from pipeline_master import STEPS as MASTER
+    from pipeline_orchestrator import build_steps
+    from run_re_pipeline_v3 import STEPS as V3
+    seen = {}
+    for step in V3 + MASTER + build_steps(200):
+        seen.setdefault(step.script, step)
+    return list(seen.values())
+
+
+def time_startup(modules, client):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP, "client" if client else "none", *modules],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    return time.perf_counter() - start, result.stderr.strip().splitlines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold per-step startup with in-process stages")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is kept.")
+    parser.add_argument("--client", action="store_true", help="Also create the google.genai Client.")
+    args = parser.parse_args()
+
+    steps = [s for s in pipeline_steps() if s.script]
+    modules = [os.path.splitext(s.script)[0] for s in steps]
+    print(f"--- ⏱️  Startup benchmark: {len(modules)} stages, best of {args.repeat} ---")
+
+    cold_total = 0.0
+    problems = set()
+    for module in modules:
+        best = None
+        for _ in range(args.repeat):
+            elapsed, errors = time_startup([module], args.client)
+            best = elapsed if best is None else min(best, elapsed)
+            problems.update(errors)
+        cold_total += best
+        print(f"   {best * 1000:8.1f} ms  {module}")
+
+    warm = None
+    for _ in range(args.repeat):
+        elapsed, errors = time_startup(modules, args.client)
+        warm = elapsed if warm is None else min(warm, elapsed)
+        problems.update(errors)
+
+    print(f"\n   Cold (one interpreter per step): {cold_total * 1000:8.1f} ms")
+    print(f"   In-process (one interpreter):    {warm * 1000:8.1f} ms")
+    print(f"   Saved: {(cold_total - warm) * 1000:.1f} ms ({cold_total / max(warm, 1e-9):.1f}x)")
+    if problems:
+        print("\n⚠️  Some imports failed (their cost is only partly counted):")
+        for line in sorted(problems):
+            print(f"    {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+bench_port_inspector.py
+InspectPort's lsof -> ss -> ps chain vs one pass over /proc with port_inspector.
+
+Starts --servers listener processes (named like the consoles, so command="gemini_server_*"
+finds them), then times, for their ports plus one free port (where the old chain runs
+both lsof and ss before giving up):
+  chain     the old InspectPort, once per port
+  /proc     port_inspector.report() for all the ports in one call
+  command   report(command="gemini_server_*"): every port of those processes
+
+Usage:
+    python3 bench_port_inspector.py [--servers 3] [--repeat 20]
+"""
+import argparse
+import socket
+import subprocess
+import sys
+import time
+
+import port_inspector
+
+SERVER = ("import socket, sys, time; s = socket.socket(); s.bind(('127.0.0.1', 0)); s.listen(); "
+          "print(s.getsockname()[1], flush=True); time.sleep(600)")
+
+
+def old_inspect(port):
+    """InspectPort as it was in gemini_swarm/tools.py."""
+    result = subprocess.run(f"lsof -i :{port} -t", shell=True, capture_output=True, text=True)
+    pid = result.stdout.strip()
+    if not pid:
+        cmd_ss = f"ss -lptn 'sport = :{port}' | grep -o 'pid=[0-9]*' | cut -d= -f2"
+        pid = subprocess.run(cmd_ss, shell=True, capture_output=True, text=True).stdout.strip()
+    if not pid:
+        return "PORT_STATUS: FREE"
+    ps_result = subprocess.run(f"ps -fp {pid}", shell=True, capture_output=True, text=True)
+    return f"PORT_STATUS: OCCUPIED\nPID: {pid}\nDETAILS:\n{ps_result.stdout}"
+
+
+def per_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="lsof/ss/ps chain vs /proc port inspection")
+    parser.add_argument("--servers", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    servers = [subprocess.Popen([sys.executable, "-c", SERVER, f"gemini_server_bench_{i}.py"],
+                                stdout=subprocess.PIPE, text=True) for i in range(args.servers)]
+    try:
+        ports = [int(server.stdout.readline()) for server in servers] + [free_port()]
+        print(f"--- 🔍 {args.servers} listening ports + 1 free port ---")
+        old, old_text = per_call(lambda: [old_inspect(port) for port in ports], args.repeat)
+        new, new_text = per_call(lambda: port_inspector.report(ports), args.repeat)
+        assert all(f"PID: {server.pid}" in old_text[i] and f"PID: {server.pid}" in new_text
+                   for i, server in enumerate(servers))
+        every, every_text = per_call(lambda: port_inspector.report(command="gemini_server_*"), args.repeat)
+        assert all(f"PORT: {port}" in every_text for port in ports[:-1])
+        print(f"   lsof/ss/ps chain     {old * 1e3:8.1f} ms ({old / len(ports) * 1e3:.1f} ms/port)")
+        print(f"   /proc, one call      {new * 1e3:8.1f} ms  {old / new:6.1f}x")
+        print(f"   command=gemini_server_* {every * 1e3:5.1f} ms")
+    finally:
+        for server in servers:
+            server.kill()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+bench_process_killer.py
+KillProcess's kill -> sleep 1 -> ps -p chain vs process_killer.terminate().
+
+Starts --servers processes that, like a console with --shell-workers, each keep a bash
+worker in its own session, then stops them:
+  chain      the old KillProcess, once per PID (the bash workers are left running)
+  terminate  process_killer.terminate() on all the PIDs at once, workers included
+
+Usage:
+    python3 bench_process_killer.py [--servers 3]
+"""
+import argparse
+import subprocess
+import sys
+import threading
+import time
+
+import process_killer
+
+SERVER = """
+import subprocess, sys, time
+worker = subprocess.Popen(["bash", "-c", "sleep 600"], start_new_session=True)
+print(worker.pid, flush=True)
+time.sleep(600)
+"""
+
+
+def old_kill(pid):
+    """KillProcess as it was in gemini_swarm/tools.py (without the sudo step it never reached here)."""
+    subprocess.run(f"kill {pid}", shell=True)
+    time.sleep(1)
+    check = subprocess.run(f"ps -p {pid}", shell=True, capture_output=True)
+    return "STATUS: KILLED (Standard)" if check.returncode != 0 else "STATUS: FAILED_TO_KILL"
+
+
+def start_servers(count):
+    servers = [subprocess.Popen([sys.executable, "-c", SERVER], stdout=subprocess.PIPE, text=True)
+               for _ in range(count)]
+    for server in servers:  # reaped as soon as they exit, as their parent would
+        threading.Thread(target=server.wait, daemon=True).start()
+    return servers, [int(server.stdout.readline()) for server in servers]
+
+
+def alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] not in "ZX"
+    except OSError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="kill/sleep/ps chain vs pidfd-based process termination")
+    parser.add_argument("--servers", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"--- 💀 {args.servers} servers, each with a bash worker ---")
+    servers, workers = start_servers(args.servers)
+    try:
+        start = time.perf_counter()
+        statuses = [old_kill(server.pid) for server in servers]
+        old = time.perf_counter() - start
+        assert all(status == "STATUS: KILLED (Standard)" for status in statuses)
+        orphans = sum(map(alive, workers))
+    finally:
+        for server in servers:
+            server.kill()
+            server.wait()
+        process_killer.terminate(workers)
+
+    servers, workers = start_servers(args.servers)
+    try:
+        start = time.perf_counter()
+        results = process_killer.terminate([server.pid for server in servers])
+        new = time.perf_counter() - start
+        assert all(result.outcome == "exited" for result in results)
+        left = sum(map(alive, workers))
+    finally:
+        for server in servers:
+            server.kill()
+            server.wait()
+        process_killer.terminate(workers)
+
+    print(f"   kill/sleep/ps chain  {old * 1e3:8.1f} ms ({old / args.servers * 1e3:.1f} ms/PID), "
+          f"{orphans} bash workers left running")
+    print(f"   terminate, one call  {new * 1e3:8.1f} ms  {old / new:6.1f}x, {left} bash workers left running")
+
+
+if __name__ == "__main__":
+    main()
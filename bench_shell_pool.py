@@ -0,0 +1,71 @@
+"""
+bench_shell_pool.py
+Bash tool round trip: a persistent ShellPool worker vs a subprocess.run per command.
+
+Runs --calls `echo` commands (the agent's cheapest possible Bash call) both ways and
+reports the per-call latency, so what's left is the cost of the shell itself. Then
+floods each with --flood-mb of output and reports how much this process's peak RSS
+grew (the bounded head + tail capture first, since the peak only ever goes up).
+
+Usage:
+    python3 bench_shell_pool.py [--calls 1000] [--command "echo hello"] [--flood-mb 512]
+"""
+import argparse
+import resource
+import subprocess
+import time
+
+from shell_pool import ShellPool
+
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed(run, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        run()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent bash workers vs subprocess.run")
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--command", default="echo hello")
+    parser.add_argument("--flood-mb", type=int, default=512)
+    args = parser.parse_args()
+
+    pool = ShellPool()
+    expected = pool.run(args.command).stdout  # also starts the worker, as the first call would
+    results = {
+        "subprocess.run": timed(lambda: subprocess.run(args.command, shell=True, capture_output=True, text=True,
+                                                       timeout=30, executable="/bin/bash"), args.calls),
+        "ShellPool.run": timed(lambda: pool.run(args.command, timeout=30), args.calls),
+    }
+    assert pool.run(args.command).stdout == expected
+    stats = pool.stats()
+    pool.close()
+
+    print(f"--- 🐚 {args.calls:,} x {args.command!r} ---")
+    for name, elapsed in results.items():
+        print(f"   {name:15} {elapsed:7.3f}s total | {elapsed / args.calls * 1e6:8.1f} µs/call")
+    print(f"   Speedup: {results['subprocess.run'] / results['ShellPool.run']:.1f}x "
+          f"({stats['started']} shell(s) started, {stats['recycled']} recycled)")
+
+    flood = f"head -c {args.flood_mb}M /dev/zero | tr '\\0' 'x' | fold -w 99"
+    print(f"--- 🌊 {args.flood_mb} MiB of output: peak RSS growth ---")
+    pool = ShellPool()
+    for name, run in (("ShellPool.run", lambda: len(pool.run(flood, timeout=600).stdout)),
+                      ("subprocess.run", lambda: len(subprocess.run(flood, shell=True, capture_output=True, text=True,
+                                                                    executable="/bin/bash").stdout))):
+        before = peak_mb()
+        start = time.perf_counter()
+        returned = run()
+        print(f"   {name:15} +{peak_mb() - before:7.1f} MiB peak | {time.perf_counter() - start:5.2f}s | "
+              f"{returned:,} chars returned")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
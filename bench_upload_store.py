@@ -0,0 +1,145 @@
+"""
+bench_upload_store.py
+Peak server RSS and throughput for one large upload into the console.
+
+Each mode runs against a fresh server process (ConsoleServer plus the v8 upload routes)
+and reports that process's peak RSS (VmHWM) after the upload:
+  buffered    the whole body read into memory first, as cgi.FieldStorage + file.read() did
+  multipart   one multipart/form-data POST, streamed to the store's tmp/ and hashed on the way
+  resumable   POST /uploads, then PUT /uploads in 8 MiB application/octet-stream chunks
+
+Usage:
+    python3 bench_upload_store.py [--mb 2048] [--modes buffered multipart resumable] [--dir /tmp]
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from console_server import ConsoleServer, Response
+from upload_store import RESUMABLE_CHUNK, UploadStore
+
+BLOCK = 1024 * 1024
+BOUNDARY = "----benchboundary"
+
+
+def serve(root, size, port):
+    store = UploadStore(root, max_bytes=size)
+    server = ConsoleServer(log_requests=False, upload_dir=store.tmp_dir, max_upload_bytes=size,
+                           max_field_bytes=size)  # lets the buffered mode read the body into memory
+
+    @server.route("POST", "/")
+    def submit(request):
+        upload = request.files["uploaded_file"]
+        return Response.json(store.add(upload.path, upload.sha256, upload.size, upload.filename)._asdict())
+
+    @server.route("POST", "/buffered")
+    def buffered(request):
+        return Response.json({"size": len(request.body)})
+
+    @server.route("POST", "/uploads")
+    def begin(request):
+        return Response.json(store.begin(request.get("name"), int(request.get("size"))))
+
+    @server.route("PUT", "/uploads")
+    def chunk(request):
+        return Response.json(store.append(request.get("id"), int(request.get("offset")), request.files["body"].path))
+
+    @server.route("GET", "/peak")
+    def peak(request):
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return Response.json({name: int(fields[name].split()[0]) // 1024 for name in ("VmHWM", "VmRSS")})
+
+    print("ready", flush=True)
+    server.run("127.0.0.1", port)
+
+
+def blocks(size, seed):
+    block = (seed.to_bytes(8, "big") * (BLOCK // 8))
+    sent = 0
+    while sent < size:
+        n = min(BLOCK, size - sent)
+        yield block[:n]
+        sent += n
+
+
+def call(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    conn.request(method, path, body, headers or {})
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    if response.status != 200:
+        raise RuntimeError(f"{method} {path}: {response.status} {data[:200]!r}")
+    return json.loads(data)
+
+
+def upload(mode, port, size, seed):
+    if mode == "buffered":
+        call(port, "POST", "/buffered", blocks(size, seed),
+             {"Content-Type": "application/x-bench", "Content-Length": str(size)})
+    elif mode == "multipart":
+        head = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="uploaded_file"; filename="big.bin"\r\n'
+                f'Content-Type: application/octet-stream\r\n\r\n').encode()
+        tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+
+        def body():
+            yield head
+            yield from blocks(size, seed)
+            yield tail
+        call(port, "POST", "/", body(), {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}",
+                                         "Content-Length": str(len(head) + size + len(tail))})
+    else:
+        status = call(port, "POST", f"/uploads?name=big.bin&size={size}")
+        source = blocks(size, seed)
+        while status["offset"] < size:
+            n = min(RESUMABLE_CHUNK, size - status["offset"])
+            chunk = b"".join(next(source) for _ in range(-(-n // BLOCK)))
+            status = call(port, "PUT", f"/uploads?id={status['id']}&offset={status['offset']}", chunk,
+                          {"Content-Type": "application/octet-stream"})
+
+
+def bench(mode, size, directory, port, seed):
+    root = tempfile.mkdtemp(prefix="bench_uploads_", dir=directory)
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", root, "--mb", str(size // BLOCK),
+                              "--port", str(port)], stdout=subprocess.PIPE, text=True)
+    child.stdout.readline()
+    time.sleep(0.2)
+    start = time.perf_counter()
+    upload(mode, port, size, seed)
+    elapsed = time.perf_counter() - start
+    memory = call(port, "GET", "/peak")
+    child.terminate()
+    child.wait()
+    shutil.rmtree(root)
+    print(f"   {mode:9} {size / BLOCK:7.0f} MiB in {elapsed:6.1f}s ({size / BLOCK / elapsed:6.0f} MiB/s) | "
+          f"server peak RSS {memory['VmHWM']:6} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak server RSS during a large console upload")
+    parser.add_argument("--mb", type=int, default=2048)
+    parser.add_argument("--modes", nargs="+", default=["buffered", "multipart", "resumable"],
+                        choices=["buffered", "multipart", "resumable"])
+    parser.add_argument("--dir", default=tempfile.gettempdir())
+    parser.add_argument("--port", type=int, default=8951)
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    size = args.mb * BLOCK
+    if args.serve:
+        serve(args.serve, size, args.port)
+        return
+    print(f"--- 📤 Upload of {args.mb} MiB ---")
+    for seed, mode in enumerate(args.modes, 1):
+        bench(mode, size, args.dir, args.port, seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+chat_sessions.py
+Pool of live Gemini chat objects for the console servers, keyed by (browser session, model).
+
+The console used to build a fresh `client.chats.create(...)` for every prompt, so each
+request re-sent the whole persona system instruction and forgot the conversation. A
+SessionPool keeps one chat per cookie-identified browser session and model_choice, so
+follow-up prompts continue the same chat over the same client connection. Idle chats
+expire after `ttl` seconds and the least recently used chat is dropped once
+`max_sessions` are live.
+
+With a SessionStore, each chat's history is also written to a local SQLite file after
+every turn (commit()). Pre-forked workers (--workers) and restarted servers can then
+rebuild any session's chat from that store, so any worker can serve any request. A
+worker reuses its own live chat only while nobody else has moved that session on since
+(the stored version still matches); otherwise it recreates the chat from the stored
+history. Two workers answering the same session at the same moment both continue from
+the same version; the last commit wins.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.cookies import SimpleCookie
+
+SESSION_COOKIE = "gemini_session"
+DEFAULT_TTL = 30 * 60
+DEFAULT_MAX_SESSIONS = 64
+# Per port, like the history log, so a redeploy onto the same port keeps the chats.
+DEFAULT_SESSION_STORE = ".console_sessions_{port}.sqlite"
+
+
+def chat_history(chat):
+    """JSON-ready history of a google.genai chat (Content objects -> dicts)."""
+    return [c.model_dump(mode="json", exclude_none=True) if hasattr(c, "model_dump") else c
+            for c in chat.get_history()]
+
+
+class SessionStore:
+    """Chat histories shared by every process serving the console, one row per (session, model)."""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self._local = threading.local()
+        with sqlite3.connect(path, timeout=30) as db:  # not kept: connections must not cross a fork
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    history TEXT NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (session_id, model)
+                )""")
+        db.close()
+
+    def _db(self):
+        """Connection for this thread (and process: connections must not cross a fork)."""
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def version(self, session_id, model):
+        """Stored version of a session's chat (0 if none or expired)."""
+        row = self._db().execute("SELECT version, updated FROM sessions WHERE session_id = ? AND model = ?",
+                                 (session_id, model)).fetchone()
+        return row[0] if row and self.clock() - row[1] < self.ttl else 0
+
+    def load(self, session_id, model):
+        """(version, history) of a session's chat; (0, None) if none or expired."""
+        row = self._db().execute("SELECT version, history, updated FROM sessions WHERE session_id = ? AND model = ?",
+                                 (session_id, model)).fetchone()
+        if row is None or self.clock() - row[2] >= self.ttl:
+            return 0, None
+        return row[0], json.loads(row[1])
+
+    def save(self, session_id, model, history):
+        """Stores a chat's history; returns its new version."""
+        now = self.clock()
+        with self._db() as db:
+            db.execute("DELETE FROM sessions WHERE updated < ?", (now - self.ttl,))
+            row = db.execute("""
+                INSERT INTO sessions (session_id, model, version, history, updated) VALUES (?, ?, 1, ?, ?)
+                ON CONFLICT (session_id, model) DO UPDATE
+                    SET version = version + 1, history = excluded.history, updated = excluded.updated
+                RETURNING version""", (session_id, model, json.dumps(history), now)).fetchone()
+        return row[0]
+
+    def discard(self, session_id):
+        with self._db() as db:
+            db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+class PooledChat:
+    """A live chat plus the lock that serializes prompts sent to it (chats keep history)."""
+
+    def __init__(self, chat, model, session_id=None, version=0):
+        self.chat = chat
+        self.model = model
+        self.session_id = session_id
+        self.version = version  # store version the chat's history matches
+        self.lock = threading.Lock()
+        self.created = time.time()
+        self.last_used = None
+        self.prompts = 0
+
+
+class SessionPool:
+    def __init__(self, factory, ttl=DEFAULT_TTL, max_sessions=DEFAULT_MAX_SESSIONS, clock=time.monotonic,
+                 store=None, dump=chat_history):
+        """
+        `factory(model)` returns a new chat object for that model. With a SessionStore,
+        `factory(model, history)` must also rebuild a chat from a history that
+        `dump(chat)` produced.
+        """
+        self.factory = factory
+        self.store = store
+        self.dump = dump
+        self.restored = 0
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._chats = OrderedDict()  # (session_id, model) -> PooledChat, least recently used first
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._chats:
+            key, pooled = next(iter(self._chats.items()))
+            if now - pooled.last_used < self.ttl:
+                break
+            del self._chats[key]
+            self.expired += 1
+
+    def acquire(self, session_id, model):
+        """The PooledChat for this browser session and model, created on a miss."""
+        key = (session_id, model)
+        stored_version = self.store.version(session_id, model) if self.store is not None else 0
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            pooled = self._chats.get(key)
+            if pooled is not None and pooled.version == stored_version:
+                self.hits += 1
+                self._chats.move_to_end(key)
+                pooled.last_used = now
+                pooled.prompts += 1
+                return pooled
+            self.misses += 1
+        # Chat creation can hit the network; don't hold the pool lock for it.
+        version, history = self.store.load(session_id, model) if self.store is not None else (0, None)
+        if history is not None:
+            self.restored += 1
+            chat = self.factory(model, history)
+        else:
+            chat = self.factory(model)
+        pooled = PooledChat(chat, model, session_id, version)
+        with self._lock:
+            now = self.clock()
+            existing = self._chats.get(key)
+            if existing is not None and existing.version == version:
+                pooled = existing  # a concurrent request for the same session won the race
+                self._chats.move_to_end(key)
+            else:
+                if existing is not None:  # stale: the store moved on (another process, or a discard)
+                    del self._chats[key]
+                while len(self._chats) >= self.max_sessions:
+                    self._chats.popitem(last=False)
+                    self.evicted += 1
+                self._chats[key] = pooled
+            pooled.last_used = now
+            pooled.prompts += 1
+        return pooled
+
+    def commit(self, pooled):
+        """Saves a chat's history to the store after a turn (call with pooled.lock held)."""
+        if self.store is None:
+            return
+        try:
+            pooled.version = self.store.save(pooled.session_id, pooled.model, self.dump(pooled.chat))
+        except Exception as e:  # the reply already happened; other workers just won't see this turn
+            print(f"⚠️  Could not save chat session {pooled.session_id}: {e}")
+
+    def discard(self, session_id):
+        """Drops every chat of a browser session (e.g. on /reset). Returns how many were dropped."""
+        with self._lock:
+            keys = [k for k in self._chats if k[0] == session_id]
+            for key in keys:
+                del self._chats[key]
+        if self.store is not None:
+            self.store.discard(session_id)
+        return len(keys)
+
+    def stats(self):
+        with self._lock:
+            self._expire(self.clock())
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._chats),
+                "max_sessions": self.max_sessions,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "restored": self.restored,
+                "evictions": {"idle": self.expired, "capacity": self.evicted},
+            }
+
+
+def session_id_from_headers(headers):
+    """The session id from the request's Cookie header, or None."""
+    raw = headers.get("Cookie")
+    if not raw:
+        return None
+    cookie = SimpleCookie()
+    try:
+        cookie.load(raw)
+    except Exception:
+        return None
+    morsel = cookie.get(SESSION_COOKIE)
+    return morsel.value if morsel and morsel.value else None
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def session_cookie(session_id):
+    """Set-Cookie header value for a session id."""
+    return f"{SESSION_COOKIE}={session_id}; Path=/; HttpOnly; SameSite=Lax"
@@ -0,0 +1,389 @@
+"""
+cli_corpus.py
+Shared, memory-mapped view of the claude-code cli.js bundle.
+
+Every scanner used to open() and re-read the multi-megabyte bundle on its own.
+This module maps the file once per process, builds a persisted index keyed by the
+file's SHA-256 (string literals, template literals, var assignments, name: sites,
+inputSchema: sites) and memoizes ad-hoc regex searches next to it (the most recently
+used MAX_SEARCHES, within MAX_SEARCH_BYTES), so a second pipeline run against an
+unchanged cli.js is served from the index alone.
+
+Literals come from js_lexer and are kept in a JSON-lines sidecar that is streamed
+back record by record, so literal queries never hold the whole set in memory.
+
+All offsets are byte offsets into the raw file.
+"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import threading
+
+import js_lexer
+
+CLI_PATH = "node_modules/@anthropic-ai/claude-code/cli.js"
+INDEX_DIR = ".cli_corpus_index"
+INDEX_VERSION = 2
+MAX_SEARCHES = 256  # memoized ad-hoc searches kept per digest, least recently used evicted first
+MAX_SEARCH_BYTES = 32 << 20  # ... and the most JSON they may take up between them
+
+VAR_PATTERN = re.compile(rb'var\s+([a-zA-Z0-9_$]+)\s*=\s*"([^"]+)"')
+NAME_PATTERN = re.compile(rb'name\s*:\s*["\'](.*?)["\']')
+INPUT_SCHEMA_PATTERN = re.compile(rb'inputSchema\s*:')
+SCHEMA_NAME_PATTERN = re.compile(rb'name\s*:\s*["\']([a-zA-Z0-9_]+)["\']')
+
+
+def _decode(raw):
+    return raw.decode("utf-8", errors="ignore")
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def extract_balanced_object(buf, start_index, max_length=200000):
+    """Returns the bytes of the {...} object starting at the first '{' at or after start_index."""
+    obj_start = buf.find(b"{", start_index)
+    if obj_start == -1:
+        return None
+    depth = 0
+    end = min(len(buf), obj_start + max_length)
+    for i in range(obj_start, end):
+        ch = buf[i]
+        if ch == 0x7B:
+            depth += 1
+        elif ch == 0x7D:
+            depth -= 1
+            if depth == 0:
+                return bytes(buf[obj_start:i + 1])
+    return None
+
+
+class CliCorpus:
+    """Index-backed access to a JS bundle. The raw file is only mapped when a query needs it."""
+
+    def __init__(self, path=CLI_PATH, index_dir=INDEX_DIR):
+        self.path = path
+        self.index_dir = index_dir
+        self._file = None
+        self._mm = None
+        self._digest = None
+        self._index = None
+        self._searches = None
+        self._used = {}  # memoized searches served since the last write, in order of use
+        # Stages running on threads of one interpreter share this object.
+        self._lock = threading.RLock()
+
+    # --- Raw access ---
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    @property
+    def raw(self):
+        """The memory-mapped file. Slicing it only pages in the touched range."""
+        with self._lock:
+            if self._mm is None:
+                self._file = open(self.path, "rb")
+                if os.fstat(self._file.fileno()).st_size == 0:
+                    self._mm = b""
+                else:
+                    self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._mm
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def slice(self, start, end):
+        start = max(0, start)
+        end = min(self.size, end)
+        return _decode(self.raw[start:end])
+
+    def context(self, start, end, window=100):
+        """Decoded text around [start, end) padded by `window` bytes on each side."""
+        return self.slice(start - window, end + window)
+
+    def close(self):
+        if self._mm is not None and not isinstance(self._mm, bytes):
+            self._mm.close()
+        if self._file is not None:
+            self._file.close()
+        self._mm = None
+        self._file = None
+
+    # --- Content hash ---
+
+    def _stamps_path(self):
+        return os.path.join(self.index_dir, "stamps.json")
+
+    def _load_stamps(self):
+        try:
+            with open(self._stamps_path(), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @property
+    def digest(self):
+        """SHA-256 of the file. Reused from the stamp file while size and mtime are unchanged."""
+        if self._digest is not None:
+            return self._digest
+        with self._lock:
+            if self._digest is None:
+                self._digest = self._compute_digest()
+        return self._digest
+
+    def _compute_digest(self):
+        st = os.stat(self.path)
+        key = os.path.abspath(self.path)
+        stamps = self._load_stamps()
+        stamp = stamps.get(key)
+        if stamp and stamp["size"] == st.st_size and stamp["mtime_ns"] == st.st_mtime_ns:
+            return stamp["digest"]
+
+        h = hashlib.sha256()
+        buf = self.raw
+        for i in range(0, len(buf), 1 << 20):
+            h.update(buf[i:i + (1 << 20)])
+        digest = h.hexdigest()
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        stamps[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "digest": digest}
+        _write_json_atomic(self._stamps_path(), stamps)
+        return digest
+
+    # --- Persisted index ---
+
+    def _index_path(self):
+        return os.path.join(self.index_dir, f"{self.digest}.v{INDEX_VERSION}.json")
+
+    def _literals_path(self):
+        return os.path.join(self.index_dir, f"{self.digest}.v{INDEX_VERSION}.literals.jsonl")
+
+    def _search_path(self):
+        return os.path.join(self.index_dir, f"{self.digest}.v{INDEX_VERSION}.search.json")
+
+    @property
+    def index(self):
+        if self._index is not None:
+            return self._index
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            try:
+                with open(self._index_path(), "r") as f:
+                    index = json.load(f)
+                if not os.path.exists(self._literals_path()):
+                    raise ValueError("literal sidecar missing")
+                self._index = index
+            except (OSError, ValueError):
+                os.makedirs(self.index_dir, exist_ok=True)
+                self._index = self._build_index()
+                _write_json_atomic(self._index_path(), self._index)
+        return self._index
+
+    def _write_literals(self, buf):
+        """Streams lexer output straight to the sidecar. Returns (strings, templates) counts."""
+        counts = {js_lexer.STRING: 0, js_lexer.TEMPLATE: 0}
+        path = self._literals_path()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            for rec in js_lexer.iter_literals(buf):
+                f.write(json.dumps(list(rec)))
+                f.write("\n")
+                counts[rec.kind] += 1
+        os.replace(tmp_path, path)
+        return counts[js_lexer.STRING], counts[js_lexer.TEMPLATE]
+
+    def _build_index(self):
+        buf = self.raw
+        string_count, template_count = self._write_literals(buf)
+
+        var_assignments = [
+            [_decode(m.group(1)), _decode(m.group(2)), m.start(), m.end()]
+            for m in VAR_PATTERN.finditer(buf)
+        ]
+        name_sites = [[_decode(m.group(1)), m.start()] for m in NAME_PATTERN.finditer(buf)]
+
+        input_schemas = []
+        for m in INPUT_SCHEMA_PATTERN.finditer(buf):
+            raw_schema = extract_balanced_object(buf, m.start())
+            before = bytes(buf[max(0, m.start() - 300):m.start()])
+            name_match = SCHEMA_NAME_PATTERN.search(before)
+            input_schemas.append({
+                "offset": m.start(),
+                "name": _decode(name_match.group(1)) if name_match else None,
+                "raw": _decode(raw_schema) if raw_schema else None,
+            })
+
+        return {
+            "version": INDEX_VERSION,
+            "digest": self.digest,
+            "size": len(buf),
+            "strings": string_count,
+            "templates": template_count,
+            "var_assignments": var_assignments,
+            "name_sites": name_sites,
+            "input_schemas": input_schemas,
+        }
+
+    # --- Index queries ---
+
+    def iter_literals(self, *predicates):
+        """Lazily yields js_lexer.LiteralRecord from the index, filtered by every predicate."""
+        self.index
+        with open(self._literals_path(), "r") as f:
+            records = (js_lexer.LiteralRecord(o, k, t, tuple(i)) for o, k, t, i in map(json.loads, f))
+            yield from js_lexer.select(records, *predicates)
+
+    def string_literals(self, min_length=0):
+        """[(offset, text)] for "..." and '...' literals (raw source text, escapes untouched)."""
+        preds = (js_lexer.kind_is(js_lexer.STRING), js_lexer.min_length(min_length))
+        return [(rec.offset, rec.text) for rec in self.iter_literals(*preds)]
+
+    def template_literals(self, min_length=0):
+        """[(offset, text)] for `...` literals (raw source text, ${} left in place)."""
+        preds = (js_lexer.kind_is(js_lexer.TEMPLATE), js_lexer.min_length(min_length))
+        return [(rec.offset, rec.text) for rec in self.iter_literals(*preds)]
+
+    def literals(self, min_length=0):
+        """All string and template literals with at least min_length chars, ordered by offset."""
+        return sorted((rec.offset, rec.text) for rec in self.iter_literals(js_lexer.min_length(min_length)))
+
+    def var_assignments(self):
+        """[(name, value, start, end)] for every `var X="..."` site."""
+        return [tuple(r) for r in self.index["var_assignments"]]
+
+    def name_sites(self):
+        """[(value, offset)] for every `name:"..."` / `name:'...'` site."""
+        return [tuple(r) for r in self.index["name_sites"]]
+
+    def input_schema_offsets(self):
+        return [r["offset"] for r in self.index["input_schemas"]]
+
+    def input_schemas(self):
+        """[{offset, name, raw}] with the balanced schema object and the nearest preceding name."""
+        return list(self.index["input_schemas"])
+
+    # --- Memoized ad-hoc searches ---
+
+    def _load_searches(self):
+        if self._searches is None:
+            try:
+                with open(self._search_path(), "r") as f:
+                    self._searches = json.load(f)
+            except (OSError, ValueError):
+                self._searches = {}
+        return self._searches
+
+    def search(self, pattern, flags=0, window=0, limit=None):
+        """
+        Regex search over the raw bytes, memoized per (pattern, flags, window, limit).
+        Returns a list of dicts: start, end, match, groups and (if window) context.
+        """
+        key = json.dumps([pattern, flags, window, limit])
+        with self._lock:
+            searches = self._load_searches()
+            if key in searches:
+                self._used.pop(key, None)
+                self._used[key] = None
+                return searches[key]
+
+        buf = self.raw
+        regex = re.compile(pattern.encode("utf-8"), flags)
+        hits = []
+        for m in regex.finditer(buf):
+            hit = {
+                "start": m.start(),
+                "end": m.end(),
+                "match": _decode(m.group(0)),
+                "groups": [_decode(g) if g is not None else None for g in m.groups()],
+            }
+            if window:
+                hit["context"] = _decode(buf[max(0, m.start() - window):m.end() + window])
+            hits.append(hit)
+            if limit is not None and len(hits) >= limit:
+                break
+
+        # Re-read before writing so concurrent scanners don't clobber each other's entries.
+        with self._lock:
+            self._searches = None
+            searches = self._load_searches()
+            for used in [*self._used, key]:  # most recently used last
+                if used in searches:
+                    searches[used] = searches.pop(used)
+            self._used.clear()
+            searches[key] = hits
+            self._evict(searches)
+            os.makedirs(self.index_dir, exist_ok=True)
+            _write_json_atomic(self._search_path(), searches)
+        return hits
+
+    @staticmethod
+    def _evict(searches):
+        """Drops the least recently used searches beyond MAX_SEARCHES / MAX_SEARCH_BYTES; keeps the newest."""
+        sizes = {key: len(key) + len(json.dumps(hits)) for key, hits in searches.items()}
+        total = sum(sizes.values())
+        while len(searches) > 1 and (len(searches) > MAX_SEARCHES or total > MAX_SEARCH_BYTES):
+            oldest = next(iter(searches))
+            total -= sizes[oldest]
+            del searches[oldest]
+
+    def findall(self, pattern, flags=0):
+        """Same shape as re.findall: the match, the single group, or a tuple of groups."""
+        results = []
+        for hit in self.search(pattern, flags):
+            groups = hit["groups"]
+            if not groups:
+                results.append(hit["match"])
+            elif len(groups) == 1:
+                results.append(groups[0])
+            else:
+                results.append(tuple(groups))
+        return results
+
+    def first(self, pattern, flags=0):
+        hits = self.search(pattern, flags, limit=1)
+        return hits[0] if hits else None
+
+
+_CORPORA = {}
+_CORPORA_LOCK = threading.Lock()
+
+
+def get_corpus(path=CLI_PATH):
+    """Process-wide shared corpus for `path`."""
+    key = os.path.abspath(path)
+    with _CORPORA_LOCK:
+        if key not in _CORPORA:
+            _CORPORA[key] = CliCorpus(path)
+        return _CORPORA[key]
+
+
+def run(context):
+    target = context.argv[0] if context.argv else CLI_PATH
+    corpus = context.corpus(target)
+    if not corpus.exists():
+        print(f"❌ Error: {target} not found.")
+        return 1
+
+    print(f"--- 📚 Indexing {target} ---")
+    index = corpus.index
+    print(f"✅ Digest: {corpus.digest[:16]}...")
+    print(f"   Strings:         {index['strings']}")
+    print(f"   Templates:       {index['templates']}")
+    print(f"   var assignments: {len(index['var_assignments'])}")
+    print(f"   name: sites:     {len(index['name_sites'])}")
+    print(f"   inputSchema:     {len(index['input_schemas'])}")
+
+
+if __name__ == "__main__":
+    from stage_context import StageContext
+    sys.exit(run(StageContext()))
@@ -0,0 +1,222 @@
+"""
+code_search.py
+In-process code search for the agents' Grep tools.
+
+The consoles' Grep shelled out to `grep -r pattern path` (10 s timeout, the entire
+stdout returned to the model, node_modules and .git included), and
+runtime_tools.grep_tool needed the ripgrep binary vendored inside node_modules and cut
+its output to 50 lines only after collecting all of it. search():
+
+  - walks the tree, skipping ignored directories (IGNORED_DIRS: .git, node_modules,
+    swarm_workspace copies, caches...) and whatever the .gitignore files along the
+    way exclude;
+  - searches files on a thread pool, each one read (or mmapped, when large) once and
+    scanned with one compiled bytes regex, in MULTILINE mode; files with a NUL byte
+    in their first block are binary and skipped;
+  - stops walking, and drops the files still being searched further along the walk,
+    once the files it has finished from the start of the walk hold `max_results`
+    matching lines;
+  - returns the first `max_results` matches in walk order, as structured
+    Match(path, line, column, snippet) results, one per matching line.
+
+Patterns are Python regular expressions (like ripgrep's, not grep's basic ones).
+bench_code_search.py compares it with `grep -rn`.
+"""
+import fnmatch
+import math
+import mmap
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_MAX_RESULTS = 200
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) + 2)  # reads block on I/O; the regex itself holds the GIL
+IGNORED_DIRS = {".git", ".hg", ".svn", "node_modules", "swarm_workspace", "__pycache__", ".venv", "venv",
+                ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".ruff_cache"}
+BINARY_SNIFF = 8192
+MMAP_THRESHOLD = 1024 * 1024  # smaller files are just read
+MAX_SNIPPET = 200
+
+Match = namedtuple("Match", "path line column snippet")
+SearchResult = namedtuple("SearchResult", "matches files_searched files_skipped truncated seconds")
+
+
+class _Rule:
+    """One .gitignore line, matched against paths under the directory it came from."""
+
+    __slots__ = ("prefix", "match", "negate", "dir_only", "anchored")
+
+    def __init__(self, base, line):
+        self.negate = line.startswith("!")
+        line = line[1:] if self.negate else line
+        self.dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        self.anchored = "/" in line  # a slash anywhere but the end ties the pattern to `base`
+        self.match = re.compile(fnmatch.translate(line.lstrip("/"))).match
+        self.prefix = os.path.join(base, "")
+
+    def matches(self, path, name, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        if not self.anchored:
+            return self.match(name) is not None
+        # walk() builds every path by joining onto the directory its rules came from
+        return path.startswith(self.prefix) and self.match(path[len(self.prefix):]) is not None
+
+
+def gitignore_rules(directory):
+    """The rules of `directory`/.gitignore (none if there isn't one)."""
+    try:
+        with open(os.path.join(directory, ".gitignore"), encoding="utf-8", errors="replace") as f:
+            lines = [line.rstrip("\n") for line in f]
+    except OSError:
+        return []
+    return [_Rule(directory, line.strip()) for line in lines if line.strip() and not line.startswith("#")]
+
+
+def is_ignored(rules, path, name, is_dir):
+    ignored = False
+    for rule in rules:  # git semantics: the last matching rule decides
+        if rule.negate == ignored and rule.matches(path, name, is_dir):
+            ignored = not rule.negate
+    return ignored
+
+
+def walk(root, glob=None):
+    """Files under `root` worth searching, in a stable (sorted, depth-first) order."""
+    if os.path.isfile(root):
+        yield root
+        return
+    stack = [(root, gitignore_rules(root))]
+    while stack:
+        directory, rules = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirectories = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and not entry.is_file(follow_symlinks=False):
+                    continue  # symlinks, sockets, fifos...
+            except OSError:
+                continue
+            if is_dir and entry.name in IGNORED_DIRS or is_ignored(rules, entry.path, entry.name, is_dir):
+                continue
+            if is_dir:
+                subdirectories.append(entry.path)
+            elif glob is None or fnmatch.fnmatch(entry.name, glob):
+                yield entry.path
+        for subdirectory in reversed(subdirectories):
+            stack.append((subdirectory, rules + gitignore_rules(subdirectory)))
+
+
+def _search_file(path, regex, limit, order, cutoff):
+    """
+    Up to `limit` matches in one file, or None when it's binary or unreadable. Gives up
+    early (its result is not needed) once `cutoff` moves before its walk `order`.
+    """
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return []
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size >= MMAP_THRESHOLD else f.read()
+    except (OSError, ValueError):
+        return None
+    try:
+        if b"\0" in data[:BINARY_SNIFF]:
+            return None
+        matches = []
+        line = 1
+        counted = 0  # line is the line number at offset `counted`
+        pos = 0
+        while len(matches) < limit and order <= cutoff.order:
+            found = regex.search(data, pos)
+            if found is None:
+                break
+            start = found.start()
+            line_start = data.rfind(b"\n", 0, start) + 1
+            line_end = data.find(b"\n", start)
+            if line_end < 0:
+                line_end = len(data)
+            line += data[counted:line_start].count(b"\n")
+            counted = line_start
+            snippet = data[line_start:min(line_end, line_start + MAX_SNIPPET * 4)].decode(errors="replace")
+            column = len(data[line_start:start].decode(errors="replace")) + 1
+            matches.append(Match(path, line, column, snippet.rstrip("\r")[:MAX_SNIPPET]))
+            pos = line_end + 1  # one result per line, like grep
+        return matches
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+class _Cutoff:
+    """
+    The walk order of the last file whose matches can still be returned. Files finish
+    out of order; once the ones from the start of the walk hold `limit` matches, later
+    files cannot change the answer.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.order = math.inf
+        self.ready = 0  # every file before this one in walk order has finished
+        self.count = 0  # matches in those files
+        self.results = {}
+
+    def finished(self, order, matches):
+        self.results[order] = matches
+        while self.order == math.inf and self.ready in self.results:
+            self.count += len(self.results[self.ready] or ())
+            if self.count >= self.limit:
+                self.order = self.ready
+            self.ready += 1
+
+    def reached(self):
+        return self.order != math.inf
+
+
+def search(pattern, path=".", max_results=DEFAULT_MAX_RESULTS, ignore_case=False, glob=None,
+           workers=DEFAULT_WORKERS, index=None):
+    """
+    Searches files under `path` for the regex `pattern`; raises re.error for a bad one.
+    With a file_index.FileIndex covering `path`, the files come from it instead of a walk.
+    """
+    start = time.perf_counter()
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No such file or directory: {path}")
+    regex = re.compile(pattern.encode(), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+    cutoff = _Cutoff(max_results)
+    files = index.files(path, glob) if index is not None else None
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="code-search") as pool:
+        pending = {}
+        for order, file_path in enumerate(walk(path, glob) if files is None else files):
+            if cutoff.reached():
+                break
+            pending[pool.submit(_search_file, file_path, regex, max_results, order, cutoff)] = order
+            if len(pending) >= workers * 4:  # keep the walk just ahead of the searchers
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    cutoff.finished(pending.pop(future), future.result())
+        for future, order in pending.items():
+            if order > cutoff.order and future.cancel():
+                continue
+            cutoff.finished(order, future.result())
+    kept = sorted(order for order in cutoff.results if order <= cutoff.order)
+    matches = [match for order in kept for match in cutoff.results[order] or ()][:max_results]
+    searched = sum(1 for order in kept if cutoff.results[order] is not None)
+    return SearchResult(matches, searched, len(kept) - searched, cutoff.reached(), time.perf_counter() - start)
+
+
+def format_matches(result, root=None):
+    """`path:line:column: snippet` lines, as grep -n/rg print them, with a note when the budget cut it short."""
+    lines = [f"{os.path.relpath(m.path, root) if root else m.path}:{m.line}:{m.column}: {m.snippet}"
+             for m in result.matches]
+    if result.truncated:
+        lines.append(f"... (stopped at {len(result.matches)} matches; narrow the pattern or the path)")
+    return "\n".join(lines)
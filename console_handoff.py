@@ -0,0 +1,92 @@
+"""
+console_handoff.py
+Zero-downtime upgrades: pass the listening socket from a running console to its replacement.
+
+`--force` used to find the old server with `lsof -t -i:PORT`, SIGTERM it and sleep a
+second before binding, so every upgrade dropped in-flight requests and refused
+connections in between. Instead, a running ConsoleServer listens on a per-port Unix
+socket. A replacement started with --force connects, sends "HANDOFF <pid>", and gets
+the listening socket's fd back over SCM_RIGHTS. From then on both processes share one
+socket and the kernel's accept queue. The new server starts accepting at once; the old
+one stops accepting, finishes its in-flight requests (model calls included) within
+--drain-timeout and exits. No connection is refused at any point.
+
+    listener, old_pid = request_handoff(handoff_path(port)) or (None, None)
+    server.run("", port, sock=listener, handoff=handoff_path(port))
+"""
+import os
+import socket
+import tempfile
+import threading
+
+HANDOFF_TIMEOUT = 5.0
+
+
+def handoff_path(port):
+    return os.path.join(tempfile.gettempdir(), f"gemini_console_{port}.sock")
+
+
+def request_handoff(path, timeout=HANDOFF_TIMEOUT):
+    """(listening socket, old pid) from the server behind `path`, or None if no server answers."""
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(timeout)
+    try:
+        conn.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        conn.close()
+        return None
+    with conn:
+        conn.sendall(f"HANDOFF {os.getpid()}\n".encode())
+        message, fds, _, _ = socket.recv_fds(conn, 1024, 1)
+    if not fds or not message.startswith(b"OK "):
+        return None
+    return socket.socket(fileno=fds[0]), int(message.split()[1])
+
+
+class HandoffListener:
+    """
+    Serves one handoff request on `path`: sends `sock` to the caller, then calls
+    on_handoff(new_pid). Runs on a daemon thread next to the event loop.
+    """
+
+    def __init__(self, path, sock, on_handoff):
+        self.path = path
+        self.sock = sock
+        self.on_handoff = on_handoff
+        try:
+            os.unlink(path)  # stale, or left by the server we just took over from
+        except FileNotFoundError:
+            pass
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        self.listener.listen(1)
+        self.handed_off = False
+        threading.Thread(target=self._serve, name="handoff", daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return  # closed
+            with conn:
+                conn.settimeout(HANDOFF_TIMEOUT)
+                try:
+                    request = conn.recv(1024).split()
+                    if len(request) != 2 or request[0] != b"HANDOFF":
+                        continue
+                    socket.send_fds(conn, [f"OK {os.getpid()}\n".encode()], [self.sock.fileno()])
+                except OSError:
+                    continue
+            self.handed_off = True
+            self.listener.close()  # the replacement binds its own listener at the same path
+            self.on_handoff(int(request[1]))
+            return
+
+    def close(self):
+        self.listener.close()
+        if not self.handed_off:  # afterwards the path belongs to the replacement
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,258 @@
+"""
+console_history.py
+Append-only conversation history for the console servers.
+
+The consoles re-walked the whole `history_log` list on every GET /, escaping each entry
+again and growing the page with `history_html +=`, so the page got slower with every
+prompt (and v9's tool-output entries made it much worse). HistoryLog escapes and renders
+each entry once, when it is appended, and gives every entry a monotonically increasing
+id. GET / joins the pre-rendered fragments of the newest entries, and the page script
+asks /history?after=<id> for anything newer (or ?before=<id> for older pages).
+
+It keeps the list-like surface the servers already used: append((role, text)), clear(),
+len() and iteration over (role, text). Given a HistoryStore (history_store.py) it also
+persists every entry, reloads the newest ones on restart and keeps only a bounded tail
+in memory.
+"""
+import html
+import threading
+from collections import namedtuple
+
+from history_store import DEFAULT_FSYNC, FSYNC_POLICIES, HistoryStore
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+PAGE_TAIL = 500
+DEFAULT_CACHE_ENTRIES = 2000
+DEFAULT_MAX_ENTRIES = 100_000
+# Per port, so a phoenix redeploy onto the same port picks up where the old server left off.
+DEFAULT_HISTORY_PATH = ".console_history_{port}.log"
+
+HistoryEntry = namedtuple("HistoryEntry", ["id", "role", "text", "html"])
+
+
+class HistoryLog:
+    def __init__(self, css_classes=None, default_css="agent-msg", store=None, cache_entries=DEFAULT_CACHE_ENTRIES):
+        """
+        `css_classes` maps roles to the message CSS class; other roles get `default_css`.
+        With a HistoryStore as `store`, entries are persisted there and only the newest
+        `cache_entries` stay in memory (older pages are read back from the store).
+        """
+        self.css_classes = dict(css_classes or {})
+        self.default_css = default_css
+        self.store = store
+        self.cache_entries = max(cache_entries, PAGE_TAIL)
+        self._lock = threading.Lock()
+        self._entries = []
+        self._base = self._first = 1  # ids of self._entries[0] and of the oldest entry
+        if store is not None:
+            self._load()
+
+    def _load(self):
+        """(Re)fills the cache with the store's newest entries."""
+        self._generation = self.store.generation
+        self._entries = [self._entry(*e) for e in self.store.tail(self.cache_entries)]
+        self._first = self.store.first_id
+        self._base = self._entries[0].id if self._entries else self.store.last_id + 1
+
+    def _sync(self, refresh=True):
+        """Catches the cache up with the store, including entries other processes appended."""
+        if self.store is None:
+            return
+        if refresh:
+            self.store.refresh()
+        if self.store.generation != self._generation:  # compacted or cleared, possibly elsewhere
+            self._load()
+            return
+        self._first = self.store.first_id
+        last = self._base + len(self._entries) - 1
+        if self.store.last_id > last:
+            start = max(last + 1, self.store.last_id - self.cache_entries + 1)
+            if start > last + 1:
+                self._entries, self._base = [], start
+            self._entries += [self._entry(*e) for e in self.store.read(start, self.store.last_id - start + 1)]
+        if len(self._entries) > self.cache_entries + self.cache_entries // 4:
+            del self._entries[:-self.cache_entries]
+            self._base = self._entries[0].id
+
+    def render(self, role, text):
+        css = self.css_classes.get(role, self.default_css)
+        return f'<div class="msg {css}" data-id="{{id}}">{html.escape(text or "", quote=False)}</div>'
+
+    def _entry(self, entry_id, role, text):
+        return HistoryEntry(entry_id, role, text, self.render(role, text).replace("{id}", str(entry_id), 1))
+
+    def append(self, item):
+        """Appends a (role, text) pair; returns the new entry's id."""
+        role, text = item
+        fragment = self.render(role, text)
+        with self._lock:
+            expected = self._base + len(self._entries)
+            entry_id = expected if self.store is None else self.store.append(role, text)
+            if self.store is None or (entry_id == expected and self.store.generation == self._generation):
+                self._entries.append(HistoryEntry(entry_id, role, text, fragment.replace("{id}", str(entry_id), 1)))
+            self._sync(refresh=False)  # no-op unless others appended or the log was compacted
+        return entry_id
+
+    def clear(self):
+        """Drops every entry. Ids keep counting up, so old cursors stay valid."""
+        with self._lock:
+            if self.store is not None:
+                self.store.clear()
+                self._load()
+                return
+            self._base += len(self._entries)
+            self._first = self._base
+            self._entries = []
+
+    def close(self):
+        if self.store is not None:
+            with self._lock:
+                self.store.close()
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return self._base + len(self._entries) - self._first
+
+    def __iter__(self):
+        with self._lock:
+            self._sync()
+            entries = self._range(self._first, self._base + len(self._entries) - 1)
+        return iter((e.role, e.text) for e in entries)
+
+    @property
+    def last_id(self):
+        """Id of the newest entry (0 if none yet); the cursor a fresh page starts from."""
+        with self._lock:
+            self._sync()
+            return self._base + len(self._entries) - 1
+
+    def _range(self, first, last):
+        """Entries first..last (inclusive, already clamped): cached ones from memory, older from the store."""
+        if first > last:
+            return []
+        if self.store is None or first >= self._base:
+            return self._entries[first - self._base:last + 1 - self._base]
+        older = [self._entry(*e) for e in self.store.read(first, min(last, self._base - 1) - first + 1)]
+        return older + self._entries[:max(0, last + 1 - self._base)]
+
+    def page(self, after=None, before=None, limit=DEFAULT_PAGE_LIMIT):
+        """
+        Up to `limit` entries with id > after (oldest first), or the `limit` entries just
+        before `before`. Returns (entries, more) where `more` says the page was cut short.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_LIMIT))
+        with self._lock:
+            self._sync()
+            last_id = self._base + len(self._entries) - 1
+            if before is not None:
+                end = min(last_id, int(before) - 1)
+                start = max(self._first, end - limit + 1)
+                return self._range(start, end), start > self._first
+            start = self._first if after is None else max(self._first, int(after) + 1)
+            end = min(last_id, start + limit - 1)
+            return self._range(start, end), end < last_id
+
+    def page_json(self, after=None, before=None, limit=DEFAULT_PAGE_LIMIT):
+        entries, more = self.page(after, before, limit)
+        return {
+            "entries": [e._asdict() for e in entries],
+            "next": entries[-1].id if entries else (self.last_id if before is None else None),
+            "more": more,
+        }
+
+    def render_tail(self, limit=PAGE_TAIL):
+        """(html of the newest `limit` entries, id of the first one shown, number of older entries)."""
+        with self._lock:
+            self._sync()
+            tail = self._entries[max(0, self._first - self._base):][-limit:]
+            older = self._base + len(self._entries) - self._first - len(tail)
+        return "".join(e.html for e in tail), (tail[0].id if tail else None), older
+
+
+# Console-page side: pulls only entries newer than the last one on the page.
+HISTORY_SCRIPT = """
+<script>
+    (function() {
+        const box = document.getElementById('chat-history');
+        let cursor = parseInt(box.dataset.cursor || '0', 10);
+        let polling = false;
+
+        function addEntries(entries, prepend) {
+            const frag = document.createElement('div');
+            frag.innerHTML = entries.map(e => e.html).join('');
+            const nodes = Array.from(frag.children);
+            if (window.marked) nodes.filter(n => n.classList.contains('agent-msg'))
+                                   .forEach(n => { n.innerHTML = marked.parse(n.innerHTML); });
+            const placeholder = box.querySelector('.placeholder');
+            if (placeholder && nodes.length) placeholder.remove();
+            if (prepend) nodes.reverse().forEach(n => box.insertBefore(n, box.querySelector('.msg')));
+            else nodes.forEach(n => box.appendChild(n));
+        }
+
+        let again = false;
+        let dropPending = false;
+        window.refreshHistory = function(dropLive) {
+            dropPending = dropPending || dropLive;
+            if (polling) { again = true; return; }
+            polling = true;
+            fetch('/history?after=' + cursor + '&limit=200').then(r => r.json()).then(function(page) {
+                if (dropPending) box.querySelectorAll('.live').forEach(n => n.remove());
+                dropPending = false;
+                if (page.entries.length) {
+                    addEntries(page.entries, false);
+                    box.scrollTop = box.scrollHeight;
+                }
+                cursor = page.next;
+                polling = false;
+                if (page.more || again) { again = false; window.refreshHistory(false); }
+            }).catch(function() { polling = false; });
+        };
+
+        const older = document.getElementById('load-older');
+        if (older) older.addEventListener('click', function(e) {
+            e.preventDefault();
+            fetch('/history?before=' + older.dataset.before + '&limit=200').then(r => r.json()).then(function(page) {
+                addEntries(page.entries, true);
+                if (page.more && page.entries.length) older.dataset.before = page.entries[0].id;
+                else older.remove();
+            });
+        });
+
+        setInterval(function() { if (!window.streaming) window.refreshHistory(false); }, 3000);
+    })();
+</script>
+"""
+
+
+def render_history(history_log, empty_html="", limit=PAGE_TAIL):
+    """(#chat-history inner HTML, cursor) for GET /: the newest entries plus a 'load older' link."""
+    fragments, first_id, older = history_log.render_tail(limit)
+    if not fragments:
+        return empty_html, history_log.last_id
+    if older:
+        fragments = (f'<a href="#" id="load-older" data-before="{first_id}">'
+                     f'⬆ {older} earlier entries</a>') + fragments
+    return fragments, history_log.last_id
+
+
+def add_history_arguments(parser):
+    parser.add_argument("--history-file", default=DEFAULT_HISTORY_PATH,
+                        help="Append-only log the console history survives restarts in; '' keeps it in memory only "
+                             "(default: %(default)s)")
+    parser.add_argument("--history-fsync", choices=FSYNC_POLICIES, default=DEFAULT_FSYNC,
+                        help="When history appends are fsynced (default: %(default)s)")
+    parser.add_argument("--history-max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Entries kept on disk; older ones are compacted away (default: %(default)s)")
+    return parser
+
+
+def history_from_args(args, **kwargs):
+    if not args.history_file:
+        return HistoryLog(**kwargs)
+    path = args.history_file.format(port=getattr(args, "port", ""))
+    store = HistoryStore(path, fsync=args.history_fsync, max_entries=args.history_max_entries)
+    history_log = HistoryLog(store=store, **kwargs)
+    print(f"📜 History: {len(history_log)} entries reloaded from {path}")
+    return history_log
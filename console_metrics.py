@@ -0,0 +1,264 @@
+"""
+console_metrics.py
+Prometheus-style metrics for the Gemini console servers (GET /metrics).
+
+The consoles only had print() lines like "[SERVER] ⚡ Executing Bash" to show where time
+went. ConsoleMetrics records:
+  - request latency per route (ConsoleServer(metrics=...) reports every response),
+  - model call latency, outcomes and token counts per model_choice,
+  - call counts, latencies and errors per tool (@metrics.tool), and the output tokens
+    patch edits saved over whole-file ones,
+  - gauges read at scrape time: live sessions, queued/in-flight model calls, connections.
+
+Counters and histograms are sharded per thread: a thread only ever writes its own
+cells (a plain dict it owns), so the hot path takes no lock and never contends with
+other handler threads; a scrape sums the shards. bench_console_metrics.py checks the
+cost per instrumented call. With --workers, each worker process keeps (and serves) its
+own numbers; `console_process_info` says which one answered.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds. Model calls and tool runs take far longer than HTTP handlers, hence the range.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class _Shards:
+    """One dict of cells per thread; only the owning thread writes to it."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self.all = []
+
+    def cells(self):
+        try:
+            return self._local.cells
+        except AttributeError:
+            cells = self._local.cells = {}
+            self.all.append(cells)  # list.append is atomic; scrapes iterate over a copy
+            return cells
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._shards = _Shards()
+
+    def inc(self, *labels, amount=1):
+        cells = self._shards.cells()
+        cells[labels] = cells.get(labels, 0) + amount
+
+    def values(self):
+        totals = {}
+        for cells in list(self._shards.all):
+            for key, value in list(cells.items()):
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self):
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+                for key, value in sorted(self.values().items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.bounds = tuple(sorted(buckets))
+        self._shards = _Shards()
+
+    def observe(self, value, *labels):
+        cells = self._shards.cells()
+        cell = cells.get(labels)
+        if cell is None:
+            cell = cells[labels] = [0] * (len(self.bounds) + 3)  # buckets..., +Inf, sum, count
+        cell[bisect.bisect_left(self.bounds, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def values(self):
+        totals = {}
+        for cells in list(self._shards.all):
+            for key, cell in list(cells.items()):
+                total = totals.setdefault(key, [0] * len(cell))
+                for i, value in enumerate(cell):
+                    total[i] += value
+        return totals
+
+    def render(self):
+        lines = []
+        for key, cell in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), cell):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(cell[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cell[-1]}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from `read()`: a number, or a {label values tuple: number} dict."""
+    kind = "gauge"
+
+    def __init__(self, name, help, read, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.read = read
+
+    def render(self):
+        value = self.read()
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(v)}" for key, v in sorted(value.items())]
+
+
+class ConsoleMetrics:
+    def __init__(self):
+        self.metrics = []
+        self.http_latency = self.add(Histogram(
+            "console_http_request_duration_seconds", "Time from request head to response sent", ("method", "route")))
+        self.http_responses = self.add(Counter(
+            "console_http_responses_total", "Responses by status", ("method", "route", "status")))
+        self.model_latency = self.add(Histogram(
+            "console_model_call_duration_seconds", "Model calls, tool rounds included", ("model",)))
+        self.model_calls = self.add(Counter(
+            "console_model_calls_total", "Model calls by outcome", ("model", "outcome")))
+        self.model_tokens = self.add(Counter(
+            "console_model_tokens_total", "Tokens reported in usage_metadata", ("model", "kind")))
+        self.tool_latency = self.add(Histogram(
+            "console_tool_call_duration_seconds", "Tool (function call) run time", ("tool",)))
+        self.tool_calls = self.add(Counter(
+            "console_tool_calls_total", "Tool calls by outcome (error: raised or returned 'Error...')",
+            ("tool", "outcome")))
+        self.edits = self.add(Counter(
+            "console_edits_total", "Edit tool calls that applied, by mode (write, replace, diff)", ("mode",)))
+        self.edit_tokens_saved = self.add(Counter(
+            "console_edit_output_tokens_saved_total",
+            "Output tokens (~4 chars each) patch edits saved over resending whole files", ("mode",)))
+        self.add(Gauge("console_process_info", "The process that served this scrape", lambda: {
+            (os.getpid(),): 1}, ("pid",)))
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help, read, labels=()):
+        return self.add(Gauge(name, help, read, labels))
+
+    # --- Hooks ---
+
+    def request(self, method, route, status, seconds):
+        """ConsoleServer calls this once per response."""
+        self.http_latency.observe(seconds, method, route)
+        self.http_responses.inc(method, route, str(status))
+
+    def model_call(self, model):
+        """`with metrics.model_call(model) as call:` times a call; call.usage(response) adds its tokens."""
+        return _ModelCall(self, model)
+
+    def edit(self, mode, tokens_saved):
+        """The Edit tool calls this for each edit it applies (file_edit.EditResult fields)."""
+        self.edits.inc(mode)
+        if tokens_saved:
+            self.edit_tokens_saved.inc(mode, amount=tokens_saved)
+
+    def tool(self, func):
+        """Counts and times a tool. Keeps the signature/docstring function calling reads."""
+        name = func.__name__
+        latency, calls = self.tool_latency, self.tool_calls
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                if not (isinstance(result, str) and result.startswith("Error")):
+                    outcome = "ok"
+                return result
+            finally:
+                latency.observe(time.perf_counter() - start, name)
+                calls.inc(name, outcome)
+        return wrapper
+
+    # --- Exposition ---
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.metrics:
+            try:
+                samples = metric.render()
+            except Exception as e:  # a broken gauge must not take the scrape down
+                lines.append(f"# {metric.name}: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+class _ModelCall:
+    """A class rather than @contextmanager: a generator-based one costs over a microsecond more."""
+
+    __slots__ = ("metrics", "model", "start")
+
+    def __init__(self, metrics, model):
+        self.metrics = metrics
+        self.model = model
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.model_latency.observe(time.perf_counter() - self.start, self.model)
+        self.metrics.model_calls.inc(self.model, "error" if exc_type else "ok")
+
+    def usage(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        for kind, field in (("prompt", "prompt_token_count"), ("output", "candidates_token_count"),
+                            ("thoughts", "thoughts_token_count"), ("tool_use", "tool_use_prompt_token_count")):
+            count = getattr(usage, field, None)
+            if count:
+                self.metrics.model_tokens.inc(self.model, kind, amount=count)
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,744 @@
+"""
+console_server.py
+Shared asyncio HTTP/1.1 core for the Gemini console servers.
+
+The versioned consoles each copy-pasted a socketserver.ThreadingTCPServer handler (one
+OS thread per connection, idle keep-alive clients included) and parsed uploads with the
+deprecated cgi.FieldStorage, which buffers whole files in memory. ConsoleServer instead:
+  - serves every connection from one event loop, with keep-alive and an idle timeout,
+  - refuses connections past --max-connections with a 503 instead of spawning threads,
+  - streams multipart/form-data uploads (and raw application/octet-stream bodies) to disk
+    in fixed-size chunks, hashing them on the way and enforcing size limits mid-stream,
+  - runs the (blocking) route handlers on a bounded thread pool (--handler-threads),
+  - streams EventStream responses (SSE) through a bounded queue, so a slow client slows
+    the producer down instead of buffering without limit,
+  - can hand its listening socket to a replacement process and drain (console_handoff.py),
+  - with --workers N, pre-forks N worker processes that accept from one shared listening
+    socket (rendering, upload parsing and tool calls then spread over N GILs); the
+    parent only supervises, respawning workers that crash. Workers share state through
+    the on-disk history log and session store, not memory.
+
+    server = ConsoleServer(static_root=os.getcwd())
+
+    @server.route("GET", "/")
+    def index(request):
+        return Response("<h1>hi</h1>")
+
+    server.run("", 8888)
+"""
+import asyncio
+import email.parser
+import email.utils
+import hashlib
+import http.client
+import inspect
+import json
+import mimetypes
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from console_handoff import HandoffListener
+from console_stream import sse_event
+
+CHUNK_SIZE = 64 * 1024
+MAX_LINE = 64 * 1024
+MAX_HEADERS = 100
+DEFAULT_MAX_CONNECTIONS = 1024
+DEFAULT_HANDLER_THREADS = 16
+DEFAULT_KEEPALIVE_TIMEOUT = 75.0
+DEFAULT_MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_FIELD_BYTES = 1024 * 1024
+STREAM_QUEUE_SIZE = 64
+DEFAULT_DRAIN_TIMEOUT = 60.0
+DRAIN_IDLE_GRACE = 0.2  # lets requests already on the wire reach idle keep-alive connections
+DEFAULT_WORKERS = 1
+RESPAWN_BACKOFF = 1.0  # a worker dying this soon after starting waits before its respawn
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+
+
+class UploadedFile:
+    """
+    A multipart file part (or raw body) already written to disk at `path`, deleted after
+    the request unless moved. `sha256` is the hex digest of its content.
+    """
+
+    def __init__(self, field, filename, content_type, path, size, sha256=None):
+        self.field = field
+        self.filename = filename
+        self.content_type = content_type
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def __repr__(self):
+        return f"UploadedFile({self.filename!r}, {self.size} bytes)"
+
+
+class Request:
+    def __init__(self, method, target, version, headers, client_address):
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers  # http.client.HTTPMessage, case-insensitive like BaseHTTPRequestHandler's
+        self.client_address = client_address
+        split = urllib.parse.urlsplit(target)
+        self.path = urllib.parse.unquote(split.path)
+        self.query = urllib.parse.parse_qs(split.query, keep_blank_values=True)
+        self.form = {}
+        self.files = {}
+        self.body = b""
+
+    def get(self, name, default=None):
+        """First value of a form field or query parameter."""
+        values = self.form.get(name) or self.query.get(name)
+        return values[0] if values else default
+
+    def json(self):
+        return json.loads(self.body or b"null")
+
+
+class Response:
+    def __init__(self, body=b"", status=200, content_type="text/html; charset=utf-8", headers=None):
+        self.body = body.encode() if isinstance(body, str) else body
+        self.status = status
+        self.headers = [("Content-Type", content_type)] + list(headers or [])
+
+    @classmethod
+    def redirect(cls, location, status=303, headers=None):
+        return cls(b"", status, headers=[("Location", location)] + list(headers or []))
+
+    @classmethod
+    def json(cls, payload, status=200, headers=None):
+        return cls(json.dumps(payload, indent=2), status, "application/json", headers)
+
+
+class EventStream:
+    """
+    SSE response. `producer(emit)` runs on a handler thread and calls emit(event, data);
+    emit blocks while the client is behind and raises ConnectionResetError once it's gone.
+    """
+
+    def __init__(self, producer, headers=None):
+        self.producer = producer
+        self.status = 200
+        self.headers = [("Content-Type", "text/event-stream"), ("Cache-Control", "no-cache"),
+                        ("X-Accel-Buffering", "no")] + list(headers or [])
+
+
+class MultipartParser:
+    """
+    Incremental multipart/form-data parser: feed() it body chunks as they arrive. Fields
+    are kept in memory (up to max_field_bytes each); file parts with a non-empty filename
+    are written straight to temp files in upload_dir.
+    """
+
+    def __init__(self, boundary, upload_dir=None, max_file_bytes=DEFAULT_MAX_UPLOAD_BYTES,
+                 max_field_bytes=DEFAULT_MAX_FIELD_BYTES):
+        self.delimiter = b"\r\n--" + boundary.encode("latin-1")
+        self.upload_dir = upload_dir
+        self.max_file_bytes = max_file_bytes
+        self.max_field_bytes = max_field_bytes
+        self.fields = {}
+        self.files = {}
+        self._buffer = b"\r\n"  # so the first delimiter looks like every other one
+        self._state = "preamble"
+        self._part = None
+
+    def feed(self, data):
+        if self._state == "done":
+            return
+        self._buffer += data
+        while self._step():
+            pass
+
+    def _step(self):
+        if self._state == "preamble":
+            i = self._buffer.find(self.delimiter)
+            if i < 0:
+                self._buffer = self._buffer[-len(self.delimiter):]
+                return False
+            self._buffer = self._buffer[i + len(self.delimiter):]
+            self._state = "after_delimiter"
+            return True
+        if self._state == "after_delimiter":
+            if len(self._buffer) < 2:
+                return False
+            if self._buffer.startswith(b"--"):
+                self._state = "done"
+                self._buffer = b""
+                return False
+            if not self._buffer.startswith(b"\r\n"):
+                raise HTTPError(400, "Malformed multipart delimiter")
+            self._buffer = self._buffer[2:]
+            self._state = "headers"
+            return True
+        if self._state == "headers":
+            i = self._buffer.find(b"\r\n\r\n")
+            if i < 0:
+                if len(self._buffer) > MAX_LINE:
+                    raise HTTPError(431, "Multipart headers too large")
+                return False
+            self._start_part(self._buffer[:i])
+            self._buffer = self._buffer[i + 4:]
+            self._state = "body"
+            return True
+        if self._state == "body":
+            i = self._buffer.find(self.delimiter)
+            if i < 0:
+                # Keep enough bytes to recognize a delimiter split across chunks.
+                keep = len(self.delimiter) - 1
+                if len(self._buffer) > keep:
+                    self._write(self._buffer[:-keep])
+                    self._buffer = self._buffer[-keep:]
+                return False
+            self._write(self._buffer[:i])
+            self._finish_part()
+            self._buffer = self._buffer[i + len(self.delimiter):]
+            self._state = "after_delimiter"
+            return True
+        return False  # done: ignore the epilogue
+
+    def _start_part(self, raw_headers):
+        headers = email.parser.BytesParser(_class=http.client.HTTPMessage).parsebytes(raw_headers + b"\r\n\r\n")
+        name = headers.get_param("name", header="content-disposition")
+        filename = headers.get_param("filename", header="content-disposition")
+        name = email.utils.collapse_rfc2231_value(name) if name is not None else None
+        filename = email.utils.collapse_rfc2231_value(filename) if filename is not None else None
+        if name is None:
+            raise HTTPError(400, "Multipart part without a name")
+        part = {"name": name, "filename": filename, "size": 0, "chunks": [], "file": None, "path": None,
+                "hash": None, "content_type": headers.get("Content-Type", "application/octet-stream")}
+        if filename:
+            fd, part["path"] = tempfile.mkstemp(prefix="upload_", dir=self.upload_dir)
+            part["file"] = os.fdopen(fd, "wb")
+            part["hash"] = hashlib.sha256()
+        self._part = part
+
+    def _write(self, data):
+        if not data:
+            return
+        part = self._part
+        part["size"] += len(data)
+        if part["file"] is not None:
+            if part["size"] > self.max_file_bytes:
+                raise HTTPError(413, f"Upload exceeds {self.max_file_bytes} bytes")
+            part["file"].write(data)
+            part["hash"].update(data)
+        elif part["filename"] is None:
+            if part["size"] > self.max_field_bytes:
+                raise HTTPError(413, f"Form field '{part['name']}' exceeds {self.max_field_bytes} bytes")
+            part["chunks"].append(data)
+        # An empty filename is a file input left blank: its (empty) body is dropped.
+
+    def _finish_part(self):
+        part, self._part = self._part, None
+        if part["file"] is not None:
+            part["file"].close()
+            self.files[part["name"]] = UploadedFile(part["name"], os.path.basename(part["filename"]),
+                                                    part["content_type"], part["path"], part["size"],
+                                                    part["hash"].hexdigest())
+        elif part["filename"] is None:
+            self.fields.setdefault(part["name"], []).append(b"".join(part["chunks"]).decode("utf-8", "replace"))
+
+    def close(self):
+        """Checks the body ended properly; removes any half-written file otherwise."""
+        if self._state != "done":
+            self.discard()
+            raise HTTPError(400, "Truncated multipart body")
+
+    def discard(self):
+        if self._part is not None and self._part["file"] is not None:
+            self._part["file"].close()
+            _remove(self._part["path"])
+        for upload in self.files.values():
+            _remove(upload.path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ConsoleServer:
+    def __init__(self, max_connections=DEFAULT_MAX_CONNECTIONS, handler_threads=DEFAULT_HANDLER_THREADS,
+                 keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT, max_upload_bytes=DEFAULT_MAX_UPLOAD_BYTES,
+                 max_field_bytes=DEFAULT_MAX_FIELD_BYTES, upload_dir=None, static_root=None, log_requests=True,
+                 drain_timeout=DEFAULT_DRAIN_TIMEOUT, workers=DEFAULT_WORKERS, metrics=None):
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.max_upload_bytes = max_upload_bytes
+        self.max_field_bytes = max_field_bytes
+        self.upload_dir = upload_dir
+        self.static_root = os.path.realpath(static_root) if static_root else None
+        self.log_requests = log_requests
+        self.drain_timeout = drain_timeout
+        self.workers = workers
+        self.metrics = metrics  # console_metrics.ConsoleMetrics: request latency per route
+        self.worker = None  # index of this worker process in --workers mode
+        self.executor = ThreadPoolExecutor(max_workers=max(1, handler_threads), thread_name_prefix="console")
+        self.routes = {}
+        self.connections = 0
+        self.requests = 0
+        self.rejected = 0
+        self.active = 0  # requests between head and response
+        self.draining = False
+        self.server = None
+        self._loop = None
+        self._idle = set()  # connection tasks waiting for their next request
+        self._drain_task = None
+
+    # --- Routing ---
+
+    def route(self, method, path):
+        def decorator(func):
+            self.routes[(method.upper(), path)] = func
+            return func
+        return decorator
+
+    def stats(self):
+        return {"connections": self.connections, "max_connections": self.max_connections,
+                "requests": self.requests, "rejected": self.rejected, "active": self.active,
+                "draining": self.draining, "pid": os.getpid(), "worker": self.worker}
+
+    # --- Connection handling ---
+
+    async def _handle_connection(self, reader, writer):
+        peer = writer.get_extra_info("peername") or ("-", 0)
+        if self.connections >= self.max_connections:
+            self.rejected += 1
+            await self._send(writer, Response("Server busy", 503, "text/plain", [("Retry-After", "1")]),
+                             keep_alive=False)
+            writer.close()
+            return
+        self.connections += 1
+        try:
+            while await self._handle_request(reader, writer, peer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass  # shutting down; re-raising makes 3.11's StreamReaderProtocol log a spurious traceback
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _read_head(self, reader):
+        if self.draining:
+            return None
+        task = asyncio.current_task()
+        self._idle.add(task)  # drain() cancels connections still waiting here
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.keepalive_timeout)
+        except ValueError:  # longer than the StreamReader limit
+            raise HTTPError(414, "Request line too long") from None
+        finally:
+            self._idle.discard(task)
+        if not line:
+            return None
+        lines = []
+        while True:
+            try:
+                header = await asyncio.wait_for(reader.readline(), self.keepalive_timeout)
+            except ValueError:
+                raise HTTPError(431, "Header line too long") from None
+            if header in (b"\r\n", b"\n", b""):
+                break
+            lines.append(header)
+            if len(lines) > MAX_HEADERS:
+                raise HTTPError(431, "Too many headers")
+        return line, b"".join(lines)
+
+    async def _handle_request(self, reader, writer, peer):
+        """Serves one request. Returns True if the connection should stay open for another."""
+        try:
+            head = await self._read_head(reader)
+        except asyncio.TimeoutError:
+            return False
+        except HTTPError as e:  # an oversized head; what follows it can't be trusted
+            await self._send(writer, Response(str(e), e.status, "text/plain"), keep_alive=False)
+            return False
+        if head is None:
+            return False
+        self.active += 1
+        try:
+            return await self._serve_request(reader, writer, peer, head) and not self.draining
+        finally:
+            self.active -= 1
+
+    async def _serve_request(self, reader, writer, peer, head):
+        start = time.perf_counter()
+        request_line = head[0].decode("latin-1").rstrip("\r\n")
+        parts = request_line.split()
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            await self._send(writer, Response("Bad request line", 400, "text/plain"), keep_alive=False)
+            return False
+        method, target, version = parts
+        headers = email.parser.BytesParser(_class=http.client.HTTPMessage).parsebytes(head[1] + b"\r\n")
+        request = Request(method.upper(), target, version, headers, peer)
+        connection = (headers.get("Connection") or "").lower()
+        keep_alive = "close" not in connection if version == "HTTP/1.1" else "keep-alive" in connection
+        self.requests += 1
+
+        try:
+            await self._read_body(reader, writer, request)
+            response = await self._dispatch(request)
+        except HTTPError as e:
+            response = Response(str(e), e.status, "text/plain")
+            keep_alive = False  # the body may not have been consumed
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+            response = Response("Internal Server Error", 500, "text/plain")
+        finally:
+            for upload in request.files.values():
+                _remove(upload.path)
+
+        if isinstance(response, EventStream):
+            await self._send_stream(writer, response)
+            keep_alive = False
+        elif isinstance(response, str):
+            await self._send_file(writer, response, keep_alive)
+        else:
+            await self._send(writer, response, keep_alive)
+        status = response.status if not isinstance(response, str) else 200
+        if self.metrics is not None:
+            # Unrouted paths share one label each, so scanners can't blow up the series count.
+            route = (request.path if (request.method, request.path) in self.routes
+                     else "static" if isinstance(response, str) else "unrouted")
+            self.metrics.request(request.method, route, status, time.perf_counter() - start)
+        if self.log_requests:
+            date = time.strftime("%d/%b/%Y %H:%M:%S")
+            print(f'{peer[0]} - - [{date}] "{request_line}" {status} -', file=sys.stderr)
+        return keep_alive
+
+    async def _read_body(self, reader, writer, request):
+        if "chunked" in (request.headers.get("Transfer-Encoding") or "").lower():
+            raise HTTPError(411, "Chunked request bodies are not supported; send Content-Length")
+        try:
+            length = int(request.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Bad Content-Length")
+        if length <= 0:
+            return
+        if (request.headers.get("Expect") or "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+
+        content_type = request.headers.get_content_type()
+        if content_type == "multipart/form-data":
+            boundary = request.headers.get_param("boundary")
+            if not boundary:
+                raise HTTPError(400, "Multipart body without a boundary")
+            if length > self.max_upload_bytes + self.max_field_bytes:
+                raise HTTPError(413, "Request body too large")
+            parser = MultipartParser(boundary, self.upload_dir, self.max_upload_bytes, self.max_field_bytes)
+            try:
+                remaining = length
+                while remaining:
+                    chunk = await reader.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise asyncio.IncompleteReadError(b"", remaining)
+                    remaining -= len(chunk)
+                    parser.feed(chunk)
+                parser.close()
+            except BaseException:
+                parser.discard()
+                raise
+            request.form = parser.fields
+            request.files = parser.files
+            return
+        if content_type == "application/octet-stream":
+            request.files["body"] = await self._read_raw_body(reader, length)
+            return
+
+        if length > self.max_field_bytes:
+            raise HTTPError(413, "Request body too large")
+        request.body = await reader.readexactly(length)
+        if content_type == "application/x-www-form-urlencoded":
+            request.form = urllib.parse.parse_qs(request.body.decode("utf-8", "replace"), keep_blank_values=True)
+
+    async def _read_raw_body(self, reader, length):
+        """Streams a raw body (e.g. one chunk of a resumable upload) to a temp file."""
+        if length > self.max_upload_bytes:
+            raise HTTPError(413, "Request body too large")
+        fd, path = tempfile.mkstemp(prefix="upload_", dir=self.upload_dir)
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                remaining = length
+                while remaining:
+                    chunk = await reader.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise asyncio.IncompleteReadError(b"", remaining)
+                    remaining -= len(chunk)
+                    f.write(chunk)
+                    digest.update(chunk)
+        except BaseException:
+            _remove(path)
+            raise
+        return UploadedFile("body", None, "application/octet-stream", path, length, digest.hexdigest())
+
+    async def _dispatch(self, request):
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            if request.method == "GET" and self.static_root:
+                return self._static_path(request.path)
+            if any(path == request.path for _, path in self.routes):
+                raise HTTPError(405)
+            raise HTTPError(404)
+        if inspect.iscoroutinefunction(handler):
+            return await handler(request)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, handler, request)
+
+    def _static_path(self, path):
+        full = os.path.realpath(os.path.join(self.static_root, path.lstrip("/")))
+        if not full.startswith(self.static_root + os.sep) or not os.path.isfile(full):
+            raise HTTPError(404)
+        return full
+
+    # --- Writing ---
+
+    @staticmethod
+    def _head(status, headers):
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                 f"Date: {email.utils.formatdate(usegmt=True)}"]
+        lines += [f"{name}: {value}" for name, value in headers]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send(self, writer, response, keep_alive):
+        headers = response.headers + [("Content-Length", str(len(response.body))),
+                                      ("Connection", "keep-alive" if keep_alive else "close")]
+        writer.write(self._head(response.status, headers) + response.body)
+        await writer.drain()
+
+    async def _send_file(self, writer, path, keep_alive):
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        size = os.path.getsize(path)
+        headers = [("Content-Type", content_type), ("Content-Length", str(size)),
+                   ("Connection", "keep-alive" if keep_alive else "close")]
+        writer.write(self._head(200, headers))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                writer.write(chunk)
+                await writer.drain()
+
+    async def _send_stream(self, writer, response):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        closed = False
+
+        def emit(event, data):
+            if closed:
+                raise ConnectionResetError("Event stream client disconnected")
+            asyncio.run_coroutine_threadsafe(queue.put(sse_event(event, data)), loop).result()
+
+        def produce():
+            try:
+                response.producer(emit)
+            finally:
+                asyncio.run_coroutine_threadsafe(queue.put(None), loop)
+
+        writer.write(self._head(200, response.headers + [("Connection", "close")]))
+        future = loop.run_in_executor(self.executor, produce)
+        try:
+            await writer.drain()
+            while (frame := await queue.get()) is not None:
+                writer.write(frame)
+                await writer.drain()
+        except ConnectionError:
+            closed = True
+            while await queue.get() is not None:  # let the producer notice and finish
+                pass
+        try:
+            await future
+        except ConnectionError:
+            pass
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+
+    # --- Lifecycle ---
+
+    async def serve(self, host="", port=8888, sock=None, ready=None, handoff=None):
+        """
+        Serves on (host, port), or on an already-bound listening `sock`, until shutdown().
+        With a `handoff` path, a replacement server can take the listening socket over
+        from there; this one then drains and returns.
+        """
+        self._loop = asyncio.get_running_loop()
+        if sock is not None:
+            self.server = await asyncio.start_server(self._handle_connection, sock=sock, limit=MAX_LINE)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, host or None, port,
+                                                     limit=MAX_LINE, backlog=1024, reuse_address=True)
+        listener = None
+        if handoff:
+            listener = HandoffListener(handoff, self.server.sockets[0], lambda pid: self._loop.call_soon_threadsafe(
+                self._start_drain, f"Listening socket handed to PID {pid}"))
+        if self.worker is not None:  # the supervisor stops workers with SIGTERM
+            self._loop.add_signal_handler(signal.SIGTERM, self._start_drain, f"Worker {self.worker} stopping")
+        if ready is not None:
+            ready(self)
+        try:
+            async with self.server:
+                try:
+                    await self.server.serve_forever()
+                except asyncio.CancelledError:
+                    pass
+                if self._drain_task is not None:
+                    await self._drain_task
+        finally:
+            if listener is not None:
+                listener.close()
+
+    def _start_drain(self, reason):
+        if self._drain_task is None:
+            print(f"🤝 {reason}; draining {self.active} in-flight request(s)...")
+            self._drain_task = asyncio.ensure_future(self.drain())
+
+    async def drain(self, timeout=None):
+        """
+        Stops accepting, closes idle keep-alive connections and waits (up to `timeout`,
+        default drain_timeout) for in-flight requests. Returns how many were cut off.
+        """
+        timeout = self.drain_timeout if timeout is None else timeout
+        self.draining = True
+        self.server.close()  # only this process's copy: a replacement keeps accepting on the socket
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        await asyncio.sleep(DRAIN_IDLE_GRACE)
+        for task in list(self._idle):
+            task.cancel()
+        while self.active and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        if self.active:
+            print(f"⏱️  Drain deadline passed with {self.active} request(s) still running")
+        else:
+            print("👋 Drained")
+        return self.active
+
+    def shutdown(self):
+        """Stops serve() from another thread."""
+        if self._loop is not None and self.server is not None:
+            self._loop.call_soon_threadsafe(self.server.close)
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1] if self.server else None
+
+    def run(self, host="", port=8888, sock=None, handoff=None):
+        if self.workers > 1:
+            return self._run_workers(host, port, sock, handoff)
+        try:
+            asyncio.run(self.serve(host, port, sock, handoff=handoff))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Pre-fork workers ---
+
+    def _run_workers(self, host, port, sock, handoff):
+        """Supervisor: forks the workers, respawns any that die, stops them on SIGTERM/SIGINT or a handoff."""
+        if sock is None:
+            sock = socket.create_server((host, port), backlog=1024)
+        children = {}  # pid -> (worker index, start time)
+        stopping = False
+
+        def spawn(index):
+            pid = os.fork()
+            if pid == 0:
+                self._worker_main(index, sock)
+            children[pid] = (index, time.monotonic())
+
+        def stop(*_):
+            nonlocal stopping
+            stopping = True
+            for pid in list(children):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for index in range(self.workers):
+            spawn(index)
+        print(f"👷 {self.workers} workers on port {sock.getsockname()[1]}: PIDs {', '.join(map(str, children))}")
+        listener = None
+        if handoff:
+            listener = HandoffListener(handoff, sock, lambda pid: (
+                print(f"🤝 Listening socket handed to PID {pid}; stopping workers"), stop()))
+        try:
+            while children:
+                try:
+                    pid, status = os.wait()
+                except ChildProcessError:
+                    break
+                index, started = children.pop(pid, (None, 0))
+                if index is None or stopping:
+                    continue
+                print(f"💥 Worker {index} (PID {pid}) died with status {status}; respawning")
+                if time.monotonic() - started < RESPAWN_BACKOFF:
+                    time.sleep(RESPAWN_BACKOFF)
+                spawn(index)
+        finally:
+            if listener is not None:
+                listener.close()
+            sock.close()
+
+    def _worker_main(self, index, sock):
+        """Runs in the forked child; never returns."""
+        code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the supervisor, which stops us
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            self.worker = index
+            asyncio.run(self.serve(sock=sock))
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+
+def add_server_arguments(parser):
+    parser.add_argument("--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS,
+                        help="Open connections before new ones get a 503 (default: %(default)s)")
+    parser.add_argument("--handler-threads", type=int, default=DEFAULT_HANDLER_THREADS,
+                        help="Threads running request handlers and model calls (default: %(default)s)")
+    parser.add_argument("--keepalive-timeout", type=float, default=DEFAULT_KEEPALIVE_TIMEOUT,
+                        help="Seconds an idle keep-alive connection is kept open (default: %(default)s)")
+    parser.add_argument("--max-upload-mb", type=int, default=DEFAULT_MAX_UPLOAD_BYTES // (1024 * 1024),
+                        help="Largest accepted upload in MiB (default: %(default)s)")
+    parser.add_argument("--drain-timeout", type=float, default=DEFAULT_DRAIN_TIMEOUT,
+                        help="Seconds in-flight requests get to finish after a handoff (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Pre-forked worker processes sharing the listening socket (default: %(default)s)")
+    return parser
+
+
+def server_from_args(args, **kwargs):
+    """A ConsoleServer configured from add_server_arguments() flags; `kwargs` override them."""
+    options = dict(max_connections=args.max_connections, handler_threads=args.handler_threads,
+                   keepalive_timeout=args.keepalive_timeout, max_upload_bytes=args.max_upload_mb * 1024 * 1024,
+                   drain_timeout=args.drain_timeout, workers=args.workers)
+    options.update(kwargs)
+    return ConsoleServer(**options)
@@ -0,0 +1,169 @@
+"""
+console_stream.py
+Server-Sent Events plumbing for the Gemini console servers' /stream endpoint.
+
+A blocking `send_message` holds the response until every automatic function-calling
+round is done. /stream instead iterates `send_message_stream` and writes each text chunk
+to the browser as it arrives, interleaved with tool_call / tool_result events that the
+@tool_events.traced tools emit while the SDK runs them (on the same request thread).
+
+Events: queued {position}, started {}, text {text}, tool_call {tool, args},
+tool_result {tool, output, truncated}, error {message}, done {text}. queued/started come
+from consoles with model-call admission (model_admission.py): `position` requests are
+ahead of this one, and started means it has a model-call slot.
+"""
+import functools
+import inspect
+import json
+import threading
+from contextlib import contextmanager
+
+MAX_EVENT_OUTPUT = 4000
+
+
+def sse_event(event, data):
+    """One SSE frame (bytes); data is JSON-encoded so it never spans raw newlines."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class ToolEvents:
+    """Per-thread listener for tool activity; tools emit into whichever request runs them."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @contextmanager
+    def listen(self, callback):
+        previous = getattr(self._local, "callback", None)
+        self._local.callback = callback
+        try:
+            yield
+        finally:
+            self._local.callback = previous
+
+    def emit(self, event, data):
+        callback = getattr(self._local, "callback", None)
+        if callback is not None:
+            callback(event, data)
+
+    def traced(self, func):
+        """Wraps a tool so calls and results are emitted. Keeps the signature/docstring the SDK reads."""
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind_partial(*args, **kwargs)
+            self.emit("tool_call", {"tool": func.__name__, "args": {k: str(v) for k, v in bound.arguments.items()}})
+            result = func(*args, **kwargs)
+            output = str(result)
+            self.emit("tool_result", {
+                "tool": func.__name__,
+                "output": output[:MAX_EVENT_OUTPUT],
+                "truncated": len(output) > MAX_EVENT_OUTPUT,
+            })
+            return result
+        return wrapper
+
+
+tool_events = ToolEvents()
+
+
+def stream_reply(chat, prompt, emit, on_last_chunk=None):
+    """
+    Sends `prompt` with chat.send_message_stream, emitting a text event per chunk and the
+    tool events raised meanwhile. Returns the full reply text. on_last_chunk gets the
+    final chunk, which carries the call's usage_metadata.
+    """
+    parts = []
+    chunk = None
+    with tool_events.listen(emit):
+        for chunk in chat.send_message_stream(prompt):
+            text = chunk.text
+            if text:
+                parts.append(text)
+                emit("text", {"text": text})
+    if on_last_chunk is not None and chunk is not None:
+        on_last_chunk(chunk)
+    return "".join(parts)
+
+
+# Console-page side: streams the prompt through /stream instead of POST + redirect.
+STREAM_SCRIPT = """
+<script>
+    function appendMsg(css, text) {
+        const div = document.createElement('div');
+        div.className = 'msg live ' + css;  // replaced by the stored entries once the reply is done
+        div.textContent = text;
+        document.getElementById('chat-history').appendChild(div);
+        return div;
+    }
+
+    document.querySelector('form').addEventListener('submit', function(e) {
+        const form = e.target;
+        const file = form.querySelector('input[type=file]');
+        const prompt = form.querySelector('textarea').value;
+        if ((file && file.files.length) || !prompt.trim()) return;  // uploads keep the plain POST
+        e.preventDefault();
+
+        const history = document.getElementById('chat-history');
+        const model = form.querySelector('select').value;
+        appendMsg('user-msg', prompt);
+        form.querySelector('textarea').value = '';
+        let agent = null;
+        let text = '';
+        let status = null;  // queue position while waiting for a model-call slot
+        let heard = false;
+        window.streaming = true;
+        const source = new EventSource('/stream?' + new URLSearchParams({prompt: prompt, model_choice: model}));
+        const scroll = () => { history.scrollTop = history.scrollHeight; };
+
+        source.addEventListener('queued', function(ev) {
+            const ahead = JSON.parse(ev.data).position;
+            if (!status) status = appendMsg('tool-msg', '');
+            status.textContent = ahead ? '⏳ Queued: ' + ahead + ' prompt(s) ahead of yours' : '⏳ Queued: next in line';
+            scroll();
+        });
+        source.addEventListener('started', function() {
+            if (status) status.remove();
+            status = null;
+        });
+        source.addEventListener('text', function(ev) {
+            if (!agent) agent = appendMsg('agent-msg', '');
+            text += JSON.parse(ev.data).text;
+            agent.textContent = text;
+            scroll();
+        });
+        source.addEventListener('tool_call', function(ev) {
+            const d = JSON.parse(ev.data);
+            appendMsg('tool-msg', '⚡ ' + d.tool + ' ' + JSON.stringify(d.args));
+            agent = null;
+            text = '';
+            scroll();
+        });
+        source.addEventListener('tool_result', function(ev) {
+            const d = JSON.parse(ev.data);
+            appendMsg('tool-msg', d.output + (d.truncated ? '\\n…' : ''));
+            scroll();
+        });
+        ['queued', 'started', 'text', 'tool_call', 'tool_result', 'done'].forEach(function(name) {
+            source.addEventListener(name, function() { heard = true; });
+        });
+        source.addEventListener('error', function(ev) {
+            if (ev.data) appendMsg('agent-msg', '❌ Error: ' + JSON.parse(ev.data).message);
+            else if (!heard) appendMsg('agent-msg', '🚦 The console is busy (or unreachable); try again in a moment.');
+            finish();
+        });
+        source.addEventListener('done', function() {
+            if (agent && window.marked) agent.innerHTML = marked.parse(agent.innerHTML);  // escaped, as on reload
+            finish();
+        });
+        function finish() {
+            source.close();
+            if (status) status.remove();
+            window.streaming = false;
+            if (window.refreshHistory) window.refreshHistory(true);
+            document.getElementById('thinking') && (document.getElementById('thinking').style.display = 'none');
+        }
+    }, true);
+</script>
+"""
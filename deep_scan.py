@@ -2,6 +2,9 @@ import re
 import os
 import json
 
+from cli_corpus import get_corpus
+from stage_context import StageContext
+
 # Path to the CLI file we are reverse engineering
 CLI_PATH = "./node_modules/@anthropic-ai/claude-code/cli.js"
 
@@ -10,19 +13,17 @@ def scan_for_variables():
     Scans the minified CLI code for template literal variables 
     (e.g., ${EE}, ${mW.name}) to help us understand what they map to.
     """
-    if not os.path.exists(CLI_PATH):
+    corpus = get_corpus(CLI_PATH)
+    if not corpus.exists():
         print(f"❌ Error: Could not find {CLI_PATH}")
         return
 
     print(f"--- 🔍 Deep Scanning {CLI_PATH} ---")
     
-    with open(CLI_PATH, 'r', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
-
     # Regex to find ${...} patterns
     # We look for short variable names often used in minified code
     pattern = r"\$\{([a-zA-Z0-9_]+(?:\.[a-zA-Z0-9_]+)*)\}"
-    matches = re.findall(pattern, content)
+    matches = corpus.findall(pattern)
     
     # Count frequency to find the most common ones
     from collections import Counter
@@ -44,12 +45,15 @@ def scan_for_variables():
         "DJ1": ["bash", "cmd"]
     }
 
+    # Try to find the definition in minified code (heuristic)
+    # Look for "const EE=" or "var EE=" or "EE:"
+    regex_def = r"([a-zA-Z0-9_]+)\s*[:=]\s*['\"]([a-zA-Z0-9_]+)['\"]"
+    definitions = None
+
     for var, likely_meanings in suspects.items():
         if var in counts:
-            # Try to find the definition in minified code (heuristic)
-            # Look for "const EE=" or "var EE=" or "EE:"
-            regex_def = r"([a-zA-Z0-9_]+)\s*[:=]\s*['\"]([a-zA-Z0-9_]+)['\"]"
-            definitions = re.findall(regex_def, content)
+            if definitions is None:
+                definitions = corpus.findall(regex_def)
             
             candidates = [val for key, val in definitions if key == var]
             if candidates:
@@ -69,5 +73,8 @@ def scan_for_variables():
                     if file_vars:
                         print(f"  {filename}: {', '.join(['${'+v+'}' for v in file_vars])}")
 
-if __name__ == "__main__":
+def run(context):
     scan_for_variables()
+
+if __name__ == "__main__":
+    run(StageContext())
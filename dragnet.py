@@ -1,12 +1,13 @@
 import re
 
+from cli_corpus import get_corpus
+from stage_context import StageContext
+
 FILE = "node_modules/@anthropic-ai/claude-code/cli.js"
 
 def dragnet():
-    try:
-        with open(FILE, 'r') as f:
-            data = f.read()
-    except FileNotFoundError:
+    corpus = get_corpus(FILE)
+    if not corpus.exists():
         print("❌ Error: cli.js not found.")
         return
 
@@ -14,7 +15,7 @@ def dragnet():
     
     # 1. Find all "name" properties in objects
     # Pattern: name:"value" or name:'value'
-    name_matches = re.findall(r'name\s*:\s*["\'](.*?)["\']', data)
+    name_matches = [name for name, offset in corpus.name_sites()]
     
     # Filter for tool-like names (no spaces, usually lowercase or CamelCase)
     # We exclude common JS property names like 'id', 'class', etc. to reduce noise.
@@ -32,16 +33,19 @@ def dragnet():
     print("\n--- 🕵️‍♀️ Brute Force 'EE' Search ---")
     # Search for any string assignment to EE
     # EE = "something" or EE = 'something'
-    ee_assign = re.search(r'\bEE\s*=\s*["\'](.*?)["\']', data)
+    ee_assign = corpus.first(r'\bEE\s*=\s*["\'](.*?)["\']')
     if ee_assign:
-        print(f"✅ RESOLVED: EE = '{ee_assign.group(1)}'")
+        print(f"✅ RESOLVED: EE = '{ee_assign['groups'][0]}'")
     else:
         # Check if EE is an object property
-        ee_prop = re.search(r'\bEE\s*:\s*["\'](.*?)["\']', data)
+        ee_prop = corpus.first(r'\bEE\s*:\s*["\'](.*?)["\']')
         if ee_prop:
-             print(f"✅ RESOLVED: EE (property) = '{ee_prop.group(1)}'")
+             print(f"✅ RESOLVED: EE (property) = '{ee_prop['groups'][0]}'")
         else:
             print("❌ EE assignment still not found. It might be passed as an argument.")
 
-if __name__ == "__main__":
+def run(context):
     dragnet()
+
+if __name__ == "__main__":
+    run(StageContext())
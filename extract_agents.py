@@ -1,6 +1,8 @@
-import re
 import os
 
+from cli_corpus import get_corpus
+from js_lexer import TEMPLATE, kind_is, min_length
+
 # Define the signatures of the agents we identified from your previous output
 # We use unique substrings to find them in the file reliably.
 AGENT_SIGNATURES = {
@@ -15,10 +17,8 @@ AGENT_SIGNATURES = {
 
 def extract_personas(file_path):
     print(f"--- Reading {file_path} ---")
-    try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-    except FileNotFoundError:
+    corpus = get_corpus(file_path)
+    if not corpus.exists():
         print(f"Error: File not found at {file_path}")
         return
 
@@ -27,15 +27,16 @@ def extract_personas(file_path):
     
     found_count = 0
     
-    # We use the same regex to get the chunks (strings inside backticks > 500 chars)
-    # This matches the strategy that worked in smart_extract.py
-    candidates = re.findall(r'`([^`]{500,})`', content)
-    
-    print(f"--- Scanning {len(candidates)} chunks for known Agent Personas ---")
+    # Same chunks as smart_extract.py (template literals >= 500 chars), streamed once.
+    # Each chunk is checked against every signature still missing.
+    print(f"--- Scanning template literals for {len(AGENT_SIGNATURES)} known Agent Personas ---")
 
-    for filename, signature in AGENT_SIGNATURES.items():
-        found = False
-        for chunk in candidates:
+    pending = dict(AGENT_SIGNATURES)
+    for rec in corpus.iter_literals(kind_is(TEMPLATE), min_length(500)):
+        if not pending:
+            break
+        chunk = rec.text
+        for filename, signature in list(pending.items()):
             if signature in chunk:
                 # Clean up: Replace escaped newlines if necessary
                 # JS minification often leaves \n as literal characters
@@ -45,12 +46,11 @@ def extract_personas(file_path):
                     out.write(clean_chunk)
                 
                 print(f"✅ Extracted: {filename} ({len(clean_chunk)} chars)")
-                found = True
+                del pending[filename]
                 found_count += 1
-                break
-        
-        if not found:
-            print(f"❌ Could not find signature for: {filename}")
+
+    for filename in pending:
+        print(f"❌ Could not find signature for: {filename}")
 
     print(f"\n--- Extraction Complete. Found {found_count}/{len(AGENT_SIGNATURES)} Agents ---")
     print("Files are located in: gemini_code_personas/")
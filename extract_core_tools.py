@@ -1,11 +1,13 @@
 import re
 import json
 
+from cli_corpus import get_corpus
+from stage_context import StageContext
+
 SOURCE_FILE = "node_modules/@anthropic-ai/claude-code/cli.js"
 
 def extract_core_tools():
-    with open(SOURCE_FILE, "r", encoding="utf-8", errors="ignore") as f:
-        content = f.read()
+    corpus = get_corpus(SOURCE_FILE)
 
     print("--- 🕵️‍♀️ Surgical Extraction for Core Tools ---")
 
@@ -26,9 +28,9 @@ def extract_core_tools():
         
         pattern = r'name:"' + target + r'".{0,1000}inputSchema:(\{.*?\})\,([a-zA-Z]+):'
         
-        matches = re.finditer(pattern, content, re.DOTALL)
+        matches = corpus.search(pattern, re.DOTALL)
         for m in matches:
-            raw_schema = m.group(1)
+            raw_schema = m["groups"][0]
             # Try to fix unquoted keys common in minified JS
             fixed_schema = re.sub(r'([a-zA-Z0-9_]+):', r'"\1":', raw_schema)
             # Fix single quotes to double quotes
@@ -54,5 +56,8 @@ def extract_core_tools():
     print(f"--- Saved {len(tools)} candidates to core_tools_raw.json ---")
     print("Next Step: Use 'python heal_core.py' (you need to create this) to fix the JSON syntax.")
 
-if __name__ == "__main__":
+def run(context):
     extract_core_tools()
+
+if __name__ == "__main__":
+    run(StageContext())
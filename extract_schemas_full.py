@@ -2,35 +2,13 @@ import re
 import json
 import os
 
+from cli_corpus import get_corpus
+from stage_context import StageContext
+
 # Configuration
 TARGET_FILE = "node_modules/@anthropic-ai/claude-code/cli.js"
 OUTPUT_FILE = "tools_def.json"
 
-def extract_balanced_object(text, start_index):
-    """
-    Extracts a JSON-like object starting from a specific index by counting braces.
-    Returns the full string of the object.
-    """
-    stack = 0
-    found_start = False
-    obj_start = -1
-    
-    for i in range(start_index, len(text)):
-        char = text[i]
-        
-        if char == '{':
-            if not found_start:
-                obj_start = i
-                found_start = True
-            stack += 1
-        elif char == '}':
-            stack -= 1
-        
-        if found_start and stack == 0:
-            return text[obj_start : i+1]
-            
-    return None
-
 def clean_js_object_to_json(js_str):
     """
     Converts a loose Javascript object string to valid JSON.
@@ -67,30 +45,24 @@ def clean_js_object_to_json(js_str):
         return None
 
 def main():
-    if not os.path.exists(TARGET_FILE):
+    corpus = get_corpus(TARGET_FILE)
+    if not corpus.exists():
         print(f"❌ Error: Could not find {TARGET_FILE}")
         return
 
-    print(f"--- 📖 Reading {TARGET_FILE} ---")
-    with open(TARGET_FILE, 'r', encoding='utf-8') as f:
-        content = f.read()
+    print(f"--- 📖 Reading {TARGET_FILE} (corpus index) ---")
 
     # Strategy: Find 'inputSchema:' positions
-    # Then look backwards for the tool name
-    
-    matches = [m.start() for m in re.finditer(r'inputSchema\s*:', content)]
-    print(f"✅ Found {len(matches)} tool definitions.")
+    # The corpus index already holds the balanced schema object and the
+    # nearest 'name:"toolname"' within the preceding 300 chars for each site.
+    sites = corpus.input_schemas()
+    print(f"✅ Found {len(sites)} tool definitions.")
 
     tools = []
     
-    for idx in matches:
+    for site in sites:
         # 1. Extract Schema
-        # The Schema starts at the first '{' after 'inputSchema:'
-        schema_start_search = content.find('{', idx)
-        if schema_start_search == -1:
-            continue
-            
-        raw_schema = extract_balanced_object(content, schema_start_search)
+        raw_schema = site["raw"]
         if not raw_schema:
             print("❌ Failed to extract balanced object for a match.")
             continue
@@ -98,17 +70,7 @@ def main():
         schema_json = clean_js_object_to_json(raw_schema)
         
         # 2. Extract Name
-        # Look backwards 200 chars for 'name:"toolname"' or 'name: "toolname"'
-        # Or look for the parent object structure
-        snippet_before = content[max(0, idx-300) : idx]
-        
-        # Regex for name:"..." or name: "..."
-        name_match = re.search(r'name\s*:\s*"([a-zA-Z0-9_]+)"', snippet_before)
-        if not name_match:
-             # Try single quotes
-             name_match = re.search(r"name\s*:\s*'([a-zA-Z0-9_]+)'", snippet_before)
-        
-        tool_name = name_match.group(1) if name_match else "unknown_tool"
+        tool_name = site["name"] or "unknown_tool"
         
         if schema_json:
             print(f"  📎 Extracted: {tool_name}")
@@ -123,5 +85,8 @@ def main():
     
     print(f"\n✅ Successfully saved {len(tools)} tools to {OUTPUT_FILE}")
 
-if __name__ == "__main__":
+def run(context):
     main()
+
+if __name__ == "__main__":
+    run(StageContext())
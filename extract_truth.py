@@ -1,17 +1,23 @@
 import re
 
+from cli_corpus import get_corpus
+
 # File path
 CLI_PATH = "node_modules/@anthropic-ai/claude-code/cli.js"
 
 def extract_variable_definitions():
-    with open(CLI_PATH, "r", encoding="utf-8") as f:
-        content = f.read()
+    corpus = get_corpus(CLI_PATH)
 
     # The minified code often uses patterns like: var K9="Bash";var gI="Glob"
     # We look for: var (2-3 chars) = "(ToolName)"
-    pattern = re.compile(r'var\s+([a-zA-Z0-9]{2,3})="(Bash|Grep|Glob|View|Edit|Read|Write|LS|Todo|Notebook)"')
+    pattern = re.compile(r'[a-zA-Z0-9]{2,3}')
+    tool_names = {"Bash", "Grep", "Glob", "View", "Edit", "Read", "Write", "LS", "Todo", "Notebook"}
     
-    matches = pattern.findall(content)
+    matches = [
+        (var_name, value)
+        for var_name, value, start, end in corpus.var_assignments()
+        if value in tool_names and pattern.fullmatch(var_name)
+    ]
     
     print(f"--- 🕵️‍♀️ FOUND {len(matches)} DEFINITIVE DEFINITIONS ---")
     print(f"{'VAR':<10} | {'TRUE VALUE'}")
@@ -0,0 +1,236 @@
+"""
+file_edit.py
+Patch-style edits for the agents' Edit tools.
+
+Edit took the whole new `content` of a file and overwrote it with open("w"): to change
+one line of gemini_server_v8.py the model regenerated (and paid output tokens for) all
+of it, a crash or a concurrent reader could catch the file half written, and all it
+got back was "Successfully wrote to ...". edit_file() also takes:
+
+  - an exact-string replacement (old/new): `old` must occur exactly once, unless every
+    occurrence is meant (replace_all);
+  - a unified diff: each hunk's context and removed lines must match the file, near the
+    line its @@ header names (like patch, it looks outward from there when earlier
+    edits moved things); miscounted @@ ranges are tolerated;
+  - an expected_sha precondition: the sha256 (or a prefix of at least 8 hex digits) the
+    file must still have, as the previous Edit reported it;
+
+and writes every edit to a temp file in the same directory, fsyncs it and renames it
+over the original (keeping its mode), so readers see the old file or the new one. The
+result is a compact diff (1 line of context, capped) with +/- counts and the new sha,
+plus an estimate of the output tokens a full-content rewrite would have cost on top.
+"""
+import difflib
+import hashlib
+import os
+import re
+import secrets
+from collections import namedtuple
+
+CHARS_PER_TOKEN = 4  # rough size of a model token in source code
+MAX_DIFF_LINES = 40
+MIN_SHA_PREFIX = 8
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# mode: write (full content), replace or diff. tokens_saved: ~output tokens the same
+# change would have cost on top as full content.
+EditResult = namedtuple("EditResult", "path mode created added removed sha diff tokens_saved")
+
+
+class EditError(Exception):
+    pass
+
+
+def sha256(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    try:
+        return data.decode()
+    except UnicodeDecodeError:
+        raise EditError(f"{path} is not UTF-8 text; patch edits need text") from None
+
+
+def replace(text, old, new, replace_all=False):
+    """`text` with `old` replaced by `new`; `old` must be unique unless `replace_all`."""
+    if not old:
+        raise EditError("old_string is empty; give the exact text to replace")
+    if old not in text and "\r\n" in text and "\r" not in old:  # the model writes \n; the file has \r\n
+        old, new = old.replace("\n", "\r\n"), new.replace("\n", "\r\n")
+    count = text.count(old)
+    if count == 0:
+        raise EditError("old_string not found; it must match the file exactly, whitespace included")
+    if count > 1 and not replace_all:
+        raise EditError(f"old_string occurs {count} times; add surrounding lines to make it unique, "
+                        f"or set replace_all")
+    return text.replace(old, new)
+
+
+class _Hunk:
+    __slots__ = ("start", "old", "new", "old_eof", "new_eof", "last")
+
+    def __init__(self, start):
+        self.start = start
+        self.old, self.new = [], []
+        self.old_eof = self.new_eof = False  # "\ No newline at end of file" after an old / new line
+        self.last = None
+
+
+def _hunks(diff):
+    """The hunks of a one-file unified diff; header counts are not trusted, the lines are."""
+    hunks = []
+    hunk = None
+    lines = diff.splitlines()
+    for i, line in enumerate(lines):
+        header = HUNK_HEADER.match(line)
+        if header:
+            hunk = _Hunk(int(header.group(1)))
+            hunks.append(hunk)
+        elif hunk is None:
+            continue  # file headers, or prose before the first hunk
+        elif line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            hunk = None  # the next file's headers
+        elif line.startswith("\\"):
+            hunk.old_eof |= hunk.last in ("-", " ")
+            hunk.new_eof |= hunk.last in ("+", " ")
+        elif not line or line[0] in " -+":
+            kind, body = (line[0], line[1:]) if line else (" ", "")  # a blank context line lost its space
+            if kind != "+":
+                hunk.old.append(body)
+            if kind != "-":
+                hunk.new.append(body)
+            hunk.last = kind
+        else:
+            hunk = None  # anything else ends the hunk
+    if not hunks:
+        raise EditError("no @@ hunks found; send a unified diff (as `diff -u` or `git diff` print it)")
+    return hunks
+
+
+def _find(lines, block, expected, lowest):
+    """Where `block` occurs in `lines` at or after `lowest`, nearest to `expected`; None if nowhere."""
+    last = len(lines) - len(block)
+    expected = min(max(expected, lowest), max(last, lowest))
+    for distance in range(max(expected - lowest, last - expected) + 1):
+        for at in (expected - distance, expected + distance):
+            if lowest <= at <= last and lines[at:at + len(block)] == block:
+                return at
+    return None
+
+
+def apply_diff(text, diff):
+    """`text` with the unified `diff` applied; EditError naming the hunk that does not match."""
+    newline = "\r\n" if "\r\n" in text else "\n"
+    lines = text.split(newline)
+    final_newline = lines[-1] == "" and len(lines) > 1 or text == ""
+    if lines[-1] == "":
+        lines.pop()
+    offset = 0  # how far earlier hunks moved later lines
+    lowest = 0
+    for number, hunk in enumerate(_hunks(diff), 1):
+        start, old, new = hunk.start, hunk.old, hunk.new
+        if not old:  # pure insertion: @@ -N,0 @@ inserts after line N
+            at = min(start + offset, len(lines))
+        else:
+            at = _find(lines, old, start - 1 + offset, lowest)
+            if at is None:
+                raise EditError(f"hunk {number} (@@ -{start}) does not match the file; its first line "
+                                f"{old[0][:80]!r} is not followed by the rest of the hunk at or after "
+                                f"line {lowest + 1}. View the file again and resend the edit")
+        touches_end = at + len(old) >= len(lines)
+        lines[at:at + len(old)] = new
+        if touches_end and new:
+            final_newline = not hunk.new_eof
+        elif touches_end and hunk.old_eof:
+            final_newline = True
+        offset += len(new) - len(old)
+        lowest = at + len(new)
+    return newline.join(lines) + (newline if final_newline and lines else "")
+
+
+def atomic_write(path, text, mode=None):
+    """
+    Writes `text` to a temp file beside `path` (through a symlink: beside its target),
+    fsyncs it and renames it over the original, which keeps `mode` when given.
+    """
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.{secrets.token_hex(4)}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)  # the umask applies, as with open("w")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _compact_diff(before, after):
+    """Changed lines with one line of context, at most MAX_DIFF_LINES of them; (diff, added, removed)."""
+    diff = list(difflib.unified_diff(before.splitlines(), after.splitlines(), n=1, lineterm=""))[2:]
+    added = sum(1 for line in diff if line.startswith("+"))
+    removed = sum(1 for line in diff if line.startswith("-"))
+    if len(diff) > MAX_DIFF_LINES:
+        diff = diff[:MAX_DIFF_LINES] + [f"... ({len(diff) - MAX_DIFF_LINES} more diff lines)"]
+    return "\n".join(diff), added, removed
+
+
+def edit_file(path, content=None, old=None, new="", diff=None, expected_sha=None, replace_all=False):
+    """
+    Applies one edit to `path`: a unified `diff`, else an `old` -> `new` replacement, else
+    the full `content` ("" empties the file). Raises EditError (nothing written) when it
+    does not apply, or when `new`/`replace_all` come without `old`.
+    """
+    before = _read(path)
+    if expected_sha:
+        if len(expected_sha) < MIN_SHA_PREFIX:
+            raise EditError(f"expected_sha needs at least {MIN_SHA_PREFIX} hex digits")
+        actual = sha256(before) if before is not None else "(no file)"
+        if not actual.startswith(expected_sha.lower()):
+            raise EditError(f"{path} changed since expected_sha {expected_sha} (it is now {actual[:12]}); "
+                            f"view it again before editing")
+    if diff or old:
+        if before is None:
+            raise EditError(f"{path} does not exist; create it with content")
+        mode = "diff" if diff else "replace"
+        after = apply_diff(before, diff) if diff else replace(before, old, new, replace_all)
+        sent = len(diff) if diff else len(old) + len(new)
+        tokens_saved = max(0, len(after) - sent) // CHARS_PER_TOKEN
+    elif new or replace_all:  # a replacement that lost its old_string must not fall through to a write
+        raise EditError("new_string and replace_all need old_string (the exact text to replace)")
+    elif content is not None:
+        mode, after, tokens_saved = "write", content, 0
+    else:
+        raise EditError("nothing to apply: give old_string and new_string, a diff, or the full content")
+    file_mode = os.stat(path).st_mode & 0o7777 if before is not None else None
+    if after != before:
+        atomic_write(path, after, file_mode)
+    text, added, removed = _compact_diff(before or "", after)
+    return EditResult(path, mode, before is None, added, removed, sha256(after), text, tokens_saved)
+
+
+def summary(result):
+    """What the Edit tools return instead of "Successfully wrote to ...": counts, new sha, compact diff."""
+    if result.created:
+        head = f"Created {result.path}: {result.added} lines"
+    elif not result.added and not result.removed:
+        head = f"Unchanged {result.path} (the edit produced the same text)"
+    else:
+        head = f"Edited {result.path} ({result.mode}): +{result.added} -{result.removed} lines"
+    head += f", sha256 {result.sha[:12]}"
+    return head if result.created or not result.diff else f"{head}\n{result.diff}"
@@ -0,0 +1,579 @@
+"""
+file_index.py
+A live index of the files under a directory, shared by Glob, Grep and discovery lookups.
+
+Glob ran glob.glob(pattern, recursive=True), walking the tree again on every call, and
+AutoTestAgentV9.discovery_mode ran `find . -name <file>` once per filename it picked out
+of a failed command. FileIndex scans the tree once and keeps:
+
+  - a trie of directories (each one's {name: kind}), so glob patterns are answered
+    component by component: literal names are dict lookups, wildcards filter one
+    directory's names, `**` expands to the directories below;
+  - a basename -> paths map, for find();
+  - (mtime, size, when it changed) per file, for changed_since();
+  - the paths .gitignore rules exclude, so files() can list exactly what
+    code_search.walk() would, for Grep.
+
+It is kept current with inotify (one watch per directory, through ctypes; a background
+thread applies events as they arrive, and every query drains what is pending first, so
+a file written a moment ago is already there). Without inotify, or once the watch limit
+is hit, it rescans every `poll_interval` seconds instead. Directories in IGNORED_DIRS
+(.git, node_modules, ...) are listed but not indexed (files() leaves them out, as
+code_search.walk() does); glob() hands whatever part of a pattern reaches into one of
+them, or into a symlinked directory, to glob.glob(), and find() walks them on demand,
+so both still answer exactly like glob.glob() and `find -name`. A pattern outside the
+root falls back to glob.glob() whole. After a fork (--workers), the child builds its
+own index on first use.
+"""
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import functools
+import glob as glob_module
+import os
+import re
+import select
+import stat
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from code_search import IGNORED_DIRS, gitignore_rules, is_ignored
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct("iIII")  # struct inotify_event: wd, mask, cookie, len; then `len` bytes of name
+
+FILE, DIR, LINK = "file", "dir", "link"  # LINK: a symlink to a directory, listed but not followed
+
+# mtime_ns/size from stat(); changed_ns: the mtime when first scanned, else when a change was seen.
+Entry = namedtuple("Entry", "mtime_ns size changed_ns")
+
+
+class _Inotify:
+    """An inotify instance: add(path) -> watch descriptor, read() -> [(wd, mask, name)] without blocking."""
+
+    def __init__(self):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            init, self._add = libc.inotify_init1, libc.inotify_add_watch
+        except (OSError, AttributeError):
+            raise OSError(errno.ENOSYS, "inotify is not available") from None
+        self._add.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = init(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add(self, path):
+        wd = self._add(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code), path)
+        return wd
+
+    def read(self):
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            pos = 0
+            while pos < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, pos)
+                pos += _EVENT.size
+                events.append((wd, mask, os.fsdecode(data[pos:pos + length].rstrip(b"\0"))))
+                pos += length
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _join(directory, name):
+    return f"{directory}/{name}" if directory else name
+
+
+def _hidden(name):
+    return name.startswith(".")
+
+
+@functools.lru_cache(maxsize=256)
+def _matcher(part):
+    """Matches names against one glob component; like glob, wildcards don't match a leading dot."""
+    return re.compile(("" if _hidden(part) else r"(?!\.)") + fnmatch.translate(part)).match
+
+
+class FileIndex:
+    """
+    The files and directories under `root`. Query with glob(), find(), changed_since()
+    and files(); they build the index on first use, or start() does it up front.
+    `watch=False` skips inotify and always rescans every `poll_interval` seconds.
+    """
+
+    def __init__(self, root=".", poll_interval=DEFAULT_POLL_INTERVAL, watch=True):
+        self.path = root
+        self.root = os.path.abspath(root)
+        self.poll_interval = poll_interval
+        self.watch = watch
+        self.mode = None  # "inotify" or "poll" once built
+        self.scans = 0
+        self.events = 0
+        self._lock = threading.RLock()
+        self._pid = None
+        self._inotify = None
+        self._watches = {}  # watch descriptor -> directory
+        self._watched = {}  # directory -> watch descriptor
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = None
+        self._previous = {}  # entries from before a rescan, to keep their changed_ns
+        self._reset()
+
+    def _reset(self):
+        self.children = {"": {}}  # directory ("" is the root) -> {name: FILE/DIR/LINK}
+        self.entries = {}  # file path -> Entry
+        self.by_name = {}  # basename -> {paths}, files and directories
+        self.ignored = set()  # paths (files and directories) excluded by .gitignore rules
+        self.links = set()  # symlinked files: listed, but walk() and files() skip them
+        self.unindexed = set()  # IGNORED_DIRS and symlinked directories: listed, contents not indexed
+        self._rules = {"": []}  # directory -> the .gitignore rules in force there
+
+    # --- Building and watching ---
+
+    def start(self):
+        """Builds the index now rather than on the first query."""
+        with self._lock:
+            self._ensure()
+        return self
+
+    def _ensure(self):
+        """Builds the index if this process hasn't yet, else applies pending events. Lock held."""
+        if self._pid == os.getpid():
+            self._drain()
+            return
+        if self._inotify is not None:  # inherited across a fork: the parent's watcher thread is gone
+            self._inotify.close()
+        if self._wake is not None:
+            os.close(self._wake[0])
+            os.close(self._wake[1])
+        self._inotify = self._wake = None
+        self._pid = os.getpid()
+        self._stop = threading.Event()
+        self.mode = "poll"
+        if self.watch:
+            try:
+                self._inotify = _Inotify()
+                self.mode = "inotify"
+                self._wake = os.pipe()
+            except OSError as e:
+                print(f"⚠️  File index: {e}; rescanning every {self.poll_interval}s instead")
+        self._rescan()
+        self._thread = threading.Thread(target=self._run, name="file-index", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            inotify = self._inotify
+            if inotify is not None:
+                try:
+                    select.select([inotify.fd, self._wake[0]], [], [])
+                except (OSError, ValueError):  # closed under us: switched to polling, or closing
+                    continue
+            elif self._stop.wait(self.poll_interval):
+                return
+            with self._lock:
+                if self._stop.is_set():
+                    return
+                if self._inotify is not None:
+                    self._drain()
+                else:
+                    self._rescan()
+
+    def _rescan(self):
+        self._previous = self.entries
+        self._reset()
+        self._watches.clear()
+        self._watched.clear()
+        self._scan("", [], False)
+        self._previous = {}
+        self.scans += 1
+
+    def _rescan_directory(self, directory):
+        """Indexes `directory` again from scratch, e.g. after its .gitignore changed."""
+        self._previous = dict(self.entries)
+        for name in list(self.children.get(directory, ())):
+            self._remove(_join(directory, name))
+        parent = directory.rpartition("/")[0]
+        self._scan(directory, self._rules.get(parent, []) if directory else [], directory in self.ignored)
+        self._previous = {}
+
+    def _scan(self, directory, rules, ignored):
+        """Indexes `directory` (already listed in its parent) and everything below it."""
+        stack = [(directory, rules, ignored)]
+        while stack:
+            directory, rules, ignored = stack.pop()
+            full = self._full(directory)
+            rules = self._rules[directory] = rules + gitignore_rules(full)
+            self._watch(directory, full)
+            self.children[directory] = {}
+            try:
+                entries = list(os.scandir(full))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    kind, st, link = self._kind(entry.path)
+                except OSError:
+                    continue
+                if kind is None:
+                    continue
+                path = _join(directory, entry.name)
+                hidden = ignored or is_ignored(rules, entry.path, entry.name, kind == DIR)
+                self._add(directory, entry.name, kind, st, link, hidden)
+                if kind == DIR and path not in self.unindexed:
+                    stack.append((path, rules, hidden))
+
+    @staticmethod
+    def _kind(full):
+        """(FILE/DIR/LINK, or None for anything else; the stat result; whether it is a symlink)."""
+        st = os.lstat(full)
+        if not stat.S_ISLNK(st.st_mode):
+            return (DIR if stat.S_ISDIR(st.st_mode) else FILE if stat.S_ISREG(st.st_mode) else None), st, False
+        try:
+            st = os.stat(full)
+        except OSError:
+            return None, st, True  # dangling
+        return (LINK if stat.S_ISDIR(st.st_mode) else FILE if stat.S_ISREG(st.st_mode) else None), st, True
+
+    def _add(self, directory, name, kind, st, link, hidden):
+        path = _join(directory, name)
+        self.children[directory][name] = kind
+        self.by_name.setdefault(name, set()).add(path)
+        if hidden:
+            self.ignored.add(path)
+        if kind == LINK or kind == DIR and name in IGNORED_DIRS:
+            self.unindexed.add(path)
+        if kind == FILE:
+            if link:
+                self.links.add(path)
+            old = self.entries.get(path) or self._previous.get(path)
+            if old is not None and (old.mtime_ns, old.size) == (st.st_mtime_ns, st.st_size):
+                changed = old.changed_ns
+            else:
+                changed = st.st_mtime_ns if self.scans == 0 else max(st.st_mtime_ns, time.time_ns())
+            self.entries[path] = Entry(st.st_mtime_ns, st.st_size, changed)
+
+    def _remove(self, path):
+        """Drops `path` and, for a directory, everything below it."""
+        directory, _, name = path.rpartition("/")
+        kind = self.children.get(directory, {}).pop(name, None)
+        if kind is None:
+            return
+        stack = [(path, kind)]
+        while stack:
+            path, kind = stack.pop()
+            names = self.by_name.get(path.rpartition("/")[2])
+            if names is not None:
+                names.discard(path)
+                if not names:
+                    del self.by_name[path.rpartition("/")[2]]
+            self.ignored.discard(path)
+            self.links.discard(path)
+            self.unindexed.discard(path)
+            self.entries.pop(path, None)
+            if kind == DIR:
+                stack.extend((_join(path, child), child_kind)
+                             for child, child_kind in self.children.pop(path, {}).items())
+                self._rules.pop(path, None)
+                wd = self._watched.pop(path, None)
+                if wd is not None and self._watches.get(wd) == path:
+                    del self._watches[wd]
+
+    def _watch(self, directory, full):
+        if self._inotify is None:
+            return
+        try:
+            wd = self._inotify.add(full)
+            self._watches[wd] = directory
+            self._watched[directory] = wd
+        except OSError as e:
+            if e.errno != errno.ENOSPC:
+                return  # gone already, or unreadable
+            print(f"⚠️  File index: out of inotify watches; rescanning every {self.poll_interval}s instead")
+            # Closing the fd does not wake the file-index thread out of select(); the pipe does,
+            # and it goes on polling (this may be a query's thread, drained into a new directory).
+            os.write(self._wake[1], b"x")
+            self._inotify.close()
+            self._inotify = None
+            self._watches.clear()
+            self._watched.clear()
+            self.mode = "poll"
+
+    def _drain(self):
+        """Applies the inotify events that arrived since the last call. Lock held."""
+        if self._inotify is None:
+            return
+        events = self._inotify.read()
+        self.events += len(events)
+        touched = {}  # (directory, name), in arrival order and once each
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:  # events were lost: start over
+                self._rescan()
+                return
+            directory = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+            elif directory is not None and name:
+                touched[directory, name] = None
+        for directory, name in touched:
+            if self._inotify is None:  # fell back to polling mid-batch
+                return
+            self._update(directory, name)
+
+    def _update(self, directory, name):
+        """Brings one entry of an indexed directory in line with the filesystem."""
+        if directory not in self.children:
+            return
+        if name == ".gitignore":
+            self._rescan_directory(directory)
+            return
+        path = _join(directory, name)
+        full = self._full(path)
+        try:
+            kind, st, link = self._kind(full)
+        except OSError:
+            kind = None
+        old = self.children[directory].get(name)
+        if old is not None and (old != kind or kind != FILE):
+            if kind == DIR and path in self.children and old == DIR:
+                return  # a directory's own attributes changed
+            self._remove(path)
+        if kind is None:
+            return
+        hidden = directory in self.ignored or is_ignored(self._rules[directory], full, name, kind == DIR)
+        self._add(directory, name, kind, st, link, hidden)
+        if kind == DIR and path not in self.unindexed:
+            self._scan(path, self._rules[directory], hidden)
+
+    def _full(self, path):
+        return os.path.join(self.root, path) if path else self.root
+
+    def _relative(self, path):
+        """`path` relative to the root, or None when it is outside (or inside an unindexed directory)."""
+        full = os.path.abspath(path)
+        if full == self.root:
+            return ""
+        if not full.startswith(os.path.join(self.root, "")):
+            return None
+        relative = full[len(self.root) + 1:]
+        return None if any(part in IGNORED_DIRS for part in relative.split("/")) else relative
+
+    # --- Queries ---
+
+    def glob(self, pattern):
+        """glob.glob(pattern, recursive=True), sorted; from the index when it covers the pattern."""
+        with self._lock:
+            self._ensure()
+            found = self._glob(pattern)
+        return sorted(glob_module.glob(pattern, recursive=True)) if found is None else found
+
+    def _glob(self, pattern):
+        parts = pattern.split("/")
+        magic = [i for i, part in enumerate(parts) if glob_module.has_magic(part)]
+        if not magic or "//" in pattern:
+            return None  # a literal path is one lstat for glob.glob
+        # The literal directories in front are kept as written: glob.glob("../x/*") says "../x/a"
+        head = "/".join(parts[:magic[0]]) or ("/" if pattern.startswith("/") else "")
+        parts = parts[magic[0]:]
+        dirs_only = parts[-1] == ""
+        if dirs_only:
+            parts.pop()
+        if any(part in ("", ".", "..") for part in parts) or parts.count("**") > 1:
+            return None  # glob.glob repeats paths that several `**` reach, which a set can't mimic
+        start = self._relative(head or ".")
+        if start is None or start not in self.children:
+            return None
+        return sorted(self._match(start, head, parts, dirs_only))
+
+    def _match(self, start, head, parts, dirs_only):
+        def spelled(path):
+            """A root-relative path as glob.glob prints it for this pattern."""
+            below = path[len(start) + 1:] if start else path
+            return os.path.join(head, below) if head else below
+
+        def output(path):
+            text = spelled(path)
+            return text + "/" if dirs_only and not text.endswith("/") else text
+
+        def delegate(path, remaining, listed=False):
+            """
+            What glob.glob finds for the rest of the pattern inside an unindexed directory.
+            `listed`: a `**` already produced the directory itself, which "dir/**" lists again.
+            """
+            base = spelled(path)
+            results = glob_module.glob(os.path.join(base, *remaining) + ("/" if dirs_only else ""), recursive=True)
+            return [r for r in results if not listed or dirs_only or r != os.path.join(base, "")]
+
+        current = [start]
+        found = set()
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            rest = parts[i + 1:]
+            if part == "**":
+                below = [(path, kind) for directory in current for path, kind in self._below(directory)]
+                for path, kind in below:
+                    if path in self.unindexed:
+                        found.update(delegate(path, [part] + rest, listed=True))
+                if last:  # like glob, `dir/**` includes "dir/" itself
+                    found.update(spelled(directory).rstrip("/") + "/" for directory in current
+                                 if directory != start or head)
+                    found.update(output(path) for path, kind in below if not dirs_only or kind != FILE)
+                    return found
+                current = current + [path for path, kind in below if kind == DIR and path not in self.unindexed]
+                continue
+            literal = not glob_module.has_magic(part)
+            match = None if literal else _matcher(part)
+            matched = []
+            for directory in current:
+                names = self.children[directory]
+                if literal:
+                    candidates = [(part, names[part])] if part in names else []
+                else:
+                    candidates = [(name, kind) for name, kind in names.items() if match(name)]
+                for name, kind in candidates:
+                    path = _join(directory, name)
+                    if not last:
+                        if path in self.unindexed:
+                            found.update(delegate(path, rest))
+                        elif kind == DIR:
+                            matched.append(path)
+                    elif not dirs_only or kind != FILE:
+                        found.add(output(path))
+            current = matched
+        return found
+
+    def _below(self, directory):
+        """(path, kind) of everything under `directory` that `**` reaches in the index: no hidden names."""
+        stack = [directory]
+        while stack:
+            directory = stack.pop()
+            for name, kind in self.children[directory].items():
+                if _hidden(name):
+                    continue
+                path = _join(directory, name)
+                yield path, kind
+                if kind == DIR and path not in self.unindexed:
+                    stack.append(path)
+
+    def find(self, name):
+        """
+        Paths (below the root as given, like `find root -name name`) of everything called
+        `name`; inside IGNORED_DIRS too, walked for the occasion.
+        """
+        with self._lock:
+            self._ensure()
+            found = set(self.by_name.get(name, ()))
+            # IGNORED_DIRS; not symlinked directories, which find does not follow either
+            skipped = [path for path in self.unindexed
+                       if self.children[path.rpartition("/")[0]][path.rpartition("/")[2]] == DIR]
+        for path in skipped:
+            for directory, subdirectories, files in os.walk(self._full(path)):
+                relative = os.path.relpath(directory, self.root)
+                found.update(_join(relative, match) for match in subdirectories + files if match == name)
+        return [os.path.join(self.path, path) for path in sorted(found)]
+
+    def changed_since(self, since):
+        """Files created or modified after `since` (a time.time()), least recently changed first."""
+        since_ns = int(since * 1e9)
+        with self._lock:
+            self._ensure()
+            changed = [(entry.changed_ns, path) for path, entry in self.entries.items() if entry.changed_ns > since_ns]
+        return [os.path.join(self.path, path) for _, path in sorted(changed)]
+
+    def files(self, path=".", glob=None):
+        """
+        What code_search.walk(path, glob) yields, in the same order, with the .gitignore rules
+        of `path`'s parents applied too; None when the index doesn't cover `path`.
+        """
+        with self._lock:
+            self._ensure()
+            relative = self._relative(path)
+            if relative is None or relative in self.ignored:
+                return None
+            if relative in self.entries:
+                return [path]
+            if relative not in self.children:
+                return None
+            found = []
+            stack = [relative]
+            while stack:
+                directory = stack.pop()
+                names = self.children[directory]
+                subdirectories = []
+                for name in sorted(names):
+                    child = _join(directory, name)
+                    kind = names[name]
+                    if kind == LINK or child in self.links or child in self.ignored or child in self.unindexed:
+                        continue
+                    if kind == DIR:
+                        subdirectories.append(child)
+                    elif glob is None or fnmatch.fnmatch(name, glob):
+                        found.append(os.path.join(path, child[len(relative) + 1:] if relative else child))
+                stack.extend(reversed(subdirectories))
+        return found
+
+    def stats(self):
+        with self._lock:
+            return {"mode": self.mode, "files": len(self.entries), "directories": len(self.children),
+                    "watches": len(self._watches), "scans": self.scans, "events": self.events}
+
+    def close(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._stop.set()
+            if self._wake is not None:
+                os.write(self._wake[1], b"x")
+        if self._thread is not None:
+            self._thread.join(5)
+        with self._lock:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+            if self._wake is not None:
+                os.close(self._wake[0])
+                os.close(self._wake[1])
+                self._wake = None
+            self._pid = None
+
+
+def add_index_arguments(parser):
+    parser.add_argument("--file-index-poll", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Seconds between rescans of the file index where inotify is unavailable "
+                             "(default: %(default)s)")
+    parser.add_argument("--no-file-watch", action="store_true",
+                        help="Keep the file index current by rescanning instead of with inotify")
+    return parser
+
+
+def file_index_from_args(args, root=".", **kwargs):
+    """A FileIndex of `root` from add_index_arguments() flags."""
+    return FileIndex(root, poll_interval=args.file_index_poll, watch=not args.no_file_watch, **kwargs)
@@ -1,12 +1,11 @@
 # Save as find_tools.py
 import re
 
+from stage_context import StageContext
+
 path = "node_modules/@anthropic-ai/claude-code/cli.js"
-with open(path, "r", encoding="utf-8", errors="ignore") as f:
-    content = f.read()
 
 # Look for standard tool definition patterns
-print("--- 🛠️  Hunting for Tool Definitions ---")
 patterns = [
     r'name:"grep",description:".*?"',
     r'name:"ls",description:".*?"',
@@ -14,8 +13,15 @@ patterns = [
     r'json_schema:\{.*?\}'
 ]
 
-for p in patterns:
-    matches = re.findall(p, content, re.DOTALL)
-    print(f"Pattern '{p}': Found {len(matches)} matches.")
-    for m in matches[:3]: # Show first 3
-        print(f"  Found: {m[:100]}...")
+def run(context):
+    corpus = context.corpus(path)
+
+    print("--- 🛠️  Hunting for Tool Definitions ---")
+    for p in patterns:
+        matches = corpus.findall(p, re.DOTALL)
+        print(f"Pattern '{p}': Found {len(matches)} matches.")
+        for m in matches[:3]: # Show first 3
+            print(f"  Found: {m[:100]}...")
+
+if __name__ == "__main__":
+    run(StageContext())
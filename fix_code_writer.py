@@ -2,6 +2,8 @@ import json
 import os
 import re
 
+from stage_context import StageContext
+
 def fix_agent_code_writer():
     # 1. Update the Variable Map
     map_path = "variable_map_master.json"
@@ -53,5 +55,8 @@ def fix_agent_code_writer():
             else:
                 print("✅ SUCCESS: File is clean.")
 
-if __name__ == "__main__":
+def run(context):
     fix_agent_code_writer()
+
+if __name__ == "__main__":
+    run(StageContext())
@@ -1,11 +1,6 @@
 import json
 
-# Load the sanitized map
-try:
-    with open("variable_map_sanitized.json", "r") as f:
-        data = json.load(f)
-except FileNotFoundError:
-    data = {}
+from stage_context import StageContext
 
 # Apply Logical Fixes based on "Snipe" evidence
 updates = {
@@ -17,13 +12,20 @@ updates = {
     "${mS.agentType}": "Planner", # Context guess: "using the Planner tool"
 }
 
-print(f"--- 🩹 Applying {len(updates)} Fixes to Variable Map ---")
-for k, v in updates.items():
-    print(f"   Mapping {k} -> {v}")
-    data[k] = v
+def run(context):
+    # Load the sanitized map
+    data = context.load_json("variable_map_sanitized.json", {})
 
-# Save
-with open("variable_map_sanitized.json", "w") as f:
-    json.dump(data, f, indent=2)
+    print(f"--- 🩹 Applying {len(updates)} Fixes to Variable Map ---")
+    for k, v in updates.items():
+        print(f"   Mapping {k} -> {v}")
+        data[k] = v
 
-print("--- ✅ Map Updated. Ready for Re-Hydration. ---")
+    # Save
+    with open("variable_map_sanitized.json", "w") as f:
+        json.dump(data, f, indent=2)
+
+    print("--- ✅ Map Updated. Ready for Re-Hydration. ---")
+
+if __name__ == "__main__":
+    run(StageContext())
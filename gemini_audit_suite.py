@@ -1,15 +1,17 @@
 import os
 import json
-import time
-from google import genai
 from google.genai import types
 
+from gemini_scheduler import Job, GeminiScheduler
+from llm_cache import cache_parser
+from stage_context import StageContext
+
 # --- CONFIG ---
 PERSONAS_DIR = "gemini_code_personas"
 TOOLS_FILE = "master_tool_definitions.json"
 CRITICAL_FILES = ["agent_planner.md", "persona_765.md", "agent_engineer.md"]
 
-def get_client():
+def get_client(context):
     # Checked GEMINI_API_KEY first as requested
     api_key = os.environ.get("GEMINI_API_KEY")
     
@@ -20,7 +22,7 @@ def get_client():
     if not api_key:
         print("❌ GEMINI_API_KEY not found in environment.")
         return None
-    return genai.Client(api_key=api_key)
+    return context.client
 
 def load_tools():
     if not os.path.exists(TOOLS_FILE):
@@ -28,11 +30,11 @@ def load_tools():
     with open(TOOLS_FILE, 'r') as f:
         return json.load(f)
 
-def audit_file(client, filename, tools_json):
+def build_audit_prompt(filename, tools_json):
     filepath = os.path.join(PERSONAS_DIR, filename)
     if not os.path.exists(filepath):
         print(f"⚠️ File {filename} not found, skipping.")
-        return
+        return None
 
     with open(filepath, 'r') as f:
         content = f.read()
@@ -47,7 +49,7 @@ def audit_file(client, filename, tools_json):
     
     tools_str = ", ".join(tool_names)
 
-    prompt = f"""
+    return f"""
     You are a Senior Compiler and Logic Analyzer for AI Agents.
     
     I will provide you with:
@@ -80,22 +82,30 @@ def audit_file(client, filename, tools_json):
     }}
     """
 
-    try:
-        response = client.models.generate_content(
-            model='gemini-2.0-flash',
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json"
-            )
-        )
-        return json.loads(response.text)
-    except Exception as e:
-        print(f"Error auditing {filename}: {e}")
-        return None
+def audit_files(client, filenames, tools_json, cache=None):
+    """Audits every file concurrently. Returns [(filename, result-or-None)] in input order."""
+    config = types.GenerateContentConfig(response_mime_type="application/json")
+    prompts = [(f, build_audit_prompt(f, tools_json)) for f in filenames]
+    prompts = [(f, p) for f, p in prompts if p is not None]
 
-def main():
+    responses = GeminiScheduler(client, cache=cache).run(
+        [Job('gemini-2.0-flash', p, config) for _, p in prompts], stage="gemini_audit_suite"
+    )
+
+    audited = []
+    for (filename, _), response in zip(prompts, responses):
+        try:
+            if isinstance(response, Exception):
+                raise response
+            audited.append((filename, json.loads(response.text)))
+        except Exception as e:
+            print(f"Error auditing {filename}: {e}")
+            audited.append((filename, None))
+    return audited
+
+def main(context, cache_mode=None):
     print("--- 🕵️‍♀️ Starting Gemini Critical Audit ---")
-    client = get_client()
+    client = get_client(context)
     if not client: return
 
     tools = load_tools()
@@ -106,21 +116,23 @@ def main():
     # Audit specific critical files first, then the rest if needed
     files_to_audit = CRITICAL_FILES
     
-    for filename in files_to_audit:
+    for filename, result in audit_files(client, files_to_audit, tools, context.cache(cache_mode)):
         print(f"Auditing {filename}...")
-        result = audit_file(client, filename, tools)
         if result:
             results.append(result)
             print(f"   Score: {result['score']} - {result['status']}")
             if result['status'] == 'FAIL':
                 print(f"   Missing: {result['missing_tools']}")
                 print(f"   Vars: {result['remaining_variables']}")
-        time.sleep(1) # Rate limit politeness
 
     # Save Report
     with open("gemini_audit_final_report.json", 'w') as f:
         json.dump(results, f, indent=2)
     print("\n✅ Audit Complete. Results in gemini_audit_final_report.json")
 
+def run(context):
+    args = context.parse_args(cache_parser("Audit critical personas against the tool definitions"))
+    main(context, args.cache_mode)
+
 if __name__ == "__main__":
-    main()
+    run(StageContext())
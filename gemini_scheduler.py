@@ -0,0 +1,305 @@
+"""
+gemini_scheduler.py
+Shared, rate-limit-aware async scheduler for the LLM-calling mining stages.
+
+The miners used to call client.models.generate_content once per candidate in a
+plain for-loop, so every run was serialized on network latency. Stages now hand a
+list of Jobs to GeminiScheduler, which:
+  - runs them concurrently (bounded by a semaphore),
+  - paces them through per-model RPM and TPM token buckets (limits come from the
+    AI Studio table parse_usage.py extracts from usage.txt) shared by every scheduler
+    in the process, so concurrent stages stay under the limits together,
+  - runs every scheduler's jobs on one process-wide event loop, so a shared Client's
+    async transport never sees a second loop,
+  - retries 429/5xx with jittered exponential backoff,
+  - returns results in submission order (a response, or the exception that ended the job),
+  - serves byte-identical calls from the llm_cache response cache when one is given,
+  - prints achieved requests/sec and tokens/sec when the stage finishes.
+
+Point the client at gemini_stub_server.py to exercise all of this without the real API.
+"""
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+
+from llm_cache import cache_key
+
+USAGE_FILE = "usage.txt"
+DEFAULT_LIMITS = {"rpm": 15, "tpm": 1_000_000}
+DEFAULT_CONCURRENCY = int(os.environ.get("GEMINI_CONCURRENCY", "8"))
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 32.0
+
+
+class Job(namedtuple("Job", ["model", "contents", "config"])):
+    """One generate_content call. config is an optional types.GenerateContentConfig."""
+
+    def __new__(cls, model, contents, config=None):
+        return super().__new__(cls, model, contents, config)
+
+
+def load_rate_limits(usage_file=USAGE_FILE):
+    """{model: {"rpm": int|None, "tpm": int|None}} from usage.txt, or {} if unavailable."""
+    if not os.path.exists(usage_file):
+        return {}
+    try:
+        import bs4  # noqa: F401  (parse_usage needs it; stay quiet when it's missing)
+    except ImportError:
+        return {}
+    from parse_usage import extract_rate_limits
+    return extract_rate_limits(usage_file)
+
+
+def estimate_tokens(contents):
+    """Cheap pre-flight estimate (~4 chars per token) used to reserve TPM budget."""
+    if isinstance(contents, str):
+        return max(1, len(contents) // 4)
+    if isinstance(contents, (list, tuple)):
+        return max(1, sum(estimate_tokens(c) for c in contents))
+    return max(1, len(str(contents)) // 4)
+
+
+def response_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    total = getattr(usage, "total_token_count", None) if usage is not None else None
+    return total or 0
+
+
+def error_status(exc):
+    """HTTP status behind an SDK/transport exception, if one can be found."""
+    for attr in ("code", "status_code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    m = re.match(r"^\s*(\d{3})\b", str(exc))
+    return int(m.group(1)) if m else None
+
+
+def is_retryable(exc):
+    status = error_status(exc)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class TokenBucket:
+    """
+    Continuous-refill bucket holding up to `per_minute` units. Waiters are served FIFO.
+    Not tied to an event loop: an acquire reserves its units at once (the balance may go
+    negative) and sleeps until the refill covers them, so schedulers running on different
+    threads' asyncio.run() loops can draw on one bucket.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        """Takes `amount` units now; returns how many seconds to wait before using them."""
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self, amount=1):
+        delay = self.reserve(amount)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_shared_buckets = {}
+_shared_buckets_lock = threading.Lock()
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _shared_loop():
+    """
+    The event loop every scheduler's jobs run on, in a daemon thread. google.genai's async
+    transport is tied to the loop it first ran on, so the Client that in-process stages
+    share (stage_context) must never see a second one.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="gemini-scheduler", daemon=True).start()
+        return _loop
+
+
+def shared_buckets(model, rpm, tpm):
+    """
+    The process-wide (RPM, TPM) buckets for `model`: the in-process pipeline stages each
+    have their own scheduler but run concurrently, so they must share one per-model budget.
+    """
+    with _shared_buckets_lock:
+        key = (model, rpm, tpm)
+        if key not in _shared_buckets:
+            _shared_buckets[key] = (TokenBucket(rpm), TokenBucket(tpm))
+        return _shared_buckets[key]
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.requests = 0
+        self.tokens = 0
+        self.retries = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def summary(self):
+        elapsed = max(self.elapsed, 1e-9)
+        return {
+            "stage": self.name,
+            "requests": self.requests,
+            "tokens": self.tokens,
+            "retries": self.retries,
+            "failures": self.failures,
+            "cache_hits": self.cache_hits,
+            "elapsed_s": round(self.elapsed, 3),
+            "requests_per_s": round(self.requests / elapsed, 3),
+            "tokens_per_s": round(self.tokens / elapsed, 1),
+        }
+
+    def report(self):
+        s = self.summary()
+        print(f"📈 [{s['stage']}] {s['requests']} requests in {s['elapsed_s']:.1f}s -> "
+              f"{s['requests_per_s']:.2f} req/s, {s['tokens_per_s']:.0f} tok/s "
+              f"(retries: {s['retries']}, failures: {s['failures']}, cache hits: {s['cache_hits']})")
+
+
+class GeminiScheduler:
+    def __init__(self, client=None, limits=None, concurrency=DEFAULT_CONCURRENCY,
+                 max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY, call=None,
+                 cache=None):
+        """
+        `call` is an optional `async def call(job) -> response` replacing the default
+        client.aio.models.generate_content transport. `cache` is an llm_cache.LLMCache.
+        """
+        self.client = client
+        self.limits = load_rate_limits() if limits is None else limits
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.call = call or self._generate_content
+        self.cache = cache
+        self.last_stats = None
+
+    async def _generate_content(self, job):
+        return await self.client.aio.models.generate_content(
+            model=job.model, contents=job.contents, config=job.config
+        )
+
+    def limits_for(self, model):
+        limit = self.limits.get(model)
+        if limit is None:
+            # "gemini-2.0-flash-001" falls back to the "gemini-2.0-flash" row.
+            prefixes = [m for m in self.limits if model.startswith(m)]
+            limit = self.limits[max(prefixes, key=len)] if prefixes else {}
+        return {
+            "rpm": limit.get("rpm") or DEFAULT_LIMITS["rpm"],
+            "tpm": limit.get("tpm") or DEFAULT_LIMITS["tpm"],
+        }
+
+    def _buckets_for(self, model):
+        limit = self.limits_for(model)
+        return shared_buckets(model, limit["rpm"], limit["tpm"])
+
+    def _backoff(self, attempt):
+        # Equal jitter: half the exponential step is fixed, half random.
+        step = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return step / 2 + random.uniform(0, step / 2)
+
+    async def _run_job(self, job, semaphore, stats):
+        key = None
+        if self.cache is not None:
+            key = cache_key(job.model, job.contents, job.config)
+            cached = self.cache.get(key)
+            if cached is not None:
+                stats.cache_hits += 1
+                return cached
+
+        rpm_bucket, tpm_bucket = self._buckets_for(job.model)
+        for attempt in range(self.max_retries + 1):
+            await rpm_bucket.acquire(1)
+            await tpm_bucket.acquire(estimate_tokens(job.contents))
+            try:
+                async with semaphore:
+                    response = await self.call(job)
+                stats.requests += 1
+                stats.tokens += response_tokens(response)
+                if key is not None:
+                    self.cache.put(key, job.model, response)
+                return response
+            except Exception as e:
+                stats.requests += 1
+                if not is_retryable(e) or attempt == self.max_retries:
+                    stats.failures += 1
+                    return e
+                stats.retries += 1
+                await asyncio.sleep(self._backoff(attempt))
+
+    async def iter_ordered(self, jobs, stage="stage", report=True):
+        """
+        Async generator yielding (index, result) in submission order as soon as each is ready.
+        `report` prints the stage's stats (and the cache's) when it finishes.
+        """
+        stats = StageStats(stage)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.ensure_future(self._run_job(job, semaphore, stats)) for job in jobs]
+        try:
+            for i, task in enumerate(tasks):
+                yield i, await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            stats.finished = time.monotonic()
+            self.last_stats = stats
+            if report:
+                self._report()
+
+    def _report(self):
+        self.last_stats.report()
+        if self.cache is not None:
+            self.cache.report()
+
+    async def run_async(self, jobs, stage="stage", report=True):
+        return [result async for _, result in self.iter_ordered(jobs, stage, report)]
+
+    def run(self, jobs, stage="stage"):
+        """
+        Blocking entry point for the (synchronous) mining scripts. The jobs run on the
+        process-wide loop (see _shared_loop); the stats are printed from the calling thread,
+        where pipeline_engine prefixes them with the step's name.
+        """
+        future = asyncio.run_coroutine_threadsafe(self.run_async(list(jobs), stage, report=False), _shared_loop())
+        try:
+            results = future.result()
+        except BaseException:
+            future.cancel()
+            raise
+        self._report()
+        return results
+
+
+def run_prompts(client, model, prompts, config=None, stage="stage", **kwargs):
+    """Runs one generate_content per prompt; returns responses/exceptions in prompt order."""
+    scheduler = GeminiScheduler(client, **kwargs)
+    return scheduler.run([Job(model, p, config) for p in prompts], stage)
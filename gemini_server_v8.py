@@ -1,25 +1,45 @@
 import os
 import sys
-import subprocess
-import glob as glob_module
-import http.server
-import socketserver
 import urllib.parse
 import argparse
 from google import genai
 from google.genai import types
 import socket
-import signal
-import time
-import cgi
 import uuid
-import traceback
+from typing import Optional
+
+from chat_sessions import (DEFAULT_MAX_SESSIONS, DEFAULT_SESSION_STORE, DEFAULT_TTL, SessionPool, SessionStore,
+                           new_session_id, session_cookie, session_id_from_headers)
+from code_search import format_matches, search as search_code
+from console_history import (HISTORY_SCRIPT, HistoryLog, add_history_arguments, history_from_args,
+                             render_history)
+from console_handoff import handoff_path, request_handoff
+from console_server import EventStream, Response, add_server_arguments, server_from_args
+from console_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, ConsoleMetrics
+from console_stream import STREAM_SCRIPT, stream_reply, tool_events
+from file_edit import edit_file, summary as edit_summary
+from file_index import add_index_arguments, file_index_from_args
+from port_inspector import listening_pids
+from process_killer import terminate
+from shell_pool import add_shell_arguments, shell_pool_from_args
+from model_admission import Overloaded, add_admission_arguments, admission_from_args, client_key
+from upload_store import UPLOAD_SCRIPT, UploadError, UploadStore, add_upload_arguments
 
 # --- Argument Parsing ---
 parser = argparse.ArgumentParser(description='Gemini Code Server with Agent Identity')
 parser.add_argument('--name', type=str, default='Agent', help='Agent name')
 parser.add_argument('--port', type=int, default=8888, help='Port to run the server on')
 parser.add_argument('--force', action='store_true', help='Force takeover of the port')
+parser.add_argument('--session-ttl', type=int, default=DEFAULT_TTL, help='Seconds before an idle chat session is dropped')
+parser.add_argument('--max-sessions', type=int, default=DEFAULT_MAX_SESSIONS, help='Maximum live chat sessions')
+parser.add_argument('--session-store', type=str, default=DEFAULT_SESSION_STORE,
+                    help="SQLite file sharing chat histories between --workers and restarts ({port} is replaced; '' keeps them in memory)")
+add_server_arguments(parser)
+add_history_arguments(parser)
+add_admission_arguments(parser)
+add_upload_arguments(parser)
+add_shell_arguments(parser)
+add_index_arguments(parser)
 args = parser.parse_args()
 
 AGENT_NAME = args.name
@@ -31,15 +51,23 @@ FORCE_TAKEOVER = args.force
 PERSONA_FILE = "hydrated_personas/agent_engineer.md"
 MODEL_ID = "gemini-2.0-flash"
 
+# Served at /metrics: request, model-call and tool latencies plus live gauges.
+metrics = ConsoleMetrics()
+
 # --- 1. Runtime Tool Definitions ---
+# @tool_events.traced reports each call/result to a /stream request running the tool;
+# @metrics.tool counts and times it.
 
+@tool_events.traced
+@metrics.tool
 def Bash(command: str):
     """Executes a command in the bash shell. Use this to run system commands or scripts."""
     print(f"\n[SERVER] ⚡ Executing Bash: {command}")
     try:
-        result = subprocess.run(
-            command, shell=True, capture_output=True, text=True, timeout=30
-        )
+        # The session's own long-lived bash (shell_pool.session() below): cd/export persist
+        result = shell_pool.run(command, timeout=30)
+        if result.timed_out:
+            return f"Error executing command: Command '{command}' timed out after 30 seconds"
         output = result.stdout + result.stderr
         display_out = output[:200] + "..." if len(output) > 200 else output
         print(f"[SERVER] 📤 Output: {display_out.strip()}")
@@ -47,17 +75,25 @@ def Bash(command: str):
     except Exception as e:
         return f"Error executing command: {str(e)}"
 
-def Edit(path: str, content: str):
-    """Writes content to a file (overwrites)."""
+@tool_events.traced
+@metrics.tool
+def Edit(path: str, content: Optional[str] = None, old_string: str = "", new_string: str = "", diff: str = "",
+         expected_sha: str = "", replace_all: bool = False):
+    """Edits a file. To change part of it, give old_string and new_string (old_string must match the file
+    exactly, once, unless replace_all) or a unified diff; content overwrites (or creates) the whole file,
+    "" empties it.
+    expected_sha: the sha256 (8+ hex digits) an earlier Edit returned; refuses if the file changed since."""
     print(f"\n[SERVER] ✏️ Editing file: {path}")
     try:
-        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
-        with open(path, "w") as f:
-            f.write(content)
-        return f"Successfully wrote to {path}"
+        # Temp file + rename, answered with a compact diff; /metrics counts the tokens patches save
+        result = edit_file(path, content, old_string, new_string, diff, expected_sha, replace_all)
+        metrics.edit(result.mode, result.tokens_saved)
+        return edit_summary(result)
     except Exception as e:
         return f"Error writing file: {str(e)}"
 
+@tool_events.traced
+@metrics.tool
 def View(path: str):
     """Reads and displays the contents of a file."""
     print(f"\n[SERVER] 👁️ Viewing file: {path}")
@@ -69,20 +105,23 @@ def View(path: str):
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
+@tool_events.traced
+@metrics.tool
 def Glob(pattern: str):
     """Lists files matching a pattern (e.g., *.py)."""
     try:
-        files = glob_module.glob(pattern, recursive=True)
+        files = file_index.glob(pattern)
         return "\n".join(files) if files else "No files found."
     except Exception as e:
         return f"Error listing files: {str(e)}"
 
+@tool_events.traced
+@metrics.tool
 def Grep(pattern: str, path: str):
-    """Searches files for a pattern using grep."""
+    """Searches files for a regex pattern. Returns path:line:column: matching line."""
     try:
-        cmd = ["grep", "-r", pattern, path]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        return result.stdout if result.stdout else "No matches found."
+        # In-process, skipping .git/node_modules/.gitignored files, capped at 200 matches
+        return format_matches(search_code(pattern, path, index=file_index)) or "No matches found."
     except Exception as e:
         return f"Error executing grep: {str(e)}"
 
@@ -109,18 +148,24 @@ if not api_key:
 
 client = genai.Client(api_key=api_key)
 
-chat_session = client.chats.create(
-    model=MODEL_ID,
-    config=types.GenerateContentConfig(
-        system_instruction=SYSTEM_INSTRUCTION,
-        tools=[Bash, Edit, View, Glob, Grep],
-        temperature=0.1,
-        automatic_function_calling=types.AutomaticFunctionCallingConfig(
-            disable=False,
-            maximum_remote_calls=15
+def create_chat(model, history=None):
+    return client.chats.create(
+        model=model,
+        history=[types.Content.model_validate(content) for content in history or []],
+        config=types.GenerateContentConfig(
+            system_instruction=SYSTEM_INSTRUCTION,
+            tools=[Bash, Edit, View, Glob, Grep],
+            temperature=0.1,
+            automatic_function_calling=types.AutomaticFunctionCallingConfig(
+                disable=False,
+                maximum_remote_calls=15
+            )
         )
     )
-)
+
+# One live chat per (browser session, model_choice); follow-up prompts continue it.
+# __main__ attaches the on-disk session store, so every worker can continue every chat.
+session_pool = SessionPool(create_chat, ttl=args.session_ttl, max_sessions=args.max_sessions)
 
 # --- 3. Server Implementation ---
 
@@ -138,6 +183,7 @@ HTML_TEMPLATE = """
         .user-msg { color: #4ec9b0; font-weight: bold; border-left: 3px solid #4ec9b0; padding-left: 10px; }
         .agent-msg { color: #ce9178; border-left: 3px solid #ce9178; padding-left: 10px; }
         .agent-msg pre { background-color: #333; padding: 5px; overflow-x: auto; }
+        .tool-msg { color: #858585; border-left: 3px solid #666; padding-left: 10px; font-size: 0.9em; }
         form { display: flex; gap: 10px; height: 50px; }
         textarea { flex: 1; background: #3c3c3c; color: #fff; border: 1px solid #007acc; border-radius: 4px; padding: 10px; resize: none; font-family: inherit; }
         textarea:focus { outline: none; background: #444; }
@@ -148,7 +194,7 @@ HTML_TEMPLATE = """
 </head>
 <body>
     <h1>🤖 Gemini Code Console</h1>
-    <div id="chat-history">
+    <div id="chat-history" data-cursor="{{CURSOR}}">
         {{CHAT_HISTORY}}
     </div>
     <form method="POST" action="/" enctype="multipart/form-data">
@@ -172,8 +218,7 @@ HTML_TEMPLATE = """
         document.querySelector('textarea').addEventListener('keydown', function(e) {
             if (e.key === 'Enter' && !e.shiftKey) {
                 e.preventDefault();
-                document.querySelector('form').submit();
-                document.getElementById('thinking').style.display = 'block';
+                document.querySelector('form').requestSubmit();
             }
         });
 
@@ -196,113 +241,225 @@ HTML_TEMPLATE = """
 
         renderMarkdown();
     </script>
+{{UPLOAD_SCRIPT}}
+{{STREAM_SCRIPT}}
+{{HISTORY_SCRIPT}}
 </body>
 </html>
-"""
-
-history_log = []
-
-class GeminiHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == "/":
-            self.send_response(200)
-            self.send_header("Content-type", "text/html")
-            self.end_headers()
-
-            history_html = ""
-            for role, text in history_log:
-                css_class = "user-msg" if role == "USER" else "agent-msg"
-                safe_text = (text or "").replace("<", "&lt;").replace(">", "&gt;")
-                history_html += f'<div class="msg {css_class}">{safe_text}</div>'
-
-            if not history_log:
-                history_html = '<div class="msg agent-msg">System ready. Waiting for instructions...</div>'
-
-            response_html = HTML_TEMPLATE.replace("{{CHAT_HISTORY}}", history_html)
-            self.wfile.write(response_html.encode())
-        else:
-            super().do_GET()
-
-    def do_POST(self):
-        if self.path == "/":
-            # Parse the form data
+""".replace("{{UPLOAD_SCRIPT}}", UPLOAD_SCRIPT).replace("{{STREAM_SCRIPT}}", STREAM_SCRIPT).replace("{{HISTORY_SCRIPT}}", HISTORY_SCRIPT)
+
+# Entries are escaped once on append; GET / and /history reuse the rendered fragments.
+# In-memory until __main__ opens the on-disk log (shared with a draining predecessor).
+HISTORY_STYLE = dict(css_classes={"USER": "user-msg"}, default_css="agent-msg")
+history_log = HistoryLog(**HISTORY_STYLE)
+EMPTY_HISTORY = '<div class="msg agent-msg placeholder">System ready. Waiting for instructions...</div>'
+
+# At most --model-calls prompts talk to the model (and run tools) at once; --max-queued wait their turn.
+model_admission = admission_from_args(args)
+
+# Bash runs in a long-lived shell per browser session, bound around each chat turn.
+shell_pool = shell_pool_from_args(args)
+
+# Glob and Grep query a live index of the working directory instead of walking it per call.
+file_index = file_index_from_args(args)
+
+# Uploads are streamed into the store's tmp/ and kept once per SHA-256 digest.
+upload_store = UploadStore(args.upload_root, max_bytes=args.max_upload_mb * 1024 * 1024)
+
+# Unrouted GETs serve files from the working directory, as SimpleHTTPRequestHandler did.
+# Waiting and running prompts each park a handler thread, on top of --handler-threads.
+server = server_from_args(args, static_root=os.getcwd(), upload_dir=upload_store.tmp_dir,
+                          handler_threads=args.handler_threads + model_admission.capacity, metrics=metrics)
+metrics.gauge("console_sessions", "Live chat sessions in this process", lambda: session_pool.stats()["sessions"])
+metrics.gauge("console_model_calls_inflight", "Model calls holding a slot", lambda: model_admission.inflight)
+metrics.gauge("console_model_queue_depth", "Prompts waiting for a model-call slot", lambda: model_admission.queued)
+metrics.gauge("console_shell_workers", "Live bash workers behind the Bash tool", lambda: shell_pool.stats()["live"])
+metrics.gauge("console_connections", "Open client connections", lambda: server.connections)
+metrics.gauge("console_requests_active", "Requests between head and response", lambda: server.active)
+
+def session_from(request):
+    """(session_id, is_new) from the request's cookie."""
+    session_id = session_id_from_headers(request.headers)
+    if session_id is None:
+        return new_session_id(), True
+    return session_id, False
+
+@server.route("GET", "/")
+def index(request):
+    history_html, cursor = render_history(history_log, EMPTY_HISTORY)
+    return Response(HTML_TEMPLATE.replace("{{CURSOR}}", str(cursor)).replace("{{CHAT_HISTORY}}", history_html))
+
+@server.route("GET", "/history")
+def history(request):
+    """GET /history?after=<id>&limit=N (or ?before=<id>): stored entries as JSON."""
+    try:
+        return Response.json(history_log.page_json(request.get("after") or None, request.get("before") or None,
+                                                   request.get("limit") or 100))
+    except ValueError:
+        return Response.json({"error": "after, before and limit must be integers"}, status=400)
+
+@server.route("GET", "/stats")
+def stats(request):
+    return Response.json({"session_pool": session_pool.stats(), "model_admission": model_admission.stats(),
+                          "uploads": upload_store.stats(), "shell_pool": shell_pool.stats(),
+                          "file_index": file_index.stats(), "server": server.stats()})
+
+@server.route("GET", "/metrics")
+def metrics_endpoint(request):
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+def overloaded(e):
+    print(f"🚦 Model-call queue full; shedding (Retry-After: {e.retry_after}s)")
+    return Response(str(e), 503, "text/plain", [("Retry-After", str(e.retry_after))])
+
+@server.route("GET", "/stream")
+def stream(request):
+    """GET /stream?prompt=...&model_choice=...: the reply as Server-Sent Events."""
+    user_prompt = request.get("prompt", "")
+    model_choice = request.get("model_choice") or MODEL_ID
+    session_id, new_session = session_from(request)
+    ticket = None
+    if user_prompt:
+        try:
+            ticket = model_admission.enqueue(client_key(request))
+        except Overloaded as e:
+            return overloaded(e)
+
+    def produce(emit):
+        if not user_prompt:
+            emit("error", {"message": "Empty prompt"})
+            return
+
+        print(f"\n📩 PROMPT (stream): {user_prompt}")
+        try:
+            history_log.append(("USER", user_prompt))
+        except BaseException:
+            ticket.cancel()  # not admitted yet: without this it would hold its place for good
+            raise
+        try:
+            with ticket.admitted(on_position=lambda position: emit("queued", {"position": position})):
+                emit("started", {})
+                pooled = session_pool.acquire(session_id, model_choice)
+                with pooled.lock, shell_pool.session(session_id), metrics.model_call(model_choice) as call:
+                    output_text = stream_reply(pooled.chat, user_prompt, emit, call.usage) or "(No text output)"
+                    session_pool.commit(pooled)
+        except (BrokenPipeError, ConnectionResetError):
+            print("\n[SERVER] Stream client disconnected.")
+            return
+        except Exception as e:
+            output_text = f"❌ Error: {str(e)}"
+            history_log.append(("GEMINI", output_text))
             try:
-                form = cgi.FieldStorage(
-                    fp=self.rfile,
-                    headers=self.headers,
-                    environ={'REQUEST_METHOD': 'POST',
-                             'CONTENT_TYPE': self.headers['Content-Type']
-                             }
-                )
-            except Exception as e:
-                print(f"\n❌ Error initializing cgi.FieldStorage: {e}", file=sys.stderr)
-                traceback.print_exc(file=sys.stderr)
-                self.send_response(500)
-                self.send_header("Content-type", "text/html")
-                self.end_headers()
-                self.wfile.write(b"<h1>500 Internal Server Error</h1><p>Failed to process form data.</p>")
-                return
-
-            # Extract the model choice
-            model_choice = form.getvalue('model_choice')
-            print(f"\n[SERVER] Model Choice: {model_choice}")
-
-            # Handle the uploaded file
-            if 'uploaded_file' in form and form['uploaded_file'].filename:
-                file_item = form['uploaded_file']
-                # Generate a unique filename
-                timestamp = str(int(time.time()))
-                filename = os.path.join(os.getcwd(), f'{timestamp}_{file_item.filename}')
-
-                # Save the file to the current directory
-                with open(filename, 'wb') as f:
-                    f.write(file_item.file.read())
-
-                print(f"\n[SERVER] Uploaded file: {filename}")
-
-                # (Optional) If the uploaded file is a new persona file, read its contents and update the SYSTEM_INSTRUCTION
-                # For now, we'll just print a message
-                print("\n[SERVER]  Uploaded file could be a new persona file.  Handling of persona files is not yet implemented.")
-            else:
-                print("\n[SERVER] No file was uploaded")
+                emit("error", {"message": str(e)})
+            except OSError:
+                pass
+            return
+        history_log.append(("GEMINI", output_text))
+        try:
+            emit("done", {"text": output_text})
+        except OSError:
+            pass
 
-            # Extract the user prompt
-            user_prompt = form.getvalue('prompt')
+    return EventStream(produce, [("Set-Cookie", session_cookie(session_id))] if new_session else [])
 
-            if user_prompt:
-                print(f"\n📩 PROMPT: {user_prompt}")
-                history_log.append(("USER", user_prompt))
-                try:
-                    # Create a new chat session with the selected model
-                    new_chat_session = client.chats.create(
-                        model=model_choice,
-                        config=types.GenerateContentConfig(
-                            system_instruction=SYSTEM_INSTRUCTION,
-                            tools=[Bash, Edit, View, Glob, Grep],
-                            temperature=0.1,
-                            automatic_function_calling=types.AutomaticFunctionCallingConfig(
-                                disable=False,
-                                maximum_remote_calls=15
-                            )
-                        )
-                    )
-
-                    response = new_chat_session.send_message(user_prompt)
-                    output_text = response.text if response.text else "(No text output)"
-                except Exception as e:
-                    output_text = f"❌ Error: {str(e)}"
+def redirect_home(session_id=None):
+    return Response.redirect("/", headers=[("Set-Cookie", session_cookie(session_id))] if session_id else [])
 
-                history_log.append(("GEMINI", output_text))
+@server.route("POST", "/")
+def submit(request):
+    # Form fields were parsed (and any upload streamed to a temp file) by the server core.
+    model_choice = request.get('model_choice') or MODEL_ID
+    print(f"\n[SERVER] Model Choice: {model_choice}")
 
-            self.send_response(303)
-            self.send_header("Location", "/")
-            self.end_headers()
+    session_id, new_session = session_from(request)
 
-        elif self.path == "/reset":
-            history_log.clear()
-            self.send_response(303)
-            self.send_header("Location", "/")
-            self.end_headers()
+    # Handle the uploaded file: a plain multipart upload, or a finished resumable one (UPLOAD_SCRIPT)
+    upload = request.files.get('uploaded_file')
+    stored = None
+    try:
+        if upload is not None:
+            stored = upload_store.add(upload.path, upload.sha256, upload.size, upload.filename)
+        elif request.get('upload_id'):
+            stored = upload_store.completed(request.get('upload_id'))
+    except UploadError as e:
+        return Response(str(e), e.status, "text/plain")
+    if stored is not None:
+        print(f"\n[SERVER] Uploaded file: {stored.path} ({stored.size} bytes"
+              f"{', already stored' if stored.deduplicated else ''})")
+        history_log.append(("TOOL", f"📎 Uploaded {stored.filename} ({stored.size} bytes) → {stored.path}"))
+
+        # (Optional) If the uploaded file is a new persona file, read its contents and update the SYSTEM_INSTRUCTION
+        # For now, we'll just print a message
+        print("\n[SERVER]  Uploaded file could be a new persona file.  Handling of persona files is not yet implemented.")
+    else:
+        print("\n[SERVER] No file was uploaded")
+
+    # Extract the user prompt
+    user_prompt = request.get('prompt')
+    # The agent's tools see the stored copy under the working directory.
+    model_prompt = f"[Uploaded file: {stored.path}]\n{user_prompt}" if stored and user_prompt else user_prompt
+
+    if user_prompt:
+        try:
+            ticket = model_admission.enqueue(client_key(request))
+        except Overloaded as e:
+            return overloaded(e)
+        print(f"\n📩 PROMPT: {user_prompt}")
+        try:
+            history_log.append(("USER", user_prompt))
+        except BaseException:
+            ticket.cancel()
+            raise
+        try:
+            with ticket.admitted():
+                # Reuse this browser's chat for the selected model (created on first use)
+                pooled = session_pool.acquire(session_id, model_choice)
+                with pooled.lock, shell_pool.session(session_id), metrics.model_call(model_choice) as call:
+                    response = pooled.chat.send_message(model_prompt)
+                    call.usage(response)
+                    session_pool.commit(pooled)
+            output_text = response.text if response.text else "(No text output)"
+        except Exception as e:
+            output_text = f"❌ Error: {str(e)}"
+
+        history_log.append(("GEMINI", output_text))
+
+    return redirect_home(session_id if new_session else None)
+
+def upload_response(action):
+    try:
+        return Response.json(action())
+    except UploadError as e:
+        return Response.json({"error": str(e)}, status=e.status)
+    except ValueError:
+        return Response.json({"error": "size and offset must be integers"}, status=400)
+
+@server.route("POST", "/uploads")
+def begin_upload(request):
+    """POST /uploads?name=...&size=N: starts a resumable upload."""
+    return upload_response(lambda: upload_store.begin(request.get("name") or "upload", int(request.get("size", ""))))
+
+@server.route("GET", "/uploads")
+def upload_status(request):
+    """GET /uploads?id=...: how far a resumable upload got."""
+    return upload_response(lambda: upload_store.status(request.get("id")))
+
+@server.route("PUT", "/uploads")
+def upload_chunk(request):
+    """PUT /uploads?id=...&offset=K with an application/octet-stream chunk."""
+    body = request.files.get("body")
+    if body is None:
+        return Response.json({"error": "Send the chunk as application/octet-stream"}, status=400)
+    return upload_response(lambda: upload_store.append(request.get("id"), int(request.get("offset", "")), body.path))
+
+@server.route("POST", "/reset")
+def reset(request):
+    history_log.clear()
+    session_id = session_id_from_headers(request.headers)
+    if session_id:
+        session_pool.discard(session_id)
+        shell_pool.discard(session_id)
+    return redirect_home()
 
 def attempt_port_bind(port):
     try:
@@ -323,29 +480,42 @@ if __name__ == "__main__":
     print(f"🌍 Working Directory: {os.getcwd()}")
 
     # --- PORT TAKEOVER LOGIC ---
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.settimeout(2)  # Short timeout for checking
-    try:
-        sock.bind(('localhost', SERVER_PORT))
-    except OSError as e:
-        if FORCE_TAKEOVER:
-            print(f"Port {SERVER_PORT} is busy. Attempting takeover...")
-            try:
-                # Find the PID using lsof
-                lsof_command = f"lsof -t -i:{SERVER_PORT}"
-                result = subprocess.run(lsof_command, shell=True, capture_output=True, text=True)
-                pid = int(result.stdout.strip())
-                print(f"⚔️  Younger (v4) is displacing Older (PID: {pid})...")
-                os.kill(pid, signal.SIGTERM)
-                time.sleep(1)  # Wait for the socket to release
-            except Exception as e:
-                print(f"Error during takeover: {e}")
+    # A console started with --force takes the listening socket over from the running one,
+    # which drains its in-flight requests and exits; servers that predate the handoff
+    # (nothing on the handoff socket) are still displaced with SIGTERM, found through /proc.
+    handoff = handoff_path(SERVER_PORT)
+    listener = None
+    if FORCE_TAKEOVER:
+        taken = request_handoff(handoff)
+        if taken:
+            listener, old_pid = taken
+            print(f"🤝 Took over port {SERVER_PORT} from PID {old_pid}; it is draining its in-flight requests")
+    if listener is None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(2)  # Short timeout for checking
+        try:
+            sock.bind(('localhost', SERVER_PORT))
+        except OSError as e:
+            if FORCE_TAKEOVER:
+                print(f"Port {SERVER_PORT} is busy. Attempting takeover...")
+                try:
+                    # The oldest process listening on the port: a --workers supervisor, not one of its workers
+                    pids = listening_pids(SERVER_PORT)
+                    if not pids:
+                        raise RuntimeError(f"no visible process is listening on port {SERVER_PORT}")
+                    pid = pids[0]
+                    print(f"⚔️  Younger (v4) is displacing Older (PID: {pid})...")
+                    # Returns once it has exited (and its workers with it) and the socket is released
+                    if terminate([pid])[0].outcome not in ("exited", "killed"):
+                        raise RuntimeError(f"PID {pid} could not be stopped")
+                except Exception as e:
+                    print(f"Error during takeover: {e}")
+                    sys.exit(1)
+            else:
+                print(f"Port {SERVER_PORT} is busy. Use --force to displace.")
                 sys.exit(1)
-        else:
-            print(f"Port {SERVER_PORT} is busy. Use --force to displace.")
-            sys.exit(1)
-    finally:
-        sock.close()
+        finally:
+            sock.close()
 
     # --- PORT SELECTION ---
     PORT = SERVER_PORT #find_available_port()
@@ -353,10 +523,15 @@ if __name__ == "__main__":
     #    print("❌ Error: Could not find an available port.")
     #    sys.exit(1)
 
+    history_log = history_from_args(args, **HISTORY_STYLE)
+    if args.session_store:
+        session_pool.store = SessionStore(args.session_store.format(port=PORT), ttl=args.session_ttl)
+    file_index.start()
     print(f"📡 Serving on Port {PORT}...")
-    with socketserver.ThreadingTCPServer(("", PORT), GeminiHandler) as httpd:
-        print(f"✅ Server started on port {PORT}")
-        try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
-            httpd.server_close()
+    print(f"✅ Server started on port {PORT}")
+    try:
+        server.run("", PORT, sock=listener, handoff=handoff)
+    finally:
+        history_log.close()
+        shell_pool.close()
+        file_index.close()
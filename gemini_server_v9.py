@@ -1,25 +1,38 @@
 import os
 import sys
 import subprocess
-import glob as glob_module
-import http.server
-import socketserver
 import urllib.parse
 import argparse
 from google import genai
 from google.genai import types
 import socket
-import signal
-import time
-import cgi
 import uuid
 import traceback
 
+from chat_sessions import DEFAULT_SESSION_STORE, SessionPool, SessionStore
+from code_search import format_matches, search as search_code
+from console_history import (HISTORY_SCRIPT, HistoryLog, add_history_arguments, history_from_args,
+                             render_history)
+from console_handoff import handoff_path, request_handoff
+from console_server import EventStream, Response, add_server_arguments, server_from_args
+from console_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, ConsoleMetrics
+from console_stream import STREAM_SCRIPT, stream_reply, tool_events
+from file_index import add_index_arguments, file_index_from_args
+from port_inspector import listening_pids
+from process_killer import terminate
+from shell_pool import add_shell_arguments, shell_pool_from_args
+
 # --- Argument Parsing ---
 parser = argparse.ArgumentParser(description='Gemini Code Server v9 - Transparent Session')
 parser.add_argument('--name', type=str, default='Agent_v9', help='Agent name')
 parser.add_argument('--port', type=int, default=8080, help='Port to run the server on')
 parser.add_argument('--force', action='store_true', help='Force takeover of the port')
+parser.add_argument('--session-store', type=str, default=DEFAULT_SESSION_STORE,
+                    help="SQLite file sharing the chat between --workers and restarts ({port} is replaced; '' keeps it in memory)")
+add_server_arguments(parser)
+add_history_arguments(parser)
+add_shell_arguments(parser)
+add_index_arguments(parser)
 args = parser.parse_args()
 
 AGENT_NAME = args.name
@@ -31,17 +44,29 @@ PERSONA_FILE = "hydrated_personas/agent_engineer.md"
 MODEL_ID = "gemini-2.0-flash"
 
 # --- Global State ---
-history_log = []
-chat_session = None
-current_model_id = None
+# Entries are escaped once on append; GET / and /history reuse the rendered fragments.
+# In-memory until __main__ opens the on-disk log (shared with a draining predecessor).
+HISTORY_STYLE = dict(css_classes={"USER": "user-msg", "GEMINI": "agent-msg"}, default_css="tool-msg")
+history_log = HistoryLog(**HISTORY_STYLE)
+SHARED_SESSION = "shared"  # v9 has one chat for everybody
+shell_pool = shell_pool_from_args(args)  # ...and so one shell (per --workers process)
+file_index = file_index_from_args(args)  # Glob and Grep query it instead of walking the tree per call
 
 # --- 1. Runtime Tool Definitions ---
+# @tool_events.traced also streams each call/result to a /stream request running the tool;
+# @metrics.tool counts and times it for /metrics.
+metrics = ConsoleMetrics()
 
+@tool_events.traced
+@metrics.tool
 def Bash(command: str):
     """Executes a command in the bash shell. Output is logged for the user."""
     print(f"\n[SERVER] ⚡ Executing Bash: {command}")
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=30)
+        # One long-lived bash for the shared chat: cd/export persist between commands
+        result = shell_pool.run(command, timeout=30)
+        if result.timed_out:
+            raise subprocess.TimeoutExpired(command, 30)
         output = result.stdout + result.stderr
         output = output if output else "(No output)"
         # FIX: Explicitly log result so user can see it in UI
@@ -52,6 +77,8 @@ def Bash(command: str):
         history_log.append(("TOOL", msg))
         return msg
 
+@tool_events.traced
+@metrics.tool
 def View(path: str):
     """Reads and displays the contents of a file."""
     print(f"\n[SERVER] 👁️ Viewing file: {path}")
@@ -65,22 +92,25 @@ def View(path: str):
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
+@tool_events.traced
+@metrics.tool
 def Glob(pattern: str):
     """Lists files matching a pattern."""
     try:
-        files = glob_module.glob(pattern, recursive=True)
+        files = file_index.glob(pattern)
         res = "\n".join(files) if files else "No files found."
         history_log.append(("TOOL", f"GLOB: {pattern}\n{res}"))
         return res
     except Exception as e:
         return f"Error: {str(e)}"
 
+@tool_events.traced
+@metrics.tool
 def Grep(pattern: str, path: str):
-    """Searches files for a pattern."""
+    """Searches files for a regex pattern. Returns path:line:column: matching line."""
     try:
-        cmd = ["grep", "-r", pattern, path]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        res = result.stdout if result.stdout else "No matches found."
+        # In-process, skipping .git/node_modules/.gitignored files, capped at 200 matches
+        res = format_matches(search_code(pattern, path, index=file_index)) or "No matches found."
         history_log.append(("TOOL", f"GREP: {pattern} in {path}\n{res}"))
         return res
     except Exception as e:
@@ -99,6 +129,21 @@ SYSTEM_INSTRUCTION += f"\nSYSTEM CONTEXT: You are {AGENT_NAME}. Output of your t
 api_key = os.environ.get("GEMINI_API_KEY")
 client = genai.Client(api_key=api_key)
 
+def create_chat(model_choice, history=None):
+    return client.chats.create(
+        model=model_choice,
+        history=[types.Content.model_validate(content) for content in history or []],
+        config=types.GenerateContentConfig(
+            system_instruction=SYSTEM_INSTRUCTION,
+            tools=[Bash, View, Glob, Grep],
+            automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=False)
+        )
+    )
+
+# The persistent chat, replaced when the model changes; prompts take turns on pooled.lock.
+# __main__ attaches the on-disk session store, so every worker continues the same chat.
+session_pool = SessionPool(create_chat, ttl=float("inf"), max_sessions=1)
+
 # --- 3. Server Implementation ---
 
 HTML_TEMPLATE = """
@@ -121,7 +166,7 @@ HTML_TEMPLATE = """
 </head>
 <body>
     <h1>🤖 Gemini Code Console (Persistent v9)</h1>
-    <div id="chat-history">{{CHAT_HISTORY}}</div>
+    <div id="chat-history" data-cursor="{{CURSOR}}">{{CHAT_HISTORY}}</div>
     <form method="POST" action="/" enctype="multipart/form-data">
         <select name="model_choice">
           <option value="gemini-2.0-flash">gemini-2.0-flash</option>
@@ -134,70 +179,117 @@ HTML_TEMPLATE = """
         const history = document.getElementById('chat-history');
         history.scrollTop = history.scrollHeight;
     </script>
+{{STREAM_SCRIPT}}
+{{HISTORY_SCRIPT}}
 </body>
 </html>
-"""
-
-class GeminiHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == "/":
-            self.send_response(200)
-            self.send_header("Content-type", "text/html")
-            self.end_headers()
-            history_html = ""
-            for role, text in history_log:
-                if role == "USER": css = "user-msg"
-                elif role == "GEMINI": css = "agent-msg"
-                else: css = "tool-msg"
-                safe_text = (text or "").replace("<", "&lt;").replace(">", "&gt;")
-                history_html += f'<div class="msg {css}">{safe_text}</div>'
-            self.wfile.write(HTML_TEMPLATE.replace("{{CHAT_HISTORY}}", history_html).encode())
-        else: super().do_GET()
-
-    def do_POST(self):
-        global chat_session, current_model_id
-        if self.path == "/":
-            form = cgi.FieldStorage(fp=self.rfile, headers=self.headers, environ={'REQUEST_METHOD': 'POST', 'CONTENT_TYPE': self.headers['Content-Type']})
-            model_choice = form.getvalue('model_choice')
-            user_prompt = form.getvalue('prompt')
-
-            if user_prompt:
-                history_log.append(("USER", user_prompt))
-                try:
-                    # Persistence Check
-                    if chat_session is None or model_choice != current_model_id:
-                        current_model_id = model_choice
-                        chat_session = client.chats.create(
-                            model=model_choice,
-                            config=types.GenerateContentConfig(
-                                system_instruction=SYSTEM_INSTRUCTION,
-                                tools=[Bash, View, Glob, Grep],
-                                automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=False)
-                            )
-                        )
-                    response = chat_session.send_message(user_prompt)
-                    output_text = response.text if response.text else "(Command Executed)"
-                    history_log.append(("GEMINI", output_text))
-                except Exception as e:
-                    history_log.append(("GEMINI", f"❌ Error: {str(e)}"))
-
-            self.send_response(303)
-            self.send_header("Location", "/")
-            self.end_headers()
+""".replace("{{STREAM_SCRIPT}}", STREAM_SCRIPT).replace("{{HISTORY_SCRIPT}}", HISTORY_SCRIPT)
+
+# Unrouted GETs serve files from the working directory, as SimpleHTTPRequestHandler did.
+server = server_from_args(args, static_root=os.getcwd(), metrics=metrics)
+metrics.gauge("console_shell_workers", "Live bash workers behind the Bash tool", lambda: shell_pool.stats()["live"])
+metrics.gauge("console_connections", "Open client connections", lambda: server.connections)
+metrics.gauge("console_requests_active", "Requests between head and response", lambda: server.active)
+
+@server.route("GET", "/")
+def index(request):
+    history_html, cursor = render_history(history_log)
+    return Response(HTML_TEMPLATE.replace("{{CURSOR}}", str(cursor)).replace("{{CHAT_HISTORY}}", history_html))
+
+@server.route("GET", "/history")
+def history(request):
+    """GET /history?after=<id>&limit=N (or ?before=<id>): stored entries as JSON."""
+    try:
+        return Response.json(history_log.page_json(request.get("after") or None, request.get("before") or None,
+                                                   request.get("limit") or 100))
+    except ValueError:
+        return Response.json({"error": "after, before and limit must be integers"}, status=400)
+
+@server.route("GET", "/metrics")
+def metrics_endpoint(request):
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@server.route("GET", "/stream")
+def stream(request):
+    """GET /stream?prompt=...&model_choice=...: the reply as Server-Sent Events."""
+    user_prompt = request.get("prompt", "")
+    model_choice = request.get("model_choice") or MODEL_ID
+
+    def produce(emit):
+        if not user_prompt:
+            emit("error", {"message": "Empty prompt"})
+            return
+
+        history_log.append(("USER", user_prompt))
+        try:
+            pooled = session_pool.acquire(SHARED_SESSION, model_choice)
+            with pooled.lock, metrics.model_call(model_choice) as call:
+                output_text = stream_reply(pooled.chat, user_prompt, emit, call.usage) or "(Command Executed)"
+                session_pool.commit(pooled)
+            history_log.append(("GEMINI", output_text))
+            emit("done", {"text": output_text})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            history_log.append(("GEMINI", f"❌ Error: {str(e)}"))
+            try:
+                emit("error", {"message": str(e)})
+            except OSError:
+                pass
+
+    return EventStream(produce)
+
+@server.route("POST", "/")
+def submit(request):
+    model_choice = request.get('model_choice')
+    user_prompt = request.get('prompt')
+
+    if user_prompt:
+        history_log.append(("USER", user_prompt))
+        try:
+            pooled = session_pool.acquire(SHARED_SESSION, model_choice)
+            with pooled.lock, metrics.model_call(model_choice) as call:
+                response = pooled.chat.send_message(user_prompt)
+                call.usage(response)
+                session_pool.commit(pooled)
+            output_text = response.text if response.text else "(Command Executed)"
+            history_log.append(("GEMINI", output_text))
+        except Exception as e:
+            history_log.append(("GEMINI", f"❌ Error: {str(e)}"))
+
+    return Response.redirect("/")
 
 if __name__ == "__main__":
     # Same takeover logic from v8
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    try:
-        sock.bind(('localhost', SERVER_PORT))
-    except OSError:
-        if FORCE_TAKEOVER:
-            result = subprocess.run(f"lsof -t -i:{SERVER_PORT}", shell=True, capture_output=True, text=True)
-            if result.stdout:
-                os.kill(int(result.stdout.strip()), signal.SIGTERM)
-                time.sleep(1)
-    finally: sock.close()
+    # A console started with --force takes the listening socket over from the running one,
+    # which drains its in-flight requests and exits; servers that predate the handoff
+    # (nothing on the handoff socket) are still displaced with SIGTERM, found through /proc.
+    handoff = handoff_path(SERVER_PORT)
+    listener = None
+    if FORCE_TAKEOVER:
+        taken = request_handoff(handoff)
+        if taken:
+            listener, old_pid = taken
+            print(f"🤝 Took over port {SERVER_PORT} from PID {old_pid}; it is draining its in-flight requests")
+    if listener is None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.bind(('localhost', SERVER_PORT))
+        except OSError:
+            if FORCE_TAKEOVER:
+                pids = listening_pids(SERVER_PORT)  # oldest first: a --workers supervisor
+                if pids:
+                    terminate(pids[:1])
+        finally: sock.close()
 
+    history_log = history_from_args(args, **HISTORY_STYLE)
+    if args.session_store:
+        session_pool.store = SessionStore(args.session_store.format(port=SERVER_PORT), ttl=float("inf"))
+    file_index.start()
     print(f"📡 Serving v9 on Port {SERVER_PORT}...")
-    with socketserver.ThreadingTCPServer(("", SERVER_PORT), GeminiHandler) as httpd:
-        httpd.serve_forever()
+    try:
+        server.run("", SERVER_PORT, sock=listener, handoff=handoff)
+    finally:
+        history_log.close()
+        shell_pool.close()
+        file_index.close()
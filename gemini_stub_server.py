@@ -0,0 +1,116 @@
+"""
+gemini_stub_server.py
+Local stand-in for the Gemini generateContent endpoint, for scheduler tests and benchmarks.
+
+Point the SDK at it with:
+    genai.Client(api_key="stub", http_options={"base_url": "http://127.0.0.1:PORT"})
+
+Knobs: fixed latency per request, and a 429 injected on every Nth request.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROUTE = re.compile(r"^/[^/]+/models/([^/:]+):generateContent$")
+
+
+class StubState:
+    def __init__(self, latency=0.05, fail_every=0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+def _prompt_text(body):
+    parts = []
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            if "text" in part:
+                parts.append(part["text"])
+    return "\n".join(parts)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        m = ROUTE.match(self.path.split("?")[0])
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not m:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+
+        with self.state.lock:
+            self.state.requests += 1
+            n = self.state.requests
+        time.sleep(self.state.latency)
+
+        if self.state.fail_every and n % self.state.fail_every == 0:
+            self._send_json(429, {"error": {"code": 429, "message": "Resource exhausted (stub)",
+                                            "status": "RESOURCE_EXHAUSTED"}})
+            return
+
+        prompt = _prompt_text(body)
+        config = body.get("generationConfig") or {}
+        if config.get("responseMimeType") == "application/json":
+            text = json.dumps({"stub": True, "model": m.group(1), "request": n})
+        else:
+            text = f"STUB[{m.group(1)}]: {prompt[:60]}"
+
+        prompt_tokens = max(1, len(prompt) // 4)
+        output_tokens = max(1, len(text) // 4)
+        self._send_json(200, {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+            "modelVersion": m.group(1),
+        })
+
+
+def start_stub_server(port=0, latency=0.05, fail_every=0):
+    """Starts the stub on a background thread. Returns (server, base_url, state)."""
+    state = StubState(latency, fail_every)
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Gemini generateContent server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    parser.add_argument("--fail-every", type=int, default=0, help="Return 429 on every Nth request")
+    args = parser.parse_args()
+
+    server, url, _ = start_stub_server(args.port, args.latency, args.fail_every)
+    print(f"🧪 Stub Gemini endpoint on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,20 +1,28 @@
+import functools
 import os
 import subprocess
-import time
+from typing import Optional
+
+from file_edit import edit_file, summary as edit_summary
+import line_index
+from output_capture import DEFAULT_SPILL_DIR, OutputCapture
+from port_inspector import parse_ports, report as port_report
+from process_killer import parse_pids, report as kill_report, terminate
+from shell_pool import ShellPool
+
+# One long-lived bash per agent process: cd/export carry over between Bash calls, and a
+# command costs a pipe round trip instead of a new shell (see shell_pool.py). Long output
+# reaches the agent as head + tail, with the full text left in a file it can read.
+shell_pool = ShellPool(max_workers=1, capture=functools.partial(OutputCapture, spill_dir=DEFAULT_SPILL_DIR))
 
 def Bash(command: str):
     """Executes a command. Returns stdout, stderr, and EXIT CODE. Use this for standard ops."""
     print(f"\n[S] ⚡ Bash: {command}")
     try:
-        # Explicit executable for consistency
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=120,
-            executable="/bin/bash"
-        )
+        # Runs in the agent's persistent shell; the working directory and exports stick
+        result = shell_pool.run(command, timeout=120)
+        if result.timed_out:
+            return f"EXECUTION_ERROR: Command '{command}' timed out after 120 seconds"
 
         display_out = result.stdout[:300] + "..." if len(result.stdout) > 300 else result.stdout
         display_err = result.stderr[:300] + "..." if len(result.stderr) > 300 else result.stderr
@@ -28,88 +36,79 @@ def Bash(command: str):
     except Exception as e:
         return f"EXECUTION_ERROR: {str(e)}"
 
-def InspectPort(port: int):
-    """Returns detailed info (PID, User, Command) for the process on a port."""
-    print(f"\n[S] 🔍 Inspecting Port: {port}")
+def InspectPort(port: int = 0, ports: str = "", command: str = ""):
+    """Returns detailed info (PID, User, Command) for the process on a port.
+    Several at once: ports="8080,8081,8888". With no port, command="gemini_server_*" lists every port such processes listen on."""
+    wanted = parse_ports(port, ports)
+    print(f"\n[S] 🔍 Inspecting Port: {', '.join(map(str, wanted)) or command}")
     try:
-        # Try lsof first
-        cmd = f"lsof -i :{port} -t"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        pid = result.stdout.strip()
-
-        if not pid:
-            # Try ss as fallback
-            cmd_ss = f"ss -lptn 'sport = :{port}' | grep -o 'pid=[0-9]*' | cut -d= -f2"
-            result_ss = subprocess.run(cmd_ss, shell=True, capture_output=True, text=True)
-            pid = result_ss.stdout.strip()
-
-        if not pid:
-            print("[S] 🚫 Port is free (no PID found).")
-            return "PORT_STATUS: FREE"
-
-        # Get process details
-        print(f"[S] 🕵️ Found PID {pid}. Fetching details...")
-        ps_cmd = f"ps -fp {pid}"
-        ps_result = subprocess.run(ps_cmd, shell=True, capture_output=True, text=True)
-
-        return f"PORT_STATUS: OCCUPIED\nPID: {pid}\nDETAILS:\n{ps_result.stdout}"
+        # One pass over /proc (see port_inspector.py) instead of lsof / ss / ps per port
+        return port_report(wanted, command or None)
     except Exception as e:
         return f"INSPECTION_ERROR: {str(e)}"
 
-def KillProcess(pid: int):
-    """Smart kill. Tries SIGTERM, waits, checks, then tries Sudo if needed."""
-    print(f"\n[S] 💀 Attempting to kill PID: {pid}")
-
-    # 1. Try standard kill
-    subprocess.run(f"kill {pid}", shell=True)
-    time.sleep(1)
-
-    # 2. Check if still alive
-    check = subprocess.run(f"ps -p {pid}", shell=True, capture_output=True)
-    if check.returncode != 0:
-        print("[S] ☠️ Process successfully killed.")
-        return "STATUS: KILLED (Standard)"
-
-    # 3. Try Sudo Kill
-    print("[S] 🛡️ Standard kill failed. Trying sudo -n kill -9...")
-    sudo_res = subprocess.run(f"sudo -n kill -9 {pid}", shell=True, capture_output=True, text=True)
-
-    if sudo_res.returncode == 0:
-        print("[S] ☠️ Process killed with SUDO.")
-        return "STATUS: KILLED (Sudo Force)"
-    else:
-        print(f"[S] ❌ Sudo failed. Output: {sudo_res.stderr}")
-        return f"STATUS: FAILED_TO_KILL. Stderr: {sudo_res.stderr}"
-
-def Edit(path: str, content: str):
-    """Writes content to a file (overwrites)."""
+def KillProcess(pid: int = 0, pids: str = "", grace: float = 5):
+    """Smart kill. SIGTERMs the process with its process group and children, returns as soon as it exits,
+    SIGKILLs whatever is left after `grace` seconds, then tries Sudo if needed. Several at once: pids="123,456"."""
+    wanted = parse_pids(pid, pids)
+    print(f"\n[S] 💀 Attempting to kill PID: {', '.join(map(str, wanted))}")
+    try:
+        # Waits on pidfds (see process_killer.py) instead of `kill`, a fixed sleep and `ps -p`
+        return kill_report(terminate(wanted, grace=grace, sudo=True))
+    except Exception as e:
+        return f"STATUS: FAILED_TO_KILL. {str(e)}"
+
+def Edit(path: str, content: Optional[str] = None, old_string: str = "", new_string: str = "", diff: str = "",
+         expected_sha: str = "", replace_all: bool = False):
+    """Edits a file. To change part of it, give old_string and new_string (old_string must match the file
+    exactly, once, unless replace_all) or a unified diff; content overwrites (or creates) the whole file,
+    "" empties it.
+    expected_sha: the sha256 (8+ hex digits) an earlier Edit returned; refuses if the file changed since."""
     expanded_path = os.path.expanduser(path)
     print(f"\n[S] ✏️ Editing file: {expanded_path}")
     try:
-        os.makedirs(os.path.dirname(os.path.abspath(expanded_path)), exist_ok=True)
-        with open(expanded_path, "w") as f:
-            f.write(content)
-        print(f"[S] ✅ File written ({len(content)} chars).")
-        return f"Successfully wrote to {expanded_path}"
+        # Temp file + rename, answered with a compact diff (see file_edit.py)
+        result = edit_file(expanded_path, content, old_string, new_string, diff, expected_sha, replace_all)
+        print(f"[S] ✅ {result.mode}: +{result.added} -{result.removed} lines.")
+        return edit_summary(result)
     except Exception as e:
         return f"Error writing file: {str(e)}"
 
-def SmartRead(path: str, lines: int = 500, from_bottom: bool = False):
-    """Reads a file from the filesystem, optionally from the bottom."""
+def SmartRead(path: str, lines: int = 500, from_bottom: bool = False, start_line: int = 0,
+              byte_offset: int = -1, byte_count: int = 65536, follow_seconds: float = 0):
+    """Reads a file from the filesystem, optionally from the bottom.
+    start_line: read `lines` lines starting at this line (1-based) instead; fast even on huge files.
+    byte_offset/byte_count: read raw bytes instead; the reply ends with the offset to continue from.
+    follow_seconds: with byte_offset, wait up to this long for a log to grow past it (like tail -f)."""
     expanded_path = os.path.expanduser(path)
-    print(f"\n[S] 👁️ Smart Reading file: {expanded_path} (lines={lines}, from_bottom={from_bottom})")
+    print(f"\n[S] 👁️ Smart Reading file: {expanded_path} (lines={lines}, from_bottom={from_bottom}, "
+          f"start_line={start_line}, byte_offset={byte_offset})")
     if not os.path.exists(expanded_path):
         return f"Error: File {expanded_path} not found."
     try:
-        with open(expanded_path, "r") as f:
-            all_lines = f.readlines()
-        
-        if from_bottom:
-            selected_lines = all_lines[-lines:]
+        # Only the requested part is read: tails by seeking backwards, line ranges through
+        # a cached line-offset index, bytes directly (see line_index.py).
+        if byte_offset >= 0:
+            if follow_seconds > 0:
+                line_index.wait_for_growth(expanded_path, byte_offset, follow_seconds)
+            chunk = line_index.read_bytes(expanded_path, byte_offset, byte_count)
+            note = " (file is now shorter: it was truncated or replaced)" if byte_offset > chunk.size else ""
+            return (chunk.data.decode(errors="replace") +
+                    f"\n[bytes {chunk.start}-{chunk.end} of {chunk.size}{note}; continue with byte_offset={chunk.end}]")
+        if start_line > 0:
+            chunk, total = line_index.read_lines(expanded_path, start_line - 1, lines)
+            text = chunk.data.decode(errors="replace")
+            last = start_line - 1 + text.count("\n") + (bool(text) and not text.endswith("\n"))
+            footer = f"\n[lines {start_line}-{last} of {total}]"
+        elif from_bottom:
+            chunk = line_index.read_tail(expanded_path, lines)
+            text, footer = chunk.data.decode(errors="replace"), ""
         else:
-            selected_lines = all_lines[:lines]
-        
-        return "".join(selected_lines)
+            chunk = line_index.read_head(expanded_path, lines)
+            text, footer = chunk.data.decode(errors="replace"), ""
+        if chunk.truncated:
+            footer += f"\n[only bytes {chunk.start}-{chunk.end} of {chunk.size} read (long lines); use byte_offset for more]"
+        return text + footer
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
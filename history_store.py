@@ -0,0 +1,325 @@
+"""
+history_store.py
+Disk-backed, append-only log of console history entries.
+
+The consoles kept their history in a process-global list, so every phoenix redeploy
+(execute_phoenix.sh / phoenix_deploy.sh / evolve_agent.sh kill and restart the server)
+lost it and long-lived servers grew without bound. HistoryStore appends each entry to
+a single file as a length-prefixed record and only ever reads it back through an mmap.
+A restart reads the newest records backwards from the end of the file, so reload time
+depends on how much of the tail is wanted, not on how long the log is.
+
+File layout:
+    header  b"CHLOG\\0\\1\\0" + <Q first entry id>
+    record  <I payload length> <I crc32(payload)> <Q entry id> payload <I payload length>
+    payload <B role length> role text                                  (utf-8)
+
+The trailing length lets the log be walked backwards. A record torn by a crash
+mid-append fails its length/crc check on open and is truncated away.
+
+Durability (--history-fsync):
+  always    fsync after every append
+  interval  fsync at most every fsync_interval seconds (default)
+  never     leave it to the OS; records still survive a killed process
+
+Compaction rewrites the file keeping only the newest `max_entries` records. It runs
+once the log is a quarter over that bound, and on clear().
+
+Several processes may share one log (a server draining after a socket handoff next to
+its replacement, pre-forked workers, which reopen the file after the fork). Writers take an exclusive flock for each append,
+compaction or clear. A store notices entries other processes appended (refresh()) and
+files they replaced by compacting; `generation` changes when it had to reopen the file.
+Within a process it is not thread-safe on its own: HistoryLog serializes access.
+"""
+import bisect
+import contextlib
+import fcntl
+import mmap
+import os
+import struct
+import time
+import zlib
+
+MAGIC = b"CHLOG\x00\x01\x00"
+HEADER = struct.Struct("<8sQ")
+RECORD = struct.Struct("<IIQ")
+FOOTER = struct.Struct("<I")
+FSYNC_POLICIES = ("always", "interval", "never")
+DEFAULT_FSYNC = "interval"
+DEFAULT_FSYNC_INTERVAL = 1.0
+MARK_EVERY = 1024  # remember the offset of every Nth id so seeks never walk far
+
+
+class HistoryStore:
+    def __init__(self, path, fsync=DEFAULT_FSYNC, fsync_interval=DEFAULT_FSYNC_INTERVAL,
+                 max_entries=None, clock=time.monotonic):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, not {fsync!r}")
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_entries = max_entries
+        self.clock = clock
+        self.generation = 0
+        self._last_sync = clock()
+        self._map = None
+        self._fd = None
+        self._open()
+
+    # --- file handling ---
+
+    def _open(self):
+        if self._fd is not None:
+            os.close(self._fd)
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._pid = os.getpid()
+        self._marks = {}
+        self._mark_ids = []
+        self.generation += 1
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            self._end = os.fstat(self._fd).st_size
+            if self._end == 0:
+                os.write(self._fd, HEADER.pack(MAGIC, 1))
+                self._end = HEADER.size
+            magic, self.first_id = HEADER.unpack(os.pread(self._fd, HEADER.size, 0))
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a console history log")
+            self._recover()
+        except BaseException:
+            os.close(self._fd)
+            self._fd = None
+            raise
+        finally:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _replaced(self, st):
+        """True if another process swapped in a compacted file since we opened ours."""
+        try:
+            return os.stat(self.path).st_ino != st.st_ino
+        except FileNotFoundError:
+            return False  # mid-replace; the new file shows up under the lock
+
+    @contextlib.contextmanager
+    def _locked(self, mode=fcntl.LOCK_EX):
+        """Holds the file lock, reopening a replaced file and catching up on foreign appends first."""
+        if self._pid != os.getpid():
+            self._open()  # forked worker: a shared descriptor would share its flock with the parent
+        while True:
+            fcntl.flock(self._fd, mode)
+            st = os.fstat(self._fd)
+            if not self._replaced(st):
+                break
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._open()
+        try:
+            if st.st_size != self._end:  # other processes appended (or truncated a torn record)
+                self._end = st.st_size
+                self._recover()
+            yield
+        finally:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Picks up entries and compactions from other processes sharing the file."""
+        with self._locked(fcntl.LOCK_SH):
+            pass
+
+    def _view(self):
+        """Read-only mmap covering at least everything appended so far."""
+        if self._map is None or len(self._map) < self._end:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def close(self):
+        if self._fd is None:
+            return
+        if self.fsync != "never":
+            os.fsync(self._fd)
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def count(self):
+        return self.last_id - self.first_id + 1
+
+    # --- records ---
+
+    def _read_record(self, view, offset):
+        """(id, role, text, next_offset) of the record at `offset`; ValueError if it is damaged."""
+        length, crc, entry_id = RECORD.unpack_from(view, offset)
+        start = offset + RECORD.size
+        end = start + length
+        if end + FOOTER.size > self._end or FOOTER.unpack_from(view, end)[0] != length:
+            raise ValueError(f"torn record at offset {offset}")
+        payload = view[start:end]
+        if zlib.crc32(payload) != crc:
+            raise ValueError(f"checksum mismatch at offset {offset}")
+        role_len = payload[0]
+        role = payload[1:1 + role_len].decode("utf-8", "surrogatepass")
+        text = payload[1 + role_len:].decode("utf-8", "surrogatepass")
+        return entry_id, role, text, end + FOOTER.size
+
+    def _next_offset(self, view, offset):
+        """Offset of the record after the one at `offset` (header only, no decode)."""
+        return offset + RECORD.size + FOOTER.unpack_from(view, offset)[0] + FOOTER.size
+
+    def _previous_offset(self, view, offset):
+        """Offset of the record that ends at `offset`."""
+        length = FOOTER.unpack_from(view, offset - FOOTER.size)[0]
+        return offset - FOOTER.size - length - RECORD.size
+
+    def _recover(self):
+        """Finds the last entry id from the end of the file, truncating a torn trailing record."""
+        self.last_id = self.first_id - 1
+        if self._end == HEADER.size:
+            return
+        view = self._view()
+        try:
+            last = self._previous_offset(view, self._end)
+            if last >= HEADER.size:
+                entry_id, _, _, next_offset = self._read_record(view, last)
+                if next_offset == self._end:
+                    self.last_id = entry_id
+                    return
+        except (ValueError, struct.error):
+            pass
+        # The tail is damaged (crash mid-append): keep every record that still checks out.
+        offset, good = HEADER.size, HEADER.size
+        while True:
+            try:
+                entry_id, _, _, offset = self._read_record(view, offset)
+            except (ValueError, struct.error, IndexError):
+                break
+            self.last_id, good = entry_id, offset
+        print(f"⚠️  {self.path}: dropped {self._end - good} bytes of torn history after entry {self.last_id}")
+        self._map.close()
+        self._map = None
+        os.ftruncate(self._fd, good)
+        self._end = good
+
+    def _mark(self, entry_id, offset):
+        if entry_id % MARK_EVERY == 0 and entry_id not in self._marks:
+            self._marks[entry_id] = offset
+            bisect.insort(self._mark_ids, entry_id)
+
+    def _offset_of(self, entry_id):
+        """File offset of record `entry_id`, walking from the nearest known position."""
+        if entry_id > self.last_id:
+            return self._end
+        entry_id = max(entry_id, self.first_id)
+        # (distance, start id, start offset, walk backwards?)
+        options = [(self.last_id + 1 - entry_id, self.last_id + 1, self._end, True),
+                   (entry_id - self.first_id, self.first_id, HEADER.size, False)]
+        i = bisect.bisect_left(self._mark_ids, entry_id)
+        if i < len(self._mark_ids):
+            mark = self._mark_ids[i]
+            options.append((mark - entry_id, mark, self._marks[mark], True))
+        if i > 0:
+            mark = self._mark_ids[i - 1]
+            options.append((entry_id - mark, mark, self._marks[mark], False))
+        _, current, offset, backwards = min(options)
+        view = self._view()
+        while current != entry_id:
+            if backwards:
+                offset = self._previous_offset(view, offset)
+                current -= 1
+            else:
+                offset = self._next_offset(view, offset)
+                current += 1
+            self._mark(current, offset)
+        return offset
+
+    # --- public API ---
+
+    def append(self, role, text):
+        """Appends one entry and returns its id."""
+        role_bytes = role.encode("utf-8", "surrogatepass")
+        payload = bytes([len(role_bytes)]) + role_bytes + (text or "").encode("utf-8", "surrogatepass")
+        with self._locked():
+            entry_id = self.last_id + 1
+            record = RECORD.pack(len(payload), zlib.crc32(payload), entry_id) + payload + FOOTER.pack(len(payload))
+            os.write(self._fd, record)
+            self._mark(entry_id, self._end)
+            self._end += len(record)
+            self.last_id = entry_id
+
+            if self.fsync == "always" or (self.fsync == "interval"
+                                          and self.clock() - self._last_sync >= self.fsync_interval):
+                os.fsync(self._fd)
+                self._last_sync = self.clock()
+            if self.max_entries and self.count > self.max_entries + max(self.max_entries // 4, 1):
+                self._compact(self.max_entries)
+        return entry_id
+
+    def read(self, first_id, count):
+        """Up to `count` entries as (id, role, text), starting at `first_id`."""
+        first_id = max(first_id, self.first_id)
+        count = min(count, self.last_id - first_id + 1)
+        if count <= 0:
+            return []
+        offset = self._offset_of(first_id)
+        view = self._view()
+        entries = []
+        for _ in range(count):
+            entry_id, role, text, offset = self._read_record(view, offset)
+            entries.append((entry_id, role, text))
+        return entries
+
+    def tail(self, count):
+        """The newest `count` entries, oldest first."""
+        return self.read(self.last_id - count + 1, count)
+
+    def clear(self):
+        """Drops every entry; ids keep counting from where they were."""
+        with self._locked():
+            self._rewrite(self._end, self.last_id + 1)
+
+    def compact(self, keep=None):
+        """Rewrites the log keeping only the newest `keep` (default max_entries) entries."""
+        keep = self.max_entries if keep is None else keep
+        if keep is not None:
+            with self._locked():
+                self._compact(keep)
+
+    def _compact(self, keep):
+        if self.count > keep:
+            new_first = self.last_id - keep + 1
+            self._rewrite(self._offset_of(new_first), new_first)
+
+    def _rewrite(self, offset, first_id):
+        view = self._view()
+        tmp_path = self.path + ".compact"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, first_id))
+            for start in range(offset, self._end, 1 << 20):
+                f.write(view[start:min(start + (1 << 20), self._end)])
+            f.flush()
+            os.fsync(f.fileno())
+        shift = offset - HEADER.size
+        marks = {i: o - shift for i, o in self._marks.items() if i >= first_id}
+        os.replace(tmp_path, self.path)  # still holding the old file's lock, so writers wait
+        dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self._open()
+        self._marks = marks
+        self._mark_ids = sorted(marks)
@@ -33,9 +33,13 @@ def hydrate_file(filename):
         f.write(content)
     print(f"✅ Hydrated: {filename}")
 
-if __name__ == "__main__":
+def run(context):
     os.makedirs(DEST_DIR, exist_ok=True)
     files = [f for f in os.listdir(SOURCE_DIR) if f.endswith('.md')]
     print(f"--- 💧 Hydrating {len(files)} Personas ---")
     for f in files:
         hydrate_file(f)
+
+if __name__ == "__main__":
+    from stage_context import StageContext
+    run(StageContext())
@@ -1,40 +1,23 @@
-import json
 import os
-import re
+
+from hydration import hydrate_dir, load_var_map, print_report
+from stage_context import StageContext
 
 PERSONAS_DIR = "extracted_personas"
 OUTPUT_DIR = "hydrated_personas"
 MAP_FILE = "variable_map_master.json"
 
-def main():
+def run(context):
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
-    with open(MAP_FILE, 'r') as f:
-        var_map = json.load(f)
+    var_map = load_var_map(MAP_FILE)
 
     print(f"--- 💧 Hydrating Personas using {len(var_map)} variables ---")
 
-    files = [f for f in os.listdir(PERSONAS_DIR) if f.endswith(".md")]
-    
-    for filename in files:
-        with open(os.path.join(PERSONAS_DIR, filename), 'r') as f:
-            content = f.read()
-
-        # 1. Direct Substitution ${VAR} -> Value
-        for var_name, value in var_map.items():
-            # Handle keys that might strictly be 'A' vs '${A}'
-            clean_key = var_name.replace("${", "").replace("}", "")
-            pattern = r"\$\{" + re.escape(clean_key) + r"\}"
-            content = re.sub(pattern, str(value), content)
-
-        # 2. Heuristic Cleanup (Optional: remove remaining ${} if they look like artifacts)
-        # We leave them for now so the Audit can catch them.
-
-        with open(os.path.join(OUTPUT_DIR, filename), 'w') as f:
-            f.write(content)
-            
-        print(f"💧 Hydrated {filename}")
+    # Direct Substitution ${VAR} -> Value, one pass per file across a process pool.
+    # Remaining ${} artifacts are left in place and reported so the Audit can catch them.
+    print_report(hydrate_dir(PERSONAS_DIR, OUTPUT_DIR, var_map))
 
 if __name__ == "__main__":
-    main()
+    run(StageContext())
@@ -0,0 +1,271 @@
+"""
+hydration.py
+Single-pass persona hydration engine shared by the hydrate_* scripts.
+
+The old scripts looped over every map entry and called re.sub / str.replace once per
+variable, so each persona was copied (and a regex compiled) once per key. Here the
+variable map plus any overrides are compiled once into an Aho-Corasick automaton with
+leftmost-longest semantics (so ${A.planFilePath} wins over ${A}), and each persona is
+rewritten in one scan that also counts substitutions and collects the ${...} tokens
+nothing resolved (what audit_hydration.py used to grep for afterwards).
+
+Files are hydrated across a process pool; each worker builds the automaton once.
+
+Usage:
+    python3 hydration.py --map master_variable_map.json --input extracted_personas --output hydrated_personas
+    python3 hydration.py --audit hydrated_personas
+"""
+import argparse
+import json
+import os
+import re
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# ${A}, ${mW.name}, ${M$.name}
+TOKEN_RE = re.compile(r"\$\{[A-Za-z0-9_$.]+\}")
+IDENT_RE = re.compile(r"[A-Za-z0-9_$]+(?:\.[A-Za-z0-9_$]+)*")
+# Legit shell-style placeholders that are expected to survive hydration.
+IGNORED_TOKENS = frozenset({"${HOME}", "${PATH}"})
+
+_TOKEN_START = "${"
+_UNRESOLVED = object()
+
+Match = namedtuple("Match", ["start", "end", "value"])
+HydrationReport = namedtuple("HydrationReport", ["source", "destination", "substitutions", "unresolved"])
+
+
+def normalize_key(key):
+    """Map keys come as "${A}", "A" or "A.name" (wrapped to ${...}), or as raw phrases (kept as-is)."""
+    if key.startswith(_TOKEN_START):
+        return key
+    if IDENT_RE.fullmatch(key):
+        return "${" + key + "}"
+    return key
+
+
+def load_var_map(*paths, overrides=None):
+    """Merges JSON maps (later files win), then overrides, into {normalized key: str value}."""
+    merged = {}
+    for path in paths:
+        with open(path, "r") as f:
+            for key, value in json.load(f).items():
+                merged[normalize_key(key)] = str(value)
+    for key, value in (overrides or {}).items():
+        merged[normalize_key(key)] = str(value)
+    return merged
+
+
+class AhoCorasick:
+    """Multi-pattern matcher over {pattern: value} returning leftmost-longest, non-overlapping matches."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.depth = [0]
+        self.out = [None]  # pattern value ending exactly at this state
+        self.out_link = [0]  # nearest proper suffix state that ends a pattern
+        for pattern, value in patterns.items():
+            if pattern:
+                self._add(pattern, value)
+        self._link()
+
+    def _add(self, pattern, value):
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.depth.append(self.depth[state] + 1)
+                self.out.append(None)
+                self.out_link.append(0)
+                self.goto[state][ch] = nxt
+            state = nxt
+        self.out[state] = (value,)
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out_link[nxt] = self.fail[nxt] if self.out[self.fail[nxt]] else self.out_link[self.fail[nxt]]
+                queue.append(nxt)
+
+    def finditer(self, text):
+        goto, fail, depth, out, out_link = self.goto, self.fail, self.depth, self.out, self.out_link
+        state = 0
+        cursor = 0
+        pending = []
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            s = state if out[state] else out_link[state]
+            while s:
+                start = i + 1 - depth[s]
+                if start >= cursor:
+                    pending.append(Match(start, i + 1, out[s][0]))
+                s = out_link[s]
+
+            # No match found later can start before the oldest character the current state still spans.
+            horizon = i + 1 - depth[state]
+            while pending:
+                best = min(pending, key=lambda m: (m.start, -m.end))
+                if best.start >= horizon:
+                    break
+                yield best
+                cursor = best.end
+                pending = [m for m in pending if m.start >= cursor]
+
+        while pending:
+            best = min(pending, key=lambda m: (m.start, -m.end))
+            yield best
+            cursor = best.end
+            pending = [m for m in pending if m.start >= cursor]
+
+
+class Hydrator:
+    def __init__(self, var_map, ignore=IGNORED_TOKENS):
+        self.var_map = dict(var_map)
+        self.ignore = ignore
+        patterns = dict(self.var_map)
+        # Any "${" that no known key covers marks an unresolved token.
+        patterns.setdefault(_TOKEN_START, _UNRESOLVED)
+        self.automaton = AhoCorasick(patterns)
+
+    def hydrate(self, text):
+        """Returns (hydrated_text, Counter of substituted keys, list of unresolved tokens)."""
+        parts = []
+        substitutions = Counter()
+        unresolved = []
+        pos = 0
+        for m in self.automaton.finditer(text):
+            if m.start < pos:
+                continue  # inside an unresolved token we already copied through
+            parts.append(text[pos:m.start])
+            if m.value is _UNRESOLVED:
+                token = TOKEN_RE.match(text, m.start)
+                end = token.end() if token else m.end
+                if token and token.group(0) not in self.ignore:
+                    unresolved.append(token.group(0))
+                parts.append(text[m.start:end])
+                pos = end
+            else:
+                substitutions[text[m.start:m.end]] += 1
+                parts.append(m.value)
+                pos = m.end
+        parts.append(text[pos:])
+        return "".join(parts), substitutions, unresolved
+
+
+def audit_text(text, ignore=IGNORED_TOKENS):
+    """Unresolved ${...} tokens in already-hydrated text."""
+    return [t for t in TOKEN_RE.findall(text) if t not in ignore]
+
+
+# --- Process pool plumbing: one Hydrator per worker ---
+_WORKER_HYDRATOR = None
+
+
+def _init_worker(var_map):
+    global _WORKER_HYDRATOR
+    _WORKER_HYDRATOR = Hydrator(var_map)
+
+
+def _hydrate_one(pair):
+    src, dst = pair
+    with open(src, "r") as f:
+        content = f.read()
+    hydrated, substitutions, unresolved = _WORKER_HYDRATOR.hydrate(content)
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    with open(dst, "w") as f:
+        f.write(hydrated)
+    return HydrationReport(src, dst, dict(substitutions), unresolved)
+
+
+def hydrate_files(pairs, var_map, workers=None):
+    """Hydrates [(src, dst)] in parallel. Returns HydrationReports in input order."""
+    pairs = list(pairs)
+    if not pairs:
+        return []
+    workers = workers or min(len(pairs), os.cpu_count() or 1)
+    if workers <= 1:
+        _init_worker(var_map)
+        return [_hydrate_one(p) for p in pairs]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(var_map,)) as pool:
+        return list(pool.map(_hydrate_one, pairs, chunksize=max(1, len(pairs) // (workers * 4))))
+
+
+def hydrate_dir(input_dir, output_dir, var_map, workers=None, suffix=".md"):
+    files = sorted(f for f in os.listdir(input_dir) if f.endswith(suffix))
+    pairs = [(os.path.join(input_dir, f), os.path.join(output_dir, f)) for f in files]
+    return hydrate_files(pairs, var_map, workers)
+
+
+def print_report(reports):
+    """Per-file substitution counts plus the unresolved-token audit. Returns the number of dirty files."""
+    dirty = 0
+    for r in reports:
+        count = sum(r.substitutions.values())
+        name = os.path.basename(r.destination)
+        if count:
+            print(f"💧 Hydrated {name} ({count} substitutions, {len(r.substitutions)} variables)")
+        else:
+            print(f"➖ No changes in {name} (Check if map covers this file)")
+        if r.unresolved:
+            dirty += 1
+            print(f"⚠️  {name}: Found {len(r.unresolved)} unhydrated variables.")
+            print(f"    Examples: {r.unresolved[:3]}")
+    if dirty == 0:
+        print("✅ CLEAN. No unhydrated variables found in personas.")
+    else:
+        print(f"❌ ISSUES. {dirty} personas still contain raw variables.")
+    return dirty
+
+
+def audit_dir(personas_dir, ignore=IGNORED_TOKENS):
+    """Audit-only mode for already-hydrated directories. Returns {filename: [unresolved tokens]}."""
+    findings = {}
+    for filename in sorted(os.listdir(personas_dir)):
+        if not filename.endswith(".md"):
+            continue
+        with open(os.path.join(personas_dir, filename), "r") as f:
+            suspicious = audit_text(f.read(), ignore)
+        if suspicious:
+            findings[filename] = suspicious
+    return findings
+
+
+def print_audit(findings):
+    for filename, suspicious in findings.items():
+        print(f"⚠️  {filename}: Found {len(suspicious)} unhydrated variables.")
+        print(f"    Examples: {suspicious[:3]}")
+    if not findings:
+        print("✅ CLEAN. No unhydrated variables found in personas.")
+    else:
+        print(f"❌ ISSUES. {len(findings)} personas still contain raw variables.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hydrate extracted personas with a variable map")
+    parser.add_argument("--map", action="append", default=[], help="Variable map JSON (repeatable; later maps win)")
+    parser.add_argument("--input", default="extracted_personas")
+    parser.add_argument("--output", default="hydrated_personas")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--audit", metavar="DIR", help="Only audit DIR for unhydrated ${...} tokens")
+    args = parser.parse_args()
+
+    if args.audit:
+        print("--- 🧐 Auditing Hydrated Personas for Artifacts ---")
+        print_audit(audit_dir(args.audit))
+    else:
+        var_map = load_var_map(*(args.map or ["master_variable_map.json"]))
+        print(f"--- 💧 Hydrating Personas using {len(var_map)} variables ---")
+        print_report(hydrate_dir(args.input, args.output, var_map, args.workers))
@@ -1,14 +1,14 @@
 # Save as: identify_swarm.py
 import os
-from google import genai
 from google.genai import types
 import json
 
-# Init Client
-client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
+from gemini_scheduler import Job, GeminiScheduler
+from llm_cache import cache_parser
+from stage_context import StageContext
 
-def identify_persona(filename, content):
-    prompt = f"""
+def build_identify_prompt(filename, content):
+    return f"""
     You are analyzing a system prompt extracted from a software engineering agent (Claude Code).
     
     FILENAME: {filename}
@@ -27,17 +27,23 @@ def identify_persona(filename, content):
         "description": "..."
     }}
     """
-    
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            response_mime_type="application/json"
-        )
-    )
-    return json.loads(response.text)
 
-def main():
+def identify_personas(client, named_contents, cache=None):
+    """Identifies every (filename, content) concurrently. Results (dict or exception) keep input order."""
+    config = types.GenerateContentConfig(response_mime_type="application/json")
+    jobs = [Job("gemini-2.0-flash", build_identify_prompt(f, c), config) for f, c in named_contents]
+    results = []
+    for response in GeminiScheduler(client, cache=cache).run(jobs, stage="identify_swarm"):
+        if isinstance(response, Exception):
+            results.append(response)
+            continue
+        try:
+            results.append(json.loads(response.text))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def main(context, cache_mode=None):
     print("--- 🕵️‍♀️ Identifying Swarm Personas ---")
     directory = "hydrated_personas"
     
@@ -48,38 +54,47 @@ def main():
         print(f"❌ Directory '{directory}' not found.")
         return
 
+    named_contents = []
     for f in os.listdir(directory):
         if f.startswith("persona_") and f.endswith(".md"):
-            path = os.path.join(directory, f)
-            with open(path, "r") as file:
-                content = file.read()
-            
-            try:
-                info = identify_persona(f, content)
-                
-                # --- FIX START: Handle List vs Dict return ---
-                if isinstance(info, list):
-                    if len(info) > 0:
-                        info = info[0]
-                    else:
-                        raise ValueError("Gemini returned an empty list.")
-                # --- FIX END ---
+            with open(os.path.join(directory, f), "r") as file:
+                named_contents.append((f, file.read()))
+
+    identities = identify_personas(context.client, named_contents, context.cache(cache_mode))
 
-                print(f"✅ {f} -> {info.get('filename', 'UNKNOWN')} ({info.get('role', 'UNKNOWN')})")
-                
-                if 'filename' in info:
-                    # Renaissance: Rename the file
-                    new_path = os.path.join(directory, info['filename'])
-                    os.rename(path, new_path)
-                    results.append(info)
+    for (f, content), info in zip(named_contents, identities):
+        path = os.path.join(directory, f)
+        try:
+            if isinstance(info, Exception):
+                raise info
+            
+            # --- FIX START: Handle List vs Dict return ---
+            if isinstance(info, list):
+                if len(info) > 0:
+                    info = info[0]
                 else:
-                    print(f"⚠️  Skipping {f}: No filename in response.")
+                    raise ValueError("Gemini returned an empty list.")
+            # --- FIX END ---
+
+            print(f"✅ {f} -> {info.get('filename', 'UNKNOWN')} ({info.get('role', 'UNKNOWN')})")
+            
+            if 'filename' in info:
+                # Renaissance: Rename the file
+                new_path = os.path.join(directory, info['filename'])
+                os.rename(path, new_path)
+                results.append(info)
+            else:
+                print(f"⚠️  Skipping {f}: No filename in response.")
 
-            except Exception as e:
-                print(f"❌ Failed to identify {f}: {e}")
+        except Exception as e:
+            print(f"❌ Failed to identify {f}: {e}")
 
     with open("swarm_identity_map.json", "w") as f:
         json.dump(results, f, indent=2)
 
+def run(context):
+    args = context.parse_args(cache_parser("Identify swarm personas with Gemini"))
+    main(context, args.cache_mode)
+
 if __name__ == "__main__":
-    main()
+    run(StageContext())
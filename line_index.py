@@ -0,0 +1,224 @@
+"""
+line_index.py
+Reading pieces of (possibly huge, possibly growing) files without reading all of them.
+
+SmartRead used to `readlines()` the whole file and slice it, so the last 50 lines of a
+multi-GB server log cost the whole log in memory. Here:
+
+  - read_tail() seeks backwards from the end in BLOCK-sized steps until it has seen
+    enough newlines;
+  - read_head() reads forward only until it has enough lines;
+  - read_lines() serves any line range through a LineIndex: the byte offset of every
+    CHECKPOINT-th line, found by scanning an mmap of the file once. The index is cached
+    per file and stamped with (inode, size, mtime); when a log only grew (the bytes the
+    last scan ended on are unchanged), the index is extended from where that scan
+    stopped instead of being rebuilt;
+  - read_bytes() reads a byte range, and wait_for_growth() lets a caller follow a log
+    (tail -f) from the offset a previous read ended at.
+
+Every read stops after `max_bytes`, so a file without newlines can't blow one up either.
+"""
+import mmap
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict, namedtuple
+
+BLOCK = 64 * 1024
+SCAN_BLOCK = 4 * 1024 * 1024
+STRIDE = 4096
+CHECKPOINT = 1024  # lines between recorded offsets: 8 bytes of index per 1024 lines
+DEFAULT_MAX_BYTES = 256 * 1024
+MAX_CACHED_INDEXES = 32
+FOLLOW_POLL = 0.1
+EDGE_BYTES = 64
+
+# `data` is bytes [start, end) of a file that was `size` bytes when read; `truncated` when max_bytes cut it short.
+Chunk = namedtuple("Chunk", "data start end size truncated")
+
+
+def read_head(path, lines, max_bytes=DEFAULT_MAX_BYTES):
+    """The first `lines` lines."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        data = bytearray()
+        seen = 0
+        while seen < lines and len(data) < max_bytes:
+            block = f.read(min(BLOCK, max_bytes - len(data)))
+            if not block:
+                break
+            seen += block.count(b"\n")
+            data += block
+        end = _nth_newline_end(data, lines) if seen >= lines else len(data)
+        truncated = seen < lines and len(data) >= max_bytes and f.read(1) != b""
+        return Chunk(bytes(data[:end]), 0, end, size, truncated)
+
+
+def read_tail(path, lines, max_bytes=DEFAULT_MAX_BYTES):
+    """The last `lines` lines, read backwards from the end one BLOCK at a time."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        pos = size
+        data = b""
+        while pos > 0 and len(data) < max_bytes:
+            step = min(BLOCK, pos, max_bytes - len(data))
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+            if data.count(b"\n") - data.endswith(b"\n") >= lines:  # a final newline ends a line, starts none
+                break
+        start = len(data) - 1 if data.endswith(b"\n") else len(data)
+        for _ in range(lines):
+            start = data.rfind(b"\n", 0, start)
+            if start < 0:
+                break
+        cut = max(start + 1, 0)
+        return Chunk(data[cut:], pos + cut, size, size, start < 0 and pos > 0)
+
+
+def read_bytes(path, offset, count, max_bytes=DEFAULT_MAX_BYTES):
+    """Bytes [offset, offset + count), at most max_bytes of them."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        offset = max(0, min(offset, size))
+        f.seek(offset)
+        data = f.read(min(count, max_bytes))
+        return Chunk(data, offset, offset + len(data), size, count > max_bytes and offset + len(data) < size)
+
+
+def wait_for_growth(path, offset, timeout):
+    """Waits up to `timeout` seconds for the file to grow past `offset`; returns its size."""
+    deadline = time.monotonic() + timeout
+    while True:
+        size = os.stat(path).st_size
+        if size != offset or time.monotonic() >= deadline:
+            return size
+        time.sleep(FOLLOW_POLL)
+
+
+def _nth_newline_end(data, n, start=0):
+    """Offset just past the n-th newline at or after `start` (len(data) if there are fewer)."""
+    pos = start
+    for _ in range(n):
+        pos = data.find(b"\n", pos)
+        if pos < 0:
+            return len(data)
+        pos += 1
+    return pos
+
+
+class LineIndex:
+    """Offsets of every CHECKPOINT-th line start of one file, extended as the file grows."""
+
+    def __init__(self, path):
+        self.path = path
+        self.stamp = None
+        self.checkpoints = array("Q", [0])  # checkpoints[k] = offset of line k * CHECKPOINT
+        self.newlines = 0
+        self.scanned = 0
+        self.edge = b""  # the last EDGE_BYTES scanned, to tell an append from a rewrite
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """Brings the index up to date with the file; True if it had to start over."""
+        st = os.stat(self.path)
+        stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if stamp == self.stamp:
+            return False
+        with open(self.path, "rb") as f:
+            # Only appended to (a growing log) if the bytes the last scan ended on are still there.
+            appended = (self.stamp is not None and st.st_ino == self.stamp[0] and st.st_size > self.scanned
+                        and self._edge(f) == self.edge)
+            if not appended:  # new, replaced, truncated or rewritten: nothing we know still holds
+                self.checkpoints = array("Q", [0])
+                self.newlines = 0
+                self.scanned = 0
+            if st.st_size > self.scanned:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    self._scan(mm, min(len(mm), st.st_size))
+            self.edge = self._edge(f)
+        self.stamp = stamp
+        return not appended
+
+    def _edge(self, f):
+        f.seek(max(0, self.scanned - EDGE_BYTES))
+        return f.read(min(self.scanned, EDGE_BYTES))
+
+    def _scan(self, mm, size):
+        pos = self.scanned
+        next_line = len(self.checkpoints) * CHECKPOINT  # the next line whose start gets recorded
+        while pos < size:
+            block = mm[pos:min(pos + SCAN_BLOCK, size)]
+            count = block.count(b"\n")
+            cursor = 0
+            while self.newlines + count >= next_line:  # it starts in this block: find exactly where
+                needed = next_line - self.newlines
+                count -= needed
+                while True:  # whole strides first (one C-level count each), then line by line
+                    n = block.count(b"\n", cursor, cursor + STRIDE)
+                    if n >= needed:
+                        break
+                    needed -= n
+                    cursor += STRIDE
+                cursor = _nth_newline_end(block, needed, cursor)
+                self.newlines = next_line
+                self.checkpoints.append(pos + cursor)
+                next_line += CHECKPOINT
+            self.newlines += count
+            pos += len(block)
+        self.scanned = size
+
+    @property
+    def lines(self):
+        """Lines in the file as scanned, counting an unterminated last line."""
+        if self.scanned == 0:
+            return 0
+        with open(self.path, "rb") as f:
+            f.seek(self.scanned - 1)
+            return self.newlines + (f.read(1) != b"\n")
+
+    def offset(self, mm, line):
+        """Byte offset where 0-based `line` starts (the end of the file if it's past the last one)."""
+        checkpoint = min(line // CHECKPOINT, len(self.checkpoints) - 1)
+        pos = self.checkpoints[checkpoint]
+        for _ in range(line - checkpoint * CHECKPOINT):
+            hit = mm.find(b"\n", pos, self.scanned)
+            if hit < 0:
+                return self.scanned
+            pos = hit + 1
+        return pos
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def line_index(path):
+    """The cached LineIndex of `path` (least recently used ones are dropped); refresh() before use."""
+    key = os.path.realpath(path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = LineIndex(key)
+            while len(_indexes) > MAX_CACHED_INDEXES:
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(key)
+    return index
+
+
+def read_lines(path, start, count, max_bytes=DEFAULT_MAX_BYTES):
+    """Lines [start, start + count) (0-based) and the file's line count, via the cached line index."""
+    index = line_index(path)
+    with index.lock:
+        index.refresh()
+        total = index.lines
+        if index.scanned == 0:
+            return Chunk(b"", 0, 0, 0, False), total
+        with open(index.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            begin = index.offset(mm, start)
+            end = _nth_newline_end(mm, count, begin) if count else begin
+            end = min(end, index.scanned)
+            truncated = end - begin > max_bytes
+            data = mm[begin:min(end, begin + max_bytes)]
+        return Chunk(data, begin, begin + len(data), index.scanned, truncated), total
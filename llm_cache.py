@@ -0,0 +1,257 @@
+"""
+llm_cache.py
+Content-addressed cache of Gemini responses for the reverse-engineering pipeline.
+
+A response is keyed by sha256(model, contents, config), with the config serialized
+in full (response_mime_type, temperature, ...). Entries live in a single SQLite file
+with size-bounded LRU eviction, so a warm rerun of the pipeline (even with --force)
+replays byte-identical calls without touching the network.
+
+Modes (--cache-mode, or LLM_CACHE_MODE for child processes):
+  read-write  serve hits, store misses (default)
+  read-only   serve hits, never write
+  off         bypass the cache entirely
+  refresh     ignore existing entries, store fresh responses
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".llm_cache.sqlite")
+CACHE_MODES = ("read-write", "read-only", "off", "refresh")
+DEFAULT_CACHE_MODE = os.environ.get("LLM_CACHE_MODE", "read-write")
+DEFAULT_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+def _canonical(obj):
+    """JSON-ready form of prompts/configs, including SDK pydantic objects."""
+    if hasattr(obj, "model_dump"):
+        return _canonical(obj.model_dump(mode="json", exclude_none=True))
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in obj.items() if v is not None}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    return repr(obj)
+
+
+def cache_key(model, contents, config=None):
+    payload = json.dumps(
+        {"model": model, "contents": _canonical(contents), "config": _canonical(config)},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """The subset of GenerateContentResponse the pipeline scripts read."""
+
+    from_cache = True
+
+    def __init__(self, text, parsed=None, total_tokens=0):
+        self.text = text
+        self.parsed = parsed
+        self.usage_metadata = SimpleNamespace(total_token_count=total_tokens)
+
+
+def _serialize_response(response):
+    parsed = getattr(response, "parsed", None)
+    try:
+        parsed = _canonical(parsed)
+        json.dumps(parsed)
+    except (TypeError, ValueError):
+        parsed = None
+    usage = getattr(response, "usage_metadata", None)
+    return json.dumps({
+        "text": getattr(response, "text", None),
+        "parsed": parsed,
+        "total_tokens": getattr(usage, "total_token_count", None) or 0,
+    })
+
+
+class LLMCache:
+    def __init__(self, path=CACHE_PATH, mode=DEFAULT_CACHE_MODE, max_bytes=DEFAULT_MAX_BYTES):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}'. Expected one of {CACHE_MODES}.")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, payload TEXT,"
+                " size INTEGER, created REAL, last_access REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+            self._conn.commit()
+            self._track_size()
+        return self._conn
+
+    def _track_size(self):
+        """
+        Keeps SUM(size) in a meta row that triggers update with every insert, update and
+        delete (from any process sharing the file), so put() doesn't rescan the table. The
+        sum is taken once, when a cache from before the meta row is first opened.
+        """
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta (name, value)"
+                         " SELECT 'total_size', COALESCE(SUM(size), 0) FROM responses")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN"
+                         " UPDATE meta SET value = value + NEW.size WHERE name = 'total_size'; END")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses BEGIN"
+                         " UPDATE meta SET value = value + NEW.size - OLD.size WHERE name = 'total_size'; END")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN"
+                         " UPDATE meta SET value = value - OLD.size WHERE name = 'total_size'; END")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def total_size(self):
+        """Bytes of payload the cache holds."""
+        with self._lock:
+            return self.conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+
+    @property
+    def readable(self):
+        return self.mode in ("read-write", "read-only")
+
+    @property
+    def writable(self):
+        return self.mode in ("read-write", "refresh")
+
+    def get(self, key):
+        """CachedResponse for key, or None (also None whenever the mode skips lookups)."""
+        if self.mode == "off":
+            return None
+        if not self.readable:
+            self.misses += 1
+            return None
+        with self._lock:
+            row = self.conn.execute("SELECT payload FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.mode == "read-write":
+                self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                self.conn.commit()
+        self.hits += 1
+        data = json.loads(row[0])
+        return CachedResponse(data["text"], data.get("parsed"), data.get("total_tokens", 0))
+
+    def put(self, key, model, response):
+        if not self.writable:
+            return
+        payload = _serialize_response(response)
+        now = time.time()
+        with self._lock:
+            # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete fires no trigger.
+            self.conn.execute(
+                "INSERT INTO responses (key, model, payload, size, created, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET model = excluded.model, payload = excluded.payload,"
+                " size = excluded.size, created = excluded.created, last_access = excluded.last_access",
+                (key, model, payload, len(payload), now, now),
+            )
+            self._evict()
+            self.conn.commit()
+        self.stores += 1
+
+    def _evict(self):
+        total = self.conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def report(self):
+        if self.mode == "off":
+            return
+        s = self.stats()
+        print(f"💾 [cache:{s['mode']}] hits: {s['hits']}, misses: {s['misses']}, "
+              f"stores: {s['stores']}, evictions: {s['evictions']} (hit rate {s['hit_rate']:.0%})")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_CACHES = {}
+
+
+def open_cache(mode=None, path=CACHE_PATH):
+    """Process-wide cache instance for (path, mode)."""
+    mode = mode or DEFAULT_CACHE_MODE
+    key = (os.path.abspath(path), mode)
+    if key not in _CACHES:
+        _CACHES[key] = LLMCache(path, mode)
+    return _CACHES[key]
+
+
+def add_cache_argument(parser):
+    parser.add_argument(
+        "--cache-mode", choices=CACHE_MODES, default=None,
+        help=f"LLM response cache behaviour (default: {DEFAULT_CACHE_MODE}, env LLM_CACHE_MODE)",
+    )
+    return parser
+
+
+def cache_parser(description=None):
+    """Parser for scripts whose only flag is --cache-mode."""
+    import argparse
+    return add_cache_argument(argparse.ArgumentParser(description=description))
+
+
+def parse_cache_args(description=None):
+    """For scripts with no other flags: returns the parsed args with .cache_mode."""
+    return cache_parser(description).parse_args()
+
+
+def generate_content(client, model, contents, config=None, cache=None):
+    """Blocking client.models.generate_content with cache lookup/store around it."""
+    cache = cache or open_cache()
+    key = cache_key(model, contents, config)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    response = client.models.generate_content(model=model, contents=contents, config=config)
+    cache.put(key, model, response)
+    return response
@@ -1,19 +1,15 @@
 import json
 import os
 
-def load_json(path):
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            return json.load(f)
-    return {}
+from stage_context import StageContext
 
-def main():
+def main(context):
     print("--- 🔄 Merging Smart Hunt Results into Master Map ---")
     
     # Load the different maps you've generated
-    heuristic_map = load_json('variable_map.json')
-    sanitized_map = load_json('variable_map_sanitized.json')
-    smart_map = load_json('smart_map.json') # This contains the gold from smart_hunt.py
+    heuristic_map = context.load_json('variable_map.json', {})
+    sanitized_map = context.load_json('variable_map_sanitized.json', {})
+    smart_map = context.load_json('smart_map.json', {}) # This contains the gold from smart_hunt.py
     
     # Priority: Smart Hunt > Sanitized > Heuristic
     final_map = heuristic_map.copy()
@@ -51,5 +47,8 @@ def main():
         
     print(f"✅ Master Map Saved with {len(final_map)} definitions.")
 
+def run(context):
+    main(context)
+
 if __name__ == "__main__":
-    main()
+    run(StageContext())
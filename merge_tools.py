@@ -2,26 +2,28 @@
 import json
 import os
 
-def load_json(path):
-    if not os.path.exists(path):
+from stage_context import StageContext
+
+def load_json(context, path):
+    data = context.load_json(path)
+    if data is None:
         print(f"⚠️ Warning: {path} not found. Skipping.")
         return []
-    with open(path, 'r') as f:
-        return json.load(f)
+    return data
 
-def merge():
+def merge(context):
     print("--- 🔗 Merging Tool Definitions ---")
     
     # 1. Load Tools extracted by extract_schemas_full.py
     # In the sacrifice pipeline, this is the main source of truth
-    new_extracted = load_json('tools_def.json')
+    new_extracted = load_json(context, 'tools_def.json')
     print(f"✅ Loaded {len(new_extracted)} Extracted Tools (from tools_def.json)")
 
     # 2. Load Legacy/Browser Tools (Optional - keep if you plan to copy these files over)
-    core = load_json('core_tools_reconstructed.json')
+    core = load_json(context, 'core_tools_reconstructed.json')
     if core: print(f"✅ Loaded {len(core)} Legacy Core Tools")
     
-    browser = load_json('gemini_browser_tools.json')
+    browser = load_json(context, 'gemini_browser_tools.json')
     if browser:
         # Flatten if necessary
         if isinstance(browser[0], list):
@@ -53,5 +55,8 @@ def merge():
         
     print(f"🎉 Saved {len(master_list)} unique tools to master_tool_definitions.json")
 
+def run(context):
+    merge(context)
+
 if __name__ == "__main__":
-    merge()
+    run(StageContext())
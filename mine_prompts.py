@@ -1,59 +1,70 @@
 import os
 import re
 import json
+import heapq
 import argparse
-from google import genai
 from google.genai import types
 
+from cli_corpus import get_corpus
+from gemini_scheduler import Job, GeminiScheduler
+from js_lexer import contains, contains_any, min_length
+from llm_cache import add_cache_argument
+from stage_context import StageContext
+
 # --- ARGUMENT PARSING ---
-parser = argparse.ArgumentParser(description="Mine System Prompts from Minified JS")
-parser.add_argument("--limit", type=int, default=200, help="Maximum number of candidate strings to process (Default: 200 for full run)")
-args = parser.parse_args()
+def build_parser():
+    parser = argparse.ArgumentParser(description="Mine System Prompts from Minified JS")
+    parser.add_argument("--limit", type=int, default=200, help="Maximum number of candidate strings to process (Default: 200 for full run)")
+    add_cache_argument(parser)
+    return parser
 
 # --- CONFIGURATION ---
 TARGET_FILE = "node_modules/@anthropic-ai/claude-code/cli.js"
 OUTPUT_DIR = "extracted_personas"
 MIN_STRING_LENGTH = 500  # Prompts are usually long
-MAX_CANDIDATES = args.limit
+DEFAULT_MAX_CANDIDATES = 200
 MODEL_ID = "gemini-2.0-flash"
 
-client = genai.Client(http_options={'api_version': 'v1alpha'})
+# Heuristic: Prompts are long, contain spaces and usually say "You are" / "function" / "context"
+CANDIDATE_FILTERS = [
+    min_length(MIN_STRING_LENGTH + 1),
+    contains(" "),
+    contains_any(["You are", "function", "context"]),
+]
 
 # --- THE PROMPT MINER ---
-def extract_string_literals(filepath):
+def extract_string_literals(filepath, max_candidates=DEFAULT_MAX_CANDIDATES):
     print(f"--- Reading {filepath} ---")
-    if not os.path.exists(filepath):
+    corpus = get_corpus(filepath)
+    if not corpus.exists():
         print(f"❌ Error: File {filepath} not found.")
         return []
 
-    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
-    
     print("--- Scanning for large text blobs ---")
-    candidates = []
-    
-    # Strategy: Split by quotes and filter by length
-    fragments = re.split(r'["`]', content)
+    total = 0
+    heap = []  # min-heap of (length, offset, text): only the longest MAX_CANDIDATES are kept
     
-    for frag in fragments:
-        if len(frag) > MIN_STRING_LENGTH:
-            # Heuristic: Prompts usually contain "You are" or "Assistant" or "Tool"
-            if " " in frag and ("You are" in frag or "function" in frag or "context" in frag):
-                candidates.append(frag)
+    # Strategy: Stream every string/template literal through the candidate filters
+    for rec in corpus.iter_literals(*CANDIDATE_FILTERS):
+        total += 1
+        item = (len(rec.text), rec.offset, rec.text)
+        if len(heap) < max_candidates:
+            heapq.heappush(heap, item)
+        else:
+            heapq.heappushpop(heap, item)
     
     # OPTIMIZATION: Sort by length (descending) to find main prompts first
-    candidates.sort(key=len, reverse=True)
+    candidates = [text for _, _, text in sorted(heap, reverse=True)]
     
-    print(f"✅ Found {len(candidates)} candidate strings > {MIN_STRING_LENGTH} chars.")
-    if len(candidates) > MAX_CANDIDATES:
-        print(f"⚠️  Limiting to top {MAX_CANDIDATES} longest candidates (Limit set by --limit).")
-        return candidates[:MAX_CANDIDATES]
+    print(f"✅ Found {total} candidate strings > {MIN_STRING_LENGTH} chars.")
+    if total > max_candidates:
+        print(f"⚠️  Limiting to top {max_candidates} longest candidates (Limit set by --limit).")
         
     return candidates
 
 # --- THE GEMINI ANALYZER ---
-def analyze_candidate(text_chunk, index):
-    prompt = f"""
+def build_analysis_prompt(text_chunk):
+    return f"""
     I am reverse engineering a minified AI application. 
     Below is a raw string extracted from the code. 
     
@@ -70,36 +81,40 @@ def analyze_candidate(text_chunk, index):
     {text_chunk[:15000]} 
     --- RAW TEXT END ---
     """
-    
-    try:
-        response = client.models.generate_content(
-            model=MODEL_ID,
-            contents=prompt
-        )
-        return response.text
-    except Exception as e:
-        print(f"Error calling Gemini: {e}")
-        return "NO"
+
+def analyze_candidates(client, candidates, cache=None):
+    """Runs every candidate through Gemini concurrently; results come back in candidate order."""
+    scheduler = GeminiScheduler(client, cache=cache)
+    jobs = [Job(MODEL_ID, build_analysis_prompt(c)) for c in candidates]
+    results = []
+    for response in scheduler.run(jobs, stage="mine_prompts"):
+        if isinstance(response, Exception):
+            print(f"Error calling Gemini: {response}")
+            results.append("NO")
+        else:
+            results.append(response.text)
+    return results
 
 # --- MAIN EXECUTION ---
-if __name__ == "__main__":
+def run(context):
+    args = context.parse_args(build_parser())
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
-    candidates = extract_string_literals(TARGET_FILE)
+    candidates = extract_string_literals(TARGET_FILE, args.limit)
     
     if not candidates:
         print("❌ No candidates found or file missing.")
-        exit(1)
+        return 1
 
     print(f"--- Analyzing {len(candidates)} candidates with {MODEL_ID} ---")
     
+    results = analyze_candidates(context.client, candidates, context.cache(args.cache_mode))
+
     found_count = 0
-    for i, candidate in enumerate(candidates):
+    for i, (candidate, result) in enumerate(zip(candidates, results)):
         print(f"Processing candidate {i+1}/{len(candidates)} (Length: {len(candidate)})...")
         
-        result = analyze_candidate(candidate, i)
-        
         if result and not result.strip().startswith("NO"):
             found_count += 1
             # Try to guess a filename from the response
@@ -114,3 +129,6 @@ if __name__ == "__main__":
             print(f"   ✅ MATCH: Saved to {filename}")
 
     print(f"\n--- Extraction Complete. Found {found_count} personas. ---")
+
+if __name__ == "__main__":
+    exit(run(StageContext()))
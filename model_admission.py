@@ -0,0 +1,253 @@
+"""
+model_admission.py
+Admission control for model calls in the Gemini console servers.
+
+Every prompt runs `send_message` (up to 15 automatic tool rounds, Bash subprocesses
+included) on a handler thread, so a burst of prompts used to run that many model calls
+and shells at once. ModelAdmission caps the calls in flight (--model-calls) and parks
+the rest in a bounded queue (--max-queued):
+
+  - the queue is fair per client (browser session, or IP without a cookie): waiting
+    clients are served round-robin, so one tab firing twenty prompts does not starve
+    everybody else,
+  - once the queue is full, enqueue() raises Overloaded at once with a Retry-After
+    estimate, which the console turns into a 503,
+  - a waiting request is told its queue position whenever it changes (the /stream page
+    shows it instead of a bare "Thinking..."),
+  - queue and run times are recorded in Histograms for /stats.
+
+    ticket = admission.enqueue(client_key(request))      # may raise Overloaded
+    with ticket.admitted(on_position=lambda p: emit("queued", {"position": p})):
+        reply = chat.send_message(prompt)
+
+A queued request parks its handler thread, so the console's handler pool must have
+room for `capacity` of them on top of its usual work.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from chat_sessions import session_id_from_headers
+
+DEFAULT_MODEL_CALLS = 4
+DEFAULT_MAX_QUEUED = 32
+# Seconds; the last bucket catches everything slower.
+HISTOGRAM_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float("inf"))
+MAX_RETRY_AFTER = 120
+
+
+class Overloaded(Exception):
+    """The model-call queue is full; try again in `retry_after` seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Model-call queue is full; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Histogram:
+    """Bucketed latency histogram (Prometheus-style cumulative buckets, in seconds)."""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None when empty)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def snapshot(self):
+        """JSON-ready summary; bounds are strings so the open-ended bucket reads "+Inf"."""
+        label = lambda bound: None if bound is None else "+Inf" if math.isinf(bound) else str(bound)
+        cumulative, seen = {}, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            cumulative[label(bound)] = seen
+        return {"count": self.count, "sum_s": round(self.sum, 3),
+                "mean_s": round(self.sum / self.count, 3) if self.count else None,
+                "p50_s": label(self.quantile(0.5)), "p90_s": label(self.quantile(0.9)),
+                "p99_s": label(self.quantile(0.99)), "buckets": cumulative}
+
+
+class Ticket:
+    """One request's place in the model-call queue."""
+
+    def __init__(self, admission, client, enqueued):
+        self._admission = admission
+        self.client = client
+        self.enqueued = enqueued
+        self.started = None  # set on admission
+        self.done = False
+
+    @contextmanager
+    def admitted(self, on_position=None):
+        """
+        Waits for a model-call slot, then holds it for the block. on_position(n) is called
+        (outside the lock) whenever the number of requests ahead changes; if it raises,
+        e.g. because the client went away, the ticket leaves the queue.
+        """
+        try:
+            self._admission._wait(self, on_position)
+        except BaseException:
+            self._admission._release(self)
+            raise
+        try:
+            yield self
+        finally:
+            self._admission._release(self)
+
+    def cancel(self):
+        """Gives the ticket's place (or slot) back without running; for a request that fails before admitted()."""
+        self._admission._release(self)
+
+
+class ModelAdmission:
+    def __init__(self, max_inflight=DEFAULT_MODEL_CALLS, max_queued=DEFAULT_MAX_QUEUED, clock=time.monotonic):
+        self.max_inflight = max(1, max_inflight)
+        self.max_queued = max(0, max_queued)
+        self.clock = clock
+        self.inflight = 0
+        self.queued = 0
+        self.admitted_total = 0
+        self.shed = 0
+        self.cancelled = 0
+        self.queue_time = Histogram()
+        self.run_time = Histogram()
+        self._clients = OrderedDict()  # client -> deque of waiting Tickets, in round-robin order
+        self._cond = threading.Condition()
+
+    @property
+    def capacity(self):
+        """Requests that can hold a handler thread here at once (running plus queued)."""
+        return self.max_inflight + self.max_queued
+
+    def enqueue(self, client):
+        """A Ticket for `client`, admitted right away if a slot is free. Raises Overloaded when full."""
+        with self._cond:
+            if self.inflight >= self.max_inflight and self.queued >= self.max_queued:
+                self.shed += 1
+                raise Overloaded(self._retry_after())
+            ticket = Ticket(self, client, self.clock())
+            self._clients.setdefault(client, deque()).append(ticket)
+            self.queued += 1
+            self._admit()
+            return ticket
+
+    def _retry_after(self):
+        """Seconds until the queue has likely moved on by one full round of slots."""
+        mean = self.run_time.sum / self.run_time.count if self.run_time.count else 1.0
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(mean * (self.queued + 1) / self.max_inflight)))
+
+    def _admit(self):
+        """Hands free slots to waiting tickets, one client at a time. Call with the lock held."""
+        admitted = False
+        while self.inflight < self.max_inflight and self._clients:
+            client, waiting = next(iter(self._clients.items()))
+            ticket = waiting.popleft()
+            if waiting:
+                self._clients.move_to_end(client)
+            else:
+                del self._clients[client]
+            self.queued -= 1
+            self.inflight += 1
+            self.admitted_total += 1
+            ticket.started = self.clock()
+            self.queue_time.observe(ticket.started - ticket.enqueued)
+            admitted = True
+        if admitted:
+            self._cond.notify_all()
+
+    def _position(self, ticket):
+        """Waiting tickets that will be admitted before `ticket` under round-robin."""
+        depth = self._clients[ticket.client].index(ticket)
+        ahead = 0
+        before = True  # clients ahead of ours in the rotation get one more turn at our depth
+        for client, waiting in self._clients.items():
+            if client == ticket.client:
+                before = False
+                ahead += depth
+                continue
+            ahead += min(len(waiting), depth + before)
+        return ahead
+
+    def _wait(self, ticket, on_position):
+        reported = None
+        while True:
+            with self._cond:
+                while ticket.started is None:
+                    position = self._position(ticket)
+                    if position != reported and on_position is not None:
+                        break
+                    self._cond.wait()
+                else:
+                    return
+            on_position(position)
+            reported = position
+
+    def _release(self, ticket):
+        with self._cond:
+            if ticket.done:
+                return
+            ticket.done = True
+            if ticket.started is None:  # gave up while queued
+                waiting = self._clients[ticket.client]
+                waiting.remove(ticket)
+                if not waiting:
+                    del self._clients[ticket.client]
+                self.queued -= 1
+                self.cancelled += 1
+            else:
+                self.inflight -= 1
+                self.run_time.observe(self.clock() - ticket.started)
+            self._admit()
+            self._cond.notify_all()  # positions changed
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_inflight": self.max_inflight,
+                "max_queued": self.max_queued,
+                "inflight": self.inflight,
+                "queued": self.queued,
+                "waiting_clients": len(self._clients),
+                "admitted": self.admitted_total,
+                "shed": self.shed,
+                "cancelled": self.cancelled,
+                "queue_time": self.queue_time.snapshot(),
+                "run_time": self.run_time.snapshot(),
+            }
+
+
+def client_key(request):
+    """Whose turn a request counts against: its browser session, else its IP."""
+    return session_id_from_headers(request.headers) or request.client_address[0]
+
+
+def add_admission_arguments(parser):
+    parser.add_argument("--model-calls", type=int, default=DEFAULT_MODEL_CALLS,
+                        help="Model calls (and their tool runs) in flight at once (default: %(default)s)")
+    parser.add_argument("--max-queued", type=int, default=DEFAULT_MAX_QUEUED,
+                        help="Prompts waiting for a model call before new ones get a 503 (default: %(default)s)")
+    return parser
+
+
+def admission_from_args(args):
+    return ModelAdmission(args.model_calls, args.max_queued)
@@ -0,0 +1,148 @@
+"""
+output_capture.py
+Bounded capture of a command's output: the head, the tail, and counts of what's between.
+
+`capture_output=True, text=True` holds everything a command prints in memory, decodes
+it, and the Bash tools then hand all of it to the model; a `cat` of a big log or a
+`find /` costs hundreds of MB and floods the context. OutputCapture is written to
+chunk by chunk as the output arrives and keeps at most:
+
+  - the first `head_bytes` / `head_lines` (decoded incrementally as they arrive),
+  - the last `tail_bytes` / `tail_lines` (a buffer trimmed back to size as it grows),
+
+counting the bytes and lines it drops, so memory stays bounded whatever the command
+prints. text() joins head and tail around a marker such as
+
+    ... [48,211 lines (3.1 MB) elided; full output: /tmp/bash_output/out_ab12.log] ...
+
+With `spill_dir`, output that outgrows the limits is also written, in full, to a file
+there (created only once it is needed), so the agent can grep or page through it.
+"""
+import codecs
+import os
+import tempfile
+
+DEFAULT_HEAD_BYTES = 32 * 1024
+DEFAULT_TAIL_BYTES = 32 * 1024
+DEFAULT_HEAD_LINES = 400
+DEFAULT_TAIL_LINES = 400
+DEFAULT_SPILL_DIR = os.path.join(tempfile.gettempdir(), "bash_output")
+MAX_SPILL_FILES = 50  # older spill files are removed as new ones are created
+
+
+def _size(n):
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:,} {unit}" if unit == "bytes" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+class OutputCapture:
+    """Head + tail of a byte stream. `head_bytes=None` keeps everything (no limits at all)."""
+
+    def __init__(self, head_bytes=DEFAULT_HEAD_BYTES, tail_bytes=DEFAULT_TAIL_BYTES, head_lines=DEFAULT_HEAD_LINES,
+                 tail_lines=DEFAULT_TAIL_LINES, spill_dir=None, encoding="utf-8"):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head_lines = head_lines
+        self.tail_lines = tail_lines
+        self.spill_dir = spill_dir
+        self.encoding = encoding
+        self.total_bytes = 0
+        self.total_lines = 0
+        self.spill_path = None
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._head = []  # decoded text
+        self._head_size = 0
+        self._head_newlines = 0
+        self._head_full = False
+        self._head_raw = bytearray()  # the same bytes, kept only until a spill file needs them
+        self._tail = bytearray()
+        self._spill = None
+
+    def write(self, data):
+        if not data:
+            return
+        self.total_bytes += len(data)
+        self.total_lines += data.count(b"\n")
+        if not self._head_full:
+            data = self._fill_head(data)
+            if not data:
+                return
+        if self._spill is not None:
+            self._spill.write(data)
+        elif self.spill_dir is not None and len(self._tail) + len(data) > self.tail_bytes:
+            self._open_spill()
+            self._spill.write(data)
+        self._tail += data
+        if len(self._tail) > 2 * self.tail_bytes:  # trim in batches: amortized O(1) per byte
+            del self._tail[:len(self._tail) - self.tail_bytes]
+
+    def _fill_head(self, data):
+        """Takes what still fits in the head; returns the rest."""
+        if self.head_bytes is None:
+            self._head.append(self._decoder.decode(data))
+            return b""
+        take = min(len(data), self.head_bytes - self._head_size)
+        if self.head_lines is not None:
+            start = 0
+            while take > start and self._head_newlines < self.head_lines:
+                newline = data.find(b"\n", start, take)
+                if newline < 0:
+                    break
+                self._head_newlines += 1
+                start = newline + 1
+            if self._head_newlines >= self.head_lines:
+                take = min(take, start)
+        self._head.append(self._decoder.decode(data[:take]))
+        if self.spill_dir is not None:
+            self._head_raw += data[:take]
+        self._head_size += take
+        if take < len(data):
+            self._head_full = True
+            self._decoder = None  # a character cut in half at the limit is dropped
+        return data[take:]
+
+    def _open_spill(self):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        spilled = sorted((entry.stat().st_mtime, entry.path) for entry in os.scandir(self.spill_dir)
+                         if entry.name.startswith("out_"))
+        for _, path in spilled[:max(0, len(spilled) - MAX_SPILL_FILES + 1)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        fd, self.spill_path = tempfile.mkstemp(prefix="out_", suffix=".log", dir=self.spill_dir)
+        self._spill = os.fdopen(fd, "wb")
+        self._spill.write(self._head_raw)
+        self._spill.write(self._tail)
+        self._head_raw = None
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+
+    def text(self):
+        """The output as the agent sees it: all of it, or head + elision marker + tail."""
+        head = "".join(self._head)
+        if self._decoder is not None:  # never filled: the head is the whole output
+            return head + self._decoder.decode(b"", final=True)
+        tail = self._tail
+        if len(tail) > self.tail_bytes:
+            tail = tail[len(tail) - self.tail_bytes:]
+        if len(tail) < self.total_bytes - self._head_size:  # trimmed mid-line: start at the next line
+            newline = tail.find(b"\n")
+            tail = tail[newline + 1:] if 0 <= newline < len(tail) - 1 else tail.lstrip(bytes(range(0x80, 0xC0)))
+        if self.tail_lines is not None and tail.count(b"\n") > self.tail_lines:
+            start = len(tail)
+            for _ in range(self.tail_lines + 1):
+                start = tail.rfind(b"\n", 0, start)
+            tail = tail[start + 1:]
+        elided_bytes = self.total_bytes - self._head_size - len(tail)
+        if not elided_bytes:
+            return head + tail.decode(self.encoding, errors="replace")
+        elided_lines = self.total_lines - head.count("\n") - tail.count(b"\n")
+        where = f"; full output: {self.spill_path}" if self.spill_path else ""
+        separator = "" if head.endswith("\n") or not head else "\n"
+        return (f"{head}{separator}... [{elided_lines:,} lines ({_size(elided_bytes)}) elided{where}] ...\n"
+                f"{tail.decode(self.encoding, errors='replace')}")
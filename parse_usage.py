@@ -1,36 +1,38 @@
 import re
 import sys
 
-def parse_usage_html(file_path="usage.txt"):
-    print(f"--- Parsing {file_path} for Rate Limits ---")
-    
+def parse_limit_value(val):
+    """Turns an AI Studio limit cell ("2 / 2K", "1M", "Unlimited") into an int, or None."""
+    if "/" in val:
+        val = val.split("/")[-1]
+    m = re.match(r"^\s*([\d.,]+)\s*([KMB]?)\s*$", val, re.IGNORECASE)
+    if not m:
+        return None
+    multiplier = {"": 1, "K": 1_000, "M": 1_000_000, "B": 1_000_000_000}[m.group(2).upper()]
+    return int(float(m.group(1).replace(",", "")) * multiplier)
+
+def extract_rate_limits(file_path="usage.txt"):
+    """
+    Returns {model_name: {"rpm": int|None, "tpm": int|None, "rpm_raw": str, "tpm_raw": str}}
+    from the saved AI Studio usage page, or {} if it can't be parsed.
+    """
     try:
         from bs4 import BeautifulSoup
     except ImportError:
         print("❌ BeautifulSoup is not installed. Please run: pip install beautifulsoup4")
-        return
+        return {}
 
     try:
         with open(file_path, "r", encoding="utf-8") as f:
             content = f.read()
     except FileNotFoundError:
         print(f"❌ Error: '{file_path}' not found. Make sure you saved the HTML content there.")
-        return
+        return {}
 
     soup = BeautifulSoup(content, "html.parser")
-    rows = soup.find_all("tr")
-    
-    if not rows:
-        print("⚠️  No table rows found.")
-        return
-
-    # Print Header
-    print(f"\n{'MODEL NAME':<30} | {'RPM LIMIT':<15} | {'TPM LIMIT':<15}")
-    print("-" * 65)
+    limits = {}
 
-    found_models = []
-
-    for row in rows:
+    for row in soup.find_all("tr"):
         cells = row.find_all(["td", "th"])
         # Get all text from the row
         row_text = [c.get_text(strip=True) for c in cells]
@@ -43,7 +45,6 @@ def parse_usage_html(file_path="usage.txt"):
         # Check if column 1 is a model name (contains 'gemini')
         model_name = row_text[1]
         if "gemini" in model_name.lower():
-            
             # Helper to clean "Used / Limit" strings (e.g. "2 / 2K" -> "2K")
             def clean_limit(val):
                 if "/" in val:
@@ -52,14 +53,32 @@ def parse_usage_html(file_path="usage.txt"):
 
             rpm = clean_limit(row_text[3])
             tpm = clean_limit(row_text[4])
-            
-            print(f"{model_name:<30} | {rpm:<15} | {tpm:<15}")
-            found_models.append(model_name)
+            limits[model_name] = {
+                "rpm": parse_limit_value(rpm),
+                "tpm": parse_limit_value(tpm),
+                "rpm_raw": rpm,
+                "tpm_raw": tpm,
+            }
+
+    return limits
+
+def parse_usage_html(file_path="usage.txt"):
+    print(f"--- Parsing {file_path} for Rate Limits ---")
+
+    limits = extract_rate_limits(file_path)
+    if not limits:
+        print("⚠️  No table rows found.")
+        return limits
+
+    # Print Header
+    print(f"\n{'MODEL NAME':<30} | {'RPM LIMIT':<15} | {'TPM LIMIT':<15}")
+    print("-" * 65)
+
+    for model_name, limit in limits.items():
+        print(f"{model_name:<30} | {limit['rpm_raw']:<15} | {limit['tpm_raw']:<15}")
 
     print("-" * 65)
-    
-    if not found_models:
-        print("⚠️  No Gemini models found. Check column indices again.")
+    return limits
 
 if __name__ == "__main__":
     parse_usage_html()
@@ -1,5 +1,7 @@
 import json
 
+from stage_context import StageContext
+
 # Mapping schemas to their likely internal names based on Anthropic's typical naming
 NAME_MAP = {
     "javascript_exec": "browser_evaluate",
@@ -10,9 +12,10 @@ NAME_MAP = {
     "urlPattern": "get_network_activity"
 }
 
-def patch():
-    with open("healed_tools.json", "r") as f:
-        tools = json.load(f)
+def patch(context):
+    tools = context.load_json("healed_tools.json")
+    if tools is None:
+        raise FileNotFoundError("healed_tools.json")
 
     patched_count = 0
     
@@ -59,5 +62,8 @@ def patch():
     
     print(f"✅ Patched {patched_count} tools. Saved to gemini_browser_tools.json")
 
+def run(context):
+    patch(context)
+
 if __name__ == "__main__":
-    patch()
+    run(StageContext())
@@ -1,12 +1,8 @@
-import json
 import os
-import re
 
-# 1. Load the Truth Map
-with open("variable_map_final.json", "r") as f:
-    var_map = json.load(f)
+from hydration import hydrate_files, load_var_map, print_report
 
-# 2. Add HEURISTIC overrides for the remaining dirty variables
+# HEURISTIC overrides for the remaining dirty variables
 # These are variables that are likely dynamic at runtime, so we map them to defaults.
 overrides = {
     "${A.planFilePath}": "PLAN.md",
@@ -19,27 +15,6 @@ overrides = {
     "Use the Edit tool": "Use the Write tool (to overwrite) or Edit tool (to modify)",
 }
 
-print(f"--- 🔄 Consolidating Pipeline with {len(var_map) + len(overrides)} mappings ---")
-
-def hydrate_file(input_path, output_path):
-    with open(input_path, "r") as f:
-        content = f.read()
-    
-    # Apply Truth Map
-    for k, v in var_map.items():
-        content = content.replace(k, v)
-        
-    # Apply Overrides
-    for k, v in overrides.items():
-        content = content.replace(k, v)
-    
-    # Regex Fix for ${A.*} patterns that might remain
-    # content = re.sub(r'\$\{A\.[a-zA-Z]+\}', 'runtime_context', content)
-
-    with open(output_path, "w") as f:
-        f.write(content)
-    print(f"✅ Hydrated {output_path}")
-
 # Run on critical agents
 personas = [
     ("extracted_personas/agent_engineer.md", "hydrated_personas/agent_engineer.md"),
@@ -48,10 +23,18 @@ personas = [
     ("extracted_personas/persona_768.md", "hydrated_personas/agent_commit.md"),
 ]
 
-for src, dst in personas:
-    if os.path.exists(src):
-        hydrate_file(src, dst)
-    else:
-        print(f"⚠️ Source missing: {src}")
+if __name__ == "__main__":
+    # Truth Map plus overrides, compiled into one automaton (overrides win)
+    var_map = load_var_map("variable_map_final.json", overrides=overrides)
+    print(f"--- 🔄 Consolidating Pipeline with {len(var_map)} mappings ---")
+
+    present = []
+    for src, dst in personas:
+        if os.path.exists(src):
+            present.append((src, dst))
+        else:
+            print(f"⚠️ Source missing: {src}")
+
+    print_report(hydrate_files(present, var_map))
 
-print("\n--- Pipeline Consolidated. Ready for Dry Run. ---")
+    print("\n--- Pipeline Consolidated. Ready for Dry Run. ---")
@@ -0,0 +1,471 @@
+"""
+pipeline_engine.py
+Incremental, content-hashed DAG executor for the reverse-engineering pipelines.
+
+Each Step declares the files/directories it reads (inputs) and writes (outputs); the
+step's own script is always an input. Dependencies are inferred from list order: a step
+waits for every earlier step whose outputs it reads, or whose inputs/outputs it writes
+(plus any explicit `after=` names). Independent branches run concurrently.
+
+After a step succeeds, the SHA-256 of its inputs and outputs is recorded in
+.pipeline_manifest.json. On the next run a step is skipped only if its command and
+input hashes are unchanged and its outputs are still exactly what it produced, so an
+upstream rerun that yields identical artifacts does not cascade downstream. When a later
+step edits an earlier step's output in place (fix_code_writer on variable_map_master.json),
+the edited state becomes the one the earlier step is expected to have left behind; when it
+rewrites a file an earlier step read (sanitize_map's variable_map_sanitized.json, which
+merge_hunt_results folds in from the previous run), the earlier step has consumed it as of
+this run, so a second run on an unchanged tree executes nothing.
+
+Given a stage_context.StageContext, `python3 stage.py args...` steps whose script defines
+`run(context)` are imported and run in this interpreter on worker threads, sharing one
+Gemini client, one cli.js corpus and one set of parsed JSON maps; their output is still
+prefixed with the step name. Steps marked `isolate=True` (ones that fork process pools),
+steps whose script has no `run`, and everything under --isolate run as subprocesses.
+
+run_re_pipeline_v3.py, pipeline_master.py and pipeline_orchestrator.py are step lists
+on top of this module.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+MANIFEST_FILE = ".pipeline_manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_JOBS = int(os.environ.get("PIPELINE_JOBS", "4"))
+CLI_JS = "node_modules/@anthropic-ai/claude-code/cli.js"
+
+_PYTHON_RE = re.compile(r"python(\d+(\.\d+)?)?$")
+_SHELL_RE = re.compile(r"[|&;<>`$]")
+_RUN_RE = re.compile(r"^def run\(context", re.MULTILINE)
+
+
+class Step:
+    def __init__(self, command, description, inputs=(), outputs=(), after=(), name=None, always=False,
+                 isolate=False):
+        """
+        `after` names steps that must finish first even without a declared file between
+        them; `always` steps (environment checks, etc.) are never skipped; `isolate` steps
+        always get their own interpreter.
+        """
+        self.command = command
+        self.description = description
+        tokens = shlex.split(command)
+        self.script = next((t for t in tokens if t.endswith(".py")), None)
+        self.name = name or (os.path.splitext(os.path.basename(self.script))[0] if self.script else command)
+        self.inputs = tuple(inputs) + ((self.script,) if self.script else ())
+        self.outputs = tuple(outputs)
+        self.after = tuple(after)
+        self.always = always
+        self.isolate = isolate
+        # Plain `python3 script.py args...` (no shell syntax) is what can run in-process.
+        launcher = os.path.basename(tokens[0]) if tokens else ""
+        simple = (len(tokens) >= 2 and tokens[1] == self.script and not _SHELL_RE.search(command)
+                  and (_PYTHON_RE.match(launcher) or tokens[0] == sys.executable))
+        self.argv = tokens[2:] if simple else None
+
+    def __repr__(self):
+        return f"Step({self.name!r})"
+
+
+def _overlaps(a, b):
+    """True if the paths are equal or one is a directory containing the other."""
+    a, b = os.path.normpath(a), os.path.normpath(b)
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+def resolve_dependencies(steps):
+    """{step name: set of step names it waits for}, inferred from read/write hazards in list order."""
+    names = [s.name for s in steps]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate step names in pipeline: {names}")
+    deps = {}
+    for i, step in enumerate(steps):
+        found = set(step.after)
+        for earlier in steps[:i]:
+            reads_theirs = any(_overlaps(p, q) for p in step.inputs for q in earlier.outputs)
+            writes_theirs = any(_overlaps(p, q) for p in step.outputs for q in earlier.inputs + earlier.outputs)
+            if reads_theirs or writes_theirs:
+                found.add(earlier.name)
+        unknown = found - set(names[:i])
+        if unknown:
+            raise ValueError(f"Step '{step.name}' depends on unknown or later steps: {sorted(unknown)}")
+        deps[step.name] = found
+    return deps
+
+
+class Manifest:
+    """Per-step records plus a (size, mtime) -> digest stamp cache so unchanged files aren't rehashed."""
+
+    def __init__(self, path=MANIFEST_FILE):
+        self.path = path
+        self.steps = {}
+        self.stamps = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.steps = data.get("steps", {})
+                    self.stamps = data.get("stamps", {})
+            except (OSError, ValueError):
+                pass
+
+    def _file_digest(self, path):
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        with self._lock:
+            cached = self.stamps.get(path)
+        if cached and cached[:2] == stamp:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self._lock:
+            self.stamps[path] = stamp + [digest]
+        return digest
+
+    def digest(self, path):
+        """Content hash of a file or directory tree; None if it doesn't exist."""
+        if os.path.isfile(path):
+            return self._file_digest(path)
+        if not os.path.isdir(path):
+            return None
+        h = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                h.update(os.path.relpath(full, path).encode() + b"\0")
+                h.update(self._file_digest(full).encode())
+        return h.hexdigest()
+
+    def staleness(self, step):
+        """None if the step can be skipped, otherwise the reason it must run."""
+        if step.always:
+            return "always runs"
+        record = self.steps.get(step.name)
+        if record is None:
+            return "never run"
+        if record.get("command") != step.command:
+            return "command changed"
+        recorded_inputs = record.get("inputs", {})
+        if set(recorded_inputs) != set(step.inputs):
+            return "declared inputs changed"
+        for path in step.inputs:
+            if self.digest(path) != recorded_inputs[path]:
+                return f"input changed: {path}"
+        recorded_outputs = record.get("outputs", {})
+        for path in step.outputs:
+            current = self.digest(path)
+            if current is None and (path not in recorded_outputs or recorded_outputs[path] is not None):
+                return f"output missing: {path}"  # an optional output it did not write is not missing
+            if current != recorded_outputs.get(path):
+                return f"output modified: {path}"
+        return None
+
+    def record(self, step, elapsed):
+        # Inputs are hashed after the run so steps that rewrite their own inputs in place settle.
+        entry = {
+            "command": step.command,
+            "inputs": {p: self.digest(p) for p in step.inputs},
+            "outputs": {p: self.digest(p) for p in step.outputs},
+            "elapsed": round(elapsed, 3),
+            "finished": time.time(),
+        }
+        with self._lock:
+            self.steps[step.name] = entry
+            self.save()
+
+    def refresh(self, step, inputs, outputs):
+        """A later step rewrote some of `step`'s inputs or outputs in place; that state is now the expected one."""
+        with self._lock:
+            entry = self.steps.get(step.name)
+        if entry is None:
+            return
+        updated = [{p: self.digest(p) for p in paths} for paths in (inputs, outputs)]
+        with self._lock:
+            entry["inputs"].update(updated[0])
+            entry["outputs"].update(updated[1])
+            self.save()
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "steps": self.steps, "stamps": self.stamps}, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+_STEP = threading.local()
+
+
+class _StepOutput:
+    """sys.stdout/sys.stderr stand-in that prefixes whole lines written by in-process steps."""
+
+    def __init__(self, stream, log):
+        self.stream = stream
+        self.log = log
+        self._buffers = threading.local()
+
+    def write(self, text):
+        name = getattr(_STEP, "name", None)
+        if name is None:
+            return self.stream.write(text)
+        *lines, rest = (getattr(self._buffers, "pending", "") + text).split("\n")
+        self._buffers.pending = rest
+        for line in lines:
+            self.log(f"   [{name}] {line.rstrip()}")
+        return len(text)
+
+    def flush(self):
+        name = getattr(_STEP, "name", None)
+        pending = getattr(self._buffers, "pending", "")
+        if name is not None and pending:
+            self._buffers.pending = ""
+            self.log(f"   [{name}] {pending.rstrip()}")
+        elif name is None:
+            self.stream.flush()
+
+    def __getattr__(self, attr):
+        return getattr(self.stream, attr)
+
+
+def _exit_code(result):
+    """Exit status for run()'s return value or a SystemExit code, as the interpreter would report it."""
+    if result is None:
+        return 0
+    if isinstance(result, int):
+        return int(result)
+    print(result, file=sys.stderr)
+    return 1
+
+
+class Pipeline:
+    def __init__(self, steps, manifest_path=MANIFEST_FILE, jobs=DEFAULT_JOBS, force=False, env=None,
+                 context=None):
+        """
+        With a StageContext, eligible steps run in-process (see module docstring); without
+        one every step is a subprocess. `env` only applies to subprocess steps.
+        """
+        self.steps = list(steps)
+        self.by_name = {s.name: s for s in self.steps}
+        self.deps = resolve_dependencies(self.steps)
+        self.manifest = Manifest(manifest_path)
+        self.jobs = max(1, jobs)
+        self.force = force
+        self.env = env
+        self.context = context
+        self.status = {}
+        self.elapsed = {}
+        self.wall = 0.0
+        self._print_lock = threading.Lock()
+        self._out = None
+        self._import_lock = threading.Lock()
+
+    def _log(self, message):
+        with self._print_lock:
+            print(message, file=self._out or sys.stdout, flush=True)
+
+    def _stage_entry(self, step):
+        """The step's `run(context)` if it can run in this interpreter, else None."""
+        if self.context is None or step.isolate or step.argv is None or not os.path.isfile(step.script):
+            return None
+        with open(step.script, "r") as f:
+            if not _RUN_RE.search(f.read()):
+                return None  # importing a script without run() would execute it
+        path = os.path.abspath(step.script)
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        with self._import_lock:
+            module = sys.modules.get(module_name)
+            if module is None:
+                spec = importlib.util.spec_from_file_location(module_name, path)
+                module = importlib.util.module_from_spec(spec)
+                sys.modules[module_name] = module
+                try:
+                    spec.loader.exec_module(module)
+                except BaseException:
+                    del sys.modules[module_name]
+                    raise
+        if os.path.abspath(getattr(module, "__file__", "") or "") != path:
+            return None  # another module already owns this name
+        return getattr(module, "run", None)
+
+    def _execute_in_process(self, step, entry):
+        _STEP.name = step.name
+        try:
+            code = _exit_code(entry(self.context.for_step(step.argv)))
+        except SystemExit as e:
+            code = _exit_code(e.code)
+        except Exception:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            _STEP.name = None
+        return code
+
+    def _execute(self, step):
+        """Runs the step, streaming its output prefixed with the step name. Returns (exit_code, elapsed)."""
+        self._log(f"👉 [{step.name}] {step.description}")
+        start = time.time()
+        try:
+            entry = self._stage_entry(step)
+        except Exception as e:
+            self._log(f"⚠️  [{step.name}] import failed ({e}); running in a subprocess")
+            entry = None
+        if entry is not None:
+            return self._execute_in_process(step, entry), time.time() - start
+        process = subprocess.Popen(
+            step.command, shell=True, env=self.env, text=True, bufsize=1,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        )
+        for line in process.stdout:
+            self._log(f"   [{step.name}] {line.rstrip()}")
+        return process.wait(), time.time() - start
+
+    def _refresh_upstream(self, step):
+        for earlier in self.steps[:self.steps.index(step)]:
+            read = [p for p in earlier.inputs if any(_overlaps(p, q) for q in step.outputs)]
+            written = [p for p in earlier.outputs if any(_overlaps(p, q) for q in step.outputs)]
+            if read or written:
+                self.manifest.refresh(earlier, read, written)
+
+    def _ready(self, name):
+        return all(self.status.get(d) in ("ok", "cached") for d in self.deps[name])
+
+    def _blocked(self, name):
+        return any(self.status.get(d) in ("failed", "blocked") for d in self.deps[name])
+
+    def run(self):
+        """Executes the DAG. Returns True if every step succeeded or was up to date."""
+        if self.context is None:
+            return self._run()
+        self._out = sys.stdout
+        saved = sys.stdout, sys.stderr
+        sys.stdout = _StepOutput(sys.stdout, self._log)
+        sys.stderr = _StepOutput(sys.stderr, self._log)
+        try:
+            return self._run()
+        finally:
+            sys.stdout, sys.stderr = saved
+            self._out = None
+
+    def _run(self):
+        started = time.time()
+        pending = [s.name for s in self.steps]
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                for name in list(pending):
+                    if self._blocked(name):
+                        pending.remove(name)
+                        self.status[name] = "blocked"
+                        self._log(f"⏭️  [{name}] BLOCKED (an upstream step failed)")
+                        continue
+                    if not self._ready(name) or len(running) >= self.jobs:
+                        continue
+                    pending.remove(name)
+                    step = self.by_name[name]
+                    reason = "forced" if self.force else self.manifest.staleness(step)
+                    if reason is None:
+                        self.status[name] = "cached"
+                        self.elapsed[name] = 0.0
+                        self._log(f"⏭️  [{name}] {step.description}: up to date")
+                        continue
+                    self._log(f"🔄 [{name}] running ({reason})")
+                    running[pool.submit(self._execute, step)] = name
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    step = self.by_name[name]
+                    try:
+                        exit_code, elapsed = future.result()
+                    except Exception as e:
+                        self._log(f"❌ [{name}] could not start: {e}")
+                        exit_code, elapsed = -1, 0.0
+                    self.elapsed[name] = elapsed
+                    if exit_code == 0:
+                        self.status[name] = "ok"
+                        self.manifest.record(step, elapsed)
+                        self._refresh_upstream(step)
+                        self._log(f"✅ [{name}] COMPLETED ({elapsed:.1f}s)")
+                    else:
+                        self.status[name] = "failed"
+                        self._log(f"❌ [{name}] FAILED: {step.description} (Exit Code: {exit_code})")
+        self.wall = time.time() - started
+        return all(self.status[s.name] in ("ok", "cached") for s in self.steps)
+
+    def critical_path(self):
+        """(seconds, [names]) of the longest dependency chain by measured step time."""
+        finish, via = {}, {}
+        for step in self.steps:
+            prev = max(self.deps[step.name], key=lambda d: finish[d], default=None)
+            finish[step.name] = (finish[prev] if prev else 0.0) + self.elapsed.get(step.name, 0.0)
+            via[step.name] = prev
+        if not finish:
+            return 0.0, []
+        name = max(finish, key=finish.get)
+        total, path = finish[name], []
+        while name:
+            path.append(name)
+            name = via[name]
+        return total, path[::-1]
+
+    def report(self):
+        counts = {}
+        for status in self.status.values():
+            counts[status] = counts.get(status, 0) + 1
+        total, path = self.critical_path()
+        busy = sum(self.elapsed.values())
+        print("\n--- ⏱️  Pipeline Timing ---")
+        print("   " + ", ".join(f"{k}: {v}" for k, v in sorted(counts.items())))
+        print(f"   Wall clock: {self.wall:.1f}s | Sum of step time: {busy:.1f}s | Critical path: {total:.1f}s")
+        for name in path:
+            print(f"   {self.elapsed.get(name, 0.0):7.1f}s  {name} ({self.status.get(name)})")
+
+
+def add_pipeline_arguments(parser):
+    parser.add_argument("--force", action="store_true", help="Run every step even if its inputs are unchanged.")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="Steps to run concurrently (default: %(default)s).")
+    parser.add_argument("--manifest", default=MANIFEST_FILE, help="Content-hash manifest (default: %(default)s).")
+    parser.add_argument("--isolate", action="store_true",
+                        help="Run every step in its own interpreter instead of in-process.")
+    return parser
+
+
+def run_pipeline(steps, args, env=None, cache_mode=None):
+    """
+    Runs `steps` with the parsed --force/--jobs/--manifest/--isolate flags, prints the timing
+    report, exits non-zero on failure. `cache_mode` is the LLM cache mode for in-process steps.
+    """
+    context = None
+    if not args.isolate:
+        from stage_context import StageContext
+        context = StageContext(argv=[], cache_mode=cache_mode)
+    pipeline = Pipeline(steps, manifest_path=args.manifest, jobs=args.jobs, force=args.force, env=env,
+                        context=context)
+    try:
+        ok = pipeline.run()
+    except KeyboardInterrupt:
+        print("\n🛑 Pipeline interrupted by user.")
+        sys.exit(1)
+    pipeline.report()
+    if not ok:
+        sys.exit(1)
+    return pipeline
@@ -1,40 +1,34 @@
 # pipeline_master.py
-import subprocess
-import sys
-import time
-
-def run_step(script_name, description):
-    print(f"\n🚀 STEP: {description} ({script_name})")
-    start = time.time()
-    result = subprocess.run([sys.executable, script_name], capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"❌ FAILED: {result.stderr}")
-        sys.exit(1)
-    else:
-        # Print only the last few lines to keep it clean
-        output_lines = result.stdout.strip().split('\n')
-        for line in output_lines[-5:]:
-            print(f"  > {line}")
-        print(f"✅ Done in {time.time() - start:.2f}s")
+import argparse
 
-def main():
-    print("--- 🏭 STARTING GEMINI CODE REVERSE ENGINEERING PIPELINE ---")
-    
+from pipeline_engine import Step, add_pipeline_arguments, run_pipeline
+
+STEPS = [
     # 1. Update the Truth Map (Consolidates heuristic + grep findings)
     # We assume 'variable_map_final.json' is our source of truth now.
-    
+
     # 2. Hydrate the Personas (Apply the map to the raw markdown)
-    run_step("hydrate_personas.py", "Hydrating Personas with latest Map")
-    
+    Step("python3 hydrate_personas.py", "Hydrating Personas with latest Map",
+         inputs=["extracted_personas"], outputs=["hydrated_personas"]),
+
     # 3. Patch Tools (Ensure tool definitions match the map)
-    run_step("patch_tools.py", "Patching Tool Definitions")
-    
+    Step("python3 patch_tools.py", "Patching Tool Definitions",
+         inputs=["healed_tools.json"], outputs=["gemini_browser_tools.json"]),
+
     # 4. Reconstruct Core Tools (Ensure Bash/Grep schemas are valid)
-    run_step("reconstruct_core_tools.py", "Reconstructing Core Tool Schemas")
-    
+    Step("python3 reconstruct_core_tools.py", "Reconstructing Core Tool Schemas",
+         inputs=["hydrated_personas/agent_engineer.md"], outputs=["core_tools_reconstructed.json"]),
+
     # 5. Audit (The script we just wrote)
-    run_step("audit_agent_logic.py", "Gemini Logic Audit")
-    
+    Step("python3 audit_agent_logic.py", "Gemini Logic Audit", inputs=["extracted_personas"]),
+]
+
+def main():
+    parser = add_pipeline_arguments(argparse.ArgumentParser(description="Gemini Code Reverse Engineering Pipeline"))
+    args = parser.parse_args()
+
+    print("--- 🏭 STARTING GEMINI CODE REVERSE ENGINEERING PIPELINE ---")
+    run_pipeline(STEPS, args)
     print("\n--- ✨ PIPELINE COMPLETE. READY FOR ENGINE START. ---")
 
 if __name__ == "__main__":
@@ -1,65 +1,57 @@
-import os
-import subprocess
-import time
 import argparse
 
-def run_step(script_name, description, extra_args=None):
-    print(f"\n🚀 --- STEP: {description} ({script_name}) ---")
-    start = time.time()
-    if not os.path.exists(script_name):
-        print(f"❌ Error: Script {script_name} not found.")
-        return False
-    
-    cmd = ["python3", script_name]
-    if extra_args:
-        cmd.extend(extra_args)
+from pipeline_engine import CLI_JS, Step, add_pipeline_arguments, run_pipeline
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode == 0:
-        print(f"✅ Success ({time.time() - start:.2f}s)")
-        # Print first few lines of output to show progress
-        print("\n".join(result.stdout.split('\n')[:5]))
-        return True
-    else:
-        print(f"🛑 FAILED")
-        print(result.stderr)
-        return False
+def build_steps(limit):
+    return [
+        # 1. Verification of Environment
+        Step("python3 test_genai.py", "Verifying Gemini API Access", always=True),
 
-def main():
-    parser = argparse.ArgumentParser(description="Gemini Reverse Engineering Orchestrator")
-    parser.add_argument("--limit", type=int, default=200, help="Mining limit for prompt extraction (Default: 200)")
-    args = parser.parse_args()
+        # 2. Extract Raw Prompts (CRITICAL: Creates 'extracted_personas' dir)
+        # We pass the limit argument here
+        Step(f"python3 mine_prompts.py --limit {limit}", "Mining System Prompts from CLI",
+             inputs=[CLI_JS], outputs=["extracted_personas"], after=["test_genai"]),
 
-    print(f"🤖 GEMINI REVERSE ENGINEERING ORCHESTRATOR 🤖 (Limit: {args.limit})")
-    
-    # 1. Verification of Environment
-    if not run_step("test_genai.py", "Verifying Gemini API Access"): exit(1)
+        # 3. Hunt for Variables (The 'Smart Hunt' logic)
+        Step("python3 smart_hunt.py", "Hunting for Variable Definitions",
+             inputs=[CLI_JS], outputs=["smart_map.json"], after=["test_genai"]),
 
-    # 2. Extract Raw Prompts (CRITICAL: Creates 'extracted_personas' dir)
-    # We pass the limit argument here
-    if not run_step("mine_prompts.py", "Mining System Prompts from CLI", extra_args=["--limit", str(args.limit)]): exit(1)
+        # 4. Merge results into the master map
+        Step("python3 merge_hunt_results.py", "Merging Hunt Results",
+             inputs=["variable_map.json", "variable_map_sanitized.json", "smart_map.json"],
+             outputs=["variable_map_master.json"]),
 
-    # 3. Hunt for Variables (The 'Smart Hunt' logic)
-    if not run_step("smart_hunt.py", "Hunting for Variable Definitions"): exit(1)
-    
-    # 4. Merge results into the master map
-    if not run_step("merge_hunt_results.py", "Merging Hunt Results"): exit(1)
+        # 5. Sanitize Map (Manual overrides for known issues)
+        Step("python3 sanitize_map.py", "Sanitizing Variable Map",
+             inputs=["variable_map_master.json"], outputs=["variable_map_sanitized.json"]),
 
-    # 5. Sanitize Map (Manual overrides for known issues)
-    if not run_step("sanitize_map.py", "Sanitizing Variable Map"): exit(1)
+        # 6. Hydrate Personas (Apply the map to the raw text; forks a process pool, so isolated)
+        Step("python3 hydrate_personas_v2.py", "Hydrating Personas",
+             inputs=["extracted_personas", "variable_map_master.json", "hydration.py"], outputs=["hydrated_personas"],
+             isolate=True),
 
-    # 6. Hydrate Personas (Apply the map to the raw text)
-    if not run_step("hydrate_personas_v2.py", "Hydrating Personas"): exit(1)
+        # 7. Extract Tools (Get the JSON schemas)
+        Step("python3 extract_schemas_full.py", "Extracting Tool Schemas", inputs=[CLI_JS], outputs=["tools_def.json"]),
 
-    # 7. Extract Tools (Get the JSON schemas)
-    if not run_step("extract_schemas_full.py", "Extracting Tool Schemas"): exit(1)
-    
-    # 8. Merge Tools (Combine Core + Web tools)
-    if not run_step("merge_tools.py", "Merging Tool Definitions"): exit(1)
+        # 8. Merge Tools (Combine Core + Web tools)
+        Step("python3 merge_tools.py", "Merging Tool Definitions",
+             inputs=["tools_def.json", "core_tools_reconstructed.json", "gemini_browser_tools.json"],
+             outputs=["master_tool_definitions.json"]),
 
-    # 9. Gemini Audit (The Critical Step)
-    if not run_step("verify_logic_with_gemini.py", "Auditing with Gemini API"): exit(1)
+        # 9. Gemini Audit (The Critical Step)
+        Step("python3 verify_logic_with_gemini.py", "Auditing with Gemini API",
+             inputs=["hydrated_personas", "master_tool_definitions.json"], outputs=["gemini_audit_report.json"],
+             after=["test_genai"]),
+    ]
 
+def main():
+    parser = argparse.ArgumentParser(description="Gemini Reverse Engineering Orchestrator")
+    parser.add_argument("--limit", type=int, default=200, help="Mining limit for prompt extraction (Default: 200)")
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"🤖 GEMINI REVERSE ENGINEERING ORCHESTRATOR 🤖 (Limit: {args.limit})")
+    run_pipeline(build_steps(args.limit), args)
     print("\n✨ PIPELINE COMPLETE ✨")
 
 if __name__ == "__main__":
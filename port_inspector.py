@@ -0,0 +1,206 @@
+"""
+port_inspector.py
+Which processes own which TCP ports, read straight from /proc.
+
+InspectPort (gemini_swarm/tools.py, auto_test_agent_v6/v7) ran `lsof -i :PORT -t`, then
+`ss -lptn ... | grep | cut` when lsof found nothing, then `ps -fp PID`: up to three
+shells per port, and a recovery mission checking 8080, 8081 and 8888 paid for all of
+them three times over. inspect_ports() instead:
+
+  - reads /proc/net/tcp and /proc/net/tcp6 once (address, port, state and socket inode
+    of every TCP socket in this network namespace);
+  - walks /proc/<pid>/fd once, mapping the socket:[inode] links it wants to PIDs (all
+    of them: pre-forked --workers share one listening socket);
+  - reads each owner's cmdline and stat for its user, parent and start time;
+
+and answers any number of ports, or every port that processes matching a command glob
+such as "gemini_server_*" listen on, from that one pass. A socket whose owner we may
+not look at (another user's process, without root) is still reported, without PIDs.
+"""
+import fnmatch
+import ipaddress
+import os
+import pwd
+import struct
+import time
+from collections import namedtuple
+
+PROC = "/proc"
+TCP_STATES = {"01": "ESTABLISHED", "02": "SYN_SENT", "03": "SYN_RECV", "04": "FIN_WAIT1", "05": "FIN_WAIT2",
+              "06": "TIME_WAIT", "07": "CLOSE", "08": "CLOSE_WAIT", "09": "LAST_ACK", "0A": "LISTEN",
+              "0B": "CLOSING", "0C": "NEW_SYN_RECV"}
+
+Socket = namedtuple("Socket", "address port state inode uid")
+Process = namedtuple("Process", "pid ppid user started argv")
+# processes: the Process of every PID holding the socket (empty when none is visible to us)
+PortInfo = namedtuple("PortInfo", "port address state uid processes")
+
+
+def _address(text):
+    """An address as /proc/net/tcp* prints it: 32-bit words in host byte order, in hex."""
+    packed = b"".join(struct.pack("=I", int(text[i:i + 8], 16)) for i in range(0, len(text), 8))
+    return str(ipaddress.ip_address(packed))
+
+
+def tcp_sockets(proc=PROC):
+    """Every TCP socket in this network namespace."""
+    sockets = []
+    for name in ("tcp", "tcp6"):
+        try:
+            with open(os.path.join(proc, "net", name)) as f:
+                next(f)  # header
+                for line in f:
+                    fields = line.split()
+                    address, port = fields[1].split(":")
+                    sockets.append(Socket(_address(address), int(port, 16), TCP_STATES.get(fields[3], fields[3]),
+                                          int(fields[9]), int(fields[7])))
+        except FileNotFoundError:  # no IPv6
+            continue
+    return sockets
+
+
+def _pids(proc=PROC):
+    return [int(name) for name in os.listdir(proc) if name.isdigit()]
+
+
+def socket_owners(inodes, proc=PROC):
+    """{inode: [pids]} for the given socket inodes, from one walk over /proc/*/fd."""
+    wanted = {f"socket:[{inode}]": inode for inode in inodes if inode}
+    owners = {}
+    if not wanted:
+        return owners
+    for pid in _pids(proc):
+        fd_dir = os.path.join(proc, str(pid), "fd")
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:  # gone, or not ours to look at
+            continue
+        for fd in fds:
+            try:
+                inode = wanted.get(os.readlink(os.path.join(fd_dir, fd)))
+            except OSError:
+                continue
+            if inode is not None:
+                pids = owners.setdefault(inode, [])
+                if pid not in pids:
+                    pids.append(pid)
+    return owners
+
+
+def _boot_time(proc=PROC):
+    with open(os.path.join(proc, "stat")) as f:
+        for line in f:
+            if line.startswith("btime "):
+                return int(line.split()[1])
+    return 0
+
+
+def _user(uid):
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+
+def process_info(pid, proc=PROC, boot_time=None):
+    """The Process for `pid`, or None if it is gone."""
+    base = os.path.join(proc, str(pid))
+    try:
+        with open(os.path.join(base, "cmdline"), "rb") as f:
+            argv = [os.fsdecode(arg) for arg in f.read().rstrip(b"\0").split(b"\0") if arg]
+        with open(os.path.join(base, "stat")) as f:
+            stat = f.read()
+        uid = os.stat(base).st_uid
+    except OSError:
+        return None
+    comm = stat[stat.index("(") + 1:stat.rindex(")")]
+    fields = stat[stat.rindex(")") + 2:].split()  # fields[0] is the state, field 3 of proc(5)
+    boot_time = _boot_time(proc) if boot_time is None else boot_time
+    started = boot_time + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    return Process(pid, int(fields[1]), _user(uid), started, argv or [f"[{comm}]"])
+
+
+def _runs(process, pattern):
+    """Whether `pattern` matches the command line, or the basename of one of its arguments."""
+    return (fnmatch.fnmatch(" ".join(process.argv), pattern)
+            or any(fnmatch.fnmatch(os.path.basename(arg), pattern) for arg in process.argv))
+
+
+def inspect_ports(ports=None, command=None, states=("LISTEN",), proc=PROC):
+    """
+    PortInfo for the sockets on `ports` (all ports when None) in `states` (all when None),
+    keeping only those held by a process matching the `command` glob when one is given.
+    """
+    ports = None if ports is None else set(ports)
+    sockets = [s for s in tcp_sockets(proc)
+               if (ports is None or s.port in ports) and (states is None or s.state in states)]
+    owners = socket_owners({s.inode for s in sockets}, proc)
+    boot_time = _boot_time(proc)
+    processes = {pid: process_info(pid, proc, boot_time) for pids in owners.values() for pid in pids}
+    infos = []
+    for s in sockets:
+        held = [processes[pid] for pid in owners.get(s.inode, ()) if processes.get(pid)]
+        if command and not any(_runs(process, command) for process in held):
+            continue
+        infos.append(PortInfo(s.port, s.address, s.state, s.uid, held))
+    return sorted(infos, key=lambda info: (info.port, info.address))
+
+
+def listening_pids(port, proc=PROC):
+    """PIDs of the processes listening on `port`, parents first."""
+    pids = []
+    for info in inspect_ports([port], proc=proc):
+        for process in sorted(info.processes, key=lambda process: process.started):
+            if process.pid not in pids:
+                pids.append(process.pid)
+    return pids
+
+
+def _details(processes):
+    lines = [f"{'UID':<10} {'PID':>7} {'PPID':>7} {'STIME':<8} CMD"]
+    today = time.strftime("%b%d")
+    for p in processes:
+        started = time.strftime("%H:%M", time.localtime(p.started))
+        if time.strftime("%b%d", time.localtime(p.started)) != today:
+            started = time.strftime("%b%d", time.localtime(p.started))
+        lines.append(f"{p.user:<10} {p.pid:>7} {p.ppid:>7} {started:<8} {' '.join(p.argv)}")
+    return "\n".join(lines)
+
+
+def report(ports=(), command=None, proc=PROC):
+    """
+    What InspectPort returns: a PORT_STATUS block per port asked for or, with no ports,
+    per port that processes matching `command` listen on.
+    """
+    infos = inspect_ports(ports or None, None if ports else command, proc=proc)
+    by_port = {}
+    for info in infos:
+        by_port.setdefault(info.port, []).append(info)
+    if not ports and not by_port:
+        return f"PORT_STATUS: FREE (no listening ports{f' of processes matching {command!r}' if command else ''})"
+    blocks = []
+    for port in ports or sorted(by_port):
+        found = by_port.get(port)
+        if not found:
+            blocks.append(f"PORT: {port}\nPORT_STATUS: FREE")
+            continue
+        processes = {p.pid: p for info in found for p in info.processes}
+        addresses = ", ".join(sorted({info.address for info in found}))
+        if not processes:
+            uids = ", ".join(sorted({_user(info.uid) for info in found}))
+            blocks.append(f"PORT: {port}\nPORT_STATUS: OCCUPIED (listening on {addresses})\n"
+                          f"PID: unknown (owned by {uids}; the process is not visible from here)")
+            continue
+        ordered = sorted(processes.values(), key=lambda p: p.started)
+        blocks.append(f"PORT: {port}\nPORT_STATUS: OCCUPIED (listening on {addresses})\n"
+                      f"PID: {' '.join(str(p.pid) for p in ordered)}\nDETAILS:\n{_details(ordered)}")
+    return "\n\n".join(blocks)
+
+
+def parse_ports(port=0, ports=""):
+    """The ports an InspectPort call names: `port`, plus `ports` as "8080,8081 8888"."""
+    wanted = [port] if port else []
+    for item in ports.replace(",", " ").split():
+        if int(item) not in wanted:
+            wanted.append(int(item))
+    return wanted
@@ -0,0 +1,267 @@
+"""
+process_killer.py
+Stopping processes, with their children, as soon as they actually exit.
+
+KillProcess ran `kill PID` through a shell, slept a fixed second, checked `ps -p`, and
+tried `sudo -n kill -9` if the process was still there: every kill cost at least a
+second, and the children of a killed server (its bash workers, and whatever they were
+running) lived on, reparented to init. terminate():
+
+  - snapshots the process tree first (/proc/*/stat), so the target's descendants can
+    still be found once it is gone, and opens a pidfd for each of them;
+  - sends SIGTERM to every process group led by one of them (the shell_pool workers run
+    in their own sessions, so that reaches what they run too) and to the rest one by
+    one; never to our own group or to us;
+  - waits on the pidfds with poll(), returning the moment the last one exits, and sends
+    SIGKILL only to what is still there after `grace` seconds;
+  - takes any number of PIDs, signalled together and waited for together.
+
+Without pidfds (kernel < 5.3, not Linux) it polls /proc with short sleeps instead.
+"""
+import os
+import select
+import signal
+import subprocess
+import time
+from collections import namedtuple
+
+PROC = "/proc"
+DEFAULT_GRACE = 5.0  # seconds between SIGTERM and SIGKILL
+KILL_WAIT = 2.0  # how long SIGKILL gets before a process counts as unkillable (stuck in D state)
+POLL_INTERVAL = 0.005
+
+# outcome: exited (after SIGTERM), killed (needed SIGKILL), sudo (killed with `sudo -n kill -9`),
+# not_found, denied, survived (still there after SIGKILL), refused (ourselves).
+# children: how many descendants were stopped with it.
+Killed = namedtuple("Killed", "pid outcome seconds children detail")
+
+
+def _process_table(proc=PROC):
+    """{pid: (ppid, pgid)} of every live (not zombie) process."""
+    table = {}
+    for name in os.listdir(proc):
+        if not name.isdigit():
+            continue
+        try:
+            with open(os.path.join(proc, name, "stat")) as f:
+                stat = f.read()
+        except OSError:
+            continue
+        fields = stat[stat.rindex(")") + 2:].split()
+        if fields[0] not in "ZX":
+            table[int(name)] = (int(fields[1]), int(fields[2]))
+    return table
+
+
+def _descendants(pid, table):
+    children = {}
+    for child, (ppid, _) in table.items():
+        children.setdefault(ppid, []).append(child)
+    found = []
+    stack = list(children.get(pid, ()))
+    while stack:
+        child = stack.pop()
+        found.append(child)
+        stack.extend(children.get(child, ()))
+    return found
+
+
+def _alive(pid, proc=PROC):
+    """Running (a zombie has exited: it only waits for its parent to reap it)."""
+    try:
+        with open(os.path.join(proc, str(pid), "stat")) as f:
+            stat = f.read()
+    except OSError:
+        return False
+    return stat[stat.rindex(")") + 2] not in "ZX"
+
+
+class _Member:
+    """One process of a target's tree, pinned by a pidfd where the kernel has them."""
+
+    __slots__ = ("pid", "group", "fd", "gone", "exited")
+
+    def __init__(self, pid, group):
+        self.pid = pid
+        self.group = group
+        self.gone = False
+        self.exited = time.monotonic()  # when it was seen gone
+        try:
+            self.fd = os.pidfd_open(pid)
+        except ProcessLookupError:
+            self.fd = None
+            self.gone = True
+        except (AttributeError, OSError):
+            self.fd = None
+
+    def signal(self, signum):
+        """Sends `signum`; False if we may not."""
+        try:
+            if self.fd is not None:
+                signal.pidfd_send_signal(self.fd, signum)
+            else:
+                os.kill(self.pid, signum)
+        except ProcessLookupError:
+            self.mark_gone()
+        except PermissionError:
+            return False
+        return True
+
+    def mark_gone(self):
+        self.gone = True
+        self.exited = time.monotonic()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def _wait(members, deadline, proc=PROC):
+    """Waits until every member is gone or `deadline` passes."""
+    waiting = [m for m in members if not m.gone]
+    poller = select.poll()
+    by_fd = {}
+    for m in waiting:
+        if m.fd is not None:
+            poller.register(m.fd, select.POLLIN)
+            by_fd[m.fd] = m
+    unpinned = [m for m in waiting if m.fd is None]
+    while True:
+        for m in unpinned:
+            if not m.gone and not _alive(m.pid, proc):
+                m.mark_gone()
+        if by_fd:
+            for fd, _ in poller.poll(0):
+                by_fd.pop(fd).mark_gone()
+                poller.unregister(fd)
+        remaining = deadline - time.monotonic()
+        if all(m.gone for m in waiting) or remaining <= 0:
+            return
+        if unpinned or not by_fd:
+            time.sleep(min(POLL_INTERVAL, remaining))
+        else:
+            for fd, _ in poller.poll(remaining * 1000):
+                by_fd.pop(fd).mark_gone()
+                poller.unregister(fd)
+
+
+def _signal_all(targets, signum, own_group):
+    """Signals each target's groups, then its members outside them; returns the targets we may not signal."""
+    denied = set()
+    for target in targets:
+        for group in target.groups:
+            if group != own_group:
+                try:
+                    os.killpg(group, signum)
+                except ProcessLookupError:
+                    pass
+                except PermissionError:
+                    denied.add(target.pid)
+        for m in target.members:
+            if not m.gone and m.group not in target.groups and not m.signal(signum) and m.pid == target.pid:
+                denied.add(target.pid)
+    return denied
+
+
+class _Target:
+    def __init__(self, pid, members, groups):
+        self.pid = pid
+        self.members = members
+        self.groups = groups
+
+
+def terminate(pids, grace=DEFAULT_GRACE, tree=True, sudo=False, proc=PROC):
+    """
+    Stops each of `pids` (with its descendants when `tree`): SIGTERM, then SIGKILL for
+    whatever outlives `grace` seconds. With `sudo`, a process we may not signal gets
+    `sudo -n kill -9`. Returns a Killed per PID, in order.
+    """
+    start = time.monotonic()
+    me, own_group = os.getpid(), os.getpgrp()
+    table = _process_table(proc)
+    results = {}
+    targets = []
+    try:  # every pidfd opened below is closed, whatever happens
+        for pid in dict.fromkeys(pids):
+            if pid <= 0 or pid == me:
+                results[pid] = Killed(pid, "refused", 0.0, 0, "not a process KillProcess may stop")
+                continue
+            if pid not in table and not _alive(pid, proc):
+                results[pid] = Killed(pid, "not_found", 0.0, 0, "no such process")
+                continue
+            family = [pid] + ([child for child in _descendants(pid, table) if child != me] if tree else [])
+            members = [_Member(member_pid, table.get(member_pid, (0, 0))[1]) for member_pid in family]
+            # Groups led by the target or its descendants; a group led by someone else (the shell
+            # that started it, the agent itself) is not ours to stop.
+            groups = {m.pid for m in members if m.group == m.pid and m.pid != own_group} if tree else set()
+            targets.append(_Target(pid, members, groups))
+
+        denied = _signal_all(targets, signal.SIGTERM, own_group)
+        members = [m for target in targets for m in target.members]
+        _wait(members, start + grace, proc)
+        survivors = [target for target in targets if any(not m.gone for m in target.members)]
+        if survivors:
+            denied |= _signal_all(survivors, signal.SIGKILL, own_group)
+            _wait(members, time.monotonic() + KILL_WAIT, proc)
+
+        for target in targets:
+            head = target.members[0]
+            children = sum(m.gone for m in target.members[1:])
+            if all(m.gone for m in target.members):
+                seconds = max(m.exited for m in target.members) - start
+            else:
+                seconds = time.monotonic() - start
+            if head.gone:
+                outcome = "killed" if target in survivors else "exited"
+                results[target.pid] = Killed(target.pid, outcome, seconds, children, "")
+            elif target.pid in denied:
+                results[target.pid] = _sudo_kill(target.pid, seconds, children) if sudo else Killed(
+                    target.pid, "denied", seconds, children, "permission denied")
+            else:
+                results[target.pid] = Killed(target.pid, "survived", seconds, children, "still running after SIGKILL")
+    finally:
+        for target in targets:
+            for m in target.members:
+                m.close()
+    return [results[pid] for pid in dict.fromkeys(pids)]
+
+
+def _sudo_kill(pid, seconds, children):
+    try:
+        result = subprocess.run(["sudo", "-n", "kill", "-9", str(pid)], capture_output=True, text=True)
+    except OSError as e:  # no sudo here
+        return Killed(pid, "denied", seconds, children, f"permission denied; sudo: {e.strerror or e}")
+    if result.returncode == 0:
+        return Killed(pid, "sudo", seconds, children, "")
+    return Killed(pid, "denied", seconds, children, result.stderr.strip() or f"sudo exited {result.returncode}")
+
+
+def report(results):
+    """What KillProcess returns: a STATUS line per PID."""
+    if not results:
+        return "STATUS: FAILED_TO_KILL. No PID given"
+    lines = []
+    for r in results:
+        also = f", {r.children} child process{'es' if r.children != 1 else ''} with it" if r.children else ""
+        if r.outcome == "exited":
+            status = f"STATUS: KILLED (Standard, exited in {r.seconds * 1000:.0f} ms{also})"
+        elif r.outcome == "killed":
+            status = f"STATUS: KILLED (SIGKILL after ignoring SIGTERM{also})"
+        elif r.outcome == "sudo":
+            status = f"STATUS: KILLED (Sudo Force{also})"
+        elif r.outcome == "not_found":
+            status = "STATUS: NOT_FOUND (no such process)"
+        else:
+            status = f"STATUS: FAILED_TO_KILL. {r.detail}"
+        lines.append(status if len(results) == 1 else f"PID {r.pid}: {status}")
+    return "\n".join(lines)
+
+
+def parse_pids(pid=0, pids=""):
+    """The PIDs a KillProcess call names: `pid`, plus `pids` as "123,456 789"."""
+    wanted = [pid] if pid else []
+    for item in pids.replace(",", " ").split():
+        if int(item) not in wanted:
+            wanted.append(int(item))
+    return wanted
@@ -1,12 +1,12 @@
 # Save as reconstruct_core_tools.py
 import json
 import os
-from google import genai
 from google.genai import types
 
-client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
+from llm_cache import cache_parser, generate_content
+from stage_context import StageContext
 
-def reconstruct_tools():
+def reconstruct_tools(client, cache=None):
     # Load a heavy-hitter persona that uses core tools
     with open("hydrated_personas/agent_engineer.md", "r") as f:
         engineer_prompt = f.read()
@@ -31,12 +31,14 @@ def reconstruct_tools():
     {engineer_prompt[:10000]} # First 10k chars should contain the tool instructions
     """
 
-    response = client.models.generate_content(
+    response = generate_content(
+        client,
         model="gemini-2.0-flash",
         contents=prompt,
         config=types.GenerateContentConfig(
             response_mime_type="application/json"
-        )
+        ),
+        cache=cache,
     )
 
     tools = json.loads(response.text)
@@ -47,5 +49,11 @@ def reconstruct_tools():
     
     print(f"✅ Reconstructed {len(tools)} core tools. Saved to core_tools_reconstructed.json")
 
+def run(context):
+    args = context.parse_args(cache_parser("Reconstruct core tool schemas from agent prompts"))
+    cache = context.cache(args.cache_mode)
+    reconstruct_tools(context.client, cache)
+    cache.report()
+
 if __name__ == "__main__":
-    reconstruct_tools()
+    run(StageContext())
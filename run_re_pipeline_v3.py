@@ -1,42 +1,66 @@
 """
 run_re_pipeline_v3.py
-Master Orchestrator V3: Adds control flags (--force, --clean) and real-time logging.
+Master Orchestrator V3: the full reverse-engineering pipeline as a pipeline_engine DAG.
+Steps rerun only when their inputs changed (--force overrides), independent branches run
+concurrently, and --clean wipes the artifacts first.
 """
-import subprocess
-import time
-import sys
 import os
 import shutil
 import argparse
 
-# Definition of the pipeline steps
-# Format: (COMMAND, DESCRIPTION, ARTIFACT_DIR_OR_FILE)
+from llm_cache import CACHE_MODES, DEFAULT_CACHE_MODE
+from pipeline_engine import CLI_JS, Step, add_pipeline_arguments, run_pipeline
+
+CORPUS = [CLI_JS, "cli_corpus.py"]
+
+# Each step declares what it reads and writes; ordering and parallelism follow from that.
 STEPS = [
+    # 0. Corpus Index (shared by every scanner below)
+    Step("python3 cli_corpus.py", "📚 Indexing cli.js Corpus", inputs=CORPUS),
+
     # 1. Extraction Phase
-    ("python3 mine_prompts.py", "⛏️  Mining System Prompts", "extracted_personas"),
-    ("python3 deep_scan.py", "🔍 Scanning Variables", None),
-    ("python3 dragnet.py", "🕸️  Dragging Net for Tool Names", None),
+    Step("python3 mine_prompts.py", "⛏️  Mining System Prompts",
+         inputs=CORPUS + ["js_lexer.py"], outputs=["extracted_personas"], after=["cli_corpus"]),
+    Step("python3 deep_scan.py", "🔍 Scanning Variables",
+         inputs=CORPUS + ["extracted_personas"], after=["cli_corpus"]),
+    Step("python3 dragnet.py", "🕸️  Dragging Net for Tool Names", inputs=CORPUS, after=["cli_corpus"]),
     
     # 2. Heuristic Phase
-    ("python3 find_tools.py", "🛠️  Finding Tool Definitions", None),
-    ("python3 heal_tools.py", "🚑 Healing JSON Schemas", "healed_tools.json"),
-    ("python3 extract_core_tools.py", "🧬 Extracting Core Tools", None),
-    ("python3 reconstruct_core_tools.py", "🧠 Reconstructing Core Logic", "core_tools_reconstructed.json"),
+    Step("python3 find_tools.py", "🛠️  Finding Tool Definitions", inputs=CORPUS, after=["cli_corpus"]),
+    Step("python3 heal_tools.py", "🚑 Healing JSON Schemas",
+         inputs=CORPUS, outputs=["healed_tools.json"], after=["cli_corpus"]),
+    Step("python3 extract_core_tools.py", "🧬 Extracting Core Tools",
+         inputs=CORPUS, outputs=["core_tools_raw.json"], after=["cli_corpus"]),
+    Step("python3 reconstruct_core_tools.py", "🧠 Reconstructing Core Logic",
+         inputs=["hydrated_personas/agent_engineer.md"], outputs=["core_tools_reconstructed.json"]),
     
     # 3. Mapping Phase
-    ("python3 smart_hunt.py", "🕵️‍♀️ Smart Hunting Variable Names", "smart_map.json"),
-    ("python3 merge_hunt_results.py", "🔄 Merging Hunt Results", None),
-    ("python3 sanitize_map.py", "🧹 Sanitizing Variable Map", "variable_map_sanitized.json"),
-    ("python3 update_map_truth.py", "🔒 Locking Verified Mappings", None),
-    ("python3 fix_planner_map.py", "🩹 Applying Planner Fixes", None),
-    ("python3 fix_code_writer.py", "🩹 Applying Code Writer Fixes", None),
+    Step("python3 smart_hunt.py", "🕵️‍♀️ Smart Hunting Variable Names",
+         inputs=CORPUS, outputs=["smart_map.json"], after=["cli_corpus"]),
+    Step("python3 merge_hunt_results.py", "🔄 Merging Hunt Results",
+         inputs=["variable_map.json", "variable_map_sanitized.json", "smart_map.json"],
+         outputs=["variable_map_master.json"]),
+    Step("python3 sanitize_map.py", "🧹 Sanitizing Variable Map",
+         inputs=["variable_map_master.json"], outputs=["variable_map_sanitized.json"]),
+    Step("python3 update_map_truth.py", "🔒 Locking Verified Mappings",
+         inputs=[CLI_JS], outputs=["variable_map.json"]),
+    Step("python3 fix_planner_map.py", "🩹 Applying Planner Fixes",
+         inputs=["variable_map_sanitized.json"], outputs=["variable_map_sanitized.json"]),
+    Step("python3 fix_code_writer.py", "🩹 Applying Code Writer Fixes",
+         inputs=["variable_map_master.json", "variable_map_final.json", "hydrated_personas/agent_code_writer.md"],
+         outputs=["variable_map_master.json", "variable_map_final.json", "hydrated_personas/agent_code_writer.md"]),
     
-    # 4. Hydration Phase
-    ("python3 hydrate_personas_v2.py", "💧 Hydrating Personas (Final)", "gemini_code_personas"),
-    ("python3 identify_swarm.py", "🐝 Identifying Swarm Agents", "swarm_identity_map.json"),
+    # 4. Hydration Phase (forks a process pool, so it gets its own interpreter)
+    Step("python3 hydrate_personas_v2.py", "💧 Hydrating Personas (Final)",
+         inputs=["extracted_personas", "variable_map_master.json", "hydration.py"], outputs=["hydrated_personas"],
+         isolate=True),
+    Step("python3 identify_swarm.py", "🐝 Identifying Swarm Agents",
+         inputs=["hydrated_personas"], outputs=["hydrated_personas", "swarm_identity_map.json"]),
     
     # 5. Verification Phase
-    ("python3 gemini_audit_suite.py", "🧐 Running Gemini Audit Suite", "gemini_audit_final_report.json")
+    Step("python3 gemini_audit_suite.py", "🧐 Running Gemini Audit Suite",
+         inputs=["gemini_code_personas", "master_tool_definitions.json"],
+         outputs=["gemini_audit_final_report.json"]),
 ]
 
 def clean_artifacts():
@@ -58,65 +82,27 @@ def clean_artifacts():
             os.remove(f)
             print(f"   Deleted file: {f}")
 
-def run_step(command, description, artifact_check, force_mode):
-    print(f"\n--------------------------------------------------")
-    print(f"👉 {description}")
-    
-    # CHECK: Should we skip?
-    if artifact_check and not force_mode and os.path.exists(artifact_check):
-        # Specific logic for directories (check if empty)
-        if os.path.isdir(artifact_check):
-            if len(os.listdir(artifact_check)) > 5:
-                print(f"   ⚠️  Artifacts exist in '{artifact_check}'.")
-                print(f"   ⏭️  SKIPPING (Use --force to override).")
-                return
-        # Logic for files
-        else:
-            print(f"   ⚠️  Artifact '{artifact_check}' exists.")
-            print(f"   ⏭️  SKIPPING (Use --force to override).")
-            return
-
-    start_time = time.time()
-    
-    # Stream output to console
-    try:
-        process = subprocess.Popen(
-            command, 
-            shell=True, 
-            stdout=sys.stdout, 
-            stderr=sys.stderr
-        )
-        exit_code = process.wait()
-        
-        elapsed = time.time() - start_time
-        
-        if exit_code != 0:
-            print(f"❌ FAILED: {description} (Exit Code: {exit_code})")
-            user_input = input("   Continue anyway? (y/n): ")
-            if user_input.lower() != 'y':
-                sys.exit(exit_code)
-        else:
-            print(f"✅ COMPLETED ({elapsed:.1f}s)")
-            
-    except KeyboardInterrupt:
-        print(f"\n🛑 Pipeline interrupted by user.")
-        sys.exit(1)
-
 def main():
     parser = argparse.ArgumentParser(description="Gemini Code Reverse Engineering Pipeline")
-    parser.add_argument("--force", action="store_true", help="Run all steps even if artifacts exist (overwrites data).")
+    add_pipeline_arguments(parser)
     parser.add_argument("--clean", action="store_true", help="Delete all artifact directories before starting.")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default=DEFAULT_CACHE_MODE,
+                        help="LLM response cache mode passed to every Gemini stage (default: %(default)s).")
     args = parser.parse_args()
 
     print("🚀 STARTING GEMINI CODE PIPELINE (V3)")
-    print(f"   Mode: {'FORCE' if args.force else 'Standard'}")
+    print(f"   Mode: {'FORCE' if args.force else 'Incremental'} | Jobs: {args.jobs} | "
+          f"Stages: {'isolated' if args.isolate else 'in-process'}")
+    print(f"   LLM Cache: {args.cache_mode}")
     if args.clean:
         clean_artifacts()
 
     print("=====================================")
-    
-    for cmd, desc, check in STEPS:
-        run_step(cmd, desc, check, args.force)
+
+    # In-process stages get the mode from the shared StageContext; subprocess stages pick it
+    # up through llm_cache.DEFAULT_CACHE_MODE.
+    env = dict(os.environ, LLM_CACHE_MODE=args.cache_mode)
+    run_pipeline(STEPS, args, env=env, cache_mode=args.cache_mode)
         
     print("\n🎉 PIPELINE COMPLETE. Artifacts ready in ./gemini_code_personas/")
 
@@ -1,36 +1,30 @@
-import subprocess
+import glob
 import os
 
-# Point to the binary you found in the logs
-RG_PATH = os.path.abspath("node_modules/@anthropic-ai/claude-code/vendor/ripgrep/x64-linux/rg")
+import code_search
+
+# Matches returned before the search stops (it used to collect everything, then keep 50)
+MAX_MATCHES = 50
 
 def grep_tool(pattern, path=".", case_insensitive=True):
     """
-    Implements the 'grep' tool capability using the extracted ripgrep binary.
+    Implements the 'grep' tool capability with the in-process search in code_search.py
+    (no vendored ripgrep binary needed).
     """
-    if not os.path.exists(RG_PATH):
-        return f"Error: ripgrep binary not found at {RG_PATH}"
-
-    cmd = [RG_PATH, "--line-number", "--no-heading"]
-    if case_insensitive:
-        cmd.append("-i")
-    
-    cmd.append(pattern)
-    cmd.append(path)
+    include = None
+    if not os.path.exists(path) and glob.has_magic(path):
+        # e.g. "*.py": search the directory part for files matching the name part
+        path, include = os.path.split(path)
+        path = path or "."
 
     try:
-        # Run the binary
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        output = result.stdout.strip()
-        
+        result = code_search.search(pattern, path, max_results=MAX_MATCHES, ignore_case=case_insensitive,
+                                    glob=include)
+        output = code_search.format_matches(result)
+
         if not output:
             return "No matches found."
-            
-        # Truncate if too long to avoid overflowing context window
-        lines = output.split('\n')
-        if len(lines) > 50:
-            return "\n".join(lines[:50]) + f"\n... ({len(lines)-50} more matches truncated)"
-        
+
         return output
     except Exception as e:
         return f"Grep failed: {str(e)}"
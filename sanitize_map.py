@@ -1,21 +1,21 @@
 import json
 import os
 
+from stage_context import StageContext
+
 # Configuration
 INPUT_FILE = 'variable_map_master.json'  # Consumes output from merge_hunt_results.py
 OUTPUT_FILE = 'variable_map_sanitized.json'
 
-def main():
+def main(context):
     print(f"--- 🧹 Sanitizing Variable Map ({INPUT_FILE}) ---")
 
-    if not os.path.exists(INPUT_FILE):
+    # Load current map
+    vmap = context.load_json(INPUT_FILE)
+    if vmap is None:
         print(f"❌ Error: {INPUT_FILE} not found. Ensure merge_hunt_results.py ran successfully.")
         return
 
-    # Load current map
-    with open(INPUT_FILE, 'r') as f:
-        vmap = json.load(f)
-
     # List of generic minified variables that are DANGEROUS to map globally
     # These often cause false positives in hydration (e.g. replacing every "A" or "B")
     BLACKLIST = ["${A}", "${Q}", "${B}", "${G}", "${Z}", "${Y}", "${E}", "${I}"]
@@ -64,5 +64,8 @@ def main():
 
     print(f"✅ Map Sanitized. Saved to {OUTPUT_FILE} (Total keys: {len(new_map)})")
 
+def run(context):
+    main(context)
+
 if __name__ == "__main__":
-    main()
+    run(StageContext())
@@ -0,0 +1,408 @@
+"""
+shell_pool.py
+Long-lived bash workers for the agents' Bash tool.
+
+Every Bash call used to be `subprocess.run(command, shell=True)`: a fork/exec of a new
+shell per command (milliseconds each, far more than `echo` itself), and a `cd` or
+`export` in one call was gone by the next. A ShellPool keeps one bash process per agent
+session instead, fed commands over a pipe:
+
+  - framing: each command is written NUL-terminated; the worker evals it and prints
+    `\\0<token> <exit code> <cwd>\\0` on stdout and `\\0<token>\\0` on stderr, where
+    <token> is a random per-worker string, so output can hold anything but the token;
+  - state: cwd, exported variables, functions and aliases carry over between a
+    session's commands, as in a terminal;
+  - timeouts: the worker runs with job control (`set -m`), so each command's processes
+    get their own process group. A command that overruns has the groups it started
+    killed; the shell itself (and its state) survives. A shell stuck in a builtin loop
+    is replaced, keeping only its last known cwd;
+  - recycling: after `max_commands` commands (and when the least recently used session
+    is evicted to make room), the worker's cwd and `export -p` are saved and replayed
+    into a fresh shell, so a long session doesn't keep a bloated bash (and whatever it
+    leaked) alive forever.
+
+Each stream of each command is read as it arrives into an OutputCapture
+(output_capture.py), which keeps only its head and tail, so a command printing
+gigabytes costs the server no more memory than one printing a line.
+
+Commands never see the pipe as stdin (they get /dev/null), and one session runs one
+command at a time. bench_shell_pool.py compares 1000 `echo` calls pooled vs
+subprocess.run.
+"""
+import functools
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+from output_capture import DEFAULT_SPILL_DIR, OutputCapture
+
+DEFAULT_TIMEOUT = 120
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_COMMANDS = 500
+DEFAULT_SESSION = "default"
+KILL_GRACE = 2.0  # seconds a timed-out command's shell gets to report back after the kill
+KILL_INTERVAL = 0.05
+MAX_SAVED_SESSIONS = 256  # sessions whose shell was evicted but whose cwd/exports are kept
+READ_SIZE = 65536
+
+ShellResult = namedtuple("ShellResult", "returncode stdout stderr cwd timed_out")
+
+WORKER_SCRIPT = r"""
+set -m
+while IFS= read -r -d '' __shell_pool_cmd; do
+    eval "$__shell_pool_cmd" </dev/null
+    __shell_pool_rc=$?
+    printf '\0%s %d %s\0' TOKEN "$__shell_pool_rc" "$PWD"
+    printf '\0%s\0' TOKEN >&2
+done
+"""
+
+
+def _everything():
+    return OutputCapture(head_bytes=None)
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return {int(child) for child in f.read().split()}
+    except OSError:
+        return None
+
+
+class _Pipe:
+    """A worker's stdout or stderr: what comes before the end-of-command marker goes to `capture`."""
+
+    def __init__(self, pipe, marker, field):
+        self.pipe = pipe
+        self.marker = marker
+        self.field = field  # stdout's marker is followed by "<exit code> <cwd>\0"
+        self.pending = bytearray()  # at most a possible marker prefix, between reads
+        self.capture = None
+        self.done = False
+        self.value = None
+
+    def start(self, capture):
+        self.capture = capture
+        self.done = False
+        self.value = None
+        self.feed(b"")  # anything background jobs printed since the last command
+
+    def feed(self, data):
+        self.pending += data
+        if self.value is None:
+            at = self.pending.find(self.marker)
+            if at < 0:
+                cut = max(0, len(self.pending) - len(self.marker) + 1)
+                self.capture.write(bytes(self.pending[:cut]))
+                del self.pending[:cut]
+                return
+            self.capture.write(bytes(self.pending[:at]))
+            del self.pending[:at + len(self.marker)]
+            self.value = b""
+        if self.field:
+            end = self.pending.find(b"\0")
+            if end < 0:
+                return
+            self.value = bytes(self.pending[:end])
+            del self.pending[:end + 1]
+        self.done = True
+
+    def drain(self):
+        """The shell is gone: what's left is output."""
+        if self.value is None:
+            self.capture.write(bytes(self.pending))
+        self.pending.clear()
+
+
+class ShellWorker:
+    """One bash process running WORKER_SCRIPT; run() is not thread-safe (ShellPool serializes)."""
+
+    def __init__(self, cwd=None, env=None):
+        self.token = uuid.uuid4().hex
+        self.process = subprocess.Popen(
+            ["/bin/bash", "--noprofile", "--norc", "-c", WORKER_SCRIPT.replace("TOKEN", self.token)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, env=env,
+            start_new_session=True)  # Ctrl-C at the console must not reach the agent's shells
+        self.pid = self.process.pid
+        self.commands = 0
+        self.cwd = cwd or os.getcwd()
+        self._eof = False
+        self._stdout = _Pipe(self.process.stdout, b"\0" + self.token.encode() + b" ", field=True)
+        self._stderr = _Pipe(self.process.stderr, b"\0" + self.token.encode() + b"\0", field=False)
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, command, timeout=DEFAULT_TIMEOUT, capture=OutputCapture):
+        """
+        Runs `command` in this shell; returns a ShellResult. Each stream goes through a
+        `capture()` (bounded by default). Dead afterwards if the command ran `exit`.
+        """
+        before = _children(self.pid)
+        self.commands += 1
+        self._stdout.start(capture())
+        self._stderr.start(capture())
+        try:
+            self._write(command.replace("\0", "").encode() + b"\0")
+        except BrokenPipeError:
+            return self._finish(False)
+        done = self._read_until(time.monotonic() + timeout)
+        if not done and not self._eof:
+            # Killing one job lets the shell go on to the next in the list (`sleep 60; make`),
+            # so keep killing whatever it starts until it reports back.
+            grace = time.monotonic() + KILL_GRACE
+            while not done and not self._eof and time.monotonic() < grace and self._kill_jobs(before):
+                done = self._read_until(min(grace, time.monotonic() + KILL_INTERVAL))
+            if not done:  # the shell itself is busy (a builtin loop) or unkillable: give it up
+                self.close()
+            return self._finish(done, timed_out=True)
+        return self._finish(done)
+
+    def _write(self, data):
+        fd = self.process.stdin.fileno()
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+
+    def _read_until(self, deadline):
+        """Reads both pipes until both markers are in. False on timeout, or on EOF (self._eof)."""
+        pipes = [pipe for pipe in (self._stdout, self._stderr) if not pipe.done]
+        if not pipes:
+            return True
+        with selectors.DefaultSelector() as selector:
+            for pipe in pipes:
+                selector.register(pipe.pipe, selectors.EVENT_READ, pipe)
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                for key, _ in selector.select(remaining):
+                    data = os.read(key.fd, READ_SIZE)
+                    if not data:  # the shell exited (or closed its stdout/stderr)
+                        selector.unregister(key.fileobj)
+                        self._eof = True
+                        continue
+                    key.data.feed(data)
+                    if key.data.done:
+                        selector.unregister(key.fileobj)
+        return not self._eof
+
+    def _finish(self, done, timed_out=False):
+        stdout, stderr = self._stdout.capture, self._stderr.capture
+        if done:
+            code, _, cwd = self._stdout.value.partition(b" ")
+            returncode, self.cwd = int(code), os.fsdecode(cwd)
+        else:  # exited, or given up after a timeout: whatever it printed is all there is
+            self._stdout.drain()
+            self._stderr.drain()
+            if not timed_out:
+                try:
+                    self.process.wait(KILL_GRACE)
+                except subprocess.TimeoutExpired:
+                    pass
+            self.close()
+            returncode = -signal.SIGKILL if timed_out else self.process.returncode
+        stdout.close()
+        stderr.close()
+        return ShellResult(returncode, stdout.text(), stderr.text(), self.cwd, timed_out)
+
+    def _kill_jobs(self, before):
+        """
+        SIGKILLs the process groups of the shell's children that weren't there `before`
+        (None: all of them). False without /proc, where the shell has to go instead.
+        """
+        children = _children(self.pid)
+        if children is None:
+            return False
+        for child in children - (before or set()):
+            try:
+                pgid = os.getpgid(child)
+                if pgid != self.pid:
+                    os.killpg(pgid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        return True
+
+    def export_state(self):
+        """A script that recreates this shell's cwd and exported variables in a new one."""
+        result = self.run("export -p", timeout=5, capture=_everything)
+        return f"cd -- {shlex.quote(self.cwd)} 2>/dev/null\n" + ("" if result.timed_out else result.stdout)
+
+    def close(self):
+        if self.process.poll() is None:
+            self._kill_jobs(None)
+            try:
+                os.killpg(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+
+class _Session:
+    __slots__ = ("lock", "worker", "state")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.worker = None
+        self.state = None  # export_state() of a recycled/evicted worker, replayed into the next one
+
+
+class ShellPool:
+    """
+    Sticky bash workers per agent session. `run(command)` uses the session bound to the
+    calling thread with `session(...)`, or DEFAULT_SESSION. At most `max_workers`
+    shells are live; the least recently used idle one is evicted (its state saved).
+    `capture` makes the OutputCapture for each stream of each command.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, max_commands=DEFAULT_MAX_COMMANDS,
+                 timeout=DEFAULT_TIMEOUT, cwd=None, env=None, capture=OutputCapture):
+        self.max_workers = max_workers
+        self.max_commands = max_commands
+        self.timeout = timeout
+        self.cwd = cwd
+        self.env = env
+        self.capture = capture
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self.started = 0
+        self.recycled = 0
+        self.evicted = 0
+        self.timed_out = 0
+        self.commands = 0
+
+    @contextmanager
+    def session(self, session_id):
+        """Binds the calling thread's run() calls (e.g. a chat turn's tool calls) to `session_id`."""
+        previous = getattr(self._local, "session", None)
+        self._local.session = session_id
+        try:
+            yield
+        finally:
+            self._local.session = previous
+
+    def run(self, command, timeout=None, session=None):
+        session_id = session or getattr(self._local, "session", None) or DEFAULT_SESSION
+        entry = self._entry(session_id)
+        with entry.lock:
+            worker = entry.worker
+            if worker is None or not worker.alive:
+                if worker is not None:  # it ran `exit` or was given up after a timeout
+                    entry.state = f"cd -- {shlex.quote(worker.cwd)} 2>/dev/null\n"
+                    worker.close()
+                worker = entry.worker = self._start(entry.state)
+                entry.state = None
+            result = worker.run(command, self.timeout if timeout is None else timeout, self.capture)
+            with self._lock:
+                self.commands += 1
+                self.timed_out += result.timed_out
+            if worker.alive and worker.commands >= self.max_commands:
+                entry.state = worker.export_state()
+                worker.close()
+                entry.worker = None
+                with self._lock:
+                    self.recycled += 1
+        self._evict()
+        return result
+
+    def _entry(self, session_id):
+        with self._lock:
+            if self._pid != os.getpid():  # forked (--workers): the parent's shells are not ours
+                self._sessions = OrderedDict()
+                self._pid = os.getpid()
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = self._sessions[session_id] = _Session()
+            self._sessions.move_to_end(session_id)
+            return entry
+
+    def _start(self, state):
+        worker = ShellWorker(self.cwd, self.env)
+        if state:
+            worker.run(state, timeout=10)
+            worker.commands = 0
+        with self._lock:
+            self.started += 1
+        return worker
+
+    def _evict(self):
+        """Saves and closes the least recently used idle shells beyond max_workers."""
+        with self._lock:
+            live = [(sid, entry) for sid, entry in self._sessions.items() if entry.worker is not None]
+            excess = len(live) - self.max_workers
+            stale = len(self._sessions) - MAX_SAVED_SESSIONS
+        for session_id, entry in live:
+            if excess <= 0:
+                break
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.worker is not None:
+                    entry.state = entry.worker.export_state() if entry.worker.alive else None
+                    entry.worker.close()
+                    entry.worker = None
+                    excess -= 1
+                    with self._lock:
+                        self.evicted += 1
+            finally:
+                entry.lock.release()
+        if stale > 0:
+            with self._lock:
+                for session_id in [sid for sid, entry in self._sessions.items() if entry.worker is None][:stale]:
+                    del self._sessions[session_id]
+
+    def discard(self, session_id):
+        """Closes a session's shell and forgets its state (e.g. on /reset)."""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            with entry.lock:
+                if entry.worker is not None:
+                    entry.worker.close()
+                    entry.worker = None
+
+    def close(self):
+        with self._lock:
+            session_ids = list(self._sessions)
+        for session_id in session_ids:
+            self.discard(session_id)
+
+    def stats(self):
+        with self._lock:
+            live = sum(entry.worker is not None for entry in self._sessions.values())
+            return {"live": live, "sessions": len(self._sessions), "started": self.started,
+                    "recycled": self.recycled, "evicted": self.evicted, "timed_out": self.timed_out,
+                    "commands": self.commands}
+
+
+def add_shell_arguments(parser):
+    parser.add_argument("--shell-workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Live bash workers for the Bash tool, one per session (default: %(default)s)")
+    parser.add_argument("--shell-recycle", type=int, default=DEFAULT_MAX_COMMANDS,
+                        help="Commands before a bash worker is replaced, keeping cwd/exports (default: %(default)s)")
+    parser.add_argument("--bash-output-dir", default=DEFAULT_SPILL_DIR,
+                        help="Where the full output of a command too long for the model is kept; '' drops it "
+                             "(default: %(default)s)")
+    return parser
+
+
+def shell_pool_from_args(args, **kwargs):
+    """A ShellPool from add_shell_arguments() flags, capturing head + tail and spilling the rest to a file."""
+    capture = functools.partial(OutputCapture, spill_dir=args.bash_output_dir or None)
+    return ShellPool(max_workers=args.shell_workers, max_commands=args.shell_recycle, capture=capture, **kwargs)
@@ -1,37 +1,34 @@
 import re
 import sys
 
+from cli_corpus import get_corpus
+from js_lexer import TEMPLATE, contains_any, kind_is, min_length, whitespace_ratio
+
+# HEURISTIC 2: Key Phrases. We know it's a prompt if it talks to the AI.
+MARKERS = ["You are", "Agent", "Anthropic", "Claude", "context", "user"]
+
+# We look for backtick strings specifically as that's where multi-line prompts live.
+# HEURISTIC 1: Whitespace Ratio. Normal English text is ~15-20% spaces. Minified code is <3%.
+# strict filter: Must look like English (ratio > 0.10) AND have a marker
+PROMPT_FILTERS = [
+    kind_is(TEMPLATE),
+    min_length(500),
+    contains_any(MARKERS),
+    whitespace_ratio(0.10),
+]
+
 def smart_extract(file_path):
     print(f"--- 1. Reading {file_path} ---")
-    
-    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
+    corpus = get_corpus(file_path)
 
-    # Regex to find anything inside backticks `...` (Template Literals)
-    # or double quotes "..." that are very long.
-    print("--- 2. Scanning for string literals... ---")
-    
-    # We look for backtick strings specifically as that's where multi-line prompts live
-    candidates = re.findall(r'`([^`]{500,})`', content)
-    
-    print(f"--- 3. Found {len(candidates)} long candidates. Filtering for Natural Language... ---")
+    print("--- 2. Scanning for string literals (single lexer pass)... ---")
+    print("--- 3. Streaming long template literals through the Natural Language filters... ---")
 
     valid_prompts = []
     
-    for i, s in enumerate(candidates):
-        # HEURISTIC 1: Whitespace Ratio
-        # Normal English text is ~15-20% spaces. Minified code is <3%.
-        space_count = s.count(' ')
-        ratio = space_count / len(s)
-        
-        # HEURISTIC 2: Key Phrases
-        # We know it's a prompt if it talks to the AI.
-        markers = ["You are", "Agent", "Anthropic", "Claude", "context", "user"]
-        has_marker = any(m in s for m in markers)
-
-        # strict filter: Must look like English (ratio > 0.10) AND have a marker
-        if ratio > 0.10 and has_marker:
-            valid_prompts.append((ratio, s))
+    for rec in corpus.iter_literals(*PROMPT_FILTERS):
+        ratio = rec.text.count(' ') / len(rec.text)
+        valid_prompts.append((ratio, rec.text))
 
     print(f"--- 4. Success! Found {len(valid_prompts)} likely system prompts. ---")
     
@@ -2,29 +2,26 @@
 import re
 import sys
 
+from cli_corpus import get_corpus
+
 TARGET_FILE = "node_modules/@anthropic-ai/claude-code/cli.js"
 
 def sniff(pattern, context=100):
     print(f"--- 👃 Sniffing for '{pattern}' ---")
-    try:
-        with open(TARGET_FILE, 'r', errors='ignore') as f:
-            content = f.read()
-    except FileNotFoundError:
+    corpus = get_corpus(TARGET_FILE)
+    if not corpus.exists():
         print("❌ Error: cli.js not found.")
         return
 
-    # Find all matches
-    regex = re.compile(pattern)
-    matches = list(regex.finditer(content))
+    # Find all matches (memoized in the corpus index)
+    matches = corpus.search(pattern, window=context)
     
     print(f"found {len(matches)} matches.")
     
     for i, m in enumerate(matches[:5]): # Limit to top 5
-        start = max(0, m.start() - context)
-        end = min(len(content), m.end() + context)
-        snippet = content[start:end].replace('\n', ' ')
+        snippet = m["context"].replace('\n', ' ')
         
-        print(f"\n[Match {i+1} @ {m.start()}]")
+        print(f"\n[Match {i+1} @ {m['start']}]")
         # Highlight match in output
         print(f"...{snippet}...")
 
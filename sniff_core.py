@@ -1,10 +1,11 @@
 import re
 
+from cli_corpus import get_corpus
+
 def sniff_core_tools():
     print("--- 🕵️‍♀️ Sniffing for Core Tool Definitions ---")
     
-    with open("node_modules/@anthropic-ai/claude-code/cli.js", "r") as f:
-        content = f.read()
+    corpus = get_corpus("node_modules/@anthropic-ai/claude-code/cli.js")
 
     # Look for the definition of the Bash tool specifically
     # We look for the string "Bash" followed closely by "description" or "tool"
@@ -19,7 +20,7 @@ def sniff_core_tools():
     ]
 
     for p in patterns:
-        matches = re.findall(p, content)
+        matches = corpus.findall(p)
         print(f"\nPattern: {p}")
         for m in matches[:3]:
             print(f"  FOUND: {m}")
@@ -27,9 +28,9 @@ def sniff_core_tools():
     # Extract the 'safeFlags' object you saw in the grep output earlier
     # This defines what arguments are allowed in grep/ls
     print("\n--- 🕵️‍♀️ Extracting Allowed Flags ---")
-    flag_match = re.search(r'safeFlags:(\{.*?\})', content)
+    flag_match = corpus.first(r'safeFlags:(\{.*?\})')
     if flag_match:
-        print(f"  safeFlags: {flag_match.group(1)[:200]}...")
+        print(f"  safeFlags: {flag_match['groups'][0][:200]}...")
     else:
         print("  safeFlags object not found.")
 
@@ -1,18 +1,18 @@
 import sys
 import re
 
+from cli_corpus import get_corpus
+
 def snipe(pattern, filepath, window=100):
     print(f"--- 🎯 Sniping '{pattern}' in {filepath} ---")
     
-    try:
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-    except FileNotFoundError:
+    corpus = get_corpus(filepath)
+    if not corpus.exists():
         print("File not found.")
         return
 
-    # Find all matches
-    matches = [m for m in re.finditer(pattern, content)]
+    # Find all matches (memoized in the corpus index)
+    matches = corpus.search(pattern, window=window)
     print(f"Found {len(matches)} matches.")
 
     for i, m in enumerate(matches):
@@ -20,11 +20,8 @@ def snipe(pattern, filepath, window=100):
             print("... (more matches hidden) ...")
             break
             
-        start = max(0, m.start() - window)
-        end = min(len(content), m.end() + window)
-        
-        snippet = content[start:end].replace('\n', ' ')
-        print(f"\n[Match {i+1} @ {m.start()}]")
+        snippet = m["context"].replace('\n', ' ')
+        print(f"\n[Match {i+1} @ {m['start']}]")
         print(f"...{snippet}...")
 
 if __name__ == "__main__":
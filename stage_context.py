@@ -0,0 +1,80 @@
+"""
+stage_context.py
+Shared state for pipeline stages that run inside one long-lived interpreter.
+
+Every stage module exposes `run(context)`. Run stand-alone (`python3 stage.py ...`) it
+gets a fresh StageContext built from sys.argv. Under pipeline_engine's in-process mode
+all stages share one context, so google.genai is imported and the Client created once,
+cli.js is mapped and indexed once, and each JSON map is parsed once per on-disk version.
+"""
+import copy
+import json
+import os
+import sys
+import threading
+
+from cli_corpus import CLI_PATH, get_corpus
+from llm_cache import open_cache
+
+
+class _SharedState:
+    def __init__(self, client=None):
+        self.client = client
+        self.json = {}
+        self.lock = threading.Lock()
+
+
+class StageContext:
+    def __init__(self, argv=None, cache_mode=None, client=None, shared=None):
+        """
+        `argv` are the stage's own command-line arguments (sys.argv[1:] by default);
+        `cache_mode` is the llm_cache mode used when the stage isn't given --cache-mode.
+        """
+        self.argv = list(sys.argv[1:] if argv is None else argv)
+        self.cache_mode = cache_mode
+        self.shared = shared or _SharedState(client)
+
+    def for_step(self, argv):
+        """A context for one step: its own arguments, everything else shared."""
+        return StageContext(argv, self.cache_mode, shared=self.shared)
+
+    def parse_args(self, parser):
+        return parser.parse_args(self.argv)
+
+    @property
+    def client(self):
+        """
+        The shared google.genai Client (API key from GEMINI_API_KEY / GOOGLE_API_KEY). Its
+        async calls go through gemini_scheduler, which keeps them all on one event loop.
+        """
+        with self.shared.lock:
+            if self.shared.client is None:
+                from google import genai
+                self.shared.client = genai.Client(http_options={'api_version': 'v1alpha'})
+            return self.shared.client
+
+    def corpus(self, path=CLI_PATH):
+        return get_corpus(path)
+
+    def cache(self, mode=None):
+        return open_cache(mode or self.cache_mode)
+
+    def load_json(self, path, default=None):
+        """
+        Parsed JSON for path, reparsed only when its size/mtime change. Returns a private
+        copy (stages mutate their maps) or `default` if the file doesn't exist.
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return default
+        stamp = (st.st_size, st.st_mtime_ns)
+        key = os.path.abspath(path)
+        with self.shared.lock:
+            cached = self.shared.json.get(key)
+        if cached is None or cached[0] != stamp:
+            with open(path, "r") as f:
+                cached = (stamp, json.load(f))
+            with self.shared.lock:
+                self.shared.json[key] = cached
+        return copy.deepcopy(cached[1])
@@ -0,0 +1,84 @@
+from chat_sessions import SessionPool, SessionStore, session_cookie, session_id_from_headers
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _pool(**kwargs):
+    created = []
+
+    def factory(model):
+        created.append(model)
+        return object()
+
+    return SessionPool(factory, **kwargs), created
+
+
+def test_sessions_are_reused_per_cookie_and_model():
+    pool, created = _pool()
+    first = pool.acquire("s1", "gemini-2.0-flash")
+    assert pool.acquire("s1", "gemini-2.0-flash") is first
+    assert pool.acquire("s1", "gemini-2.0-pro") is not first
+    assert pool.acquire("s2", "gemini-2.0-flash") is not first
+    assert created == ["gemini-2.0-flash", "gemini-2.0-pro", "gemini-2.0-flash"]
+    stats = pool.stats()
+    assert stats["sessions"] == 3 and stats["hits"] == 1 and stats["hit_rate"] == 0.25
+
+    assert pool.discard("s1") == 2
+    assert pool.stats()["sessions"] == 1
+
+
+def test_idle_ttl_and_capacity_evictions():
+    clock = FakeClock()
+    pool, _ = _pool(ttl=10, max_sessions=2, clock=clock)
+    a = pool.acquire("a", "m")
+    clock.now = 5
+    pool.acquire("b", "m")
+    clock.now = 12  # "a" idle for 12s, "b" for 7s
+    assert pool.stats()["sessions"] == 1
+    assert pool.acquire("a", "m") is not a
+
+    pool.acquire("c", "m")  # cap of 2: the least recently used ("b") goes
+    stats = pool.stats()
+    assert stats["sessions"] == 2
+    assert stats["evictions"] == {"idle": 1, "capacity": 1}
+
+
+def test_session_cookie_round_trip():
+    value = session_cookie("abc123").split(";")[0]
+    assert session_id_from_headers({"Cookie": f"theme=dark; {value}"}) == "abc123"
+    assert session_id_from_headers({}) is None
+
+
+class FakeChat:
+    def __init__(self, history=None):
+        self.history = list(history or [])
+
+    def get_history(self):
+        return self.history
+
+
+def test_store_lets_another_process_continue_a_session(tmp_path):
+    store_path = str(tmp_path / "sessions.sqlite")
+    factory = lambda model, history=None: FakeChat(history)
+    one = SessionPool(factory, store=SessionStore(store_path))
+    two = SessionPool(factory, store=SessionStore(store_path))  # e.g. another --workers process
+
+    a = one.acquire("s1", "m")
+    a.chat.history.append({"role": "user", "parts": [{"text": "hi"}]})
+    one.commit(a)
+    b = two.acquire("s1", "m")
+    assert b.chat.history == a.chat.history and two.stats()["restored"] == 1
+    b.chat.history.append({"role": "model", "parts": [{"text": "hello"}]})
+    two.commit(b)
+
+    again = one.acquire("s1", "m")  # stale: rebuilt from what `two` stored
+    assert again is not a and len(again.chat.history) == 2
+    assert one.acquire("s1", "m") is again  # up to date: reused
+    one.discard("s1")
+    assert two.acquire("s1", "m").chat.history == []
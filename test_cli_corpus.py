@@ -0,0 +1,82 @@
+import json
+import os
+import re
+
+import cli_corpus
+from cli_corpus import CliCorpus
+
+BUNDLE = (
+    'var K9="Bash";var f3="Edit";\n'
+    'const t={name:"Grep",inputSchema:{type:"object",properties:{q:{type:"string"}}}};\n'
+    "let p=`Use ${K9} to run ${x}`;foo('single quoted');\n"
+)
+
+
+def _corpus(tmp_path, text=BUNDLE):
+    path = tmp_path / "cli.js"
+    path.write_text(text)
+    return CliCorpus(str(path), index_dir=str(tmp_path / "index"))
+
+
+def test_index_lists_literals_assignments_and_schemas(tmp_path):
+    corpus = _corpus(tmp_path)
+    index = corpus.index
+    assert (index["strings"], index["templates"]) == (6, 1)
+    assert [(name, value) for name, value, _, _ in corpus.var_assignments()] == [("K9", "Bash"), ("f3", "Edit")]
+    assert [value for value, _ in corpus.name_sites()] == ["Grep"]
+    [schema] = corpus.input_schemas()
+    assert schema["name"] == "Grep" and json.loads(re.sub(r"(\w+):", r'"\1":', schema["raw"]))["type"] == "object"
+    assert corpus.template_literals() == [(BUNDLE.index("`"), "Use ${K9} to run ${x}")]
+    assert (BUNDLE.index("'single"), "single quoted") in corpus.string_literals(min_length=5)
+    corpus.close()
+
+    again = _corpus(tmp_path)  # a second process: served from the persisted index, not rebuilt
+    again._build_index = None
+    assert again.index == index
+
+
+def test_search_findall_first_and_memo(tmp_path, monkeypatch):
+    corpus = _corpus(tmp_path)
+    hits = corpus.search(r'var (\w+)="(\w+)"', window=3)
+    assert [(h["match"], h["groups"]) for h in hits] == [('var K9="Bash"', ["K9", "Bash"]),
+                                                         ('var f3="Edit"', ["f3", "Edit"])]
+    assert hits[1]["context"] == 'h";var f3="Edit";\nc'
+    assert corpus.findall(r'var \w+="(\w+)"') == ["Bash", "Edit"]
+    assert corpus.findall(r'var (\w+)="(\w+)"') == [("K9", "Bash"), ("f3", "Edit")]
+    assert corpus.findall(r"NAME:", re.IGNORECASE) == ["name:"]
+    assert corpus.first(r"\$\{(\w+)\}")["groups"] == ["K9"]
+    assert corpus.first(r"nowhere") is None
+
+    monkeypatch.setattr(cli_corpus, "re", None)  # memoized searches never touch the regex engine
+    assert _corpus(tmp_path).search(r'var (\w+)="(\w+)"', window=3) == hits
+
+
+def test_search_memo_keeps_the_most_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli_corpus, "MAX_SEARCHES", 2)
+    corpus = _corpus(tmp_path)
+    corpus.first("K9")
+    corpus.first("f3")
+    corpus.first("K9")  # used again: f3 is now the oldest
+    corpus.first("Grep")
+    with open(corpus._search_path()) as f:
+        assert [json.loads(key)[0] for key in json.load(f)] == ["K9", "Grep"]
+
+    monkeypatch.setattr(cli_corpus, "MAX_SEARCH_BYTES", 0)  # over budget: only the newest survives
+    corpus.first("Edit")
+    with open(corpus._search_path()) as f:
+        assert [json.loads(key)[0] for key in json.load(f)] == ["Edit"]
+
+
+def test_changed_file_gets_a_new_digest_index_and_memo(tmp_path):
+    corpus = _corpus(tmp_path)
+    assert corpus.findall(r'var (\w+)="Bash"') == ["K9"]
+    old_digest, old_index = corpus.digest, corpus._index_path()
+    corpus.close()
+
+    path = tmp_path / "cli.js"
+    path.write_text(BUNDLE.replace("K9", "Z1"))
+    os.utime(path, ns=(0, 0))
+    changed = CliCorpus(str(path), index_dir=str(tmp_path / "index"))
+    assert changed.digest != old_digest and changed._index_path() != old_index
+    assert changed.findall(r'var (\w+)="Bash"') == ["Z1"]
+    assert changed.var_assignments()[0][0] == "Z1"
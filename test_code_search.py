@@ -0,0 +1,58 @@
+import code_search
+from code_search import Match, format_matches, search
+
+
+def _tree(tmp_path):
+    files = {
+        "app.py": "import os\ndef main():\n    return os.getcwd()  # main entry\n",
+        "lib/util.py": "def helper():\n    pass\nMAIN = 1\n",
+        "lib/build/out.py": "def main(): pass\n",
+        "lib/.gitignore": "build/\n*.log\n!keep.log\n",
+        "lib/debug.log": "main failed\n",
+        "lib/keep.log": "main kept\n",
+        "node_modules/pkg/index.js": "function main() {}\n",
+        "swarm_workspace/app.py": "def main(): pass\n",
+        ".gitignore": "/app_copy.py\n",
+        "app_copy.py": "def main(): pass\n",
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    (tmp_path / "blob.bin").write_bytes(b"main\0\x01\x02")
+    return str(tmp_path)
+
+
+def test_structured_matches_skip_ignored_and_binary_files(tmp_path):
+    root = _tree(tmp_path)
+    result = search(r"main", root)
+    assert [(m.path[len(root) + 1:], m.line, m.column) for m in result.matches] == [
+        ("app.py", 2, 5), ("app.py", 3, 27), ("lib/keep.log", 1, 1)]  # one result per line
+    assert result.matches[0] == Match(f"{root}/app.py", 2, 5, "def main():")
+    assert result.files_skipped == 1 and not result.truncated  # blob.bin
+    assert format_matches(result, root).splitlines()[0] == "app.py:2:5: def main():"
+
+    assert [m.line for m in search(r"^main", root, ignore_case=True, glob="*.py").matches] == [3]
+    assert [m.line for m in search("^MAIN", str(tmp_path / "lib" / "util.py")).matches] == [3]
+
+
+def test_stops_at_the_result_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(code_search, "MMAP_THRESHOLD", 0)  # exercise the mmap path
+    for i in range(20):
+        (tmp_path / f"f{i:02}.txt").write_text("hit\n" * 100)
+    result = search("hit", str(tmp_path), max_results=30, workers=2)
+    assert len(result.matches) == 30 and result.truncated
+    assert result.files_searched < 20
+    assert format_matches(result).endswith("(stopped at 30 matches; narrow the pattern or the path)")
+
+
+def test_the_capped_matches_are_the_first_in_walk_order(tmp_path):
+    # The first file takes longest to search; later ones finish (and fill the cap) before it.
+    (tmp_path / "a.txt").write_text("x\n" * 200_000 + "hit\n" * 5)
+    for i in range(10):
+        (tmp_path / f"b{i}.txt").write_text("hit\n" * 5)
+    expected = [("a.txt", 200_001 + i) for i in range(5)] + [("b0.txt", 1 + i) for i in range(5)] + [("b1.txt", 1)]
+    for _ in range(5):
+        result = search("hit", str(tmp_path), max_results=11, workers=4)
+        assert [(m.path[len(str(tmp_path)) + 1:], m.line) for m in result.matches] == expected
+        assert result.truncated
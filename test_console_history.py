@@ -0,0 +1,47 @@
+from console_history import HistoryLog, render_history
+
+
+def make_log(n):
+    log = HistoryLog(css_classes={"USER": "user-msg", "GEMINI": "agent-msg"}, default_css="tool-msg")
+    for i in range(n):
+        log.append(("USER" if i % 2 == 0 else "TOOL", f"entry {i} <b>&"))
+    return log
+
+
+def test_entries_are_rendered_once_and_keep_list_surface():
+    log = make_log(2)
+    assert len(log) == 2
+    assert list(log) == [("USER", "entry 0 <b>&"), ("TOOL", "entry 1 <b>&")]
+    entries, more = log.page()
+    assert not more
+    assert entries[0].html == '<div class="msg user-msg" data-id="1">entry 0 &lt;b&gt;&amp;</div>'
+    assert entries[1].html.startswith('<div class="msg tool-msg" data-id="2">')
+
+
+def test_cursor_pages_forward_and_backward():
+    log = make_log(10)
+    entries, more = log.page(after=3, limit=4)
+    assert [e.id for e in entries] == [4, 5, 6, 7] and more
+    page = log.page_json(after=7, limit=4)
+    assert [e["id"] for e in page["entries"]] == [8, 9, 10] and page["next"] == 10 and not page["more"]
+    assert log.page_json(after=10) == {"entries": [], "next": 10, "more": False}
+    entries, more = log.page(before=4, limit=2)
+    assert [e.id for e in entries] == [2, 3] and more
+
+
+def test_clear_keeps_cursors_monotonic():
+    log = make_log(3)
+    log.clear()
+    assert len(log) == 0 and log.last_id == 3
+    assert log.append(("USER", "again")) == 4
+    assert [e.id for e in log.page(after=3)[0]] == [4]
+    assert [e.id for e in log.page(after=1)[0]] == [4]
+
+
+def test_page_renders_only_the_tail():
+    log = make_log(30)
+    html, cursor = render_history(log, limit=5)
+    assert cursor == 30
+    assert html.count('class="msg') == 5
+    assert 'data-before="26"' in html and "25 earlier entries" in html
+    assert render_history(HistoryLog(), "empty") == ("empty", 0)
@@ -0,0 +1,72 @@
+import inspect
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from console_metrics import ConsoleMetrics
+
+
+def test_tool_metrics_keep_the_signature_and_count_errors():
+    metrics = ConsoleMetrics()
+
+    @metrics.tool
+    def View(path: str):
+        """Reads a file."""
+        if path == "boom":
+            raise OSError("boom")
+        return "Error: File x not found." if path == "x" else "contents"
+
+    assert (View.__name__, View.__doc__, list(inspect.signature(View).parameters)) == ("View", "Reads a file.", ["path"])
+    View("a")
+    View("x")
+    with pytest.raises(OSError):
+        View("boom")
+    assert metrics.tool_calls.values() == {("View", "ok"): 1, ("View", "error"): 2}
+    assert metrics.tool_latency.values()[("View",)][-1] == 3
+
+
+def test_threads_write_their_own_shards_and_scrapes_add_them_up():
+    metrics = ConsoleMetrics()
+
+    def work():
+        for _ in range(10_000):
+            metrics.request("GET", "/", 200, 0.002)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    text = metrics.render()
+    assert 'console_http_responses_total{method="GET",route="/",status="200"} 40000' in text
+    assert 'console_http_request_duration_seconds_bucket{method="GET",route="/",le="0.001"} 0' in text
+    assert 'console_http_request_duration_seconds_bucket{method="GET",route="/",le="0.005"} 40000' in text
+    assert 'console_http_request_duration_seconds_count{method="GET",route="/"} 40000' in text
+
+
+def test_model_calls_count_tokens_and_outcomes():
+    metrics = ConsoleMetrics()
+    metrics.gauge("console_model_queue_depth", "Waiting prompts", lambda: 3)
+    usage = SimpleNamespace(prompt_token_count=120, candidates_token_count=30, thoughts_token_count=None)
+    with metrics.model_call("gemini-2.0-flash") as call:
+        call.usage(SimpleNamespace(text="hi", usage_metadata=usage))
+    with pytest.raises(RuntimeError):
+        with metrics.model_call("gemini-2.0-flash"):
+            raise RuntimeError("quota")
+    assert metrics.model_tokens.values() == {("gemini-2.0-flash", "prompt"): 120,
+                                             ("gemini-2.0-flash", "output"): 30}
+    assert metrics.model_calls.values() == {("gemini-2.0-flash", "ok"): 1, ("gemini-2.0-flash", "error"): 1}
+    text = metrics.render()
+    assert "# TYPE console_model_call_duration_seconds histogram" in text
+    assert "console_model_queue_depth 3" in text
+
+
+def test_edits_count_the_output_tokens_they_saved():
+    metrics = ConsoleMetrics()
+    metrics.edit("replace", 1500)
+    metrics.edit("diff", 400)
+    metrics.edit("write", 0)
+    assert metrics.edits.values() == {("replace",): 1, ("diff",): 1, ("write",): 1}
+    assert 'console_edit_output_tokens_saved_total{mode="replace"} 1500' in metrics.render()
+    assert metrics.edit_tokens_saved.values() == {("replace",): 1500, ("diff",): 400}
@@ -0,0 +1,232 @@
+import hashlib
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from console_handoff import request_handoff
+from console_metrics import ConsoleMetrics
+from console_server import ConsoleServer, EventStream, HTTPError, MultipartParser, Response
+
+BOUNDARY = "----testboundary42"
+
+
+def _multipart(fields, files):
+    out = []
+    for name, value in fields.items():
+        out.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data) in files.items():
+        out.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                   f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b"\r\n")
+    out.append(f"--{BOUNDARY}--\r\n".encode())
+    return b"".join(out)
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 64, 1 << 20])
+def test_multipart_parser_streams_files_to_disk(tmp_path, chunk):
+    payload = os.urandom(5000) + f"\r\n--{BOUNDARY[:-2]}".encode() + os.urandom(100)
+    body = _multipart({"prompt": "héllo", "model_choice": "m"},
+                      {"uploaded_file": ("a.bin", payload), "empty": ("", b"")})
+    parser = MultipartParser(BOUNDARY, upload_dir=str(tmp_path))
+    for i in range(0, len(body), chunk):
+        parser.feed(body[i:i + chunk])
+    parser.close()
+    assert parser.fields == {"prompt": ["héllo"], "model_choice": ["m"]}
+    assert list(parser.files) == ["uploaded_file"]
+    upload = parser.files["uploaded_file"]
+    assert upload.filename == "a.bin" and upload.size == len(payload)
+    assert upload.sha256 == hashlib.sha256(payload).hexdigest()
+    with open(upload.path, "rb") as f:
+        assert f.read() == payload
+
+
+def test_multipart_parser_enforces_limits_mid_stream(tmp_path):
+    body = _multipart({}, {"f": ("big.bin", b"x" * 10_000)})
+    parser = MultipartParser(BOUNDARY, upload_dir=str(tmp_path), max_file_bytes=1000)
+    with pytest.raises(HTTPError) as e:
+        parser.feed(body)
+    assert e.value.status == 413
+    parser.discard()
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.fixture
+def server(tmp_path):
+    app = ConsoleServer(max_connections=3, upload_dir=str(tmp_path), log_requests=False, metrics=ConsoleMetrics())
+
+    @app.route("GET", "/")
+    def index(request):
+        return Response(f"hello {request.get('name', 'world')}")
+
+    @app.route("POST", "/upload")
+    def upload(request):
+        f = request.files["uploaded_file"]
+        with open(f.path, "rb") as fh:
+            return Response.json({"prompt": request.get("prompt"), "size": f.size, "data": fh.read().decode()})
+
+    @app.route("GET", "/events")
+    def events(request):
+        def produce(emit):
+            for i in range(3):
+                emit("text", {"i": i})
+        return EventStream(produce)
+
+    ready = threading.Event()
+    thread = threading.Thread(target=lambda: __import__("asyncio").run(
+        app.serve("127.0.0.1", 0, ready=lambda s: ready.set())), daemon=True)
+    thread.start()
+    assert ready.wait(5)
+    yield app
+    app.shutdown()
+    thread.join(5)
+
+
+def test_keep_alive_upload_and_event_stream(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    conn.request("GET", "/?name=a")
+    assert conn.getresponse().read() == b"hello a"
+    conn.request("GET", "/")  # same socket
+    assert conn.getresponse().read() == b"hello world"
+    assert server.stats()["requests"] == 2
+    conn.request("GET", "/nowhere")
+    assert conn.getresponse().read() == b"Not Found"
+    deadline = time.monotonic() + 5  # recorded once the response is written, so it may trail the read
+    while len(server.metrics.http_responses.values()) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.metrics.http_responses.values() == {("GET", "/", "200"): 2, ("GET", "unrouted", "404"): 1}
+
+    body = _multipart({"prompt": "p"}, {"uploaded_file": ("x.txt", b"file data")})
+    conn.request("POST", "/upload", body, {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"})
+    response = conn.getresponse()
+    assert response.status == 200
+    assert b'"size": 9' in response.read()
+    assert os.listdir(server.upload_dir) == []  # temp upload removed after the request
+
+    conn.request("GET", "/events")
+    frames = conn.getresponse().read().decode()
+    assert frames.count("event: text") == 3 and 'data: {"i": 2}' in frames
+    conn.close()
+
+
+def test_connections_beyond_limit_get_503(server):
+    idle = [socket.create_connection(("127.0.0.1", server.port)) for _ in range(3)]
+    deadline = time.time() + 5
+    while server.connections < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    conn.request("GET", "/")
+    assert conn.getresponse().status == 503
+    for s in idle:
+        s.close()
+
+
+@pytest.mark.parametrize("head, status", [
+    (b"GET / HTTP/1.1\r\n" + b"X-A: 1\r\n" * 101 + b"\r\n", b"431"),
+    (b"GET /" + b"a" * 70000 + b" HTTP/1.1\r\n\r\n", b"414"),
+    (b"GET / HTTP/1.1\r\nX-A: " + b"a" * 70000 + b"\r\n\r\n", b"431"),
+], ids=["many-headers", "long-request-line", "long-header"])
+def test_oversized_heads_are_answered_and_closed(server, head, status, caplog):
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as s:
+        s.sendall(head)
+        reply = b""
+        while chunk := s.recv(65536):
+            reply += chunk
+    assert reply.split()[1] == status and b"Connection: close" in reply
+    assert not [r for r in caplog.records if r.name == "asyncio"]  # no unhandled-exception traceback
+
+
+def _start(app, **kwargs):
+    ready = threading.Event()
+    thread = threading.Thread(target=lambda: __import__("asyncio").run(
+        app.serve("127.0.0.1", 0, ready=lambda s: ready.set(), **kwargs)), daemon=True)
+    thread.start()
+    assert ready.wait(5)
+    return thread
+
+
+def _get(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", path)
+    body = conn.getresponse().read()
+    conn.close()
+    return body
+
+
+def test_handoff_moves_the_listener_and_drains_in_flight_requests(tmp_path):
+    path = str(tmp_path / "handoff.sock")
+    release = threading.Event()
+    old = ConsoleServer(log_requests=False)
+    old.route("GET", "/")(lambda request: Response("old"))
+    old.route("GET", "/slow")(lambda request: release.wait(5) and Response("old finished"))
+    old_thread = _start(old, handoff=path)
+    port = old.port
+    idle = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    idle.request("GET", "/")
+    assert idle.getresponse().read() == b"old"  # keep-alive connection now idle on the old server
+
+    slow = {}
+    slow_thread = threading.Thread(target=lambda: slow.update(body=_get(port, "/slow")))
+    slow_thread.start()
+    while old.active == 0:
+        time.sleep(0.01)
+
+    listener, old_pid = request_handoff(path)
+    assert old_pid == os.getpid()
+    new = ConsoleServer(log_requests=False)
+    new.route("GET", "/")(lambda request: Response("new"))
+    _start(new, sock=listener, handoff=path)
+    while not old.draining:
+        time.sleep(0.01)
+    assert _get(port, "/") == b"new"  # same port, no refused connection
+
+    release.set()
+    slow_thread.join(5)
+    assert slow["body"] == b"old finished"
+    old_thread.join(5)
+    assert not old_thread.is_alive() and old.stats()["connections"] == 0  # idle keep-alive closed too
+    assert request_handoff(path) is not None  # the new server now answers handoffs itself
+    new.shutdown()
+
+
+WORKER_SCRIPT = """
+import os, socket, sys
+from console_server import ConsoleServer, Response
+app = ConsoleServer(log_requests=False, workers=2)
+app.route("GET", "/")(lambda request: Response(str(os.getpid())))
+app.route("GET", "/crash")(lambda request: os._exit(1))
+app.run(sock=socket.socket(fileno=int(sys.argv[1])))
+"""
+
+
+def test_workers_share_the_socket_and_crashed_workers_are_respawned():
+    sock = socket.create_server(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    supervisor = subprocess.Popen([sys.executable, "-c", WORKER_SCRIPT, str(sock.fileno())],
+                                  pass_fds=[sock.fileno()], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                  stdout=subprocess.DEVNULL)
+    sock.close()
+    children = f"/proc/{supervisor.pid}/task/{supervisor.pid}/children"
+    try:
+        pids = {int(_get(port, "/")) for _ in range(20)}
+        with open(children) as f:
+            workers = set(map(int, f.read().split()))
+        assert len(workers) == 2 and pids <= workers  # the supervisor never serves
+        with pytest.raises(http.client.RemoteDisconnected):
+            _get(port, "/crash")
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            with open(children) as f:
+                respawned = set(map(int, f.read().split()))
+            if len(respawned) == 2 and respawned != workers:
+                break
+            time.sleep(0.05)
+        assert len(respawned & workers) == 1
+        assert int(_get(port, "/")) in respawned
+    finally:
+        supervisor.terminate()
+        assert supervisor.wait(10) == 0
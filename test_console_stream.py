@@ -0,0 +1,42 @@
+import inspect
+import json
+from types import SimpleNamespace
+
+from console_stream import sse_event, stream_reply, tool_events
+
+
+@tool_events.traced
+def Grep(pattern: str, path: str):
+    """Searches files for a pattern."""
+    return f"{path}: {pattern}"
+
+
+class FakeChat:
+    def send_message_stream(self, prompt):
+        Grep("TODO", path="src")
+        yield SimpleNamespace(text="Found ")
+        yield SimpleNamespace(text=None)
+        yield SimpleNamespace(text="it.")
+
+
+def test_traced_tool_keeps_what_function_calling_reads():
+    assert Grep.__name__ == "Grep"
+    assert Grep.__doc__ == "Searches files for a pattern."
+    assert list(inspect.signature(Grep).parameters) == ["pattern", "path"]
+    assert Grep("x", "y") == "y: x"  # no listener: plain call
+
+
+def test_stream_reply_interleaves_tool_and_text_events():
+    events = []
+    text = stream_reply(FakeChat(), "find todos", lambda event, data: events.append((event, data)))
+    assert text == "Found it."
+    assert [e for e, _ in events] == ["tool_call", "tool_result", "text", "text"]
+    assert events[0][1] == {"tool": "Grep", "args": {"pattern": "TODO", "path": "src"}}
+    assert events[1][1]["output"] == "src: TODO"
+
+
+def test_sse_frames_are_single_data_lines():
+    frame = sse_event("text", {"text": "a\nb"}).decode()
+    event, data, blank, end = frame.split("\n")
+    assert event == "event: text" and blank == "" and end == ""
+    assert json.loads(data[len("data: "):]) == {"text": "a\nb"}
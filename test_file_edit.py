@@ -0,0 +1,86 @@
+import difflib
+import os
+
+import pytest
+
+from file_edit import EditError, apply_diff, edit_file, sha256, summary
+
+SOURCE = "".join(f"def f{i}():\n    return {i}\n\n" for i in range(200))
+
+
+def test_replacements_are_exact_unique_and_atomic(tmp_path):
+    path = tmp_path / "mod.py"
+    path.write_text(SOURCE)
+    path.chmod(0o755)
+    result = edit_file(str(path), old="    return 7\n", new="    return 'seven'\n")
+    assert path.read_text() == SOURCE.replace("return 7\n", "return 'seven'\n")
+    assert (result.mode, result.added, result.removed, result.sha) == ("replace", 1, 1, sha256(path.read_text()))
+    assert result.tokens_saved > len(SOURCE) // 4 - 10
+    assert summary(result) == (f"Edited {path} (replace): +1 -1 lines, sha256 {result.sha[:12]}\n"
+                               "@@ -22,3 +22,3 @@\n def f7():\n-    return 7\n+    return 'seven'\n ")
+    assert path.stat().st_mode & 0o777 == 0o755 and os.listdir(tmp_path) == ["mod.py"]  # no temp file left
+
+    with pytest.raises(EditError, match="occurs 200 times"):
+        edit_file(str(path), old="def ", new="async def ")
+    with pytest.raises(EditError, match="not found"):
+        edit_file(str(path), old="return 7\n", new="")
+    with pytest.raises(EditError, match="changed since expected_sha"):
+        edit_file(str(path), old="def f1()", new="def g()", expected_sha=sha256(SOURCE)[:12])
+    with pytest.raises(EditError, match="nothing to apply"):
+        edit_file(str(path))
+    assert sha256(path.read_text()) == result.sha  # failed edits write nothing
+
+    edit_file(str(path), old="def ", new="async def ", replace_all=True, expected_sha=result.sha[:8])
+    assert path.read_text().count("async def ") == 200
+
+
+def test_unified_diffs_apply_with_drift_and_lenient_headers():
+    after = SOURCE.replace("return 3\n", "return 3  # three\n").replace("def f150():\n", "def f150(x=1):\n")
+    diff = "".join(difflib.unified_diff(SOURCE.splitlines(True), after.splitlines(True), "a/m.py", "b/m.py"))
+    assert apply_diff(SOURCE, diff) == after
+    # The file grew above the hunks since the diff was made, the counts are wrong, blank context lost its space
+    sloppy = diff.replace("@@ -8,7 +8,7 @@", "@@ -8,99 +8,99 @@").replace("\n \n", "\n\n")
+    assert apply_diff("# header\n" * 5 + SOURCE, sloppy) == "# header\n" * 5 + after
+    with pytest.raises(EditError, match="hunk 2 .* does not match"):
+        apply_diff(SOURCE.replace("def f150():", "def f150(y):"), diff)
+
+    no_newline = "@@ -1,2 +1,2 @@\n a\n-b\n\\ No newline at end of file\n+c\n\\ No newline at end of file\n"
+    assert apply_diff("a\nb", no_newline) == "a\nc"
+    assert apply_diff("a\r\nb\r\n", "@@ -2 +2,2 @@\n-b\n+c\n+d\n") == "a\r\nc\r\nd\r\n"
+    assert apply_diff("a\n", "@@ -1,0 +2 @@\n+b\n") == "a\nb\n"
+
+
+def test_creates_files_and_writes_through_symlinks(tmp_path):
+    created = edit_file(str(tmp_path / "new" / "notes.md"), content="one\ntwo\n")
+    assert (created.created, created.added, created.tokens_saved) == (True, 2, 0)
+    assert summary(created).startswith(f"Created {tmp_path / 'new' / 'notes.md'}: 2 lines, sha256 ")
+    link = tmp_path / "link.md"
+    link.symlink_to(tmp_path / "new" / "notes.md")
+    edit_file(str(link), diff="@@ -2 +2 @@\n-two\n+2\n")
+    assert link.is_symlink() and (tmp_path / "new" / "notes.md").read_text() == "one\n2\n"
+    with pytest.raises(EditError, match="does not exist"):
+        edit_file(str(tmp_path / "missing.py"), old="x", new="y")
+
+
+def test_empty_content_creates_or_truncates(tmp_path):
+    from gemini_swarm.tools import Edit
+
+    path = tmp_path / "empty.txt"
+    created = edit_file(str(path), content="")
+    assert path.read_text() == "" and (created.mode, created.created, created.sha) == ("write", True, sha256(""))
+    path.write_text(SOURCE)
+    assert Edit(str(path), "").startswith(f"Edited {path} (write): +0 -600 lines")
+    assert path.read_text() == ""
+
+
+def test_a_replacement_without_old_string_writes_nothing(tmp_path):
+    from gemini_swarm.tools import Edit
+
+    path = tmp_path / "a.txt"
+    path.write_text("one\ntwo\n")
+    for kwargs, error in [({"new_string": "inserted\n"}, "need old_string"),
+                          ({"old_string": "", "new_string": "x"}, "need old_string"),
+                          ({"replace_all": True}, "need old_string"),
+                          ({"expected_sha": sha256("one\ntwo\n")}, "nothing to apply")]:
+        assert error in Edit(str(path), **kwargs)
+        assert path.read_text() == "one\ntwo\n"
@@ -0,0 +1,96 @@
+import errno
+import glob
+import os
+import shutil
+import time
+
+import pytest
+
+from code_search import walk
+from file_index import FileIndex
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    for name in ["app.py", "lib/util.py", "lib/deep/core.py", "lib/deep/notes.md", ".hidden/secret.py",
+                 "build/out.py", "node_modules/pkg/index.js", "docs/readme.md"]:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name)
+    (tmp_path / ".gitignore").write_text("build/\n")
+    (tmp_path / "linked").symlink_to(tmp_path / "lib")
+    monkeypatch.chdir(tmp_path)
+    index = FileIndex(".").start()
+    yield index
+    index.close()
+
+
+def test_answers_like_glob_and_walk(tree, tmp_path):
+    for pattern in ["*.py", "**/*.py", "lib/*", "lib/**", "**", "**/", "*/", "**/core.py", "**/index.js", "lib/*/*.md",
+                    ".hidden/*", "./*.py", "./**", str(tmp_path / "lib" / "*.py"), str(tmp_path / "**"), "missing/*",
+                    f"../{tmp_path.name}/*/*.py", "node_modules/*/*.js", "*/pkg/*", "linked/*", "*/deep/*",
+                    "**/deep/", ".*/*.py", "*/**", "*/**/", "*/**/*.js", "node_modules/**", "**/*/**"]:
+        assert tree.glob(pattern) == sorted(glob.glob(pattern, recursive=True)), pattern
+    assert "node_modules" in tree.glob("*")  # listed, though what is inside is not indexed
+    assert tree.find("core.py") == ["./lib/deep/core.py"]  # not through the symlink, like find
+    assert tree.find("index.js") == ["./node_modules/pkg/index.js"]
+    assert tree.files(".") == list(walk(".")) and "./build/out.py" not in tree.files(".")
+    assert "./node_modules/pkg/index.js" not in tree.files(".")
+    assert tree.files("lib", "*.md") == list(walk("lib", "*.md")) == ["lib/deep/notes.md"]
+    assert tree.files("build") is None  # ignored: the caller walks it itself
+
+
+def test_follows_changes_as_they_happen(tree):
+    since = time.time()
+    assert tree.changed_since(since) == []
+    with open("lib/util.py", "a") as f:
+        f.write("# more")
+    os.makedirs("src/pkg")
+    with open("src/pkg/new.py", "w") as f:
+        f.write("x")
+    assert tree.changed_since(since) == ["./lib/util.py", "./src/pkg/new.py"]  # no waiting: queries drain events
+
+    os.rename("src", "moved")
+    assert tree.find("new.py") == ["./moved/pkg/new.py"]
+    shutil.rmtree("lib")
+    assert tree.glob("**/*.py") == ["app.py", "build/out.py", "moved/pkg/new.py"]
+    with open(".gitignore", "w") as f:
+        f.write("moved/\n")
+    assert tree.files(".") == list(walk(".")) and "./build/out.py" in tree.files(".")
+    assert tree.find("new.py") == ["./moved/pkg/new.py"] and tree.files("moved") is None
+    assert tree.stats()["mode"] == "inotify" and tree.stats()["scans"] == 1
+
+
+def test_polls_without_inotify(tmp_path):
+    index = FileIndex(str(tmp_path), poll_interval=0.02, watch=False).start()
+    try:
+        (tmp_path / "later.txt").write_text("x")
+        deadline = time.monotonic() + 5
+        while not index.find("later.txt") and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert index.find("later.txt") == [str(tmp_path / "later.txt")]
+        assert index.stats()["mode"] == "poll"
+    finally:
+        index.close()
+
+
+def test_falls_back_to_polling_when_watches_run_out(tmp_path):
+    index = FileIndex(str(tmp_path), poll_interval=0.02).start()
+    try:
+        def out_of_watches(path):
+            raise OSError(errno.ENOSPC, "No space left on device", path)
+
+        (tmp_path / "new").mkdir()
+        assert index.find("new") == [str(tmp_path / "new")]
+        time.sleep(0.1)  # the file-index thread is back in select(), nothing pending
+        index._inotify.add = out_of_watches
+        with index._lock:  # the limit hit on a query's thread, as its drain scans a new directory
+            index._watch("new", str(tmp_path / "new"))
+        assert index.stats()["mode"] == "poll"
+        (tmp_path / "new" / "later.txt").write_text("x")
+        deadline = time.monotonic() + 5
+        while not index.find("later.txt") and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert index.find("later.txt") == [str(tmp_path / "new" / "later.txt")]
+    finally:
+        index.close()
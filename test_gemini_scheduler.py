@@ -0,0 +1,140 @@
+import asyncio
+import json
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from gemini_scheduler import GeminiScheduler, Job, TokenBucket
+from gemini_stub_server import start_stub_server
+
+
+def _urllib_call(base_url):
+    """Minimal generateContent transport so the scheduler can hit the stub without the SDK."""
+
+    def post(job):
+        body = json.dumps({"contents": [{"role": "user", "parts": [{"text": job.contents}]}]}).encode()
+        req = urllib.request.Request(
+            f"{base_url}/v1beta/models/{job.model}:generateContent",
+            data=body, headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req) as resp:
+            payload = json.load(resp)
+        usage = SimpleNamespace(total_token_count=payload["usageMetadata"]["totalTokenCount"])
+        text = payload["candidates"][0]["content"]["parts"][0]["text"]
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    async def call(job):
+        return await asyncio.to_thread(post, job)
+
+    return call
+
+
+@pytest.fixture
+def stub():
+    server, url, state = start_stub_server(latency=0.05, fail_every=4)
+    yield url, state
+    server.shutdown()
+
+
+def test_concurrent_ordered_with_retries_against_stub(stub):
+    url, state = stub
+    scheduler = GeminiScheduler(
+        limits={"stub-model": {"rpm": 6000, "tpm": 10_000_000}},
+        concurrency=8, base_delay=0.01, max_delay=0.05, call=_urllib_call(url),
+    )
+    prompts = [f"prompt {i}" for i in range(24)]
+    results = scheduler.run([Job("stub-model", p) for p in prompts], stage="test")
+
+    assert [r.text for r in results] == [f"STUB[stub-model]: {p}" for p in prompts]
+    stats = scheduler.last_stats.summary()
+    assert stats["retries"] >= 1 and stats["failures"] == 0
+    assert stats["tokens"] > 0
+    # 24 calls at 50 ms each would take >= 1.2 s serialized.
+    assert stats["elapsed_s"] < 1.0
+
+
+def test_non_retryable_error_is_returned_in_place():
+    class Boom(Exception):
+        code = 400
+
+    async def call(job):
+        if job.contents == "bad":
+            raise Boom("400 bad request")
+        return SimpleNamespace(text=job.contents, usage_metadata=None)
+
+    scheduler = GeminiScheduler(limits={}, call=call)
+    results = scheduler.run([Job("m", "a"), Job("m", "bad"), Job("m", "c")])
+    assert results[0].text == "a" and isinstance(results[1], Boom) and results[2].text == "c"
+    assert scheduler.last_stats.failures == 1 and scheduler.last_stats.retries == 0
+
+
+def test_token_bucket_paces_after_burst():
+    async def scenario():
+        bucket = TokenBucket(per_minute=600)  # 10/s, burst of 600
+        bucket.tokens = 1
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await bucket.acquire(1)
+        await bucket.acquire(2)
+        return loop.time() - start
+
+    assert 0.15 <= asyncio.run(scenario()) < 0.5
+
+
+def test_concurrent_schedulers_share_one_budget_per_model():
+    import threading
+
+    async def call(job):
+        return SimpleNamespace(text=job.contents, usage_metadata=None)
+
+    limits = {"shared-model": {"rpm": 6, "tpm": 1_000_000}}  # a burst of 6, then one every 10 s
+    schedulers = [GeminiScheduler(limits=limits, call=call) for _ in range(2)]
+    threads = [threading.Thread(target=s.run, args=([Job("shared-model", f"p{i}") for i in range(3)],))
+               for s in schedulers]  # called from two threads, like concurrent in-process stages
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rpm_bucket, _ = schedulers[0]._buckets_for("shared-model")
+    assert rpm_bucket is schedulers[1]._buckets_for("shared-model")[0]
+    assert rpm_bucket.reserve(1) > 9  # both stages' calls came out of the same 6
+
+
+class _LoopBoundClient:
+    """client.aio stand-in that fails like an async HTTP transport reused from another event loop."""
+
+    def __init__(self):
+        self.loop = None
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate))
+
+    async def _generate(self, model, contents, config):
+        loop = asyncio.get_running_loop()
+        self.loop = self.loop or loop
+        if loop is not self.loop:
+            raise RuntimeError("attached to a different loop")
+        return SimpleNamespace(text=contents, usage_metadata=None)
+
+
+def test_one_client_serves_every_stage_and_run(capsys):
+    import threading
+
+    client = _LoopBoundClient()
+    results = [GeminiScheduler(client, limits={}).run([Job("m", "first")], stage="first")]
+    threads = [threading.Thread(target=lambda i=i: results.append(
+        GeminiScheduler(client, limits={}).run([Job("m", f"p{i}")], stage=f"s{i}"))) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(r[0].text for r in results) == ["first", "p0", "p1", "p2"]
+    assert "📈 [s2] 1 requests" in capsys.readouterr().out
+
+
+def test_sdk_client_against_stub(stub):
+    genai = pytest.importorskip("google.genai")
+    url, _ = stub
+    client = genai.Client(api_key="stub", http_options={"base_url": url})
+    scheduler = GeminiScheduler(client, limits={}, base_delay=0.01, max_delay=0.05)
+    results = scheduler.run([Job("gemini-2.0-flash", f"p{i}") for i in range(6)])
+    assert [r.text for r in results] == [f"STUB[gemini-2.0-flash]: p{i}" for i in range(6)]
@@ -1,8 +1,7 @@
-from google import genai
 import os
 import sys
 
-def test_gemini_connection():
+def test_gemini_connection(context=None):
     print("--- 1. Checking Environment ---")
     api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
     
@@ -13,7 +12,11 @@ def test_gemini_connection():
 
     print("\n--- 2. Initializing Client (google-genai) ---")
     try:
-        client = genai.Client(api_key=api_key)
+        if context is not None:
+            client = context.client
+        else:
+            from google import genai
+            client = genai.Client(api_key=api_key)
         print("✅ Client initialized.")
     except Exception as e:
         print(f"❌ Client initialization failed: {e}")
@@ -39,6 +42,9 @@ def test_gemini_connection():
         print(f"❌ Generation failed: {e}")
         return False
 
+def run(context):
+    return 0 if test_gemini_connection(context) else 1
+
 if __name__ == "__main__":
-    success = test_gemini_connection()
-    sys.exit(0 if success else 1)
+    from stage_context import StageContext
+    sys.exit(run(StageContext()))
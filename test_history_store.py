@@ -0,0 +1,81 @@
+import os
+
+from console_history import HistoryLog
+from history_store import HistoryStore
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "history.log")
+    with HistoryStore(path, fsync="never") as store:
+        for i in range(3000):
+            store.append("TOOL" if i % 2 else "USER", f"entry {i} ✓")
+    with HistoryStore(path) as store:
+        assert (store.first_id, store.last_id) == (1, 3000)
+        assert store.tail(2) == [(2999, "USER", "entry 2998 ✓"), (3000, "TOOL", "entry 2999 ✓")]
+        assert store.read(1025, 2) == [(1025, "USER", "entry 1024 ✓"), (1026, "TOOL", "entry 1025 ✓")]
+        assert store.append("USER", "after restart") == 3001
+
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    path = str(tmp_path / "history.log")
+    with HistoryStore(path) as store:
+        store.append("USER", "kept")
+        store.append("GEMINI", "also kept")
+        good_size = os.path.getsize(path)
+        store.append("GEMINI", "torn by a crash")
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 3)
+    with HistoryStore(path) as store:
+        assert store.last_id == 2 and os.path.getsize(path) == good_size
+        assert store.append("USER", "next") == 3
+
+
+def test_compaction_keeps_the_newest_entries(tmp_path):
+    path = str(tmp_path / "history.log")
+    with HistoryStore(path, max_entries=100) as store:
+        for i in range(1000):
+            store.append("USER", str(i))
+        assert store.count <= 125 and store.last_id == 1000
+        assert store.read(1, 1) == [(store.first_id, "USER", str(store.first_id - 1))]
+        store.clear()
+        assert store.count == 0 and store.append("USER", "fresh") == 1001
+    with HistoryStore(path) as store:
+        assert (store.first_id, store.tail(5)) == (1001, [(1001, "USER", "fresh")])
+
+
+def test_history_log_pages_older_entries_from_disk(tmp_path):
+    path = str(tmp_path / "history.log")
+    log = HistoryLog(store=HistoryStore(path), cache_entries=500)
+    for i in range(2000):
+        log.append(("USER", f"<{i}>"))
+    log.close()
+
+    log = HistoryLog(store=HistoryStore(path), cache_entries=500)
+    assert len(log) == 2000 and log.last_id == 2000
+    entries, more = log.page(after=10, limit=3)
+    assert [e.id for e in entries] == [11, 12, 13] and more
+    assert entries[0].html == '<div class="msg agent-msg" data-id="11">&lt;10&gt;</div>'
+    entries, _ = log.page(before=1600, limit=200)  # straddles the store and the cache
+    assert [e.id for e in entries] == list(range(1400, 1600))
+    assert log.render_tail(2)[1:] == (1999, 1998)
+    log.close()
+
+
+def test_processes_sharing_a_log_see_each_others_entries(tmp_path):
+    path = str(tmp_path / "history.log")
+    old = HistoryLog(store=HistoryStore(path, max_entries=600), cache_entries=500)
+    new = HistoryLog(store=HistoryStore(path, max_entries=600), cache_entries=500)
+    old.append(("USER", "in flight on the old server"))
+    assert new.append(("GEMINI", "first answer from the new one")) == 2
+    assert old.append(("GEMINI", "old server's late reply")) == 3
+    assert [text for _, text in new] == ["in flight on the old server", "first answer from the new one",
+                                         "old server's late reply"]
+    for i in range(800):  # compacts on `new`; `old` reopens the replaced file
+        new.append(("USER", str(i)))
+    assert old.last_id == new.last_id == 803 and len(old) == len(new) <= 750
+    assert old.append(("USER", "after compaction")) == 804
+    new.clear()
+    assert len(old) == 0 and old.append(("USER", "fresh")) == 805
+    assert new.page(after=804)[0][0].text == "fresh"
+    old.close()
+    new.close()
@@ -0,0 +1,31 @@
+from hydration import AhoCorasick, Hydrator, hydrate_files, load_var_map
+
+
+def test_leftmost_longest_without_overlaps():
+    ac = AhoCorasick({"abcdefg": 1, "ab": 2, "de": 3})
+    assert [(m.start, m.end, m.value) for m in ac.finditer("abcdeX")] == [(0, 2, 2), (3, 5, 3)]
+    ac = AhoCorasick({"he": 1, "she": 2, "hers": 3, "his": 4})
+    assert [m.value for m in ac.finditer("ushers his")] == [2, 4]
+
+
+def test_hydrate_counts_and_unresolved_in_one_pass(tmp_path):
+    map_file = tmp_path / "map.json"
+    map_file.write_text('{"${A}": "path", "A.planFilePath": "PLAN.md", "${K9}": "Bash"}')
+    var_map = load_var_map(str(map_file), overrides={"Use the Edit tool": "Use Write"})
+    text, subs, unresolved = Hydrator(var_map).hydrate(
+        "Use the Edit tool on ${A.planFilePath}, ${A} and ${A}; ${A.other} ${HOME} ${K9}x ${zz}"
+    )
+    assert text == "Use Write on PLAN.md, path and path; ${A.other} ${HOME} Bashx ${zz}"
+    assert subs == {"Use the Edit tool": 1, "${A.planFilePath}": 1, "${A}": 2, "${K9}": 1}
+    assert unresolved == ["${A.other}", "${zz}"]
+
+
+def test_hydrate_files_in_pool(tmp_path):
+    pairs = []
+    for i in range(4):
+        src = tmp_path / f"p{i}.md"
+        src.write_text(f"agent {i} uses ${{K9}} and ${{X{i}}}")
+        pairs.append((str(src), str(tmp_path / "out" / f"p{i}.md")))
+    reports = hydrate_files(pairs, {"${K9}": "Bash"}, workers=2)
+    assert [r.unresolved for r in reports] == [[f"${{X{i}}}"] for i in range(4)]
+    assert (tmp_path / "out" / "p3.md").read_text() == "agent 3 uses Bash and ${X3}"
@@ -0,0 +1,37 @@
+from js_lexer import (
+    STRING, TEMPLATE, contains_any, iter_literals, kind_is, min_length, select, whitespace_ratio,
+)
+
+
+def test_escaped_quotes_keep_literal_boundaries():
+    records = list(iter_literals(rb"""var a="he said \"hi\"",b='it\'s';"""))
+    assert [(r.kind, r.text) for r in records] == [
+        (STRING, r'he said \"hi\"'),
+        (STRING, r"it\'s"),
+    ]
+
+
+def test_comments_and_regex_literals_are_skipped():
+    src = rb'''// "not a string"
+/* 'nor this' */ var r=/a"b[/"]c/g, d=x/2/y; return /"q"/.test("real");'''
+    assert [r.text for r in iter_literals(src)] == ["real"]
+
+
+def test_nested_template_expressions():
+    src = rb'var t=`outer ${fn(`inner ${"deep"}`)} and ${mW.name} \` tick`;'
+    records = list(iter_literals(src))
+    assert [r.kind for r in records] == [STRING, TEMPLATE, TEMPLATE]
+    outer = records[-1]
+    assert outer.offset == src.index(b"`")
+    assert outer.text.endswith(r"and ${mW.name} \` tick")
+    assert outer.interpolations == ('fn(`inner ${"deep"}`)', "mW.name")
+
+
+def test_predicates_filter_the_stream():
+    prompt = "You are a helpful agent " * 30
+    src = b"var a=`" + prompt.encode() + b"`,b=`" + b"x" * 800 + b"`,c=\"You are\";"
+    picked = list(select(
+        iter_literals(src),
+        kind_is(TEMPLATE), min_length(500), contains_any(["You are"]), whitespace_ratio(0.10),
+    ))
+    assert [r.text for r in picked] == [prompt]
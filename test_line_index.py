@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+import line_index
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    monkeypatch.setattr(line_index, "CHECKPOINT", 7)  # many checkpoints on a small file
+    monkeypatch.setattr(line_index, "SCAN_BLOCK", 1000)
+    rng = random.Random(1)
+    lines = [f"line {i} {'x' * rng.randint(0, 40)}\n" for i in range(3000)]
+    path = tmp_path / "server.log"
+    path.write_text("".join(lines))
+    return str(path), lines
+
+
+def test_head_tail_and_line_ranges(log):
+    path, lines = log
+    for n in (0, 1, 50, 5000):
+        assert line_index.read_head(path, n).data.decode() == "".join(lines[:n])
+        assert line_index.read_tail(path, n).data.decode() == "".join(lines[len(lines) - min(n, 3000):])
+    rng = random.Random(2)
+    for _ in range(200):
+        start, count = rng.randint(0, 3100), rng.randint(0, 80)
+        chunk, total = line_index.read_lines(path, start, count)
+        assert chunk.data.decode() == "".join(lines[start:start + count]) and total == 3000
+
+
+def test_index_extends_as_the_log_grows_and_rebuilds_on_rewrite(log):
+    path, lines = log
+    line_index.read_lines(path, 0, 1)
+    index = line_index.line_index(path)
+    checkpoints = len(index.checkpoints)
+    with open(path, "a") as f:
+        f.write("appended\nunterminated")
+    assert index.refresh() is False and len(index.checkpoints) >= checkpoints  # extended, not rebuilt
+    chunk, total = line_index.read_lines(path, 2999, 5)
+    assert chunk.data == lines[2999].encode() + b"appended\nunterminated" and total == 3002
+
+    with open(path, "w") as f:  # same inode, same or larger size, different content
+        f.write("".join(f"new {i}\n" for i in range(12000)))
+    assert index.refresh() is True
+    assert line_index.read_lines(path, 11998, 5)[0].data == b"new 11998\nnew 11999\n"
+
+
+def test_reads_stop_at_max_bytes(tmp_path):
+    path = tmp_path / "minified.js"
+    path.write_bytes(b"x" * 100_000)
+    head = line_index.read_head(str(path), 3, max_bytes=1000)
+    tail = line_index.read_tail(str(path), 3, max_bytes=1000)
+    assert (len(head.data), head.truncated) == (1000, True)
+    assert (tail.start, tail.end, tail.truncated) == (99_000, 100_000, True)
+    chunk = line_index.read_bytes(str(path), 99_990, 50)
+    assert (chunk.data, chunk.end, chunk.truncated) == (b"x" * 10, 100_000, False)
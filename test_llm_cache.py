@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+from gemini_scheduler import GeminiScheduler, Job
+from llm_cache import LLMCache, cache_key
+
+
+def _response(text, tokens=10):
+    return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(total_token_count=tokens))
+
+
+def test_key_covers_model_prompt_and_config():
+    base = cache_key("m", "prompt", {"response_mime_type": "application/json"})
+    assert base == cache_key("m", "prompt", {"response_mime_type": "application/json"})
+    assert base != cache_key("m2", "prompt", {"response_mime_type": "application/json"})
+    assert base != cache_key("m", "prompt!", {"response_mime_type": "application/json"})
+    assert base != cache_key("m", "prompt", {"response_mime_type": "text/plain"})
+
+
+def test_modes(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    rw = LLMCache(path, "read-write")
+    rw.put("k", "m", _response("hello", 7))
+    hit = rw.get("k")
+    assert hit.text == "hello" and hit.usage_metadata.total_token_count == 7
+    assert rw.get("missing") is None and (rw.hits, rw.misses) == (1, 1)
+
+    ro = LLMCache(path, "read-only")
+    ro.put("other", "m", _response("x"))
+    assert ro.get("k").text == "hello" and ro.get("other") is None
+
+    refresh = LLMCache(path, "refresh")
+    assert refresh.get("k") is None
+    refresh.put("k", "m", _response("fresh"))
+    assert rw.get("k").text == "fresh"
+
+    off = LLMCache(path, "off")
+    assert off.get("k") is None and off.stats()["misses"] == 0
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = LLMCache(str(tmp_path / "c.sqlite"), "read-write", max_bytes=250)
+    cache.put("a", "m", _response("a" * 50))
+    cache.put("b", "m", _response("b" * 50))
+    cache.get("a")
+    cache.put("c", "m", _response("c" * 50))
+    assert cache.evictions == 1
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_size_total_is_kept_without_rescanning(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "c.sqlite")
+    legacy = sqlite3.connect(path)  # a cache written before the running total existed
+    legacy.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, model TEXT, payload TEXT,"
+                   " size INTEGER, created REAL, last_access REAL)")
+    legacy.execute("INSERT INTO responses VALUES ('old', 'm', 'x', 40, 0, 0)")
+    legacy.commit()
+    legacy.close()
+
+    cache = LLMCache(path, "read-write", max_bytes=250)
+    assert cache.total_size() == 40
+    cache.put("a", "m", _response("a" * 50))
+    cache.put("a", "m", _response("a" * 60))  # replaced, not added twice
+    other = LLMCache(path, "read-write", max_bytes=250)  # another process sharing the file
+    other.put("b", "m", _response("b" * 50))
+    cache.put("c", "m", _response("c" * 50))
+    assert cache.evictions and cache.get("old") is None and cache.get("c") is not None
+    assert cache.total_size() == cache.conn.execute("SELECT SUM(size) FROM responses").fetchone()[0] <= 250
+
+
+def test_warm_scheduler_run_makes_no_calls(tmp_path):
+    calls = []
+
+    async def call(job):
+        calls.append(job.contents)
+        return _response(job.contents.upper())
+
+    cache = LLMCache(str(tmp_path / "c.sqlite"))
+    jobs = [Job("m", f"p{i}") for i in range(5)]
+    cold = GeminiScheduler(limits={}, call=call, cache=cache).run(jobs)
+    warm_scheduler = GeminiScheduler(limits={}, call=call, cache=cache)
+    warm = warm_scheduler.run(jobs)
+
+    assert len(calls) == 5
+    assert [r.text for r in warm] == [r.text for r in cold]
+    assert warm_scheduler.last_stats.cache_hits == 5 and warm_scheduler.last_stats.requests == 0
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from model_admission import Histogram, ModelAdmission, Overloaded
+
+
+def _run(ticket, order, name, positions=None, hold=None):
+    def target():
+        with ticket.admitted(on_position=positions.append if positions is not None else None):
+            order.append(name)
+            if hold is not None:
+                hold.wait(5)
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def test_waiting_clients_take_turns():
+    admission = ModelAdmission(max_inflight=1, max_queued=10)
+    release = threading.Event()
+    order = []
+    first = _run(admission.enqueue("a"), order, "a0", hold=release)
+    while not order:
+        time.sleep(0.01)
+    tickets = [(name, admission.enqueue(name[0])) for name in ("a1", "a2", "a3", "b1", "c1", "b2")]
+    positions = {}
+    for name, ticket in tickets:  # round-robin: a1 b1 c1 a2 b2 a3
+        positions[name] = admission._position(ticket)
+    assert positions == {"a1": 0, "b1": 1, "c1": 2, "a2": 3, "b2": 4, "a3": 5}
+
+    reported = []
+    threads = [_run(ticket, order, name, reported if name == "a3" else None) for name, ticket in tickets]
+    time.sleep(0.05)
+    release.set()
+    for thread in [first] + threads:
+        thread.join(5)
+    assert order == ["a0", "a1", "b1", "c1", "a2", "b2", "a3"]
+    assert reported[0] == 5 and reported == sorted(reported, reverse=True)
+    stats = admission.stats()
+    assert stats["admitted"] == 7 and stats["inflight"] == stats["queued"] == 0
+    assert stats["queue_time"]["count"] == stats["run_time"]["count"] == 7
+
+
+def test_full_queue_sheds_with_retry_after():
+    admission = ModelAdmission(max_inflight=1, max_queued=1)
+    running = admission.enqueue("a")
+    waiting = admission.enqueue("b")
+    with pytest.raises(Overloaded) as e:
+        admission.enqueue("c")
+    assert e.value.retry_after >= 1 and admission.stats()["shed"] == 1
+
+    with pytest.raises(ConnectionResetError):  # client gone while queued: its ticket leaves the queue
+        with waiting.admitted(on_position=lambda position: (_ for _ in ()).throw(ConnectionResetError())):
+            pass
+    assert admission.stats()["queued"] == 0 and admission.stats()["cancelled"] == 1
+    queued = admission.enqueue("c")
+    with running.admitted():
+        pass
+    with queued.admitted():
+        assert admission.stats()["inflight"] == 1
+
+
+def test_cancel_gives_back_a_ticket_that_never_ran():
+    admission = ModelAdmission(max_inflight=1, max_queued=1)
+    admitted = admission.enqueue("a")  # the request fails (history write, ...) before admitted()
+    queued = admission.enqueue("b")
+    queued.cancel()
+    admitted.cancel()
+    admitted.cancel()  # idempotent
+    assert admission.stats()["inflight"] == admission.stats()["queued"] == 0
+    with admission.enqueue("c").admitted():
+        assert admission.stats()["inflight"] == 1
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.1, 1, float("inf")))
+    for value in (0.05, 0.05, 0.5, 3):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"0.1": 2, "1": 3, "+Inf": 4}
+    assert (snapshot["p50_s"], snapshot["p90_s"]) == ("0.1", "+Inf")
+    assert histogram.quantile(0.75) == 1
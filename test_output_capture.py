@@ -0,0 +1,40 @@
+from output_capture import OutputCapture
+
+
+def feed(capture, data, size=7):
+    for i in range(0, len(data), size):
+        capture.write(data[i:i + size])
+    capture.close()
+    return capture.text()
+
+
+def test_short_output_is_kept_whole():
+    data = "ünïcode split across chunks\n".encode() * 3
+    assert feed(OutputCapture(head_bytes=1000, tail_bytes=1000), data) == data.decode()
+    assert feed(OutputCapture(head_bytes=None), data * 1000, size=4096) == data.decode() * 1000
+
+
+def test_long_output_keeps_head_and_tail_lines():
+    data = b"".join(b"line %d\n" % i for i in range(1000))
+    text = feed(OutputCapture(head_bytes=10_000, tail_bytes=10_000, head_lines=3, tail_lines=2), data)
+    assert text == "line 0\nline 1\nline 2\n... [995 lines (8.6 KB) elided] ...\nline 998\nline 999\n"
+
+
+def test_byte_limits_cut_on_line_and_character_boundaries(tmp_path):
+    data = ("é" * 50 + "\n").encode() * 3
+    capture = OutputCapture(head_bytes=11, tail_bytes=21, spill_dir=str(tmp_path))
+    head, marker, tail = feed(capture, data).split("\n", 2)
+    assert head == "é" * 5  # the half character at the limit is dropped
+    assert marker == f"... [2 lines (271 bytes) elided; full output: {capture.spill_path}] ..."
+    assert tail == "é" * 10 + "\n"
+    with open(capture.spill_path, "rb") as f:
+        assert f.read() == data  # the spill file has everything, head and tail included
+
+
+def test_memory_stays_bounded():
+    capture = OutputCapture(head_bytes=100, tail_bytes=100)
+    chunk = b"x" * 65536
+    for _ in range(1000):
+        capture.write(chunk)
+    assert capture.total_bytes == 65536 * 1000 and len(capture._tail) <= 2 * 100 + len(chunk)
+    assert capture.spill_path is None and "(62.5 MB) elided" in capture.text()
@@ -0,0 +1,115 @@
+import os
+import sys
+
+import pytest
+
+from pipeline_engine import Pipeline, Step, resolve_dependencies
+from stage_context import StageContext
+
+
+def _copy_step(tmp_path, name, src, dst, sleep=0.0):
+    script = tmp_path / f"{name}.py"
+    script.write_text(
+        "import sys, time\n"
+        f"time.sleep({sleep})\n"
+        "data = open(sys.argv[1]).read()\n"
+        "open(sys.argv[2], 'w').write(data.upper())\n"
+    )
+    return Step(f"{sys.executable} {script} {src} {dst}", name, inputs=[src], outputs=[dst], name=name)
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def _pipeline(tmp_path):
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "b.txt").write_text("b")
+    return [
+        _copy_step(tmp_path, "left", "a.txt", "a2.txt", sleep=0.3),
+        _copy_step(tmp_path, "right", "b.txt", "b2.txt", sleep=0.3),
+        _copy_step(tmp_path, "join", "a2.txt", "joined.txt"),
+    ]
+
+
+def test_dependencies_follow_declared_files(tmp_path):
+    steps = _pipeline(tmp_path)
+    assert resolve_dependencies(steps) == {"left": set(), "right": set(), "join": {"left"}}
+
+
+def test_independent_branches_run_concurrently_and_reruns_are_incremental(tmp_path):
+    steps = _pipeline(tmp_path)
+    first = Pipeline(steps, manifest_path=str(tmp_path / "m.json"), jobs=4)
+    assert first.run()
+    assert first.wall < 0.55 + first.elapsed["join"]
+    assert (tmp_path / "joined.txt").read_text() == "A"
+    total, path = first.critical_path()
+    assert path[-1] == "join" and path[0] in ("left", "right")
+
+    second = Pipeline(steps, manifest_path=str(tmp_path / "m.json"))
+    assert second.run()
+    assert set(second.status.values()) == {"cached"}
+
+    (tmp_path / "b.txt").write_text("bb")
+    third = Pipeline(steps, manifest_path=str(tmp_path / "m.json"))
+    assert third.run()
+    assert third.status == {"left": "cached", "right": "ok", "join": "cached"}
+
+
+def test_failure_blocks_dependents_only(tmp_path):
+    steps = _pipeline(tmp_path)
+    os.remove(tmp_path / "a.txt")
+    pipeline = Pipeline(steps, manifest_path=str(tmp_path / "m.json"))
+    assert not pipeline.run()
+    assert pipeline.status == {"left": "failed", "right": "ok", "join": "blocked"}
+
+
+def test_stages_with_run_execute_in_process_unless_isolated(tmp_path, capsys):
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "stage_pid.py").write_text(
+        "import os\n"
+        "def run(context):\n"
+        "    print('hello from', context.argv[0])\n"
+        "    open(context.argv[0], 'w').write(str(os.getpid()))\n"
+        "if __name__ == '__main__':\n"
+        "    import sys, types\n"
+        "    run(types.SimpleNamespace(argv=sys.argv[1:]))\n"
+    )
+    (tmp_path / "stage_fails.py").write_text("def run(context):\n    return 3\n")
+    steps = [
+        Step("python3 stage_pid.py inproc.txt", "in-process", outputs=["inproc.txt"], name="inproc"),
+        Step("python3 stage_pid.py isolated.txt", "isolated", outputs=["isolated.txt"], name="isolated", isolate=True),
+        Step("python3 stage_fails.py", "fails"),
+    ]
+    pipeline = Pipeline(steps, manifest_path=str(tmp_path / "m.json"), context=StageContext(argv=[]))
+    assert not pipeline.run()
+    assert pipeline.status == {"inproc": "ok", "isolated": "ok", "stage_fails": "failed"}
+    assert (tmp_path / "inproc.txt").read_text() == str(os.getpid())
+    assert (tmp_path / "isolated.txt").read_text() != str(os.getpid())
+    assert "   [inproc] hello from inproc.txt" in capsys.readouterr().out
+
+
+def test_steps_that_rewrite_each_others_files_settle(tmp_path):
+    # The mapping phase of run_re_pipeline_v3: merge reads the map sanitize writes later, sanitize
+    # reads the map fix_code_writer patches later, fix_planner_map rewrites its own input.
+    import shutil
+    from run_re_pipeline_v3 import STEPS
+
+    names = {"merge_hunt_results", "sanitize_map", "fix_planner_map", "fix_code_writer"}
+    steps = [s for s in STEPS if s.name in names]
+    for step in steps:
+        shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), step.script), tmp_path)
+    (tmp_path / "variable_map.json").write_text('{"${A}": "x", "${zz}": "Heuristic"}')
+    (tmp_path / "smart_map.json").write_text('{"${sm}": "Smart"}')
+    first = Pipeline(steps, manifest_path=str(tmp_path / "m.json"), context=StageContext(argv=[]))
+    assert first.run() and set(first.status.values()) == {"ok"}
+
+    second = Pipeline(steps, manifest_path=str(tmp_path / "m.json"), context=StageContext(argv=[]))
+    assert second.run()
+    assert set(second.status.values()) == {"cached"}
+
+    (tmp_path / "smart_map.json").write_text('{"${sm}": "Smarter"}')
+    third = Pipeline(steps, manifest_path=str(tmp_path / "m.json"), context=StageContext(argv=[]))
+    assert third.run() and set(third.status.values()) == {"ok"}
+    assert '"${sm}": "Smarter"' in (tmp_path / "variable_map_sanitized.json").read_text()
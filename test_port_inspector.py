@@ -0,0 +1,51 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from port_inspector import inspect_ports, listening_pids, parse_ports, report
+
+CHILD = "import socket, sys, time; s = socket.socket(fileno=int(sys.argv[1])); time.sleep(30)"
+
+
+@pytest.fixture
+def listener():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen()
+    yield sock
+    sock.close()
+
+
+def test_finds_the_listening_process(listener):
+    port = listener.getsockname()[1]
+    [info] = inspect_ports([port])
+    assert (info.address, info.state) == ("127.0.0.1", "LISTEN")
+    assert [p.pid for p in info.processes] == [os.getpid()] and info.processes[0].ppid == os.getppid()
+
+    text = report([port, 1])
+    assert f"PORT: {port}\nPORT_STATUS: OCCUPIED (listening on 127.0.0.1)\nPID: {os.getpid()}\nDETAILS:" in text
+    assert text.endswith("PORT: 1\nPORT_STATUS: FREE")
+    assert parse_ports(port, "1, 2 1") == [port, 1, 2]
+
+
+def test_shared_sockets_and_command_globs(listener):
+    port = listener.getsockname()[1]
+    child = subprocess.Popen([sys.executable, "-c", CHILD, str(listener.fileno()), "gemini_server_probe.py"],
+                             pass_fds=[listener.fileno()])
+    try:
+        deadline = time.monotonic() + 10
+        while len(listening_pids(port)) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert listening_pids(port) == [os.getpid(), child.pid]  # oldest (the parent) first
+        [info] = inspect_ports(command="gemini_server_*")
+        assert info.port == port and {p.pid for p in info.processes} == {os.getpid(), child.pid}
+        assert f"PID: {os.getpid()} {child.pid}" in report(command="gemini_server_probe*")
+        assert report(command="no_such_server_*") == (
+            "PORT_STATUS: FREE (no listening ports of processes matching 'no_such_server_*')")
+    finally:
+        child.kill()
+        child.wait()
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+import time
+
+import process_killer
+from process_killer import parse_pids, report, terminate
+
+# A server with a bash worker in its own session (as shell_pool starts them) running a command,
+# and a plain child; prints the PIDs of all three once they are up.
+SERVER = """
+import subprocess, sys, time
+worker = subprocess.Popen(["bash", "-c", "sleep 60 & echo $!; wait"], stdout=subprocess.PIPE, text=True,
+                          start_new_session=True)
+child = subprocess.Popen(["sleep", "60"])
+print(worker.pid, worker.stdout.readline().strip(), child.pid, flush=True)
+time.sleep(60)
+"""
+STUBBORN = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('up', flush=True); time.sleep(60)"
+
+
+def _alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] not in "ZX"
+    except OSError:
+        return False
+
+
+def test_stops_the_whole_tree_as_soon_as_it_exits():
+    server = subprocess.Popen([sys.executable, "-c", SERVER], stdout=subprocess.PIPE, text=True)
+    try:
+        family = [int(pid) for pid in server.stdout.readline().split()]
+        start = time.monotonic()
+        [result] = terminate([server.pid])
+        assert time.monotonic() - start < 1  # no fixed sleep
+        assert (result.outcome, result.children) == ("exited", 3)
+        assert not any(_alive(pid) for pid in [server.pid] + family)
+        assert report([result]).startswith("STATUS: KILLED (Standard, exited in ")
+        assert report([result]).endswith(" ms, 3 child processes with it)")
+    finally:
+        server.kill()
+        server.wait()
+
+
+def test_escalates_and_reports_every_pid():
+    stubborn = subprocess.Popen([sys.executable, "-c", STUBBORN], stdout=subprocess.PIPE, text=True)
+    quick = subprocess.Popen(["sleep", "60"])
+    try:
+        stubborn.stdout.readline()
+        gone = subprocess.Popen(["true"])
+        gone.wait()
+        start = time.monotonic()
+        results = terminate(parse_pids(stubborn.pid, f"{quick.pid}, {gone.pid} {os.getpid()}"), grace=0.3)
+        assert 0.3 <= time.monotonic() - start < 2
+        assert [r.outcome for r in results] == ["killed", "exited", "not_found", "refused"]
+        assert results[1].seconds < 0.3  # its own exit, not the stubborn one's grace
+        assert report(results).splitlines() == [
+            f"PID {stubborn.pid}: STATUS: KILLED (SIGKILL after ignoring SIGTERM)",
+            f"PID {quick.pid}: STATUS: KILLED (Standard, exited in {results[1].seconds * 1000:.0f} ms)",
+            f"PID {gone.pid}: STATUS: NOT_FOUND (no such process)",
+            f"PID {os.getpid()}: STATUS: FAILED_TO_KILL. not a process KillProcess may stop",
+        ]
+    finally:
+        for process in (stubborn, quick):
+            process.kill()
+            process.wait()
+
+
+def test_denied_without_sudo_installed_still_reports_the_rest(monkeypatch):
+    allowed, protected = subprocess.Popen(["sleep", "60"]), subprocess.Popen(["sleep", "60"])
+    signal = process_killer._Member.signal
+    monkeypatch.setattr(process_killer._Member, "signal",
+                        lambda m, signum: m.pid != protected.pid and signal(m, signum))  # as if owned by root
+
+    def no_sudo(*args, **kwargs):
+        raise FileNotFoundError(2, "No such file or directory", "sudo")
+
+    monkeypatch.setattr(process_killer.subprocess, "run", no_sudo)
+    fds = len(os.listdir("/proc/self/fd"))
+    try:
+        results = terminate([allowed.pid, protected.pid], grace=0.2, sudo=True)
+        allowed.wait(timeout=5)
+        assert [r.outcome for r in results] == ["exited", "denied"]
+        assert report(results).splitlines()[1] == (f"PID {protected.pid}: STATUS: FAILED_TO_KILL. "
+                                                   "permission denied; sudo: No such file or directory")
+        assert len(os.listdir("/proc/self/fd")) == fds  # every pidfd closed
+
+        monkeypatch.setattr(process_killer, "_wait", lambda *args: 1 / 0)
+        try:
+            terminate([protected.pid])
+        except ZeroDivisionError:
+            pass
+        assert len(os.listdir("/proc/self/fd")) == fds
+    finally:
+        for p in (allowed, protected):
+            p.kill()
+            p.wait()
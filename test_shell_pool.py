@@ -0,0 +1,82 @@
+import functools
+import os
+import time
+
+import pytest
+
+from output_capture import OutputCapture
+from shell_pool import ShellPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ShellPool(max_workers=2, max_commands=5, cwd=str(tmp_path))
+    yield pool
+    pool.close()
+
+
+def test_sessions_keep_their_own_cwd_and_env(pool, tmp_path):
+    (tmp_path / "sub").mkdir()
+    with pool.session("a"):
+        result = pool.run("cd sub && export GREETING='hi there'; echo out; echo err >&2; false")
+    assert (result.returncode, result.stdout, result.stderr) == (1, "out\n", "err\n")
+    assert result.cwd == str(tmp_path / "sub")
+    assert pool.run('pwd; echo "$GREETING"', session="a").stdout == f"{tmp_path / 'sub'}\nhi there\n"
+    assert pool.run('pwd; echo "[$GREETING]"', session="b").stdout == f"{tmp_path}\n[]\n"
+    assert pool.run("printf 'a\\0b'; cat", session="b").stdout == "a\0b"  # NULs pass; stdin is /dev/null
+
+
+def test_timeout_kills_the_command_not_the_shell(pool):
+    pool.run("export KEEP=1; shell=$$")
+    start = time.monotonic()
+    result = pool.run("sleep 30 | cat; sleep 30", timeout=0.5)
+    assert result.timed_out and time.monotonic() - start < 5
+    after = pool.run('echo "$KEEP $shell $$"')
+    assert not after.timed_out
+    keep, before_pid, pid = after.stdout.split()
+    assert keep == "1" and before_pid == pid
+
+    result = pool.run("while :; do :; done", timeout=0.5)  # the shell itself is stuck: replaced
+    assert result.timed_out and pool.run("echo $$").stdout.strip() != pid
+    assert pool.stats()["timed_out"] == 2
+
+
+def test_recycled_and_evicted_shells_keep_cwd_and_exports(pool, tmp_path):
+    pool.run("cd /; export A='x y' B=2")
+    first_pid = pool.run("echo $$").stdout
+    for _ in range(5):
+        result = pool.run('echo "$A|$B|$PWD"')
+    assert result.stdout == "x y|2|/\n"
+    assert pool.run("echo $$").stdout != first_pid and pool.stats()["recycled"] == 1
+
+    pool.run("true", session="b")
+    pool.run("true", session="c")  # max_workers=2: the default session's shell goes
+    assert pool.stats()["live"] == 2 and pool.stats()["evicted"] == 1
+    assert pool.run('echo "$A|$B|$PWD"').stdout == "x y|2|/\n"
+
+    pool.run(f"cd {tmp_path}; exit 3", session="b")
+    assert pool.run("pwd", session="b").stdout == f"{tmp_path}\n"  # respawned where it was
+
+
+def test_forked_child_starts_its_own_shells(pool):
+    parent = pool.run("echo $$").stdout
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if pool.run("echo $$").stdout != parent else 1)
+    assert os.waitpid(pid, 0)[1] == 0
+    assert pool.run("echo $$").stdout == parent
+
+
+def test_long_output_is_captured_head_and_tail(tmp_path):
+    pool = ShellPool(capture=functools.partial(OutputCapture, head_lines=2, tail_lines=2, spill_dir=str(tmp_path)))
+    try:
+        result = pool.run("seq 1 200000; echo done >&2")
+        head, rest = result.stdout.split("\n... [", 1)
+        marker, tail = rest.split("] ...\n")
+        assert head == "1\n2" and tail == "199999\n200000\n" and result.stderr == "done\n"
+        spilled = marker.split("full output: ")[1]
+        with open(spilled) as f:
+            assert sum(1 for _ in f) == 200000
+        assert pool.run("echo next").stdout == "next\n"  # the framing survived the flood
+    finally:
+        pool.close()
@@ -0,0 +1,50 @@
+import hashlib
+import os
+
+import pytest
+
+from upload_store import UploadError, UploadStore
+
+
+def _temp(store, data):
+    path = os.path.join(store.tmp_dir, f"chunk_{len(data)}_{hashlib.md5(data).hexdigest()}")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    store = UploadStore(str(tmp_path / "uploads"))
+    data = b"same bytes"
+    digest = hashlib.sha256(data).hexdigest()
+    first = store.add(_temp(store, data), digest, len(data), "../notes v1.txt")
+    second = store.add(_temp(store, data), digest, len(data), "notes.txt")
+    assert not first.deduplicated and second.deduplicated
+    assert os.path.basename(first.path) == f"{digest[:12]}_notes_v1.txt"
+    assert os.stat(first.path).st_ino == os.stat(second.path).st_ino  # links to one object
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_resumable_upload_survives_a_restart(tmp_path):
+    root = str(tmp_path / "uploads")
+    data = os.urandom(3000)
+    store = UploadStore(root, max_bytes=10_000)
+    with pytest.raises(UploadError) as e:
+        store.begin("too_big.bin", 20_000)
+    assert e.value.status == 413
+    upload_id = store.begin("big.bin", len(data))["id"]
+    assert store.append(upload_id, 0, _temp(store, data[:1000]))["offset"] == 1000
+    with pytest.raises(UploadError) as e:  # a retried chunk that already landed
+        store.append(upload_id, 0, _temp(store, data[:1000]))
+    assert e.value.status == 409
+
+    store = UploadStore(root)  # e.g. the console restarted: the hash state is rebuilt from disk
+    offset = store.status(upload_id)["offset"]
+    with pytest.raises(UploadError) as e:
+        store.append(upload_id, offset, _temp(store, data[offset:] + b"extra"))
+    assert e.value.status == 413 and store.status(upload_id)["offset"] == offset
+    done = store.append(upload_id, offset, _temp(store, data[offset:]))
+    assert done["sha256"] == hashlib.sha256(data).hexdigest()
+    with open(done["path"], "rb") as f:
+        assert f.read() == data
+    assert store.completed(upload_id).path == done["path"]
@@ -2,6 +2,9 @@ import re
 import json
 import os
 
+from cli_corpus import get_corpus
+from stage_context import StageContext
+
 # Configuration
 CLI_PATH = "node_modules/@anthropic-ai/claude-code/cli.js"
 MAP_FILE = "variable_map.json"
@@ -16,25 +19,19 @@ TARGET_TOOLS = [
 def update_variable_map():
     print(f"--- 🕵️‍♀️  Scanning {CLI_PATH} for definitive definitions ---")
     
-    if not os.path.exists(CLI_PATH):
+    corpus = get_corpus(CLI_PATH)
+    if not corpus.exists():
         print(f"❌ Error: Could not find {CLI_PATH}")
         return
 
-    with open(CLI_PATH, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    # Regex explanation:
+    # Every `var X="..."` site comes from the corpus index (cli_corpus.VAR_PATTERN):
     # var\s+       -> matches "var "
     # ([a-zA-Z0-9_$]+) -> Capture Group 1: The variable name (e.g., K9, gI)
     # \s*=\s* -> matches " = " (with optional whitespace)
     # "([^"]+)"    -> Capture Group 2: The value inside quotes
-    pattern = re.compile(r'var\s+([a-zA-Z0-9_$]+)\s*=\s*"([^"]+)"')
-    
-    matches = pattern.findall(content)
-    
     new_mappings = {}
     
-    for var_name, value in matches:
+    for var_name, value, _, _ in corpus.var_assignments():
         # We only care if the value matches one of our known Tool Names
         if value in TARGET_TOOLS:
             key = f"${{{var_name}}}" # Format as ${VAR}
@@ -67,5 +64,8 @@ def update_variable_map():
             json.dump(current_map, f, indent=4)
         print(f"   💾 Saved {changes_count} updates to {MAP_FILE}")
 
-if __name__ == "__main__":
+def run(context):
     update_variable_map()
+
+if __name__ == "__main__":
+    run(StageContext())
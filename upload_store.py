@@ -0,0 +1,256 @@
+"""
+upload_store.py
+Content-addressed store for files uploaded to the Gemini console.
+
+The console used to move every upload into the working directory as
+`<timestamp>_<name>`, so the same file uploaded twice took twice the space and the
+agent had no stable name for it. UploadStore keeps one copy per SHA-256 digest:
+
+    .console_uploads/
+        objects/ab/cdef...            the content, once per digest
+        files/abcdef123456_name.ext   hard link the agent's tools are pointed at
+        partial/<id>, <id>.json       resumable uploads in progress
+        tmp/                          request bodies being streamed in (same filesystem)
+
+ConsoleServer already streams upload bodies to tmp/ in fixed-size chunks, hashing and
+size-checking them on the way, so add() only has to rename (or, for a duplicate,
+delete) the temp file. Large files go through the resumable protocol instead, one
+chunk per request, so a dropped connection costs one chunk rather than the upload:
+
+    POST /uploads?name=big.iso&size=N          -> {"id", "offset": 0, ...}
+    PUT  /uploads?id=...&offset=K  <chunk>     -> {"offset": K + len} ... {"path", "sha256"}
+    GET  /uploads?id=...                       -> {"offset", ...}  (where to resume)
+"""
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+DEFAULT_UPLOAD_ROOT = ".console_uploads"
+CHUNK_SIZE = 1024 * 1024
+RESUMABLE_CHUNK = 8 * 1024 * 1024  # what UPLOAD_SCRIPT sends per PUT
+RESUMABLE_THRESHOLD = 8 * 1024 * 1024  # smaller files keep the plain multipart POST
+PARTIAL_TTL = 24 * 60 * 60
+
+StoredUpload = namedtuple("StoredUpload", "sha256 size filename path deduplicated")
+
+
+class UploadError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def safe_filename(filename):
+    name = re.sub(r"[^\w.+-]", "_", os.path.basename(filename or "")).lstrip(".")
+    return name[:120] or "upload"
+
+
+class UploadStore:
+    def __init__(self, root=DEFAULT_UPLOAD_ROOT, max_bytes=None, clock=time.time):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.tmp_dir = os.path.join(root, "tmp")
+        for sub in ("objects", "files", "partial", "tmp"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+        self.stored = 0
+        self.deduplicated = 0
+        self._hashes = {}  # upload id -> (offset, sha256 so far) for chunks appended by this process
+        self._lock = threading.Lock()
+
+    # --- Whole files ---
+
+    def add(self, path, sha256, size, filename):
+        """Moves a fully written temp file (on the store's filesystem) into the store."""
+        obj = os.path.join(self.root, "objects", sha256[:2], sha256[2:])
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        deduplicated = os.path.exists(obj)
+        if deduplicated:
+            os.remove(path)
+        else:
+            os.chmod(path, 0o644)
+            os.replace(path, obj)
+        link = os.path.join(self.root, "files", f"{sha256[:12]}_{safe_filename(filename)}")
+        if not os.path.exists(link):
+            try:
+                os.link(obj, link)
+            except FileExistsError:
+                pass
+        with self._lock:
+            self.stored += 1
+            self.deduplicated += deduplicated
+        return StoredUpload(sha256, size, filename, link, deduplicated)
+
+    # --- Resumable uploads ---
+
+    def _partial(self, upload_id):
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id or ""):
+            raise UploadError(400, "Bad upload id")
+        return os.path.join(self.root, "partial", upload_id)
+
+    def _meta(self, upload_id):
+        try:
+            with open(self._partial(upload_id) + ".json") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError(404, f"No upload {upload_id}")
+
+    def _write_meta(self, upload_id, meta):
+        path = self._partial(upload_id) + ".json"
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def begin(self, filename, size):
+        """Starts a resumable upload of `size` bytes; returns its status."""
+        if size < 0:
+            raise UploadError(400, "Bad size")
+        if self.max_bytes is not None and size > self.max_bytes:
+            raise UploadError(413, f"Upload exceeds {self.max_bytes} bytes")
+        self.prune()
+        upload_id = uuid.uuid4().hex
+        open(self._partial(upload_id), "wb").close()
+        self._write_meta(upload_id, {"filename": filename, "size": size, "started": self.clock()})
+        return self.status(upload_id)
+
+    def status(self, upload_id):
+        meta = self._meta(upload_id)
+        status = {"id": upload_id, "filename": meta["filename"], "size": meta["size"]}
+        if "sha256" in meta:
+            return dict(status, offset=meta["size"], sha256=meta["sha256"], path=meta["path"])
+        return dict(status, offset=os.path.getsize(self._partial(upload_id)))
+
+    def append(self, upload_id, offset, chunk_path):
+        """
+        Appends a chunk (a temp file) at `offset`, which must be where the upload stands
+        (409 otherwise: ask status() and resume from there). Stores the file once complete.
+        """
+        partial = self._partial(upload_id)
+        try:
+            out = open(os.open(partial, os.O_WRONLY | os.O_APPEND), "ab")  # never re-creates a stored one
+        except FileNotFoundError:
+            out = None
+        if out is None:
+            self._meta(upload_id)  # 404 if unknown
+            raise UploadError(409, "Upload already complete")
+        with out:
+            fcntl.flock(out, fcntl.LOCK_EX)  # chunks of one upload may reach different --workers
+            meta = self._meta(upload_id)
+            if "sha256" in meta:  # completed while we waited for the lock
+                raise UploadError(409, "Upload already complete")
+            current = out.seek(0, os.SEEK_END)
+            if offset != current:
+                raise UploadError(409, f"Upload {upload_id} is at offset {current}, not {offset}")
+            with self._lock:
+                resumed_at, digest = self._hashes.pop(upload_id, (None, None))
+            if resumed_at != current:  # earlier chunks went through another process (or before a restart)
+                digest = _hash_file(partial) if current else hashlib.sha256()
+            with open(chunk_path, "rb") as chunk:
+                while data := chunk.read(CHUNK_SIZE):
+                    if current + len(data) > meta["size"]:
+                        out.truncate(offset)
+                        raise UploadError(413, f"Chunk runs past the declared size of {meta['size']} bytes")
+                    out.write(data)
+                    digest.update(data)
+                    current += len(data)
+            out.flush()
+            if current < meta["size"]:
+                with self._lock:
+                    self._hashes[upload_id] = (current, digest)
+                return self.status(upload_id)
+            stored = self.add(partial, digest.hexdigest(), meta["size"], meta["filename"])
+            self._write_meta(upload_id, dict(meta, sha256=stored.sha256, path=stored.path))
+        return dict(self.status(upload_id), deduplicated=stored.deduplicated)
+
+    def completed(self, upload_id):
+        """The StoredUpload of a finished resumable upload."""
+        meta = self._meta(upload_id)
+        if "sha256" not in meta:
+            raise UploadError(409, f"Upload {upload_id} is not complete")
+        return StoredUpload(meta["sha256"], meta["size"], meta["filename"], meta["path"], False)
+
+    def prune(self):
+        """Forgets resumable uploads (finished or not) started more than PARTIAL_TTL ago."""
+        directory = os.path.join(self.root, "partial")
+        for name in os.listdir(directory):
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-5]
+            try:
+                if self.clock() - self._meta(upload_id)["started"] < PARTIAL_TTL:
+                    continue
+            except (UploadError, ValueError, KeyError):
+                pass
+            for path in (os.path.join(directory, upload_id), os.path.join(directory, name)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        return {"stored": self.stored, "deduplicated": self.deduplicated}
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while data := f.read(CHUNK_SIZE):
+            digest.update(data)
+    return digest
+
+
+def add_upload_arguments(parser):
+    parser.add_argument("--upload-root", default=DEFAULT_UPLOAD_ROOT,
+                        help="Content-addressed upload store (default: %(default)s)")
+    return parser
+
+
+# Console-page side: files over RESUMABLE_THRESHOLD go up in RESUMABLE_CHUNK pieces,
+# retrying from the server's offset, and the form is then posted with just the upload id.
+UPLOAD_SCRIPT = """
+<script>
+    document.querySelector('form').addEventListener('submit', async function(e) {
+        const form = e.target;
+        const input = form.querySelector('input[type=file]');
+        const file = input && input.files[0];
+        if (!file || file.size <= %(threshold)d) return;  // small: the plain multipart POST
+        e.preventDefault();
+        e.stopImmediatePropagation();
+        const status = document.getElementById('thinking') || {style: {}};
+        status.style.display = 'block';
+        const api = (method, query, body) => fetch('/uploads?' + new URLSearchParams(query), {method: method, body: body,
+            headers: body ? {'Content-Type': 'application/octet-stream'} : {}}).then(r => r.ok ? r.json() : Promise.reject(r));
+        try {
+            let upload = await api('POST', {name: file.name, size: file.size});
+            let failures = 0;
+            while (!upload.sha256) {
+                status.textContent = '📤 Uploading ' + file.name + ': ' + Math.floor(100 * upload.offset / file.size) + '%%';
+                try {
+                    upload = await api('PUT', {id: upload.id, offset: upload.offset},
+                                       file.slice(upload.offset, upload.offset + %(chunk)d));
+                    failures = 0;
+                } catch (err) {
+                    if (++failures > 5) throw err;
+                    await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+                    upload = await api('GET', {id: upload.id});  // resume where the server got to
+                }
+            }
+            const field = document.createElement('input');
+            field.type = 'hidden';
+            field.name = 'upload_id';
+            field.value = upload.id;
+            form.appendChild(field);
+            input.value = '';
+            form.submit();
+        } catch (err) {
+            status.textContent = '❌ Upload of ' + file.name + ' failed';
+        }
+    }, true);
+</script>
+""" % {"threshold": RESUMABLE_THRESHOLD, "chunk": RESUMABLE_CHUNK}
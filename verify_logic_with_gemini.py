@@ -1,16 +1,11 @@
 import os
 import json
-from google import genai
 from google.genai import types
 
-# Initialize Client
-try:
-    client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
-except KeyError:
-    print("❌ Error: GEMINI_API_KEY environment variable not set.")
-    exit(1)
+from llm_cache import cache_parser, generate_content
+from stage_context import StageContext
 
-def verify_persona(filename, tool_defs):
+def verify_persona(client, filename, tool_defs, cache=None):
     with open(filename, "r") as f:
         content = f.read()
 
@@ -41,18 +36,21 @@ def verify_persona(filename, tool_defs):
     """
 
     try:
-        response = client.models.generate_content(
+        response = generate_content(
+            client,
             model="gemini-2.0-flash",
             contents=prompt,
             config=types.GenerateContentConfig(
                 response_mime_type="application/json"
-            )
+            ),
+            cache=cache,
         )
         return json.loads(response.text)
     except Exception as e:
         return {"status": "ERROR", "error": str(e)}
 
-def main():
+def main(context, cache_mode=None):
+    cache = context.cache(cache_mode)
     # Load Tools
     if os.path.exists("master_tool_definitions.json"):
         with open("master_tool_definitions.json", "r") as f:
@@ -75,7 +73,7 @@ def main():
     for f in files[:3]: # limit to top 3 for speed
         filepath = os.path.join(persona_dir, f)
         if os.path.exists(filepath):
-            result = verify_persona(filepath, tools)
+            result = verify_persona(context.client, filepath, tools, cache)
             report.append(result)
             
             # Print immediate feedback
@@ -85,10 +83,19 @@ def main():
                 print(f"      Missing Vars: {result.get('obfuscated_variables')}")
                 print(f"      Missing Tools: {result.get('missing_tools')}")
 
+    cache.report()
+
     # Save Report
     with open("gemini_audit_report.json", "w") as f:
         json.dump(report, f, indent=2)
     print("\n📄 Full audit report saved to gemini_audit_report.json")
 
+def run(context):
+    args = context.parse_args(cache_parser("Logic audit of hydrated personas against the tool definitions"))
+    if "GEMINI_API_KEY" not in os.environ:
+        print("❌ Error: GEMINI_API_KEY environment variable not set.")
+        return 1
+    main(context, args.cache_mode)
+
 if __name__ == "__main__":
-    main()
+    exit(run(StageContext()))
@@ -8,23 +8,19 @@ import os
 from google import genai
 from google.genai import types
 
+from cli_corpus import get_corpus
+from llm_cache import generate_content, open_cache, parse_cache_args
+
 # Initialize Gemini
 client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
 
 CLI_FILE = "node_modules/@anthropic-ai/claude-code/cli.js"
 
 def get_context(pattern, num_chars=1000):
-    with open(CLI_FILE, "r") as f:
-        content = f.read()
-    
-    matches = []
-    for m in re.finditer(pattern, content):
-        start = max(0, m.start() - num_chars // 2)
-        end = min(len(content), m.end() + num_chars // 2)
-        matches.append(content[start:end])
-    return matches
+    corpus = get_corpus(CLI_FILE)
+    return [m["context"] for m in corpus.search(pattern, window=num_chars // 2)]
 
-def analyze_subagent_logic():
+def analyze_subagent_logic(cache=None):
     print("--- 🕵️‍♀️ Investigating Subagent Architecture ---")
     
     # 1. Grab context around 'subagent_type'
@@ -53,10 +49,12 @@ def analyze_subagent_logic():
     """
     
     print("🧠 Asking Gemini to decode subagent logic...")
-    response = client.models.generate_content(
+    response = generate_content(
+        client,
         model="gemini-2.0-flash",
         contents=prompt,
-        config=types.GenerateContentConfig(response_mime_type="application/json")
+        config=types.GenerateContentConfig(response_mime_type="application/json"),
+        cache=cache,
     )
     
     result = json.loads(response.text)
@@ -75,4 +73,7 @@ def analyze_subagent_logic():
                 print(f"⚠️  Definition not found for {agent_type}")
 
 if __name__ == "__main__":
-    analyze_subagent_logic()
+    args = parse_cache_args("Inspect subagent spawn logic with Gemini")
+    cache = open_cache(args.cache_mode)
+    analyze_subagent_logic(cache)
+    cache.report()